@@ -0,0 +1,264 @@
+import os, time, logging, threading
+import pandas as pd
+from decimal import Decimal
+from typing import Callable, Optional
+from account.my_account import get_my_exchange_account
+
+"""
+# 계좌 캐시
+
+매 스케줄마다 전체 계좌 조회(서명된 요청 + DataFrame 생성)를 하지 않도록 계좌 잔고를 메모리에 보관합니다.
+
+- 최초 조회 후에는 메모리의 잔고를 반환합니다. (get_my_exchange_account와 같은 형태의 DataFrame)
+- 우리가 낸 주문이 체결되면(order_tracker 체결 결과) 잔고를 바로 반영합니다.
+  - 매수(bid): 코인 수량 증가, 매수평균가 갱신, 원화 = 원화 - 체결 금액 - 수수료
+  - 매도(ask): 코인 수량 감소, 원화 = 원화 + 체결 금액 - 수수료
+- 백그라운드 스레드에서 {reconcile_sec}초마다 실제 계좌를 조회하여 맞춥니다. (입출금, 앱에서 직접 한 주문 등)
+  조회 중에 체결이 반영되면 조회 결과는 버리고 다음 주기에 다시 조회합니다.
+- 주문 요청부터 체결 결과가 반영될 때까지(진행 중인 주문)는 조회 결과를 사용하지 않습니다.
+  (조회 결과에 이미 체결이 반영되어 있으면 체결 결과 반영 시 두 번 계산되므로)
+  - trade.buy_market/sell_market에서 주문 요청 전 begin_order, 응답 후 end_order(uuid)를 호출합니다.
+  - 체결 결과(apply_fill)가 반영되면 진행 중인 주문에서 제거합니다.
+  - 체결 확인을 하지 않는 주문은 {pending_order_sec}초가 지나면 진행 중인 주문에서 제거합니다.
+- 마지막 조회 후 {max_age_sec}초가 지났으면 반환하기 전에 다시 조회합니다. (백그라운드 스레드가 멈춘 경우)
+
+## 환경변수 (.env)
+- ACCOUNT_CACHE_MAX_AGE_SEC: 캐시 최대 유지 시간(초), 기본값 120
+- ACCOUNT_RECONCILE_SEC: 실제 계좌 조회 주기(초), 기본값 30
+- ACCOUNT_PENDING_ORDER_SEC: 진행 중인 주문 최대 유지 시간(초), 기본값 60 (체결 확인 제한 시간보다 길게)
+"""
+
+ACCOUNT_CACHE_MAX_AGE_SEC = float(os.getenv('ACCOUNT_CACHE_MAX_AGE_SEC', '120'))
+ACCOUNT_RECONCILE_SEC = float(os.getenv('ACCOUNT_RECONCILE_SEC', '30'))
+ACCOUNT_PENDING_ORDER_SEC = float(os.getenv('ACCOUNT_PENDING_ORDER_SEC', '60'))
+
+logger = logging.getLogger(__name__)
+
+_ZERO = Decimal('0')
+
+
+def _to_decimal(value) -> Decimal:
+    if value is None or value == '':
+        return _ZERO
+    return Decimal(str(value))
+
+
+# Decimal -> 문자열 (지수 표기 없이, 업비트 응답과 같은 형태)
+def _to_str(value: Decimal) -> str:
+    return format(value.normalize(), 'f') if value != _ZERO else '0'
+
+
+class AccountCache:
+    def __init__(
+            self,
+            fetch_func: Callable[[], pd.DataFrame] = get_my_exchange_account,
+            max_age_sec: float = ACCOUNT_CACHE_MAX_AGE_SEC,
+            reconcile_sec: float = ACCOUNT_RECONCILE_SEC,
+            pending_order_sec: float = ACCOUNT_PENDING_ORDER_SEC
+    ):
+        self.fetch_func = fetch_func
+        self.max_age_sec = max_age_sec
+        self.reconcile_sec = reconcile_sec
+        self.pending_order_sec = pending_order_sec
+
+        # 화폐별 잔고 {currency: {'balance', 'locked', 'avg_buy_price': Decimal, 'avg_buy_price_modified', 'unit_currency'}}
+        self._balances = None
+        self._updated_at = None  # 마지막 조회 시각 (time.monotonic())
+        self._version = 0  # 체결 반영/주문 요청 횟수 (조회 중 체결 반영 여부 확인)
+        self._placing = 0  # 응답을 기다리는 주문 요청 수
+        self._pending_orders = {}  # 체결 결과가 반영되지 않은 주문 {uuid: 주문 응답 시각 (time.monotonic())}
+        self._lock = threading.Lock()
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def refresh(self) -> bool:
+        """
+        실제 계좌를 조회하여 캐시 갱신
+
+        Returns:
+            bool: 갱신 여부 (조회 중에 체결이 반영되었거나 진행 중인 주문이 있으면 False)
+        """
+        with self._lock:
+            version = self._version
+
+        account_df = self.fetch_func()
+        if 'currency' not in account_df.columns:
+            raise ValueError('[currency] 컬럼이 존재하지 않습니다.')
+
+        balances = {}
+        for row in account_df.to_dict('records'):
+            balances[row['currency']] = {
+                'balance': _to_decimal(row.get('balance')),
+                'locked': _to_decimal(row.get('locked')),
+                'avg_buy_price': _to_decimal(row.get('avg_buy_price')),
+                'avg_buy_price_modified': row.get('avg_buy_price_modified', False),
+                'unit_currency': row.get('unit_currency', 'KRW'),
+            }
+
+        with self._lock:
+            if self._version != version:
+                logger.debug('계좌 조회 중 체결이 반영되어 조회 결과를 사용하지 않습니다.')
+                return False
+
+            if self._has_pending_orders():
+                logger.debug(f'진행 중인 주문이 있어 조회 결과를 사용하지 않습니다. ({list(self._pending_orders)})')
+                return False
+
+            self._balances = balances
+            self._updated_at = time.monotonic()
+
+        return True
+
+    # 진행 중인 주문 확인 (lock 안에서 호출, 오래된 주문은 제거)
+    def _has_pending_orders(self) -> bool:
+        now = time.monotonic()
+        for order_uuid, placed_at in list(self._pending_orders.items()):
+            if now - placed_at > self.pending_order_sec:
+                logger.warning(f'[{order_uuid}] 체결 결과가 반영되지 않아 진행 중인 주문에서 제거합니다.')
+                del self._pending_orders[order_uuid]
+
+        return self._placing > 0 or len(self._pending_orders) > 0
+
+    # 주문 요청 전 호출 (응답을 받을 때까지 조회 결과를 사용하지 않음)
+    def begin_order(self):
+        with self._lock:
+            self._version += 1
+            self._placing += 1
+
+    # 주문 응답 후 호출 (주문 실패 시 order_uuid는 None)
+    def end_order(self, order_uuid: Optional[str] = None):
+        with self._lock:
+            self._version += 1
+            self._placing = max(self._placing - 1, 0)
+            if order_uuid:
+                self._pending_orders[order_uuid] = time.monotonic()
+
+    # 다음 조회 때 실제 계좌로 갱신하도록 설정
+    def invalidate(self):
+        with self._lock:
+            self._updated_at = None
+
+    def _ensure_fresh(self):
+        with self._lock:
+            is_fresh = self._updated_at is not None and time.monotonic() - self._updated_at <= self.max_age_sec
+
+        if not is_fresh:
+            self.refresh()
+
+    def get_account(self) -> pd.DataFrame:
+        """
+        계좌 잔고 (get_my_exchange_account와 같은 형태의 DataFrame)
+        """
+        self._ensure_fresh()
+
+        with self._lock:
+            rows = [
+                {
+                    'currency': currency,
+                    'balance': _to_str(item['balance']),
+                    'locked': _to_str(item['locked']),
+                    'avg_buy_price': _to_str(item['avg_buy_price']),
+                    'avg_buy_price_modified': item['avg_buy_price_modified'],
+                    'unit_currency': item['unit_currency'],
+                }
+                for currency, item in (self._balances or {}).items()
+            ]
+
+        return pd.DataFrame(rows, columns=['currency', 'balance', 'locked', 'avg_buy_price',
+                                           'avg_buy_price_modified', 'unit_currency'])
+
+    def apply_fill(self, fill: dict):
+        """
+        주문 체결 결과(order_tracker)를 잔고에 반영
+
+        Args:
+            fill (dict): 체결 결과 (market, side, executed_volume, executed_funds, paid_fee, timed_out)
+        """
+        with self._lock:
+            self._pending_orders.pop(fill.get('uuid'), None)
+
+        # 체결이 확인되지 않은 주문은 실제 계좌로 다시 맞춘다.
+        if fill.get('timed_out') or not fill.get('market') or fill.get('side') not in ('bid', 'ask'):
+            self.invalidate()
+            return
+
+        unit_currency, currency = fill['market'].split('-', 1)
+        volume = _to_decimal(fill['executed_volume'])
+        funds = _to_decimal(fill['executed_funds'])
+        fee = _to_decimal(fill['paid_fee'])
+
+        with self._lock:
+            if self._balances is None:
+                return
+
+            self._version += 1
+
+            quote = self._balances.setdefault(unit_currency, {
+                'balance': _ZERO, 'locked': _ZERO, 'avg_buy_price': _ZERO,
+                'avg_buy_price_modified': False, 'unit_currency': unit_currency,
+            })
+            base = self._balances.setdefault(currency, {
+                'balance': _ZERO, 'locked': _ZERO, 'avg_buy_price': _ZERO,
+                'avg_buy_price_modified': False, 'unit_currency': unit_currency,
+            })
+
+            if fill['side'] == 'bid':
+                total = base['balance'] + base['locked']
+                new_total = total + volume
+                if new_total > _ZERO:
+                    base['avg_buy_price'] = (total * base['avg_buy_price'] + funds) / new_total
+                base['balance'] += volume
+                quote['balance'] -= funds + fee
+            else:
+                base['balance'] = max(base['balance'] - volume, _ZERO)
+                quote['balance'] += funds - fee
+
+                # 전부 매도한 경우 계좌 목록에서 제거 (업비트 응답과 동일)
+                if base['balance'] == _ZERO and base['locked'] == _ZERO:
+                    del self._balances[currency]
+
+            # 원화가 음수가 되는 경우(계산 오차 등)는 실제 계좌로 다시 맞춘다.
+            if quote['balance'] < _ZERO:
+                quote['balance'] = _ZERO
+                self._updated_at = None
+
+        logger.debug(f'[{fill["market"]}] 체결 반영 : {fill["side"]}, {volume}, {funds}')
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='account-cache', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f'계좌 조회 오류 : {e}')
+
+            self._stop_event.wait(self.reconcile_sec)
+
+
+# 공용 계좌 캐시
+_account_cache = None
+_account_cache_lock = threading.Lock()
+
+
+def get_account_cache() -> AccountCache:
+    global _account_cache
+
+    if _account_cache is None:
+        with _account_cache_lock:
+            if _account_cache is None:
+                _account_cache = AccountCache()
+
+    return _account_cache
@@ -1,8 +1,5 @@
-import requests, jwt, uuid, os
 import pandas as pd
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.upbit_client import get_upbit_client
 
 """
 # 전체 계좌 조회
@@ -18,18 +15,11 @@ URL: https://docs.upbit.com/reference/%EC%A0%84%EC%B2%B4-%EA%B3%84%EC%A2%8C-%EC%
 - avg_buy_price_modified: 매수평균가 수정 여부
 - unit_currency: 평단가 기준 화폐
 """
-my_account_url = 'https://api.upbit.com/v1/accounts'
-
-# Authorization
-# Key: access_key, secret_key
-access_key = os.getenv('ACCESS_KEY', '')
-secret_key = os.getenv('SECRET_KEY', '')
+my_account_path = '/v1/accounts'
 
 
 # 내 계좌를 확인합니다.
 def get_my_exchange_account():
-    authorization = 'Bearer {}'.format(jwt.encode({'access_key': access_key, 'nonce': str(uuid.uuid4())}, secret_key))
-    headers = {"Authorization": authorization}
-
-    my_exchange_account = pd.DataFrame(requests.get(my_account_url, headers=headers).json())
+    # 인증(JWT)은 공용 클라이언트에서 처리
+    my_exchange_account = pd.DataFrame(get_upbit_client().get(my_account_path, auth=True).json())
     return my_exchange_account
@@ -0,0 +1,303 @@
+import os, json, time, logging, threading
+from typing import Optional
+
+"""
+# 포지션/거래 저널 (Position Journal)
+
+매수 시간, 매수 전 원화 잔고 같은 포지션 정보를 전역변수로만 가지고 있으면 재시작할 때 잃어버려서
+매도 조건(매수 이후 캔들 확인)을 판단할 수 없습니다.
+포지션 변경과 체결 결과를 파일에 한 줄씩 추가(append-only, JSON Lines)하고, 재시작하면 다시 읽어서 포지션을 복원합니다.
+
+- 기록(event)
+  - open: 포지션 시작 (ex. buy_time, krw_balance, order_uuid)
+  - update: 포지션 정보 추가/변경 (ex. 체결 후 buy_price, volume)
+  - close: 포지션 종료 (ex. 매도 사유, 매매수익)
+  - fill: 주문 체결 결과 (기록만 하고 포지션 복원에는 사용하지 않음)
+- 쓰기는 별도 스레드에서 모아서 한번에 write + fsync 합니다. (group commit)
+  - sync=True(기본값): fsync가 끝날 때까지 기다립니다. 그 사이에 들어온 기록은 같은 fsync로 함께 저장됩니다.
+  - sync=False: 기다리지 않고, 최대 {fsync_sec}초 안에 저장됩니다. (체결 결과 등)
+- 기록이 {compact_records}개를 넘으면 현재 포지션을 스냅샷 파일로 저장하고 저널 파일을 비웁니다.
+  스냅샷은 임시 파일에 쓰고 fsync 후 교체(os.replace)하기 때문에 저장 도중 종료되어도 이전 스냅샷이 남습니다.
+- 재시작 시 스냅샷을 읽고, 스냅샷 이후(seq 기준)의 기록만 다시 적용합니다.
+  쓰는 도중 종료되어 마지막 줄이 잘린 경우 해당 줄은 버리고 파일에서도 잘라냅니다.
+
+## 파일
+- {POSITION_JOURNAL_DIR}/{name}.jsonl: 저널 ({"seq", "ts", "event", "market", "data"})
+- {POSITION_JOURNAL_DIR}/{name}.snapshot.json: 스냅샷 ({"seq", "ts", "positions"})
+
+## 환경변수 (.env)
+- POSITION_JOURNAL_DIR: 저널 디렉토리, 기본값 data/journal
+- POSITION_JOURNAL_FSYNC_SEC: sync=False 기록의 최대 저장 대기 시간(초), 기본값 0.2
+- POSITION_JOURNAL_COMPACT_RECORDS: 스냅샷 저장 기준 기록 개수, 기본값 1000
+"""
+
+POSITION_JOURNAL_DIR = os.getenv(
+    'POSITION_JOURNAL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'journal'))
+POSITION_JOURNAL_FSYNC_SEC = float(os.getenv('POSITION_JOURNAL_FSYNC_SEC', '0.2'))
+POSITION_JOURNAL_COMPACT_RECORDS = int(os.getenv('POSITION_JOURNAL_COMPACT_RECORDS', '1000'))
+
+EVENT_OPEN = 'open'
+EVENT_UPDATE = 'update'
+EVENT_CLOSE = 'close'
+EVENT_FILL = 'fill'
+
+EVENTS = (EVENT_OPEN, EVENT_UPDATE, EVENT_CLOSE, EVENT_FILL)
+
+logger = logging.getLogger(__name__)
+
+
+# 기록 하나를 포지션에 적용
+def _apply_record(positions: dict, record: dict):
+    event = record['event']
+    market = record.get('market')
+
+    if event == EVENT_OPEN:
+        positions[market] = dict(record.get('data') or {}, opened_at=record['ts'])
+    elif event == EVENT_UPDATE and market in positions:
+        positions[market].update(record.get('data') or {})
+    elif event == EVENT_CLOSE:
+        positions.pop(market, None)
+
+
+class PositionJournal:
+    def __init__(
+            self,
+            name: str = 'positions',
+            directory: str = POSITION_JOURNAL_DIR,
+            fsync_sec: float = POSITION_JOURNAL_FSYNC_SEC,
+            compact_records: int = POSITION_JOURNAL_COMPACT_RECORDS
+    ):
+        self.journal_path = os.path.join(directory, f'{name}.jsonl')
+        self.snapshot_path = os.path.join(directory, f'{name}.snapshot.json')
+        self.fsync_sec = fsync_sec
+        self.compact_records = compact_records
+
+        # 현재 포지션 {market: {...}}
+        self._positions = {}
+        self._seq = 0  # 마지막 기록 번호
+        self._durable_seq = 0  # fsync까지 끝난 기록 번호
+        self._journal_records = 0  # 마지막 스냅샷 이후 기록 개수
+
+        self._pending = []  # 파일에 쓰지 않은 기록 (JSON 문자열)
+        self._sync_requested = False
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='position-journal', daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        start = time.perf_counter()
+
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            snapshot_seq = snapshot['seq']
+            self._positions = snapshot['positions']
+
+        self._seq = snapshot_seq
+
+        if os.path.exists(self.journal_path):
+            valid_size = 0
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 쓰는 도중 종료되어 잘린 줄 (이후 기록은 없음)
+                        logger.warning(f'저널의 잘린 기록을 버립니다. ({self.journal_path}, {valid_size} bytes)')
+                        break
+
+                    valid_size += len(line)
+                    self._journal_records += 1
+
+                    # 스냅샷에 이미 반영된 기록 (스냅샷 저장 후 저널을 비우기 전에 종료된 경우)
+                    if record['seq'] <= snapshot_seq:
+                        continue
+
+                    _apply_record(self._positions, record)
+                    self._seq = record['seq']
+
+            if valid_size != os.path.getsize(self.journal_path):
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid_size)
+                    os.fsync(f.fileno())
+
+        self._durable_seq = self._seq
+
+        logger.info(f'포지션 저널 복원 : {len(self._positions)}개 포지션, seq {self._seq}, '
+                    f'{(time.perf_counter() - start) * 1000:.1f}ms')
+
+    def append(self, event: str, market: Optional[str] = None, data: Optional[dict] = None, sync: bool = True) -> int:
+        """
+        기록 추가
+
+        Args:
+            event (str): 기록 종류 (open, update, close, fill)
+            market (str, optional): 마켓 ID
+            data (dict, optional): 기록 내용 (JSON으로 변환 가능한 값)
+            sync (bool): fsync가 끝날 때까지 기다릴지 여부
+
+        Returns:
+            int: 기록 번호 (seq)
+        """
+        if event not in EVENTS:
+            raise ValueError(f'지원하지 않는 기록입니다. ({event})')
+
+        with self._cond:
+            if self._closed:
+                raise ValueError('이미 종료된 저널입니다.')
+
+            self._seq += 1
+            seq = self._seq
+            record = {'seq': seq, 'ts': time.time(), 'event': event, 'market': market, 'data': data or {}}
+
+            # 파일에 쓸 수 없는 값이면 포지션에 반영하기 전에 오류
+            self._pending.append(json.dumps(record, ensure_ascii=False, default=str))
+            _apply_record(self._positions, record)
+
+            if sync:
+                self._sync_requested = True
+            self._cond.notify_all()
+
+            if sync:
+                while self._durable_seq < seq and self._error is None:
+                    self._cond.wait()
+
+                if self._error is not None:
+                    raise ValueError(f'저널 저장 오류 : {self._error}')
+
+        return seq
+
+    def open_position(self, market: str, **data) -> int:
+        return self.append(EVENT_OPEN, market, data)
+
+    def update_position(self, market: str, **data) -> int:
+        return self.append(EVENT_UPDATE, market, data)
+
+    def close_position(self, market: str, **data) -> int:
+        return self.append(EVENT_CLOSE, market, data)
+
+    # 주문 체결 결과 기록 (order_tracker listener)
+    def record_fill(self, fill: dict):
+        self.append(EVENT_FILL, fill.get('market'), fill, sync=False)
+
+    def get_position(self, market: str) -> Optional[dict]:
+        with self._cond:
+            position = self._positions.get(market)
+            return dict(position) if position else None
+
+    def get_positions(self) -> dict:
+        with self._cond:
+            return {market: dict(position) for market, position in self._positions.items()}
+
+    def flush(self):
+        """
+        대기 중인 기록을 모두 저장 (fsync 완료까지 대기)
+        """
+        with self._cond:
+            seq = self._seq
+            self._sync_requested = True
+            self._cond.notify_all()
+
+            while self._durable_seq < seq and self._error is None and self._thread.is_alive():
+                self._cond.wait()
+
+    def close(self, timeout: float = 5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join(timeout)
+        self._file.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # sync 요청이 있거나, 기록이 생기고 {fsync_sec}초가 지나면 저장
+                deadline = None
+                while not self._sync_requested and not self._closed:
+                    if self._pending:
+                        if deadline is None:
+                            deadline = time.monotonic() + self.fsync_sec
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+
+                lines = self._pending
+                self._pending = []
+                self._sync_requested = False
+                seq = self._seq
+                closed = self._closed
+
+            if lines:
+                try:
+                    self._file.write('\n'.join(lines) + '\n')
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    logger.error(f'저널 저장 오류 : {e}')
+                    with self._cond:
+                        self._error = e
+                        self._cond.notify_all()
+                    return
+
+            with self._cond:
+                self._durable_seq = seq
+                self._journal_records += len(lines)
+                self._cond.notify_all()
+
+                if self._journal_records >= self.compact_records:
+                    self._compact()
+
+            if closed:
+                return
+
+    # 현재 포지션을 스냅샷으로 저장하고 저널 비우기 (lock 안에서 호출, 저장되지 않은 기록이 없어야 함)
+    def _compact(self):
+        if self._pending:
+            return
+
+        snapshot = {'seq': self._durable_seq, 'ts': time.time(), 'positions': self._positions}
+        tmp_path = f'{self.snapshot_path}.tmp'
+
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            # 스냅샷 교체 후에 저널을 비운다. (비우기 전에 종료되어도 seq로 중복 적용하지 않음)
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._journal_records = 0
+        except OSError as e:
+            logger.error(f'저널 스냅샷 저장 오류 : {e}')
+
+
+# 공용 포지션 저널
+_position_journal = None
+_position_journal_lock = threading.Lock()
+
+
+def get_position_journal() -> PositionJournal:
+    global _position_journal
+
+    if _position_journal is None:
+        with _position_journal_lock:
+            if _position_journal is None:
+                _position_journal = PositionJournal()
+
+    return _position_journal
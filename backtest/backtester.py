@@ -0,0 +1,413 @@
+import os, sys, math, logging, argparse, importlib, contextlib
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional
+
+# python backtest/backtester.py 로 실행하는 경우를 위해 프로젝트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading.signal_utils import SIGNAL_BUY, SIGNAL_SELL, candle_datetime_ns, buy_time_str
+from upbit_data.candle_store import load_candle_data
+
+"""
+# 백테스트
+
+저장된 캔들(candle_store) 또는 get_min_candle_data 형태의 DataFrame으로 매매전략을 재생합니다.
+
+## 모드
+- vectorized(기본값): 매매전략 모듈의 generate_signals로 전체 구간의 신호를 한번에 계산합니다. (1년치 1분봉도 수 초 이내)
+  window=None으로 replay 한 결과와 같습니다.
+- replay(검증용): 캔들마다 기존 매매전략 함수(trading_strategy)를 그대로 호출합니다.
+  실제 운영과 같이 최근 {window}개(기본값 1,000개) 캔들만 전달하며, 캔들 구간은 복사 없이 iloc 슬라이스(view)로 전달합니다.
+  캔들마다 {window}개 구간의 지표를 다시 계산하므로 O(캔들 수 x window)이고 1년치 1분봉은 몇 시간이 걸립니다.
+  매매전략 함수를 변경한 뒤 generate_signals와 결과가 같은지 짧은 구간으로 확인할 때 사용합니다.
+
+## 체결 가정 (main.py와 동일)
+- 신호가 발생한 캔들의 종가로 시장가 주문이 체결됩니다.
+- 매수: 원화 잔고의 99.9%(소수점 버림)로 매수하고 수수료(0.05%)는 원화 잔고에서 추가로 차감됩니다.
+- 매도: 보유 수량 전체를 매도하고 매도 금액에서 수수료(0.05%)를 차감합니다.
+- 매수시간(buy_time)은 매수 캔들 시각 - {unit}분, 매수가격(buy_price)은 체결 가격(평균 매수가)입니다.
+
+## 실행
+- python -m backtest.backtester --market KRW-DOGE --unit 5 --strategy trading_strategy2
+- python -m backtest.backtester --market KRW-DOGE --unit 5 --strategy trading_strategy2 --mode replay --count 5000
+"""
+
+FEE_RATE = 0.0005  # 원화(KRW) 마켓 거래 수수료
+KRW_INVEST_RATE = 0.999  # 매수 시 원화 잔고에서 투자하는 비율
+MIN_ORDER_KRW = 5000  # 최소 주문 금액
+
+# 매매전략 이름: (모듈, 매도 판단 시 buy_time, buy_price 전달 여부)
+STRATEGIES = {
+    'trading_strategy': ('trading.trading_strategy', True),
+    'trading_strategy2': ('trading.trading_strategy2', True),
+    'bollinger_band_breakout': ('trading.bollinger_band_breakout', False),
+}
+
+
+class SimulatedAccount:
+    """
+    buy_market/sell_market 체결을 흉내내는 계좌 (KRW, 코인 1종)
+    """
+
+    def __init__(self, initial_krw: float):
+        if math.floor(initial_krw * KRW_INVEST_RATE) < MIN_ORDER_KRW:
+            raise ValueError(f'초기 원화 잔고가 너무 적습니다. (최소 주문 금액 : {MIN_ORDER_KRW}원)')
+
+        self.krw = float(initial_krw)
+        self.volume = 0.0
+        self.avg_buy_price = 0.0
+
+    # 시장가 매수 (전 금액)
+    def buy_market(self, price: float) -> float:
+        krw_available = math.floor(self.krw * KRW_INVEST_RATE)
+        self.krw -= krw_available * (1 + FEE_RATE)
+        self.volume = krw_available / price
+        self.avg_buy_price = price
+        return krw_available
+
+    # 시장가 매도 (전량)
+    def sell_market(self, price: float) -> float:
+        sell_krw = self.volume * price * (1 - FEE_RATE)
+        self.krw += sell_krw
+        self.volume = 0.0
+        self.avg_buy_price = 0.0
+        return sell_krw
+
+
+def simulate_fills(candle_close: np.ndarray, signals: np.ndarray, initial_krw: float) -> dict:
+    """
+    신호 배열로 체결을 계산합니다.
+
+    Args:
+        candle_close (np.ndarray): 캔들 종가
+        signals (np.ndarray): 캔들별 신호 (1: 매수, -1: 매도)
+        initial_krw (float): 초기 원화 잔고
+
+    Returns:
+        dict: 캔들별 원화 잔고/보유 수량(krw, volume), 매매별 위치/금액(buy_index, sell_index, buy_krw, sell_krw 등)
+    """
+    n = len(candle_close)
+
+    # 신호는 매수/매도가 번갈아 발생 (포지션이 없을 때만 매수, 있을 때만 매도)
+    buy_index = np.flatnonzero(signals == SIGNAL_BUY)
+    sell_index = np.flatnonzero(signals == SIGNAL_SELL)
+    trade_cnt = len(buy_index)
+
+    buy_krw = np.empty(trade_cnt, dtype=np.float64)
+    trade_volume = np.empty(trade_cnt, dtype=np.float64)
+    sell_krw = np.full(trade_cnt, np.nan)
+
+    # 캔들별 원화 잔고, 보유 수량 (신호가 있는 캔들에서만 바뀌므로 구간 단위로 채움)
+    krw = np.empty(n, dtype=np.float64)
+    volume = np.empty(n, dtype=np.float64)
+
+    account = SimulatedAccount(initial_krw)
+    prev = 0
+
+    for i in range(trade_cnt):
+        t = buy_index[i]
+        krw[prev:t] = account.krw
+        volume[prev:t] = 0.0
+        buy_krw[i] = account.buy_market(candle_close[t])
+        trade_volume[i] = account.volume
+        prev = t
+
+        if i < len(sell_index):
+            t = sell_index[i]
+            krw[prev:t] = account.krw
+            volume[prev:t] = account.volume
+            sell_krw[i] = account.sell_market(candle_close[t])
+            prev = t
+
+    krw[prev:] = account.krw
+    volume[prev:] = account.volume
+
+    return {
+        'krw': krw,
+        'volume': volume,
+        'buy_index': buy_index,
+        'sell_index': sell_index,
+        'buy_krw': buy_krw,
+        'trade_volume': trade_volume,
+        'sell_krw': sell_krw,
+    }
+
+
+def summarize_signals(
+        candle_close: np.ndarray,
+        signals: np.ndarray,
+        initial_krw: float = 1_000_000,
+        start: int = 0,
+        end: Optional[int] = None
+) -> dict:
+    """
+    {start} ~ {end} 구간의 손익 요약 (DataFrame을 만들지 않으므로 파라미터 스윕, 워크포워드에서 사용)
+
+    Returns:
+        dict: profit, return_rate, trade_cnt, win_rate, max_drawdown
+    """
+    candle_close = candle_close[start:end]
+    fills = simulate_fills(candle_close, signals[start:end], initial_krw)
+
+    equity = fills['krw'] + fills['volume'] * candle_close
+    final_equity = float(equity[-1]) if len(equity) > 0 else float(initial_krw)
+
+    is_closed = ~np.isnan(fills['sell_krw'])
+    profits = fills['sell_krw'][is_closed] - fills['buy_krw'][is_closed] * (1 + FEE_RATE)
+
+    return {
+        'profit': final_equity - initial_krw,
+        'return_rate': final_equity / initial_krw - 1,
+        'trade_cnt': int(is_closed.sum()),
+        'win_rate': float((profits > 0).mean()) if len(profits) > 0 else 0.0,
+        'max_drawdown': float((equity / np.maximum.accumulate(equity) - 1).min()) if len(equity) > 0 else 0.0,
+    }
+
+
+def _build_report(df: pd.DataFrame, signals: np.ndarray, messages: dict, initial_krw: float) -> dict:
+    """
+    신호 배열로 체결을 계산하여 결과를 만듭니다.
+
+    Args:
+        df (pd.DataFrame): 캔들 데이터
+        signals (np.ndarray): 캔들별 신호 (1: 매수, -1: 매도)
+        messages (dict): {캔들 위치: 매매전략 메시지}
+        initial_krw (float): 초기 원화 잔고
+
+    Returns:
+        dict: 백테스트 결과
+    """
+    candle_close = df['close'].to_numpy(dtype=float)
+    candle_datetime = candle_datetime_ns(df).view('datetime64[ns]')
+
+    fills = simulate_fills(candle_close, signals, initial_krw)
+    krw = fills['krw']
+    volume = fills['volume']
+    buy_index = fills['buy_index']
+    sell_index = fills['sell_index']
+    buy_krw = fills['buy_krw']
+    sell_krw = fills['sell_krw']
+    trade_cnt = len(buy_index)
+    n = len(df)
+
+    # 평가금액 (보유 수량은 캔들 종가로 평가)
+    equity = pd.Series(krw + volume * candle_close, index=pd.DatetimeIndex(candle_datetime), name='equity')
+
+    # 매매 내역 (마지막 매수가 매도되지 않았으면 매도 관련 값은 NaN)
+    sell_pos = np.full(trade_cnt, -1, dtype=np.int64)
+    sell_pos[:len(sell_index)] = sell_index
+    is_closed = sell_pos >= 0
+    krw_before_buy = buy_krw * (1 + FEE_RATE)
+
+    trades_df = pd.DataFrame({
+        'buy_datetime': candle_datetime[buy_index],
+        'buy_price': candle_close[buy_index],
+        'volume': fills['trade_volume'],
+        'buy_krw': buy_krw,
+        'sell_datetime': np.where(is_closed, candle_datetime[sell_pos], np.datetime64('NaT')),
+        'sell_price': np.where(is_closed, candle_close[sell_pos], np.nan),
+        'sell_krw': sell_krw,
+        'profit': sell_krw - krw_before_buy,
+        'return_rate': sell_krw / krw_before_buy - 1,
+        'bars': np.where(is_closed, sell_pos - buy_index, np.nan),
+        'buy_message': [messages.get(t, '') for t in buy_index],
+        'sell_message': [messages.get(t, '') if t >= 0 else '' for t in sell_pos],
+    })
+    closed = trades_df[is_closed]
+
+    final_equity = float(equity.iloc[-1]) if n > 0 else float(initial_krw)
+    max_drawdown = float((equity / equity.cummax() - 1).min()) if n > 0 else 0.0
+
+    return {
+        'trades': trades_df,
+        'equity': equity,
+        'signals': signals,
+        'initial_krw': float(initial_krw),
+        'final_equity': final_equity,
+        'profit': final_equity - initial_krw,
+        'return_rate': final_equity / initial_krw - 1,
+        'trade_cnt': len(closed),
+        'win_rate': float((closed['profit'] > 0).mean()) if len(closed) > 0 else 0.0,
+        'max_drawdown': max_drawdown,
+        'holding': bool(n > 0 and volume[-1] > 0),
+    }
+
+
+def run_backtest(
+        df: pd.DataFrame,
+        strategy_name: str = 'trading_strategy2',
+        initial_krw: float = 1_000_000,
+        unit: int = 5,
+        params: Optional[dict] = None,
+        mode: str = 'vectorized',
+        window: Optional[int] = 1000
+) -> dict:
+    """
+    매매전략 백테스트 (기본값은 vectorized, replay는 느린 검증용)
+
+    Args:
+        df (pd.DataFrame): 캔들 데이터 (시간순 정렬, get_min_candle_data 형태)
+        strategy_name (str): 매매전략 이름 (STRATEGIES)
+        initial_krw (float): 초기 원화 잔고
+        unit (int): 분 단위
+        params (dict, optional): 매매전략 파라미터 (없으면 매매전략의 DEFAULT_PARAMS)
+        mode (str): 'vectorized' 또는 'replay'
+        window (int, optional): replay 모드에서 매매전략에 전달할 최근 캔들 개수 (None이면 처음부터 전체)
+
+    Returns:
+        dict: 백테스트 결과 (trades, equity, signals, profit, return_rate, trade_cnt, win_rate, max_drawdown 등)
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f'지원하지 않는 매매전략입니다. ({strategy_name})')
+    if mode not in ('vectorized', 'replay'):
+        raise ValueError(f'지원하지 않는 백테스트 모드입니다. ({mode})')
+
+    module_name, use_buy_info = STRATEGIES[strategy_name]
+    strategy_module = importlib.import_module(module_name)
+
+    if mode == 'replay':
+        return run_backtest_replay(df, strategy_module.trading_strategy, initial_krw, window=window, unit=unit,
+                                   use_buy_info=use_buy_info, params=params)
+
+    return run_backtest_vectorized(df, strategy_module.generate_signals, initial_krw, unit=unit, params=params)
+
+
+def run_backtest_replay(
+        df: pd.DataFrame,
+        strategy_func: Callable,
+        initial_krw: float = 1_000_000,
+        window: Optional[int] = 1000,
+        unit: int = 5,
+        use_buy_info: bool = True,
+        quiet: bool = True,
+        params: Optional[dict] = None
+) -> dict:
+    """
+    캔들마다 매매전략 함수를 호출하여 백테스트 (replay, 검증용)
+
+    캔들마다 최근 {window}개 구간의 지표를 다시 계산하므로 O(캔들 수 x window)입니다.
+    매매전략 함수와 generate_signals의 결과를 짧은 구간으로 비교할 때 사용하고, 긴 구간은 run_backtest_vectorized를 사용합니다.
+
+    Args:
+        df (pd.DataFrame): 캔들 데이터 (시간순 정렬, get_min_candle_data 형태)
+        strategy_func (Callable): trading_strategy(df, position, [buy_time, buy_price])
+        initial_krw (float): 초기 원화 잔고
+        window (int, optional): 매매전략에 전달할 최근 캔들 개수 (None이면 처음부터 전체)
+        unit (int): 분 단위
+        use_buy_info (bool): 매도 판단 시 buy_time, buy_price 전달 여부
+        quiet (bool): 매매전략의 print/로그 출력 숨기기
+        params (dict, optional): 매매전략 파라미터 (없으면 매매전략의 DEFAULT_PARAMS)
+
+    Returns:
+        dict: 백테스트 결과 (trades, equity, signals, profit, return_rate, trade_cnt, win_rate, max_drawdown 등)
+    """
+    df = df.reset_index(drop=True)
+    n = len(df)
+
+    candle_close = df['close'].to_numpy(dtype=float)
+    candle_datetime = candle_datetime_ns(df)
+
+    # 캔들별 신호 (미리 할당)
+    signals = np.zeros(n, dtype=np.int8)
+    messages = {}
+
+    # 파라미터를 지정한 경우에만 전달 (파라미터가 없는 매매전략 함수도 사용할 수 있도록)
+    strategy_kwargs = {} if params is None else {'params': params}
+
+    position = 0
+    buy_time = None
+    buy_price = None
+
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+
+            # 매매전략의 조건 값/신호 로그(INFO 이하)도 숨기기
+            logging.disable(logging.INFO)
+            stack.callback(logging.disable, logging.NOTSET)
+
+        for t in range(n):
+            lo = 0 if window is None else max(0, t + 1 - window)
+            df_window = df.iloc[lo:t + 1]
+
+            if position == 0:
+                result = strategy_func(df_window, 0, **strategy_kwargs)
+                if result['signal'] == 'buy':
+                    signals[t] = SIGNAL_BUY
+                    messages[t] = result.get('message', '')
+                    position = 1
+                    buy_time = buy_time_str(int(candle_datetime[t]), unit)
+                    buy_price = float(candle_close[t])
+            else:
+                if use_buy_info:
+                    result = strategy_func(df_window, 1, buy_time, buy_price, **strategy_kwargs)
+                else:
+                    result = strategy_func(df_window, 1, **strategy_kwargs)
+
+                if result['signal'] == 'sell':
+                    signals[t] = SIGNAL_SELL
+                    messages[t] = result.get('message', '')
+                    position = 0
+                    buy_time = None
+                    buy_price = None
+
+    return _build_report(df, signals, messages, initial_krw)
+
+
+def run_backtest_vectorized(
+        df: pd.DataFrame,
+        generate_func: Callable,
+        initial_krw: float = 1_000_000,
+        unit: int = 5,
+        params: Optional[dict] = None
+) -> dict:
+    """
+    generate_signals로 전체 구간의 신호를 한번에 계산하여 백테스트 (vectorized)
+
+    Args:
+        df (pd.DataFrame): 캔들 데이터 (시간순 정렬, get_min_candle_data 형태)
+        generate_func (Callable): 매매전략 모듈의 generate_signals(df, unit, params)
+        initial_krw (float): 초기 원화 잔고
+        unit (int): 분 단위
+        params (dict, optional): 매매전략 파라미터 (없으면 매매전략의 DEFAULT_PARAMS)
+
+    Returns:
+        dict: 백테스트 결과 (run_backtest_replay와 동일)
+    """
+    df = df.reset_index(drop=True)
+    return _build_report(df, generate_func(df, unit=unit, params=params), {}, initial_krw)
+
+
+# 결과 요약 출력
+def print_report(report: dict):
+    print(f"초기 원화 잔고 : {report['initial_krw']:,.0f}")
+    print(f"최종 평가금액 : {report['final_equity']:,.0f}")
+    print(f"손익 : {report['profit']:,.0f} ({report['return_rate'] * 100:.2f}%)")
+    print(f"매매 횟수 : {report['trade_cnt']}, 승률 : {report['win_rate'] * 100:.1f}%")
+    print(f"최대 낙폭(MDD) : {report['max_drawdown'] * 100:.2f}%")
+    print(f"보유 중 : {report['holding']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='저장된 캔들로 매매전략 백테스트')
+    parser.add_argument('--market', default='KRW-DOGE')
+    parser.add_argument('--unit', type=int, default=5)
+    parser.add_argument('--strategy', default='trading_strategy2', choices=list(STRATEGIES.keys()))
+    parser.add_argument('--mode', default='vectorized', choices=['vectorized', 'replay'],
+                        help='replay는 캔들마다 매매전략 함수를 호출하는 느린 검증용 모드 (짧은 구간에 사용)')
+    parser.add_argument('--window', type=int, default=1000, help='replay 모드에서 매매전략에 전달할 캔들 개수 (0: 전체)')
+    parser.add_argument('--count', type=int, default=None, help='최근 {count}개 캔들만 사용')
+    parser.add_argument('--krw', type=float, default=1_000_000)
+    args = parser.parse_args()
+
+    candle_df = load_candle_data(args.market, args.unit, count=args.count)
+    if candle_df is None:
+        print(f'저장된 캔들이 없습니다. ({args.market}, {args.unit}분)')
+        sys.exit(1)
+
+    backtest_report = run_backtest(candle_df, args.strategy, args.krw, unit=args.unit, mode=args.mode,
+                                   window=args.window or None)
+
+    print_report(backtest_report)
+    print(backtest_report['trades'].to_string())
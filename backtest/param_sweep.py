@@ -0,0 +1,177 @@
+import os, sys, argparse, importlib, itertools
+import numpy as np
+import pandas as pd
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# python backtest/param_sweep.py 로 실행하는 경우를 위해 프로젝트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.backtester import STRATEGIES, summarize_signals
+from upbit_data.candle_store import STORE_COLUMNS, load_candle_arrays, build_candle_frame
+
+"""
+# 파라미터 스윕
+
+매매전략 파라미터(DEFAULT_PARAMS) 조합별로 백테스트(vectorized)를 여러 프로세스에서 동시에 실행하고
+결과를 순위 테이블(DataFrame)로 반환합니다.
+
+- 캔들 배열은 shared_memory에 한번만 올리고, 각 프로세스는 복사 없이 연결(attach)하여 사용합니다.
+  (작업마다 캔들 데이터를 pickle로 전달하지 않음)
+- 프로세스마다 DataFrame은 한번만 만들고, 지표는 지표 캐시(indicator_cache)로 파라미터 조합 간에 재사용합니다.
+
+## 실행
+- python -m backtest.param_sweep --strategy trading_strategy2 --grid stop_loss_rate=0.99,0.993058 rsi_buy=25,30
+"""
+
+# 프로세스별 캔들 데이터 (initializer에서 설정)
+_worker_df = None
+_worker_unit = None
+_worker_shm = []
+
+
+def share_candle_arrays(arrays: dict) -> tuple:
+    """
+    캔들 배열을 shared_memory에 복사
+
+    Returns:
+        tuple: (SharedMemory 목록, {컬럼명: (shared_memory 이름, 길이, dtype)})
+    """
+    blocks = []
+    specs = {}
+    for column, (_, dtype) in STORE_COLUMNS.items():
+        values = np.ascontiguousarray(arrays[column], dtype=dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=dtype, buffer=shm.buf)[:] = values
+        blocks.append(shm)
+        specs[column] = (shm.name, len(values), np.dtype(dtype).str)
+
+    return blocks, specs
+
+
+# 작업 프로세스 초기화 (shared_memory 연결 후 DataFrame 생성)
+def init_candle_worker(market: str, unit: int, specs: dict):
+    global _worker_df, _worker_unit, _worker_shm
+
+    arrays = {}
+    for column, (name, length, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_shm.append(shm)
+        arrays[column] = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+
+    _worker_df = build_candle_frame(market, unit, arrays)
+    _worker_unit = unit
+
+
+# 작업 프로세스의 캔들 데이터
+def get_worker_frame() -> tuple:
+    return _worker_df, _worker_unit
+
+
+def _run_one(task: tuple) -> dict:
+    strategy_name, params = task
+    module_name, _ = STRATEGIES[strategy_name]
+    strategy_module = importlib.import_module(module_name)
+
+    signals = strategy_module.generate_signals(_worker_df, unit=_worker_unit, params=params)
+
+    return dict(params, **summarize_signals(_worker_df['close'].to_numpy(), signals))
+
+
+# 파라미터 그리드의 모든 조합 {'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+def expand_grid(grid: dict) -> list:
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def run_param_sweep(
+        arrays: dict,
+        market: str,
+        unit: int,
+        strategy_name: str,
+        grid: dict,
+        max_workers: Optional[int] = None,
+        sort_by: str = 'return_rate',
+        chunksize: int = 16
+) -> pd.DataFrame:
+    """
+    파라미터 조합별 백테스트를 프로세스 풀에서 실행
+
+    Args:
+        arrays (dict): 캔들 배열 (load_candle_arrays 형태)
+        market (str): 마켓 ID
+        unit (int): 분 단위
+        strategy_name (str): 매매전략 이름 (STRATEGIES)
+        grid (dict): {파라미터 이름: 값 목록}
+        max_workers (int, optional): 프로세스 수 (기본값: CPU 개수)
+        sort_by (str): 순위 기준 컬럼 (내림차순)
+        chunksize (int): 프로세스에 한번에 전달할 조합 개수
+
+    Returns:
+        pd.DataFrame: 파라미터 조합별 결과 (순위순)
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f'지원하지 않는 매매전략입니다. ({strategy_name})')
+
+    default_params = importlib.import_module(STRATEGIES[strategy_name][0]).DEFAULT_PARAMS
+    unknown = [key for key in grid if key not in default_params]
+    if unknown:
+        raise ValueError(f'지원하지 않는 파라미터입니다. ({unknown})')
+
+    tasks = [(strategy_name, params) for params in expand_grid(grid)]
+
+    blocks, specs = share_candle_arrays(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_candle_worker,
+                                 initargs=(market, unit, specs)) as executor:
+            results = list(executor.map(_run_one, tasks, chunksize=chunksize))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    result_df = pd.DataFrame(results)
+    if len(result_df) == 0:
+        return result_df
+
+    result_df = result_df.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+    result_df.index = result_df.index + 1
+    result_df.index.name = 'rank'
+
+    return result_df
+
+
+# 'stop_loss_rate=0.99,0.993' -> ('stop_loss_rate', [0.99, 0.993])
+def parse_grid_arg(arg: str) -> tuple:
+    if '=' not in arg:
+        raise ValueError(f'파라미터 형식이 올바르지 않습니다. ({arg}, ex. rsi_buy=25,30)')
+
+    key, values = arg.split('=', 1)
+    parsed = []
+    for value in values.split(','):
+        number = float(value)
+        parsed.append(int(number) if number.is_integer() and '.' not in value else number)
+
+    return key, parsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='매매전략 파라미터 스윕')
+    parser.add_argument('--market', default='KRW-DOGE')
+    parser.add_argument('--unit', type=int, default=5)
+    parser.add_argument('--strategy', default='trading_strategy2', choices=list(STRATEGIES.keys()))
+    parser.add_argument('--grid', nargs='+', required=True, help='파라미터=값1,값2 ...')
+    parser.add_argument('--count', type=int, default=None, help='최근 {count}개 캔들만 사용')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    candle_arrays = load_candle_arrays(args.market, args.unit, count=args.count)
+    if candle_arrays is None:
+        print(f'저장된 캔들이 없습니다. ({args.market}, {args.unit}분)')
+        sys.exit(1)
+
+    sweep_df = run_param_sweep(candle_arrays, args.market, args.unit, args.strategy,
+                               dict(parse_grid_arg(arg) for arg in args.grid), max_workers=args.workers)
+    print(sweep_df.head(args.top).to_string())
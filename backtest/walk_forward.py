@@ -0,0 +1,361 @@
+import os, sys, json, hashlib, inspect, argparse, importlib
+import numpy as np
+import pandas as pd
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+
+# python backtest/walk_forward.py 로 실행하는 경우를 위해 프로젝트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.backtester import STRATEGIES, summarize_signals
+from backtest.param_sweep import (expand_grid, share_candle_arrays, init_candle_worker, get_worker_frame,
+                                  parse_grid_arg)
+from trading.indicator_cache import get_indicator
+from upbit_data.candle_frame import KST_OFFSET_SEC
+from upbit_data.candle_store import STORE_COLUMNS, load_candle_arrays
+
+"""
+# 워크포워드 최적화
+
+전체 구간을 (in-sample, out-of-sample) fold로 나누고, fold마다 in-sample 구간에서 가장 좋은 파라미터를 고른 다음
+바로 뒤의 out-of-sample 구간에서 성과를 확인합니다.
+
+- 지표는 이전 캔들만 사용하기 때문에(causal), 전체 구간으로 한번 계산한 지표를 fold 구간만 잘라서 사용합니다.
+  (fold마다 처음부터 다시 계산하지 않음)
+- 매수/매도 조건은 fold 구간과 그 앞의 {FOLD_MARGIN}개 캔들로 계산합니다. (조건의 lookback은 {FOLD_MARGIN}개 미만)
+- 파라미터 조합 단위로 여러 프로세스에서 동시에 계산합니다. (캔들 배열은 shared_memory로 공유)
+- fold별 결과(손익 요약)와 fold 구간의 지표 배열을 디스크에 캐싱합니다.
+  - 결과 캐시 키: fold 구간, 해당 fold까지의 캔들 데이터, 매매전략과 신호/지표 계산 코드(CACHE_SOURCE_MODULES)의 해시
+  - 지표 캐시 키: fold 구간, 해당 fold까지의 캔들 데이터, 지표 계산 코드의 해시 (매매전략 코드와 무관)
+  - 파라미터 값을 바꾸거나 추가하면 캐시에 없는 (fold, 파라미터) 조합만 다시 계산하며,
+    지표 파라미터가 같으면 지표는 계산하지 않고 디스크에서 읽습니다. (ex. rsi_buy, stop_loss_rate만 변경)
+
+## 환경변수 (.env)
+- WALK_FORWARD_CACHE_DIR: fold 결과 캐시 경로 (기본값: data/walk_forward)
+
+## 실행
+- python -m backtest.walk_forward --strategy trading_strategy2 --in-sample 8640 --out-sample 2016 --grid rsi_buy=25,30
+"""
+
+WALK_FORWARD_CACHE_DIR = os.getenv(
+    'WALK_FORWARD_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'walk_forward'))
+
+WARMUP_LEN = 200  # 매매전략 최소 캔들 개수
+FOLD_MARGIN = 200  # fold 조건 계산 시 앞에 포함할 캔들 개수 (lookback, 이전 캔들 기준 값)
+
+# 결과 캐시 키에 코드 해시를 포함하는 모듈 (매매전략 모듈 외)
+CACHE_SOURCE_MODULES = ('trading.signal_utils', 'trading.indicator_cache', 'trading.indicators', 'backtest.backtester')
+
+# 지표 캐시 키에 코드 해시를 포함하는 모듈
+INDICATOR_SOURCE_MODULES = ('trading.indicator_cache', 'trading.indicators')
+
+
+def make_folds(n: int, in_sample: int, out_sample: int, step: Optional[int] = None) -> list:
+    """
+    fold 구간 나누기
+
+    Args:
+        n (int): 전체 캔들 개수
+        in_sample (int): in-sample 캔들 개수
+        out_sample (int): out-of-sample 캔들 개수
+        step (int, optional): 다음 fold까지 이동할 캔들 개수 (기본값: out_sample)
+
+    Returns:
+        list: [(in-sample 시작, in-sample 종료(= out-of-sample 시작), out-of-sample 종료), ...]
+    """
+    if in_sample <= 0 or out_sample <= 0:
+        raise ValueError('in_sample, out_sample은 0보다 커야 합니다.')
+
+    step = step or out_sample
+    folds = []
+
+    # 매매전략에 최소 200개 캔들이 필요하므로 199번째 캔들부터 시작
+    start = WARMUP_LEN - 1
+    while start + in_sample + out_sample <= n:
+        folds.append((start, start + in_sample, start + in_sample + out_sample))
+        start += step
+
+    return folds
+
+
+# numpy 값을 JSON으로 저장할 수 있도록 변환하고, 파라미터 순서와 관계없이 같은 키를 만든다.
+def _param_key(params: dict) -> str:
+    return json.dumps({key: value.item() if hasattr(value, 'item') else value for key, value in params.items()},
+                      sort_keys=True)
+
+
+# 모듈 코드 해시 (코드가 바뀌면 캐시를 다시 계산)
+def _source_hash(module_names: tuple) -> str:
+    h = hashlib.sha1()
+    for module_name in module_names:
+        h.update(inspect.getsource(importlib.import_module(module_name)).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+# fold 캐시 키 (코드 해시, fold 구간, 해당 fold 종료 시점까지의 캔들 데이터)
+def _fold_cache_key(source_hash: str, arrays: dict, market: str, unit: int, fold: tuple,
+                    initial_krw: Optional[float] = None) -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps([market, unit, list(fold), initial_krw, source_hash]).encode('utf-8'))
+    for column in STORE_COLUMNS:
+        h.update(np.ascontiguousarray(arrays[column][:fold[-1]]).tobytes())
+
+    return h.hexdigest()
+
+
+def _cache_path(strategy_name: str, cache_key: str) -> str:
+    return os.path.join(WALK_FORWARD_CACHE_DIR, f'{strategy_name}_{cache_key}.json')
+
+
+def _indicator_cache_dir(indicator_key: str) -> str:
+    return os.path.join(WALK_FORWARD_CACHE_DIR, 'indicators', indicator_key)
+
+
+# fold 조건 계산 구간 (in-sample 시작 {FOLD_MARGIN}개 전 ~ out-of-sample 종료)
+def _fold_range(fold: tuple) -> tuple:
+    return max(fold[0] - FOLD_MARGIN, 0), fold[2]
+
+
+def fold_indicator(df: pd.DataFrame, lo: int, hi: int, cache_dir: Optional[str] = None):
+    """
+    fold 구간의 지표 배열 함수 (build_signal_conditions의 indicator, 작업 프로세스)
+
+    전체 구간으로 계산한 지표(지표 캐시)를 [lo, hi) 구간만 잘라서 반환하고, cache_dir이 있으면 디스크에 저장합니다.
+    이미 저장된 지표는 계산하지 않고 읽습니다.
+
+    Args:
+        df (pd.DataFrame): 전체 구간 캔들 데이터
+        lo (int): 시작 위치 (포함)
+        hi (int): 종료 위치 (미포함)
+        cache_dir (str, optional): fold 지표 캐시 경로
+    """
+
+    def indicator(name: str, **params) -> np.ndarray:
+        path = None
+        if cache_dir is not None:
+            indicator_name = hashlib.sha1(_param_key(dict(params, _name=name)).encode('utf-8')).hexdigest()
+            path = os.path.join(cache_dir, f'{indicator_name}.npy')
+
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                pass  # 없거나 쓰는 도중 종료된 파일은 다시 계산
+
+        values = np.ascontiguousarray(get_indicator(df, name, **params).to_numpy()[lo:hi])
+
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, path)
+
+        return values
+
+    return indicator
+
+
+def _load_fold_cache(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # 쓰는 도중 종료된 파일 등은 무시하고 다시 계산
+        return {}
+
+
+def _save_fold_cache(path: str, results: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f)
+    os.replace(tmp_path, path)
+
+
+def _run_combination(task: tuple) -> tuple:
+    """
+    파라미터 조합 하나에 대해 여러 fold의 in-sample/out-of-sample 결과 계산 (작업 프로세스)
+
+    Returns:
+        tuple: (파라미터 키, {fold 번호: {'in_sample': 요약, 'out_sample': 요약}})
+    """
+    strategy_name, params, folds, initial_krw = task
+    strategy_module = importlib.import_module(STRATEGIES[strategy_name][0])
+    df, unit = get_worker_frame()
+    candle_close = df['close'].to_numpy(dtype=float)
+
+    results = {}
+    for fold_no, (is_start, is_end, oos_end), indicator_cache_dir in folds:
+        # fold 구간(+ 앞쪽 {FOLD_MARGIN}개)의 조건만 계산, 위치는 lo 기준
+        lo, hi = _fold_range((is_start, is_end, oos_end))
+        conditions = strategy_module.build_signal_conditions(
+            df.iloc[lo:hi], unit, params, indicator=fold_indicator(df, lo, hi, indicator_cache_dir))
+
+        in_sample_signals = strategy_module.generate_signals_from_conditions(conditions, is_start - lo, is_end - lo)
+        out_sample_signals = strategy_module.generate_signals_from_conditions(conditions, is_end - lo, oos_end - lo)
+
+        fold_close = candle_close[lo:hi]
+        results[fold_no] = {
+            'in_sample': summarize_signals(fold_close, in_sample_signals, initial_krw, is_start - lo, is_end - lo),
+            'out_sample': summarize_signals(fold_close, out_sample_signals, initial_krw, is_end - lo, oos_end - lo),
+        }
+
+    return _param_key(params), results
+
+
+def run_walk_forward(
+        arrays: dict,
+        market: str,
+        unit: int,
+        strategy_name: str,
+        grid: dict,
+        in_sample: int,
+        out_sample: int,
+        step: Optional[int] = None,
+        metric: str = 'return_rate',
+        initial_krw: float = 1_000_000,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True
+) -> dict:
+    """
+    워크포워드 최적화
+
+    Args:
+        arrays (dict): 캔들 배열 (load_candle_arrays 형태)
+        market (str): 마켓 ID
+        unit (int): 분 단위
+        strategy_name (str): 매매전략 이름 (STRATEGIES)
+        grid (dict): {파라미터 이름: 값 목록}
+        in_sample (int): in-sample 캔들 개수
+        out_sample (int): out-of-sample 캔들 개수
+        step (int, optional): 다음 fold까지 이동할 캔들 개수 (기본값: out_sample)
+        metric (str): in-sample 구간에서 파라미터를 고르는 기준 (내림차순)
+        initial_krw (float): fold별 초기 원화 잔고
+        max_workers (int, optional): 프로세스 수 (기본값: CPU 개수)
+        use_cache (bool): fold 결과 캐시 사용 여부
+
+    Returns:
+        dict: folds(fold별 선택된 파라미터와 결과 DataFrame), out_sample_return_rate(누적 수익률), computed(새로 계산한 조합 수)
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f'지원하지 않는 매매전략입니다. ({strategy_name})')
+
+    strategy_module = importlib.import_module(STRATEGIES[strategy_name][0])
+    unknown = [key for key in grid if key not in strategy_module.DEFAULT_PARAMS]
+    if unknown:
+        raise ValueError(f'지원하지 않는 파라미터입니다. ({unknown})')
+    if max(grid.get('lookback', [0])) >= FOLD_MARGIN:
+        raise ValueError(f'lookback은 {FOLD_MARGIN}보다 작아야 합니다.')
+
+    folds = make_folds(len(arrays['time']), in_sample, out_sample, step)
+    if len(folds) == 0:
+        raise ValueError('캔들 개수가 부족하여 fold를 만들 수 없습니다.')
+
+    combinations = expand_grid(grid)
+    source_hash = _source_hash((strategy_module.__name__,) + CACHE_SOURCE_MODULES)
+    indicator_source_hash = _source_hash(INDICATOR_SOURCE_MODULES)
+
+    # fold별 캐시 불러오기
+    cache_paths = [
+        _cache_path(strategy_name, _fold_cache_key(source_hash, arrays, market, unit, fold, initial_krw))
+        for fold in folds
+    ]
+    fold_results = [_load_fold_cache(path) if use_cache else {} for path in cache_paths]
+
+    # fold별 지표 캐시 경로 (지표는 매매전략, 초기 원화 잔고와 관계없이 fold 구간의 캔들로만 결정)
+    indicator_cache_dirs = [
+        _indicator_cache_dir(_fold_cache_key(indicator_source_hash, arrays, market, unit, _fold_range(fold)))
+        if use_cache else None
+        for fold in folds
+    ]
+
+    # 캐시에 없는 (파라미터 조합, fold)만 계산
+    tasks = []
+    for params in combinations:
+        key = _param_key(params)
+        missing = [(fold_no, fold, indicator_cache_dirs[fold_no]) for fold_no, fold in enumerate(folds)
+                   if key not in fold_results[fold_no]]
+        if missing:
+            tasks.append((strategy_name, params, missing, initial_krw))
+
+    if tasks:
+        blocks, specs = share_candle_arrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=init_candle_worker,
+                                     initargs=(market, unit, specs)) as executor:
+                for key, results in executor.map(_run_combination, tasks):
+                    for fold_no, result in results.items():
+                        fold_results[fold_no][key] = result
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        if use_cache:
+            updated_folds = {fold_no for task in tasks for fold_no, _, _ in task[2]}
+            for fold_no in updated_folds:
+                _save_fold_cache(cache_paths[fold_no], fold_results[fold_no])
+
+    # fold별로 in-sample 기준 가장 좋은 파라미터를 고르고 out-of-sample 결과 확인
+    candle_kst = pd.to_datetime(np.asarray(arrays['time']) + KST_OFFSET_SEC, unit='s')
+    param_keys = [_param_key(params) for params in combinations]
+    rows = []
+
+    for fold_no, (is_start, is_end, oos_end) in enumerate(folds):
+        best_key = max(param_keys, key=lambda k: fold_results[fold_no][k]['in_sample'][metric])
+        best = fold_results[fold_no][best_key]
+
+        rows.append(dict({
+            'fold': fold_no,
+            'in_sample_start': candle_kst[is_start],
+            'out_sample_start': candle_kst[is_end],
+            'out_sample_end': candle_kst[oos_end - 1],
+        }, **json.loads(best_key), **{
+            f'in_sample_{metric}': best['in_sample'][metric],
+            'out_sample_return_rate': best['out_sample']['return_rate'],
+            'out_sample_trade_cnt': best['out_sample']['trade_cnt'],
+            'out_sample_win_rate': best['out_sample']['win_rate'],
+            'out_sample_max_drawdown': best['out_sample']['max_drawdown'],
+        }))
+
+    folds_df = pd.DataFrame(rows).set_index('fold')
+
+    return {
+        'folds': folds_df,
+        'out_sample_return_rate': float(np.prod(1 + folds_df['out_sample_return_rate'].to_numpy()) - 1),
+        'computed': sum(len(task[2]) for task in tasks),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='매매전략 워크포워드 최적화')
+    parser.add_argument('--market', default='KRW-DOGE')
+    parser.add_argument('--unit', type=int, default=5)
+    parser.add_argument('--strategy', default='trading_strategy2', choices=list(STRATEGIES.keys()))
+    parser.add_argument('--grid', nargs='+', required=True, help='파라미터=값1,값2 ...')
+    parser.add_argument('--in-sample', type=int, required=True, help='in-sample 캔들 개수')
+    parser.add_argument('--out-sample', type=int, required=True, help='out-of-sample 캔들 개수')
+    parser.add_argument('--step', type=int, default=None)
+    parser.add_argument('--metric', default='return_rate')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    candle_arrays = load_candle_arrays(args.market, args.unit)
+    if candle_arrays is None:
+        print(f'저장된 캔들이 없습니다. ({args.market}, {args.unit}분)')
+        sys.exit(1)
+
+    walk_forward_result = run_walk_forward(
+        candle_arrays, args.market, args.unit, args.strategy, dict(parse_grid_arg(arg) for arg in args.grid),
+        args.in_sample, args.out_sample, step=args.step, metric=args.metric, max_workers=args.workers,
+        use_cache=not args.no_cache)
+
+    print(walk_forward_result['folds'].to_string())
+    print(f"out-of-sample 누적 수익률 : {walk_forward_result['out_sample_return_rate'] * 100:.2f}%")
+    print(f"새로 계산한 (fold, 파라미터) 개수 : {walk_forward_result['computed']}")
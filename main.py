@@ -1,7 +1,6 @@
 import sys, os, math, time
-import logging.config
-from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
+import logging
+from datetime import datetime, timedelta, timezone
 
 # 현재 스크립트의 디렉토리 경로를 얻습니다.
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,16 +18,40 @@ sys.path.append(trading_dir)
 sys.path.append(utils_dir)
 
 # import
-from account.my_account import get_my_exchange_account
-from upbit_data.candle import get_min_candle_data
+from account.account_cache import get_account_cache
+from account.position_journal import get_position_journal
+from upbit_data.candle import get_cached_min_candle_data
+from upbit_data.market_data_daemon import get_shared_candle_data
 # from trading.trading_strategy import trading_strategy
-from trading.trading_strategy2 import trading_strategy
-from trading.trade import buy_market, sell_market, get_open_order
-from utils.email_utils import send_email
-
-# 전역변수
+from trading.trading_strategy2 import trading_strategy, DEFAULT_PARAMS
+from trading.trade import buy_market, sell_market
+from trading.order_tracker import get_order_tracker
+from trading.indicator_cache import get_indicator_cache
+from trading.risk_engine import RiskEngine
+from upbit_data.websocket_feed import TradeFeed
+from utils.email_utils import send_email, get_email_notifier
+from utils.candle_scheduler import CandleCloseScheduler, get_closed_candle_data
+from utils.warm_state import load_warm_state, WarmStateSnapshotter
+from utils.exchange_clock import get_exchange_clock
+from utils.metrics import get_metrics, start_metrics_server, start_metrics_reporter
+from utils.profiler import get_job_profiler
+from utils.log_utils import setup_logging, shutdown_logging, get_decision_trace
+
+KST = timezone(timedelta(hours=9))
+CANDLE_UNIT_SEC = 5 * 60  # 5분봉
+
+# 단계별 시간, 매매 신호 등 성능 지표 (metrics 엔드포인트/로그로 확인)
+metrics = get_metrics()
+
+# 전역변수 (매수시간, 계좌잔고는 포지션 저널에도 기록하고 재시작 시 복원)
 buy_time = None  # 매수시간
 krw_balance = 0  # 계좌잔고(KRW)
+risk_engine = None  # 실시간 손절 (리스크 엔진)
+
+# 리스크 엔진 기준 (None이면 사용하지 않음)
+RISK_STOP_LOSS_RATE = DEFAULT_PARAMS['stop_loss_rate']  # 매매전략과 같은 손절 비율
+RISK_TRAILING_RATE = None  # 추적 손절 (ex. 0.99 - 최고가 대비 1% 하락)
+RISK_TAKE_PROFIT_RATE = None  # 익절 (ex. 1.02)
 
 # 로그파일 경로
 log_dir = os.path.join(current_dir, 'logs')
@@ -38,15 +61,19 @@ if not os.path.exists(log_dir):
     print('로그 폴더(/logs)가 존재하지 않습니다. 생성 후 다시 실행해주세요.')
     sys.exit(1)
 
-logging.config.fileConfig('logging.conf')
+# 로그 출력은 별도 스레드에서 처리 (매매 스레드는 큐에 넣기만 함)
+setup_logging('logging.conf')
 logger = logging.getLogger(__name__)
 
 
 def get_account_info():
     logger.info('========== get_account_info ==========')
 
-    # get my account
-    my_account = get_my_exchange_account()
+    # 계좌 조회 시각 (이후에 리스크 엔진이 매도했는지 확인)
+    as_of = time.monotonic()
+
+    # get my account (계좌 캐시: 체결 시 바로 반영, 백그라운드에서 주기적으로 실제 계좌와 맞춤)
+    my_account = get_account_cache().get_account()
 
     # 도지코인(DOGE) 기준으로 확인합니다.
     doge_ticker = 'DOGE'
@@ -88,41 +115,207 @@ def get_account_info():
         'doge_balance': doge_balance,
         'doge_buy_price': doge_avg_buy_price,
         'krw_balance': krw_amount,
-        'krw_available': krw_invest_amount
+        'krw_available': krw_invest_amount,
+        'as_of': as_of
     }
 
 
-def check_time():
-    # 현재 시간 가져오기 - 로컬 PC의 시간이 기준
-    current_time = datetime.now()
+# 포지션 저널에서 매수시간, 매수 전 계좌잔고 복원 (재시작 시)
+def restore_position():
+    global buy_time, krw_balance
+
+    position = get_position_journal().get_position('KRW-DOGE')
+    if position is None:
+        return
+
+    buy_time = position['buy_time']
+    krw_balance = position['krw_balance']
+    logger.info(f'[KRW-DOGE] 포지션 복원 : {position}')
+
+
+# 포지션 종료 기록 후 전역변수 초기화
+def close_position(**data):
+    global buy_time, krw_balance
+
+    if get_position_journal().get_position('KRW-DOGE') is not None:
+        get_position_journal().close_position('KRW-DOGE', **data)
+
+    buy_time = None
+    krw_balance = 0
+
+
+# 보유 중인 도지코인을 리스크 엔진에 등록 (보유하지 않으면 해제)
+# 계좌 조회 이후에 리스크 엔진이 매도했으면 반영 전의 계좌 정보이므로 다시 감시하지 않는다.
+def sync_risk_engine(account_info: dict):
+    if risk_engine is None:
+        return
+
+    if account_info['is_doge'] and account_info['doge_buy_price'] > 0:
+        risk_engine.watch('KRW-DOGE', account_info['doge_balance'], account_info['doge_buy_price'],
+                          stop_loss_rate=RISK_STOP_LOSS_RATE,
+                          trailing_rate=RISK_TRAILING_RATE,
+                          take_profit_rate=RISK_TAKE_PROFIT_RATE,
+                          as_of=account_info['as_of'])
+    else:
+        risk_engine.unwatch('KRW-DOGE')
+
+
+# 주문 응답(DataFrame)의 uuid (오류 응답이거나 uuid가 없으면 None)
+def get_order_uuid(order_result):
+    if order_result is None or 'uuid' not in order_result.columns or not order_result['uuid'].notnull()[0]:
+        return None
+
+    return order_result['uuid'][0]
+
+
+def get_fill(future, side_name: str):
+    """
+    주문 체결 결과 확인
+
+    - 체결을 확인하지 못했으면(조회 오류, 제한 시간 초과) 포지션 기록은 바꾸지 않고 알림만 보냅니다.
+      계좌 캐시는 다음 조회 때 실제 계좌로 맞추고, 다음 스케줄에서 계좌 기준으로 포지션을 판단합니다.
+
+    Args:
+        future (Future): order_tracker.track 결과
+        side_name (str): 알림에 표시할 주문 종류 ('매수', '매도')
+
+    Returns:
+        dict: 체결 결과, 체결을 확인하지 못했으면 None
+    """
+    try:
+        fill = future.result()
+    except Exception as e:
+        fill = {'error': str(e)}
+
+    if 'error' in fill or fill['timed_out']:
+        get_account_cache().invalidate()
+        logger.error(f'[KRW-DOGE] {side_name} 체결이 확인되지 않았습니다. : {fill}')
+        send_email(f'{side_name} 체결 확인 실패', f'{side_name} 체결이 확인되지 않았습니다. 확인해주세요.\n{fill}')
+        return None
+
+    return fill
+
+
+# 매수 체결 확인 후 매수가격, 수량 기록 및 리스크 엔진 감시 시작 (order_tracker 스레드에서 호출)
+def on_buy_fill(future):
+    buy_fill = get_fill(future, '매수')
+    if buy_fill is None:
+        return
+
+    logger.info(f'[KRW-DOGE] 매수 체결 : {buy_fill}')
+    get_position_journal().update_position('KRW-DOGE', buy_price=buy_fill['avg_price'],
+                                           volume=buy_fill['executed_volume'])
+
+    try:
+        sync_risk_engine(get_account_info())
+    except Exception as e:
+        logger.error(f'리스크 엔진 감시 오류 : {e}')
+
+
+# 매도 체결 확인 후 매매수익 확인, 포지션 종료 기록 (order_tracker 스레드에서 호출)
+def on_sell_fill(future, strategy_message: str):
+    sell_fill = get_fill(future, '매도')
+    if sell_fill is None:
+        return
+
+    logger.info(f'[KRW-DOGE] 매도 체결 : {sell_fill}')
+
+    # 매도 이후에 매매수익을 확인하기 위해 계좌정보를 다시 조회 (체결 결과는 계좌 캐시에 반영됨)
+    after_sell_account = get_account_cache().get_account()
+    logger.debug('after_sell_account :\n%s', after_sell_account)
+
+    # 원화 잔고 확인
+    trade_result = 0
+    if 'KRW' in after_sell_account['currency'].values:
+        after_sell_krw_bal = math.floor(
+            float(after_sell_account[after_sell_account['currency'] == 'KRW']['balance'].values[0]))
+        trade_result = math.floor(after_sell_krw_bal - krw_balance)
+
+    logger.info(f'[KRW-DOGE] {sell_fill["executed_volume"]} 매도 하였습니다.')
+    logger.info(f'매매수익은 {trade_result} 입니다.')
+
+    # 매도하면서 포지션 종료를 기록하고 전역변수를 초기화한다.
+    close_position(reason='strategy', order_uuid=sell_fill['uuid'], sell_price=sell_fill['avg_price'],
+                   trade_result=trade_result)
+
+    send_email('[KRW-DOGE] 시장가 매도', f'{strategy_message}\n매매수익은 {trade_result} 입니다.')
+
+
+# 리스크 엔진이 매도한 경우 (리스크 엔진의 매도 스레드에서 호출)
+def on_risk_exit(market: str, exit_info: dict):
+    sell_result = exit_info['result']
+    error = exit_info['error']
 
-    # 현재 분(minute) 추출
-    current_minute = current_time.minute
+    # 주문 응답이 오류인 경우 (ex. {'error': {'name': ..., 'message': ...}})
+    sell_uuid = get_order_uuid(sell_result) if error is None else None
+    if error is None and sell_uuid is None:
+        error = sell_result.to_dict('records') if sell_result is not None else '주문 응답이 없습니다.'
 
-    # 현재 분(minute)이 5로 나눠지는지 확인
-    is_multiple_of_five = current_minute % 5 == 0
+    if error is not None:
+        logger.error(f'[{market}] 리스크 엔진 매도 오류 ({exit_info["reason"]}) : {error}')
+        send_email('매도 중 에러 발생', f'리스크 엔진 매도 중 에러가 발생하였습니다. 확인해주세요.\n{error}')
+        return
 
-    logger.debug(f'current_time : {current_time}, current_minute : {current_minute}')
-    logger.debug(f'is_multiple_of_five : {is_multiple_of_five}')
+    # 체결 확인 (리스크 엔진의 매도 스레드이므로 기다린다. order_tracker 리스너에서 계좌 캐시에도 반영됨)
+    sell_fill = get_fill(get_order_tracker().track(sell_uuid), '매도')
+    if sell_fill is None:
+        return
 
-    return is_multiple_of_five
+    logger.info(f'[{market}] 리스크 엔진 매도 체결 : {sell_fill}')
+
+    close_position(reason=exit_info['reason'], order_uuid=sell_fill['uuid'], sell_price=sell_fill['avg_price'])
+
+    send_email(f'[{market}] 시장가 매도 ({exit_info["reason"]})',
+               f'체결 가격 {exit_info["trigger_price"]}, 평균 체결가 {sell_fill["avg_price"]}, '
+               f'매수가 {exit_info["buy_price"]}\n'
+               f'[{market}] {sell_fill["executed_volume"]} 매도 하였습니다.')
 
 
 def get_data():
     # 도지코인(KRW-DOGE) 5분봉 가져오기
-    doge_5min_data = get_min_candle_data('KRW-DOGE', 5)
+    # 시세 데이터 데몬(market_data_daemon)이 실행 중이면 shared memory에서 읽는다. (API 호출 없음)
+    doge_5min_data = get_shared_candle_data('KRW-DOGE', 5)
+    if doge_5min_data is not None:
+        return doge_5min_data
+
+    # 캐시를 사용하여 마지막 캔들 이후의 데이터만 새로 가져온다.
+    doge_5min_data = get_cached_min_candle_data('KRW-DOGE', 5)
 
     return doge_5min_data
 
 
-def auto_trading():
+# 캔들 마감(거래소 시각)부터 지금까지 걸린 시간 (초)
+def since_candle_close(closed_time: int) -> float:
+    return get_exchange_clock().now() - (closed_time + CANDLE_UNIT_SEC)
+
+
+# 매매전략 실행 (캔들 조회, 매매전략 시간과 매매 신호 기록)
+def run_strategy(closed_time: int, *args) -> dict:
+    # 마감된 캔들 + 진행 중인 캔들 (마감된 캔들이 아직 없으면 다시 조회)
+    with metrics.span('trading_stage_seconds', stage='candles'):
+        candle_data = get_closed_candle_data(get_data, closed_time, 5)
+
+    # 매매 판단 기록 (조건 값, 결과, 로그 처리 시간)
+    with get_decision_trace().evaluate(strategy='trading_strategy2', market='KRW-DOGE', closed_time=closed_time,
+                                       position=args[0]) as trace:
+        with metrics.span('trading_stage_seconds', stage='strategy'):
+            trade_strategy_result = trading_strategy(candle_data, *args)
+        trace.update(signal=trade_strategy_result['signal'], message=trade_strategy_result['message'])
+
+    metrics.observe('candle_close_to_decision_seconds', since_candle_close(closed_time))
+    metrics.inc('trading_signals_total', strategy='trading_strategy2', signal=trade_strategy_result['signal'] or 'none')
+
+    return trade_strategy_result
+
+
+def auto_trading(closed_time: int):
+    # closed_time: 마감된 5분봉 캔들의 시작 시각 (UTC epoch seconds, 캔들 마감 스케줄러에서 전달)
+    start = time.perf_counter()
     try:
         # 계좌정보 확인
-        account_info = get_account_info()
-
-        # 시간 확인
-        # reminder_of_four = check_time()
-        multiple_of_five = check_time()
+        with metrics.span('trading_stage_seconds', stage='account'):
+            account_info = get_account_info()
+        sync_risk_engine(account_info)
 
         # 포지션 확인 (0: 매수 가능, 1: 매도 가능)
         # 현재 계좌에 매수된 코인 정보가 없으면 '매수 가능(0)', 있으면 매도 가능(1)입니다.
@@ -133,97 +326,129 @@ def auto_trading():
         # 전역변수 사용
         global buy_time, krw_balance
 
+        # 저널에는 포지션이 있으나 계좌에 없으면 다른 곳(앱 등)에서 매도한 것으로 보고 종료
+        if current_position == 0 and buy_time is not None:
+            logger.warning('[KRW-DOGE] 계좌에 보유 수량이 없어 포지션을 종료합니다.')
+            close_position(reason='not_in_account')
+
         # 매수
         if current_position == 0:
-            # 매수는 현재 시간을 확인(def: check_time)한 다음 진행
-            if multiple_of_five:
-                # if True:
-                trade_strategy_result = trading_strategy(get_data(), current_position)
+            trade_strategy_result = run_strategy(closed_time, current_position)
 
-                logger.debug(f'trade_strategy_result : {trade_strategy_result}')
+            logger.debug(f'trade_strategy_result : {trade_strategy_result}')
 
-                if trade_strategy_result['signal'] == 'buy':
-                    # 현재 계좌잔고(KRW) 세팅
-                    # 매도 시 얼마정도 수익을 봤느냐 체크하기 매수하기 전에 값을 세팅
-                    krw_balance = math.floor(account_info['krw_balance'])
+            if trade_strategy_result['signal'] == 'buy':
+                # 현재 계좌잔고(KRW) 세팅
+                # 매도 시 얼마정도 수익을 봤느냐 체크하기 매수하기 전에 값을 세팅
+                krw_balance = math.floor(account_info['krw_balance'])
 
-                    # 매수
+                # 매수
+                with metrics.span('trading_stage_seconds', stage='order'):
                     buy_result = buy_market('KRW-DOGE', account_info['krw_available'])
+                metrics.observe('candle_close_to_order_ack_seconds', since_candle_close(closed_time), side='bid')
+
+                if buy_result['uuid'].notnull()[0]:
+                    # 시장가로 주문하기 때문에 uuid 값이 있으면 정상적으로 처리됐다고 가정한다.
+                    # 매수하면서 전역변수인 매수시간을 세팅한다.
+                    # 매수시간은 이전 캔들(마감된 캔들) 시간으로 세팅 (KST)
+                    buy_time = datetime.fromtimestamp(closed_time, KST).strftime('%Y-%m-%d %H:%M:%S')
+                    logger.info(f'[KRW-DOGE] {account_info["krw_available"]}원 매수 하였습니다.')
 
-                    if buy_result['uuid'].notnull()[0]:
-                        # 시장가로 주문하기 때문에 uuid 값이 있으면 정상적으로 처리됐다고 가정한다.
-                        # 매수하면서 전역변수인 매수시간을 세팅한다.
-                        # 매수시간은 이전 캔들 시간으로 세팅
-                        min5_ago = datetime.now() - timedelta(minutes=5)
-                        buy_time = min5_ago.replace(second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
-                        logger.info(f'[KRW-DOGE] {account_info["krw_available"]}원 매수 하였습니다.')
+                    # 재시작해도 매도 조건을 판단할 수 있도록 저널에 기록 (fsync까지 대기)
+                    get_position_journal().open_position('KRW-DOGE', buy_time=buy_time, krw_balance=krw_balance,
+                                                         order_uuid=buy_result['uuid'][0])
 
+                    with metrics.span('trading_stage_seconds', stage='email'):
                         send_email('[KRW-DOGE] 시장가 매수', trade_strategy_result['message'])
-                    else:
-                        logger.error('매수가 정상적으로 처리되지 않았습니다.')
+
+                    # 체결이 확인되면 매수한 수량, 평균가로 리스크 엔진 감시 시작 (스케줄러 작업을 막지 않음)
+                    get_order_tracker().track(buy_result['uuid'][0]).add_done_callback(on_buy_fill)
+                else:
+                    logger.error('매수가 정상적으로 처리되지 않았습니다.')
 
         # 매도
         elif current_position == 1:
-            if multiple_of_five:
-                trade_strategy_result = trading_strategy(get_data(), current_position, buy_time,
-                                                         account_info['doge_buy_price'])
-
-                logger.debug(f'trade_strategy_result : {trade_strategy_result}')
-
-                if trade_strategy_result['signal'] == 'sell':
-                    sell_result = sell_market('KRW-DOGE', account_info['doge_balance'])
-                    if sell_result['uuid'].notnull()[0]:
-                        while True:
-                            open_order_df = get_open_order('KRW-DOGE', 'wait')
-                            print(open_order_df)
-
-                            time.sleep(5)  # 5초 대기
+            trade_strategy_result = run_strategy(closed_time, current_position, buy_time,
+                                                 account_info['doge_buy_price'])
 
-                            # wait 중인 거래가 없으면 반복 중단
-                            if len(open_order_df) == 0:
-                                break
+            logger.debug(f'trade_strategy_result : {trade_strategy_result}')
 
-                        # 매도 이후에 매매수익을 확인하기 위해 계좌정보를 다시 조회
-                        after_sell_account = get_my_exchange_account()
-                        print(after_sell_account)
+            # 매매전략으로 매도하므로 리스크 엔진 감시 해제 (중복 매도 방지)
+            # 리스크 엔진이 이미 매도 중이거나 계좌 조회 이후에 매도했으면 매도하지 않는다.
+            if trade_strategy_result['signal'] == 'sell' and risk_engine is not None \
+                    and not risk_engine.unwatch('KRW-DOGE', as_of=account_info['as_of']):
+                logger.info('[KRW-DOGE] 리스크 엔진이 매도한 포지션이므로 매매전략 매도를 하지 않습니다.')
 
-                        # 원화 잔고 확인
-                        trade_result = 0
-                        if 'KRW' in after_sell_account['currency'].values:
-                            after_sell_krw_bal = math.floor(
-                                float(after_sell_account[after_sell_account['currency'] == 'KRW']['balance'].values[0]))
-                            trade_result = math.floor(after_sell_krw_bal - krw_balance)
-
-                        logger.info(f'[KRW-DOGE] {account_info["doge_balance"]} 매도 하였습니다.')
-                        logger.info(f'매매수익은 {trade_result} 입니다.')
-
-                        # 매도하면서 전역변수를 초기화한다.
-                        buy_time = None
-                        krw_balance = 0
-
-                        send_email('[KRW-DOGE] 시장가 매도',
-                                   f'{trade_strategy_result["message"]}\n매매수익은 {trade_result} 입니다.')
-                    else:
-                        logger.error('매도가 정상적으로 처리되지 않았습니다.')
-                        send_email('매도 중 에러 발생', '매도 중 에러가 발생하였습니다. 확인해주세요.')
+            elif trade_strategy_result['signal'] == 'sell':
+                with metrics.span('trading_stage_seconds', stage='order'):
+                    sell_result = sell_market('KRW-DOGE', account_info['doge_balance'])
+                metrics.observe('candle_close_to_order_ack_seconds', since_candle_close(closed_time), side='ask')
+
+                if sell_result['uuid'].notnull()[0]:
+                    # 주문 UUID로 체결 완료 확인 (조회 간격 0.1초부터 점점 늘림)
+                    # 체결 완료는 기다리지 않고, 확인되면 매매수익 확인 및 포지션 종료 (스케줄러 작업을 막지 않음)
+                    logger.info(f'[KRW-DOGE] {account_info["doge_balance"]} 매도 주문하였습니다.')
+                    sell_future = get_order_tracker().track(sell_result['uuid'][0])
+                    sell_future.add_done_callback(
+                        lambda future, message=trade_strategy_result['message']: on_sell_fill(future, message))
+                else:
+                    logger.error('매도가 정상적으로 처리되지 않았습니다.')
+                    send_email('매도 중 에러 발생', '매도 중 에러가 발생하였습니다. 확인해주세요.')
 
     except ValueError as ve:
+        metrics.inc('trading_errors_total', type='ValueError')
         logger.error(f'ValueError : {ve}')
     except Exception as e:
+        metrics.inc('trading_errors_total', type=type(e).__name__)
         logger.error(f'예상치 못한 오류 발생 : {e}')
+    finally:
+        metrics.observe('trading_stage_seconds', time.perf_counter() - start, stage='total')
 
 
 # main 작업 실행
 if __name__ == '__main__':
-    logger.info('++++++++++ apscheduler starts. ++++++++++')
+    logger.info('++++++++++ candle scheduler starts. ++++++++++')
 
     # 현재 시간
     scheduler_start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     logger.info(f'scheduler_start_time : {scheduler_start_time}')
 
-    # Background Scheduler 세팅
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(auto_trading, 'cron', second=5)  # 매분 5초에 실행
+    # 성능 지표 엔드포인트(Prometheus text), 주기적인 로그 출력
+    metrics_server = start_metrics_server()
+    metrics_reporter = start_metrics_reporter()
+
+    # 프로파일링 요청 (SIGUSR1: 샘플링, SIGUSR2: cProfile, 또는 logs/profile.flag 파일)
+    profiler = get_job_profiler()
+    profiler.install_signal_handlers()
+
+    # 재시작한 경우 포지션(매수시간, 계좌잔고)과 캔들/지표 캐시 복원
+    restore_position()
+    load_warm_state()
+    warm_state_snapshotter = WarmStateSnapshotter()
+    warm_state_snapshotter.start()
+
+    # 지표 증분 계산 (캔들 마감마다 전체 구간을 다시 계산하지 않고 새로 추가된 캔들만 계산)
+    get_indicator_cache().enable_streaming('KRW-DOGE', 5)
+
+    # 리스크 엔진 세팅 (체결마다 손절 확인, 스케줄러와 별개로 동작)
+    trade_feed = TradeFeed(['KRW-DOGE'], units=(5,))
+    risk_engine = RiskEngine(trade_feed, on_exit=on_risk_exit)
+    trade_feed.start()
+
+    # 이미 보유 중이면 시작할 때부터 감시
+    try:
+        sync_risk_engine(get_account_info())
+    except Exception as e:
+        logger.error(f'리스크 엔진 초기화 오류 : {e}')
+
+    # 계좌 캐시 세팅 (주문 체결 결과를 잔고에 바로 반영)
+    get_order_tracker().add_listener(get_account_cache().apply_fill)
+    get_order_tracker().add_listener(get_position_journal().record_fill)
+    get_account_cache().start()
+
+    # 캔들 마감 스케줄러 세팅 (5분봉이 마감되면 바로 실행, 체결로 마감 감지)
+    scheduler = CandleCloseScheduler(unit=5, feed=trade_feed)
+    scheduler.add_job(profiler.wrap(auto_trading))
     scheduler.start()
 
     try:
@@ -232,3 +457,20 @@ if __name__ == '__main__':
             time.sleep(2)
     except (KeyboardInterrupt, SystemExit):
         scheduler.shutdown()
+        get_account_cache().stop()
+        trade_feed.stop()
+        risk_engine.shutdown()
+        warm_state_snapshotter.stop()
+        get_position_journal().close()
+
+        # 큐에 남은 메일 전송 후 종료
+        get_email_notifier().stop()
+
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if metrics_reporter is not None:
+            metrics_reporter.set()
+        logger.info(f'metrics : {metrics.format_log_line()}')
+
+        # 큐에 남은 로그 출력 후 종료
+        shutdown_logging()
@@ -1,9 +1,7 @@
 import sys, os, math, time
-import logging.config
+import logging
 from datetime import datetime
 
-from apscheduler.schedulers.background import BackgroundScheduler
-
 # 현재 스크립트의 디렉토리 경로를 얻습니다.
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -20,11 +18,24 @@ sys.path.append(trading_dir)
 sys.path.append(utils_dir)
 
 # import
-from account.my_account import get_my_exchange_account
-from upbit_data.candle import get_min_candle_data
+from account.account_cache import get_account_cache
+from upbit_data.candle import get_cached_min_candle_data
+from upbit_data.market_data_daemon import get_shared_candle_data
 from trading.bollinger_band_breakout import trading_strategy
-from trading.trade import buy_market, sell_market, get_open_order
-from utils.email_utils import send_email
+from trading.trade import buy_market, sell_market
+from trading.order_tracker import get_order_tracker
+from trading.indicator_cache import get_indicator_cache
+from utils.email_utils import send_email, get_email_notifier
+from utils.candle_scheduler import CandleCloseScheduler, get_closed_candle_data
+from utils.exchange_clock import get_exchange_clock
+from utils.metrics import get_metrics, start_metrics_server, start_metrics_reporter
+from utils.profiler import get_job_profiler
+from utils.log_utils import setup_logging, shutdown_logging, get_decision_trace
+
+CANDLE_UNIT_SEC = 5 * 60  # 5분봉
+
+# 단계별 시간, 매매 신호 등 성능 지표 (metrics 엔드포인트/로그로 확인)
+metrics = get_metrics()
 
 # 로그파일 경로
 log_dir = os.path.join(current_dir, 'logs')
@@ -34,15 +45,16 @@ if not os.path.exists(log_dir):
     print('로그 폴더(/logs)가 존재하지 않습니다. 생성 후 다시 실행해주세요.')
     sys.exit(1)
 
-logging.config.fileConfig('logging.conf')
+# 로그 출력은 별도 스레드에서 처리 (매매 스레드는 큐에 넣기만 함)
+setup_logging('logging.conf')
 logger = logging.getLogger(__name__)
 
 
 def get_account_info():
     logger.info('========== get_account_info ==========')
 
-    # get my account
-    my_account = get_my_exchange_account()
+    # get my account (계좌 캐시: 체결 시 바로 반영, 백그라운드에서 주기적으로 실제 계좌와 맞춤)
+    my_account = get_account_cache().get_account()
 
     # 도지코인(DOGE) 기준으로 확인합니다.
     doge_ticker = 'DOGE'
@@ -88,59 +100,88 @@ def get_account_info():
     }
 
 
-def mod5_curr_min():
-    # 현재 시간 가져오기 - 로컬 PC의 시간이 기준
-    current_time = datetime.now()
-
-    # 현재 분(minute) 추출
-    current_minute = current_time.minute
+# 매도 체결 완료 알림
+def notify_sell_fill(sell_fill: dict, strategy_message: str):
+    if sell_fill['timed_out']:
+        logger.error(f'[KRW-DOGE] 매도 체결이 확인되지 않았습니다. : {sell_fill}')
+        send_email('매도 체결 확인 실패', f'매도 체결이 확인되지 않았습니다. 확인해주세요.\n{sell_fill}')
+        return
 
-    # 나머지
-    remainder_of_mod5 = current_minute % 5
+    logger.info(f'[KRW-DOGE] {sell_fill["executed_volume"]} 매도 하였습니다. '
+                f'(평균가 {sell_fill["avg_price"]:,.2f}, 수수료 {sell_fill["paid_fee"]:,.2f})')
 
-    logger.debug(f'current_time : {current_time}, current_minute : {current_minute}')
-    logger.debug(f'remainder_of_mod5 : {remainder_of_mod5}')
-
-    return remainder_of_mod5
+    sell_msg = f"{strategy_message}" + \
+               f"[KRW-DOGE] {sell_fill['executed_volume']} 매도 하였습니다. (평균가 {sell_fill['avg_price']:,.2f})"
+    send_email('[KRW-DOGE] 시장가 매도', sell_msg)
 
 
 def get_data():
     # 도지코인(KRW-DOGE) 5분봉 가져오기
-    doge_5min_data = get_min_candle_data('KRW-DOGE', 5)
+    # 시세 데이터 데몬(market_data_daemon)이 실행 중이면 shared memory에서 읽는다. (API 호출 없음)
+    doge_5min_data = get_shared_candle_data('KRW-DOGE', 5)
+    if doge_5min_data is not None:
+        return doge_5min_data
+
+    # 캐시를 사용하여 마지막 캔들 이후의 데이터만 새로 가져온다.
+    doge_5min_data = get_cached_min_candle_data('KRW-DOGE', 5)
 
     return doge_5min_data
 
 
-def auto_trading():
+# 캔들 마감(거래소 시각)부터 지금까지 걸린 시간 (초)
+def since_candle_close(closed_time: int) -> float:
+    return get_exchange_clock().now() - (closed_time + CANDLE_UNIT_SEC)
+
+
+def auto_trading(closed_time: int):
+    # closed_time: 마감된 5분봉 캔들의 시작 시각 (UTC epoch seconds, 캔들 마감 스케줄러에서 전달)
     logger.debug('##### Bollinger Band Breakout #####')
 
+    start = time.perf_counter()
     try:
-        # 시간 확인
-        remainder = mod5_curr_min()
-
         # 계좌정보 확인
-        account_info = get_account_info()
+        with metrics.span('trading_stage_seconds', stage='account'):
+            account_info = get_account_info()
 
         # 현재 계좌잔고(KRW) 확인
         krw_balance: float = math.floor(account_info['krw_balance'])
 
-        # 포지션 확인 (0: 매수 가능, 1: 매도 가능, 9: 매수/매도 모두 불가)
-        current_position = 9
-        if remainder == 4 and krw_balance > 10000:
-            current_position = 0
-        elif remainder == 0 and account_info['is_doge']:
-            current_position = 1
+        # 포지션 확인 (0: 매수 가능, 1: 매도 가능)
+        # 캔들이 마감될 때 보유 중이면 매도, 잔고가 있으면 매수 조건을 확인
+        positions = []
+        if account_info['is_doge']:
+            positions.append(1)
+        if krw_balance > 10000:
+            positions.append(0)
 
-        logger.debug(f'remainder : {remainder}')
         logger.debug(f'krw_balance : {krw_balance}')
-        logger.debug(f'current_position : {current_position}')
-
-        if current_position == 0 or current_position == 1:
-            # 캔들 정보 가져오기
-            doge_data = get_data()
+        logger.debug(f'positions : {positions}')
+
+        # 캔들 정보 가져오기 (마감된 캔들 + 진행 중인 캔들, 마감된 캔들이 아직 없으면 다시 조회)
+        with metrics.span('trading_stage_seconds', stage='candles'):
+            doge_data = get_closed_candle_data(get_data, closed_time, 5) if positions else None
+
+        for current_position in positions:
+            # 매수는 마감된 캔들을 현재 캔들로 판단 (진행 중인 캔들 제외)
+            # 이전에는 캔들 마감 10초 전(매 5분 4분 50초)에 판단
+            # 매도는 진행 중인 캔들을 포함하여 이전 캔들(마감된 캔들)로 판단
+            if current_position == 0:
+                strategy_data = doge_data.iloc[:-1]
+            else:
+                strategy_data = doge_data
 
             # 매매전략 결과 확인
-            trade_strategy_result = trading_strategy(doge_data, current_position)
+            # 매매 판단 기록 (조건 값, 결과, 로그 처리 시간)
+            with get_decision_trace().evaluate(strategy='bollinger_band_breakout', market='KRW-DOGE',
+                                               closed_time=closed_time, position=current_position) as trace:
+                with metrics.span('trading_stage_seconds', stage='strategy'):
+                    trade_strategy_result = trading_strategy(strategy_data, current_position)
+                trace.update(signal=trade_strategy_result['signal'], message=trade_strategy_result['message'],
+                             bull_market=trade_strategy_result['bull_market'])
+
+            metrics.observe('candle_close_to_decision_seconds', since_candle_close(closed_time))
+            metrics.inc('trading_signals_total', strategy='bollinger_band_breakout',
+                        signal=trade_strategy_result['signal'] or 'none')
 
             logger.debug(f'trade_strategy_result : {trade_strategy_result}')
 
@@ -160,14 +201,21 @@ def auto_trading():
 
             if trade_strategy_result['signal'] == 'buy' and krw_trade_amount >= 5000:
                 # 매수
-                buy_result = buy_market('KRW-DOGE', krw_trade_amount)
+                with metrics.span('trading_stage_seconds', stage='order'):
+                    buy_result = buy_market('KRW-DOGE', krw_trade_amount)
+                metrics.observe('candle_close_to_order_ack_seconds', since_candle_close(closed_time), side='bid')
+
                 if buy_result['uuid'].notnull()[0]:
                     # 시장가로 주문하기 때문에 uuid 값이 있으면 정상
                     logger.info(f'[KRW-DOGE] {formatted_trade_amount}원 매수 하였습니다.')
 
+                    # 체결 결과는 기다리지 않고 계좌 캐시에 반영 (order_tracker 리스너)
+                    get_order_tracker().track(buy_result['uuid'][0])
+
                     buy_msg = f"{trade_strategy_result['message']}" + \
                               f"[KRW-DOGE] {formatted_trade_amount}원 매수 하였습니다."
-                    send_email('[KRW-DOGE] 시장가 매수', buy_msg)
+                    with metrics.span('trading_stage_seconds', stage='email'):
+                        send_email('[KRW-DOGE] 시장가 매수', buy_msg)
                 else:
                     logger.error('매수가 정상적으로 처리되지 않았습니다.')
                     send_email('매수 중 에러 발생', '매수 중 에러가 발생하였습니다. 확인해주세요.')
@@ -190,44 +238,56 @@ def auto_trading():
                 logger.info(f'sell_doge_amount : {sell_doge_amount}')
 
                 # 매도
-                sell_result = sell_market('KRW-DOGE', str(sell_doge_amount))
-                if sell_result['uuid'].notnull()[0]:
-                    while True:
-                        open_order_df = get_open_order('KRW-DOGE', 'wait')
-                        # print(open_order_df)
-
-                        time.sleep(5)  # 5초 대기
-
-                        # wait 중인 거래가 없으면 반복 중단
-                        if len(open_order_df) == 0:
-                            break
+                with metrics.span('trading_stage_seconds', stage='order'):
+                    sell_result = sell_market('KRW-DOGE', str(sell_doge_amount))
+                metrics.observe('candle_close_to_order_ack_seconds', since_candle_close(closed_time), side='ask')
 
-                    logger.info(f'[KRW-DOGE] {sell_doge_amount} 매도 하였습니다.')
-
-                    sell_msg = f"{trade_strategy_result['message']}" + \
-                               f"[KRW-DOGE] {sell_doge_amount} 매도 하였습니다."
-                    send_email('[KRW-DOGE] 시장가 매도', sell_msg)
+                if sell_result['uuid'].notnull()[0]:
+                    # 체결 완료는 기다리지 않고, 확인되면 알림 (스케줄러 작업을 막지 않음)
+                    sell_future = get_order_tracker().track(sell_result['uuid'][0])
+                    sell_future.add_done_callback(
+                        lambda future, message=trade_strategy_result['message']:
+                        notify_sell_fill(future.result(), message))
                 else:
                     logger.error('매도가 정상적으로 처리되지 않았습니다.')
                     send_email('매도 중 에러 발생', '매도 중 에러가 발생하였습니다. 확인해주세요.')
 
     except ValueError as ve:
+        metrics.inc('trading_errors_total', type='ValueError')
         logger.error(f'ValueError : {ve}')
     except Exception as e:
+        metrics.inc('trading_errors_total', type=type(e).__name__)
         logger.error(f'예상치 못한 오류 발생 : {e}')
+    finally:
+        metrics.observe('trading_stage_seconds', time.perf_counter() - start, stage='total')
 
 
 # main 작업 실행
 if __name__ == '__main__':
-    logger.info('++++++++++ apscheduler starts. ++++++++++')
+    logger.info('++++++++++ candle scheduler starts. ++++++++++')
 
     # 현재 시간
     scheduler_start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     logger.info(f'scheduler_start_time : {scheduler_start_time}')
 
-    # Background Scheduler 세팅
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(auto_trading, 'cron', second=50)  # 매분 50초에 실행
+    # 성능 지표 엔드포인트(Prometheus text), 주기적인 로그 출력
+    metrics_server = start_metrics_server()
+    metrics_reporter = start_metrics_reporter()
+
+    # 프로파일링 요청 (SIGUSR1: 샘플링, SIGUSR2: cProfile, 또는 logs/profile.flag 파일)
+    profiler = get_job_profiler()
+    profiler.install_signal_handlers()
+
+    # 지표 증분 계산 (캔들 마감마다 전체 구간을 다시 계산하지 않고 새로 추가된 캔들만 계산)
+    get_indicator_cache().enable_streaming('KRW-DOGE', 5)
+
+    # 계좌 캐시 세팅 (주문 체결 결과를 잔고에 바로 반영)
+    get_order_tracker().add_listener(get_account_cache().apply_fill)
+    get_account_cache().start()
+
+    # 캔들 마감 스케줄러 세팅 (5분봉이 마감되면 바로 실행)
+    scheduler = CandleCloseScheduler(unit=5)
+    scheduler.add_job(profiler.wrap(auto_trading))
     scheduler.start()
 
     try:
@@ -236,3 +296,16 @@ if __name__ == '__main__':
             time.sleep(2)
     except (KeyboardInterrupt, SystemExit):
         scheduler.shutdown()
+        get_account_cache().stop()
+
+        # 큐에 남은 메일 전송 후 종료
+        get_email_notifier().stop()
+
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if metrics_reporter is not None:
+            metrics_reporter.set()
+        logger.info(f'metrics : {metrics.format_log_line()}')
+
+        # 큐에 남은 로그 출력 후 종료
+        shutdown_logging()
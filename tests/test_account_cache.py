@@ -0,0 +1,126 @@
+import time
+import pandas as pd
+from account.account_cache import AccountCache
+
+"""
+# 계좌 캐시 테스트
+
+- 체결 결과 반영 (매수/매도)
+- 조회 중에 체결이 반영되면 조회 결과를 사용하지 않음 (버전 확인)
+- 체결이 확인되지 않은 주문은 다음 조회 때 실제 계좌로 갱신
+"""
+
+MARKET = 'KRW-DOGE'
+
+
+def _account_df(krw: str, doge: str = None, avg_buy_price: str = '0') -> pd.DataFrame:
+    rows = [{'currency': 'KRW', 'balance': krw, 'locked': '0', 'avg_buy_price': '0',
+             'avg_buy_price_modified': True, 'unit_currency': 'KRW'}]
+    if doge is not None:
+        rows.append({'currency': 'DOGE', 'balance': doge, 'locked': '0', 'avg_buy_price': avg_buy_price,
+                     'avg_buy_price_modified': False, 'unit_currency': 'KRW'})
+    return pd.DataFrame(rows)
+
+
+def _balances(cache: AccountCache) -> dict:
+    df = cache.get_account()
+    return dict(zip(df['currency'], df['balance']))
+
+
+def test_apply_fill():
+    cache = AccountCache(fetch_func=lambda: _account_df('100000'))
+    assert _balances(cache) == {'KRW': '100000'}
+
+    cache.apply_fill({'market': MARKET, 'side': 'bid', 'executed_volume': '200', 'executed_funds': '40000',
+                      'paid_fee': '20'})
+    df = cache.get_account()
+    assert _balances(cache) == {'KRW': '59980', 'DOGE': '200'}
+    assert df.loc[df['currency'] == 'DOGE', 'avg_buy_price'].iloc[0] == '200'
+
+    cache.apply_fill({'market': MARKET, 'side': 'ask', 'executed_volume': '200', 'executed_funds': '42000',
+                      'paid_fee': '21'})
+    assert _balances(cache) == {'KRW': '101959'}
+
+
+def test_discard_refresh_during_fill():
+    cache = AccountCache(fetch_func=lambda: _account_df('100000'))
+    cache.refresh()
+
+    # 조회 응답을 받기 전에 체결이 반영된 경우 (조회 결과에는 체결이 반영되지 않음)
+    def fetch_during_fill() -> pd.DataFrame:
+        cache.apply_fill({'market': MARKET, 'side': 'bid', 'executed_volume': '100', 'executed_funds': '20000',
+                          'paid_fee': '10'})
+        return _account_df('100000')
+
+    cache.fetch_func = fetch_during_fill
+    assert cache.refresh() is False
+    assert _balances(cache) == {'KRW': '79990', 'DOGE': '100'}
+
+    # 다음 조회는 그대로 사용
+    cache.fetch_func = lambda: _account_df('79990', '100', '200')
+    assert cache.refresh() is True
+    assert _balances(cache) == {'KRW': '79990', 'DOGE': '100'}
+
+
+def test_invalidate_timed_out_fill():
+    fetch_cnt = []
+
+    def fetch() -> pd.DataFrame:
+        fetch_cnt.append(1)
+        return _account_df('100000') if len(fetch_cnt) == 1 else _account_df('50000', '250', '200')
+
+    cache = AccountCache(fetch_func=fetch)
+    assert _balances(cache) == {'KRW': '100000'}
+    assert _balances(cache) == {'KRW': '100000'}
+    assert len(fetch_cnt) == 1
+
+    cache.apply_fill({'market': MARKET, 'side': 'bid', 'timed_out': True})
+    assert _balances(cache) == {'KRW': '50000', 'DOGE': '250'}
+    assert len(fetch_cnt) == 2
+
+
+def test_discard_refresh_with_pending_order():
+    cache = AccountCache(fetch_func=lambda: _account_df('100000'))
+    cache.refresh()
+
+    # 주문 후 체결 결과가 반영되기 전에 조회가 끝난 경우 (조회 결과에 이미 체결이 반영됨)
+    cache.begin_order()
+    cache.end_order('order-1')
+    cache.fetch_func = lambda: _account_df('79990', '100', '200')
+    assert cache.refresh() is False
+
+    cache.apply_fill({'uuid': 'order-1', 'market': MARKET, 'side': 'bid', 'executed_volume': '100',
+                      'executed_funds': '20000', 'paid_fee': '10'})
+    assert _balances(cache) == {'KRW': '79990', 'DOGE': '100'}
+
+    # 체결 결과가 반영된 후에는 조회 결과 사용
+    assert cache.refresh() is True
+    assert _balances(cache) == {'KRW': '79990', 'DOGE': '100'}
+
+
+def test_discard_refresh_during_order_request():
+    cache = AccountCache(fetch_func=lambda: _account_df('100000'))
+    cache.refresh()
+
+    # 주문 응답을 받기 전에 시작한 조회
+    def fetch_during_order() -> pd.DataFrame:
+        cache.begin_order()
+        return _account_df('79990', '100', '200')
+
+    cache.fetch_func = fetch_during_order
+    assert cache.refresh() is False
+
+    # 주문이 실패하면(uuid 없음) 진행 중인 주문이 없음
+    cache.end_order(None)
+    cache.fetch_func = lambda: _account_df('100000')
+    assert cache.refresh() is True
+
+
+def test_expire_untracked_order():
+    cache = AccountCache(fetch_func=lambda: _account_df('100000'), pending_order_sec=0.0)
+    cache.begin_order()
+    cache.end_order('order-1')
+
+    # 체결 확인을 하지 않은 주문은 {pending_order_sec}초 후 제거
+    time.sleep(0.01)
+    assert cache.refresh() is True
@@ -0,0 +1,90 @@
+import socket
+import pytest
+from email import message_from_bytes, policy
+from utils.email_utils import EmailNotifier
+
+"""
+# 메일 알림 테스트
+
+- 로컬 SMTP 서버(aiosmtpd, SSL 없음)로 전송하여 짧은 시간에 보낸 여러 메일이 한 통(digest)으로 묶이는지 확인합니다.
+- 메일 작성 중 예상하지 못한 오류가 발생해도 flush가 끝나고 이후 메일은 계속 전송합니다.
+"""
+
+controller_module = pytest.importorskip('aiosmtpd.controller')
+
+
+# 받은 메일 보관
+class CollectHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content, policy=policy.default))
+        return '250 OK'
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    handler = CollectHandler()
+    controller = controller_module.Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def _create_notifier(port: int) -> EmailNotifier:
+    return EmailNotifier(host='127.0.0.1', port=port, use_ssl=False, sender='sender@test.local', password='',
+                         receiver='receiver@test.local', batch_sec=0.5, max_retry=0)
+
+
+def test_burst_becomes_digest(smtp_server):
+    handler, port = smtp_server
+    notifier = _create_notifier(port)
+
+    for i in range(5):
+        assert notifier.send(f'알림 {i}', f'내용 {i}')
+    assert notifier.flush(10)
+
+    assert len(handler.messages) == 1
+    assert notifier.sent == 1
+    assert handler.messages[0]['Subject'].startswith('알림 0 외 4건')
+
+    body = handler.messages[0].get_content()
+    for i in range(5):
+        assert f'알림 {i}\n내용 {i}' in body
+
+    # 묶을 메일이 없으면 한 통씩 전송
+    notifier.send('단건 알림', '단건 내용')
+    assert notifier.flush(10)
+    notifier.stop()
+
+    assert len(handler.messages) == 2
+    assert handler.messages[1]['Subject'].startswith('단건 알림 (')
+    assert handler.messages[1].get_content().strip() == '단건 내용'
+
+
+def test_unexpected_error_does_not_stop_worker(smtp_server, monkeypatch):
+    handler, port = smtp_server
+    notifier = _create_notifier(port)
+
+    def broken_make_message(messages: list):
+        raise TypeError('broken message')
+
+    monkeypatch.setattr(notifier, '_make_message', broken_make_message)
+    notifier.send('실패 알림', '내용')
+    assert notifier.flush(5)
+    assert notifier.dropped == 1
+    assert len(handler.messages) == 0
+
+    # 이후 메일은 정상 전송
+    monkeypatch.undo()
+    notifier.send('정상 알림', '내용')
+    assert notifier.flush(5)
+    notifier.stop()
+
+    assert notifier.sent == 1
+    assert len(handler.messages) == 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from trading.indicators import IndicatorStream, compute_batch, create_default_indicators, verify_against_batch
+
+"""
+# 증분 지표 계산 테스트
+
+- 증분 계산(IndicatorEngine, IndicatorStream) 결과가 일괄 계산(pandas, ta)과 완전히 같은지 확인합니다.
+  (SMA, EMA, RSI, MACD, 볼린저밴드)
+- IndicatorStream은 진행 중인 캔들 갱신(revise) 후 마감, 새 캔들 추가(append) 순서로 반영합니다.
+"""
+
+CANDLE_CNT = 1500
+CHECK_INTERVAL = 250  # 일괄 계산과 비교하는 캔들 간격
+
+
+def _random_candles(seed: int = 0, n: int = CANDLE_CNT) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'time': 1_700_000_100 + np.arange(n, dtype=np.int64) * 300,
+        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+        'volume': rng.lognormal(5, 1, n),
+    })
+
+
+def test_engine_matches_batch():
+    result = verify_against_batch(_random_candles())
+
+    assert set(result) == set(compute_batch(_random_candles(n=10)).columns)
+    assert {name: item['exact'] for name, item in result.items() if not item['exact']} == {}
+
+
+def test_stream_matches_batch_with_revise():
+    df = _random_candles(seed=1)
+    times = df['time'].to_numpy()
+    close = df['close'].to_numpy()
+    volume = df['volume'].to_numpy()
+    stream = IndicatorStream(create_default_indicators(), capacity=CANDLE_CNT)
+
+    for i in range(CANDLE_CNT):
+        # 진행 중인 캔들(체결 일부)을 먼저 반영한 후 마감된 값으로 갱신
+        live_close = close.copy()
+        live_volume = volume.copy()
+        live_close[i] = close[i - 1] if i > 0 else close[i]
+        live_volume[i] = volume[i] / 3
+        assert stream.update(times[:i + 1], live_close[:i + 1], live_volume[:i + 1]) == 0
+
+        start = stream.update(times[:i + 1], close[:i + 1], volume[:i + 1])
+        assert start == 0
+
+        n = i + 1
+        if n % CHECK_INTERVAL == 0 or n == CANDLE_CNT:
+            batch = compute_batch(df.iloc[:n])
+            for name in batch.columns:
+                np.testing.assert_array_equal(stream.get(name, start, n), batch[name].to_numpy(), err_msg=name)
+
+
+def test_stream_rebuild_on_changed_candle():
+    df = _random_candles(seed=2, n=300)
+    times = df['time'].to_numpy()
+    close = df['close'].to_numpy()
+    volume = df['volume'].to_numpy()
+
+    stream = IndicatorStream(create_default_indicators(), capacity=300)
+    assert stream.update(times, close, volume) == 0
+
+    # 이미 넣은 캔들 값이 바뀌면(캔들 보정) 다시 만들어야 함
+    changed = close.copy()
+    changed[100] += 1
+    assert stream.update(times, changed, volume) is None
+
+    # 이어지지 않는 캔들
+    assert stream.update(times + 10, close, volume) is None
@@ -0,0 +1,102 @@
+from trading.order_tracker import OrderTracker
+
+"""
+# 주문 체결 확인 테스트
+
+- 완료 상태(done, cancel)가 될 때까지 조회 후 체결 결과 반환
+- 제한 시간이 지나면 마지막으로 조회한 상태로 반환 (timed_out)
+- 조회 오류는 제한 시간 안에서 다시 조회
+"""
+
+ORDER_UUID = 'test-uuid'
+
+
+def _order(state: str, trades: list = ()) -> dict:
+    return {
+        'uuid': ORDER_UUID, 'market': 'KRW-DOGE', 'side': 'bid', 'ord_type': 'price', 'state': state,
+        'executed_volume': str(sum(float(trade['volume']) for trade in trades)), 'paid_fee': '5',
+        'trades_count': len(trades), 'trades': list(trades),
+    }
+
+
+def _create_tracker(get_order_func, timeout: float = 0.3) -> OrderTracker:
+    return OrderTracker(get_order_func, initial_sec=0.01, max_sec=0.05, timeout=timeout)
+
+
+def test_fill_report():
+    states = iter(['wait', 'wait', 'done'])
+    trades = [{'volume': '30', 'funds': '6000'}, {'volume': '20', 'funds': '4100'}]
+    calls = []
+
+    def get_order_func(order_uuid: str) -> dict:
+        calls.append(order_uuid)
+        state = next(states)
+        return _order(state, trades if state == 'done' else ())
+
+    tracker = _create_tracker(get_order_func)
+    listened = []
+    tracker.add_listener(listened.append)
+
+    fill = tracker.track(ORDER_UUID).result(5)
+    tracker.shutdown()
+
+    assert calls == [ORDER_UUID] * 3
+    assert fill['state'] == 'done' and not fill['timed_out']
+    assert fill['executed_volume'] == 50
+    assert fill['executed_funds'] == 10100
+    assert fill['avg_price'] == 202
+    assert fill['paid_fee'] == 5
+    assert listened == [fill]
+
+
+def test_timeout_returns_last_state():
+    calls = []
+
+    def get_order_func(order_uuid: str) -> dict:
+        calls.append(order_uuid)
+        return _order('wait')
+
+    tracker = _create_tracker(get_order_func, timeout=0.2)
+    listened = []
+    tracker.add_listener(listened.append)
+
+    fill = tracker.track(ORDER_UUID).result(5)
+    tracker.shutdown()
+
+    assert fill['timed_out']
+    assert fill['state'] == 'wait'
+    assert 0.2 <= fill['elapsed_sec'] < 1.0
+
+    # 조회 간격은 최대 간격(0.05초)까지만 늘어남
+    assert len(calls) >= 4
+    assert listened == [fill]
+
+
+def test_retry_after_error():
+    results = iter([OSError('connection reset'), _order('cancel', [{'volume': '10', 'funds': '2000'}])])
+
+    def get_order_func(order_uuid: str) -> dict:
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    tracker = _create_tracker(get_order_func)
+    fill = tracker.track(ORDER_UUID).result(5)
+    tracker.shutdown()
+
+    assert fill['state'] == 'cancel' and not fill['timed_out']
+    assert fill['executed_funds'] == 2000
+
+
+def test_timeout_without_response():
+    def get_order_func(order_uuid: str) -> dict:
+        raise OSError('connection refused')
+
+    tracker = _create_tracker(get_order_func, timeout=0.1)
+    fill = tracker.track(ORDER_UUID).result(5)
+    tracker.shutdown()
+
+    assert fill['timed_out']
+    assert fill['uuid'] == ORDER_UUID
+    assert fill['state'] is None and fill['executed_volume'] == 0
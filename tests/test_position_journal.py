@@ -0,0 +1,115 @@
+import os, json
+from account.position_journal import PositionJournal
+
+"""
+# 포지션 저널 테스트
+
+- 재시작 시 포지션 복원
+- 쓰는 도중 종료되어 잘린 마지막 줄 복구
+- 스냅샷 저장(compaction) 후 복원, 스냅샷에 반영된 기록은 다시 적용하지 않음
+"""
+
+MARKET = 'KRW-DOGE'
+
+
+def _open_journal(tmp_path, **kwargs) -> PositionJournal:
+    return PositionJournal(name='test', directory=str(tmp_path), **kwargs)
+
+
+def test_restore_positions(tmp_path):
+    journal = _open_journal(tmp_path)
+    journal.open_position(MARKET, buy_time='2024-01-01 09:00:00', krw_balance=100000)
+    journal.update_position(MARKET, buy_price=150.5)
+    journal.open_position('KRW-BTC', buy_time='2024-01-01 09:05:00')
+    journal.close_position('KRW-BTC', reason='stop_loss')
+    journal.close()
+
+    journal = _open_journal(tmp_path)
+    try:
+        position = journal.get_position(MARKET)
+        assert position['buy_time'] == '2024-01-01 09:00:00'
+        assert position['krw_balance'] == 100000
+        assert position['buy_price'] == 150.5
+        assert journal.get_position('KRW-BTC') is None
+    finally:
+        journal.close()
+
+
+def test_repair_truncated_record(tmp_path):
+    journal = _open_journal(tmp_path)
+    journal.open_position(MARKET, buy_price=100)
+    journal.close()
+
+    # 쓰는 도중 종료된 것처럼 마지막 줄을 잘라서 추가
+    journal_path = os.path.join(tmp_path, 'test.jsonl')
+    valid_size = os.path.getsize(journal_path)
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 2, "ts": 1.0, "event": "clo')
+
+    journal = _open_journal(tmp_path)
+    try:
+        position = journal.get_position(MARKET)
+        assert position['buy_price'] == 100
+        assert journal.get_positions().keys() == {MARKET}
+        assert os.path.getsize(journal_path) == valid_size
+
+        # 잘린 줄을 지운 뒤에 이어서 기록
+        assert journal.update_position(MARKET, volume=3) == 2
+    finally:
+        journal.close()
+
+    journal = _open_journal(tmp_path)
+    try:
+        assert journal.get_position(MARKET)['volume'] == 3
+    finally:
+        journal.close()
+
+
+def test_compact_and_restore(tmp_path):
+    journal = _open_journal(tmp_path, compact_records=3)
+    journal.open_position(MARKET, buy_price=100)
+    journal.update_position(MARKET, volume=1)
+    journal.update_position(MARKET, volume=2)
+    journal.open_position('KRW-BTC', buy_price=200)
+    journal.flush()
+    journal.close()
+
+    snapshot_path = os.path.join(tmp_path, 'test.snapshot.json')
+    with open(snapshot_path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['seq'] == 3
+    assert snapshot['positions'][MARKET]['volume'] == 2
+
+    # 스냅샷 이후의 기록만 저널에 남음
+    with open(os.path.join(tmp_path, 'test.jsonl'), encoding='utf-8') as f:
+        assert [json.loads(line)['seq'] for line in f] == [4]
+
+    journal = _open_journal(tmp_path, compact_records=3)
+    try:
+        positions = journal.get_positions()
+        assert positions[MARKET]['volume'] == 2
+        assert positions['KRW-BTC']['buy_price'] == 200
+        assert journal.append('fill', MARKET, {'side': 'bid'}) == 5
+    finally:
+        journal.close()
+
+
+def test_skip_records_in_snapshot(tmp_path):
+    # 스냅샷 저장 후 저널을 비우기 전에 종료된 경우
+    with open(os.path.join(tmp_path, 'test.snapshot.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seq': 2, 'ts': 1.0, 'positions': {MARKET: {'buy_price': 110}}}, f)
+
+    records = [
+        {'seq': 1, 'ts': 1.0, 'event': 'open', 'market': MARKET, 'data': {'buy_price': 100}},
+        {'seq': 2, 'ts': 1.0, 'event': 'update', 'market': MARKET, 'data': {'buy_price': 110}},
+        {'seq': 3, 'ts': 1.0, 'event': 'update', 'market': MARKET, 'data': {'volume': 5}},
+    ]
+    with open(os.path.join(tmp_path, 'test.jsonl'), 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(record) + '\n' for record in records)
+
+    journal = _open_journal(tmp_path)
+    try:
+        assert journal.get_position(MARKET) == {'buy_price': 110, 'volume': 5}
+        assert journal.close_position(MARKET) == 4
+    finally:
+        journal.close()
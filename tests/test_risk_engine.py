@@ -0,0 +1,121 @@
+import time, threading
+from trading.risk_engine import RiskEngine, EXIT_STOP_LOSS, EXIT_TRAILING_STOP, EXIT_TAKE_PROFIT
+
+"""
+# 리스크 엔진 테스트
+
+- 손절, 추적 손절, 익절 조건에서 한번만 매도
+- 매도 중이거나 계좌 조회(as_of) 이후에 매도한 포지션은 watch/unwatch가 False
+"""
+
+MARKET = 'KRW-DOGE'
+
+
+# TradeFeed 대용 (체결을 직접 전달)
+class FakeFeed:
+    def __init__(self, markets: list):
+        self.aggregators = {market: None for market in markets}
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def trade(self, market: str, price: float):
+        for callback in self._listeners:
+            callback(market, {'code': market, 'trade_price': price})
+
+
+def _create_engine(sell_func=None) -> tuple:
+    feed = FakeFeed([MARKET])
+    sells = []
+    exits = []
+
+    def default_sell_func(market: str, volume: str):
+        sells.append((market, volume))
+        return {'uuid': 'test'}
+
+    engine = RiskEngine(feed, sell_func=sell_func or default_sell_func,
+                        on_exit=lambda market, exit_info: exits.append((market, exit_info)))
+    return feed, engine, sells, exits
+
+
+def test_stop_loss():
+    feed, engine, sells, exits = _create_engine()
+    assert engine.watch(MARKET, '10', 100.0, stop_loss_rate=0.99)
+
+    feed.trade(MARKET, 99.5)
+    assert engine.is_watching(MARKET)
+
+    feed.trade(MARKET, 98.9)
+    feed.trade(MARKET, 98.0)
+    engine.shutdown()
+
+    assert sells == [(MARKET, '10')]
+    assert [exit_info['reason'] for _, exit_info in exits] == [EXIT_STOP_LOSS]
+    assert exits[0][1]['trigger_price'] == 98.9
+    assert not engine.is_watching(MARKET)
+
+
+def test_trailing_stop():
+    feed, engine, sells, exits = _create_engine()
+    engine.watch(MARKET, '10', 100.0, stop_loss_rate=0.95, trailing_rate=0.98)
+
+    for price in (101.0, 105.0, 104.0, 103.0):
+        feed.trade(MARKET, price)
+    assert engine.get_position(MARKET)['high'] == 105.0
+    assert len(sells) == 0
+
+    # 최고가(105) * 0.98 = 102.9 이하
+    feed.trade(MARKET, 102.8)
+    engine.shutdown()
+
+    assert [exit_info['reason'] for _, exit_info in exits] == [EXIT_TRAILING_STOP]
+    assert exits[0][1]['high'] == 105.0
+
+
+def test_take_profit_keeps_high_on_rewatch():
+    feed, engine, sells, exits = _create_engine()
+    engine.watch(MARKET, '10', 100.0, take_profit_rate=1.1)
+    feed.trade(MARKET, 108.0)
+
+    # 추가 매수로 수량/기준이 바뀌어도 최고가는 유지
+    engine.watch(MARKET, '20', 104.0, take_profit_rate=1.1)
+    assert engine.get_position(MARKET)['high'] == 108.0
+
+    feed.trade(MARKET, 114.0)
+    feed.trade(MARKET, 114.5)
+    engine.shutdown()
+
+    assert sells == [(MARKET, '20')]
+    assert [exit_info['reason'] for _, exit_info in exits] == [EXIT_TAKE_PROFIT]
+
+
+def test_hand_over_during_exit():
+    selling = threading.Event()
+    release = threading.Event()
+
+    def blocking_sell_func(market: str, volume: str):
+        selling.set()
+        release.wait(5)
+        return {'uuid': 'test'}
+
+    feed, engine, sells, exits = _create_engine(blocking_sell_func)
+    as_of = time.monotonic()
+    engine.watch(MARKET, '10', 100.0, stop_loss_rate=0.99)
+    feed.trade(MARKET, 98.0)
+    assert selling.wait(5)
+
+    # 매도 중에는 넘겨받을 수 없음
+    assert not engine.unwatch(MARKET)
+    assert not engine.watch(MARKET, '10', 100.0, stop_loss_rate=0.99)
+
+    release.set()
+    engine.shutdown()
+    assert len(exits) == 1
+
+    # 매도 전에 조회한 계좌 정보(as_of)로는 다시 감시하거나 매도하지 않음
+    assert not engine.watch(MARKET, '10', 100.0, stop_loss_rate=0.99, as_of=as_of)
+    assert not engine.unwatch(MARKET, as_of=as_of)
+
+    # 매도 후에 조회한 계좌 정보는 사용
+    assert engine.unwatch(MARKET, as_of=time.monotonic())
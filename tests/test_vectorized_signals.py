@@ -0,0 +1,62 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+from backtest.backtester import STRATEGIES
+from trading.indicator_cache import get_indicator_cache
+from trading.signal_utils import verify_signals
+from upbit_data.candle_frame import CandleFrame
+
+"""
+# 벡터 계산(generate_signals)과 bar-by-bar 신호 비교 테스트
+
+- 매매전략별로 랜덤 워크 캔들(5분봉)에서 generate_signals와 매매전략 함수를 캔들마다 호출한 결과가 같은지 확인합니다.
+- 지표 캐시는 (market, unit, 캔들 구간) 기준이므로 데이터마다 다른 마켓 이름을 사용합니다.
+"""
+
+UNIT = 5
+CANDLE_CNT = 400
+SEEDS = (0, 1)
+
+
+def _random_candles(seed: int, n: int = CANDLE_CNT) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.006, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.003)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.003)
+    volume = rng.lognormal(5, 0.8, n)
+
+    unit_sec = UNIT * 60
+    times = 1_700_000_000 - 1_700_000_000 % unit_sec + np.arange(n, dtype=np.int64) * unit_sec
+
+    return CandleFrame(f'KRW-TEST{seed}', UNIT, {
+        'time': times,
+        'timestamp': (times + unit_sec - 1) * 1000,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+        'acc_trade_price': volume * close,
+    }).to_dataframe()
+
+
+@pytest.fixture(autouse=True)
+def clear_indicator_cache():
+    get_indicator_cache().clear()
+    yield
+    get_indicator_cache().clear()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('strategy_name', list(STRATEGIES.keys()))
+def test_vectorized_matches_bar_by_bar(strategy_name: str, seed: int):
+    module_name, use_buy_info = STRATEGIES[strategy_name]
+    strategy_module = importlib.import_module(module_name)
+
+    result = verify_signals(strategy_module.generate_signals, strategy_module.trading_strategy,
+                            _random_candles(seed), unit=UNIT, use_buy_info=use_buy_info)
+
+    assert result['match'], result['mismatch_index']
+    assert result['buy_cnt'] > 0
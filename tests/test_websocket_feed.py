@@ -0,0 +1,185 @@
+import time, socket, asyncio, threading
+import numpy as np
+import pytest
+from upbit_data import websocket_feed
+from upbit_data.candle_frame import CandleFrame
+from upbit_data.websocket_feed import CandleAggregator, TradeFeed, serve_trade_replay
+
+"""
+# 체결 WebSocket 구독 및 캔들 생성 테스트
+
+- 로컬 체결 재생 서버(serve_trade_replay)로 체결을 보내고 TradeFeed가 만든 1/5분봉을 직접 계산한 값과 비교합니다.
+- 연결이 끊긴 후 REST API 캔들로 보정(backfill)한 결과가 끊기지 않고 받은 결과와 같은지 확인합니다.
+"""
+
+MARKET = 'KRW-TEST'
+BASE_TIME = 1_700_000_100  # 5분 단위 시각 (UTC epoch seconds)
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume', 'acc_trade_price')
+
+
+def _trade(sec: float, price: float, volume: float) -> dict:
+    return {'type': 'trade', 'code': MARKET, 'trade_price': price, 'trade_volume': volume,
+            'trade_timestamp': int((BASE_TIME + sec) * 1000)}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+# 별도 스레드에서 serve_trade_replay 실행 (stop하면 연결이 끊김)
+class ReplayServer:
+    def __init__(self, trades: list, port: int):
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._task = None
+        self._thread = threading.Thread(target=self._run, args=(trades,), daemon=True)
+        self._thread.start()
+
+        # 연결을 받을 수 있을 때까지 대기
+        assert _wait_until(self._is_listening, 5)
+
+    def _is_listening(self) -> bool:
+        try:
+            socket.create_connection(('127.0.0.1', self.port), timeout=0.1).close()
+            return True
+        except OSError:
+            return False
+
+    def _run(self, trades: list):
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(serve_trade_replay(trades, port=self.port))
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join(5)
+
+
+@pytest.fixture
+def port() -> int:
+    return _free_port()
+
+
+def _start_feed(port: int, units: tuple) -> TradeFeed:
+    feed = TradeFeed([MARKET], url=f'ws://127.0.0.1:{port}', units=units)
+    feed.start()
+    assert feed.wait_connected(5)
+    return feed
+
+
+def test_trade_to_candles(port):
+    trades = [
+        _trade(10, 100.0, 1.0),
+        _trade(30, 102.0, 2.0),
+        _trade(70, 99.0, 1.0),
+        _trade(200, 101.0, 3.0),
+        _trade(50, 90.0, 9.0),  # 1분봉은 진행 중인 캔들보다 이전 시각 (무시), 5분봉은 진행 중인 캔들에 반영
+        _trade(290, 103.0, 1.0),
+        _trade(310, 98.0, 2.0),
+        dict(_trade(320, 1.0, 1.0), code='KRW-OTHER'),  # 구독하지 않은 마켓
+    ]
+    server = ReplayServer(trades, port)
+    feed = _start_feed(port, (1, 5))
+    try:
+        assert _wait_until(lambda: feed.received == 7)
+
+        # 1분봉: [시작 시각, 시가, 고가, 저가, 종가, 거래량, 거래금액]
+        one_min = feed.aggregators[MARKET].get_candle_arrays(1)
+        assert np.column_stack([one_min[column] for column in COLUMNS]).tolist() == [
+            [BASE_TIME, 100.0, 102.0, 100.0, 102.0, 3.0, 304.0],
+            [BASE_TIME + 60, 99.0, 99.0, 99.0, 99.0, 1.0, 99.0],
+            [BASE_TIME + 180, 101.0, 101.0, 101.0, 101.0, 3.0, 303.0],
+            [BASE_TIME + 240, 103.0, 103.0, 103.0, 103.0, 1.0, 103.0],
+            [BASE_TIME + 300, 98.0, 98.0, 98.0, 98.0, 2.0, 196.0],
+        ]
+
+        # 5분봉: 300초 전의 체결은 모두 같은 캔들
+        five_min = feed.aggregators[MARKET].get_candle_arrays(5)
+        assert np.column_stack([five_min[column] for column in COLUMNS]).tolist() == [
+            [BASE_TIME, 100.0, 103.0, 90.0, 103.0, 17.0, 1619.0],
+            [BASE_TIME + 300, 98.0, 98.0, 98.0, 98.0, 2.0, 196.0],
+        ]
+        assert feed.aggregators[MARKET].dropped == 1
+        assert feed.get_candle_data(MARKET, 5, include_current=False)['close'].tolist() == [103.0]
+    finally:
+        feed.stop()
+        server.stop()
+
+
+def test_revise_current_candle():
+    aggregator = CandleAggregator(MARKET, units=(5,))
+    closed = aggregator.on_trade(100.0, 1.0, _trade(10, 0, 0)['trade_timestamp'])
+    assert closed == []
+
+    # 진행 중인 캔들 갱신
+    aggregator.on_trade(104.0, 2.0, _trade(100, 0, 0)['trade_timestamp'])
+    aggregator.on_trade(97.0, 1.0, _trade(200, 0, 0)['trade_timestamp'])
+    current = aggregator.get_current_candle(5)
+    assert (current['open'], current['high'], current['low'], current['close'], current['volume']) == \
+           (100.0, 104.0, 97.0, 97.0, 4.0)
+
+    # 다음 구간의 체결로 마감
+    closed = aggregator.on_trade(99.0, 1.0, _trade(300, 0, 0)['trade_timestamp'])
+    assert [(unit, candle[0], candle[4]) for unit, candle in closed] == [(5, BASE_TIME, 97.0)]
+
+
+def test_backfill_after_reconnect(port, monkeypatch):
+    rng = np.random.default_rng(0)
+    secs = np.sort(rng.uniform(0, 1800, 600))
+    prices = np.round(100 + np.cumsum(rng.normal(0, 0.2, 600)), 2)
+    trades = [_trade(sec, float(price), 1.0) for sec, price in zip(secs, prices)]
+    gap_start, gap_end = 200, 400
+
+    # 끊기지 않고 모든 체결을 받은 경우
+    expected = CandleAggregator(MARKET, units=(1, 5))
+    for trade in trades:
+        expected.on_trade(trade['trade_price'], trade['trade_volume'], trade['trade_timestamp'])
+
+    # REST API 캔들 대용: 끊긴 구간까지의 체결로 만든 캔들 (재연결 후 체결을 받기 시작한 다음 조회)
+    def get_min_candles(market: str, minute: int, count: int) -> CandleFrame:
+        _wait_until(lambda: feed.received > gap_start)
+        rest = CandleAggregator(market, units=(minute,))
+        for trade in trades[:gap_end]:
+            rest.on_trade(trade['trade_price'], trade['trade_volume'], trade['trade_timestamp'])
+        arrays = rest.get_candle_arrays(minute)
+        return CandleFrame(market, minute, {column: values[-count:] for column, values in arrays.items()})
+
+    monkeypatch.setattr(websocket_feed, 'get_min_candles', get_min_candles)
+
+    server = ReplayServer(trades[:gap_start], port)
+    feed = _start_feed(port, (1, 5))
+    try:
+        assert _wait_until(lambda: feed.received == gap_start)
+        assert not feed.is_stale()
+
+        # 연결 끊김 -> 끊긴 구간(gap_start ~ gap_end) 이후의 체결부터 다시 전송
+        server.stop()
+        assert _wait_until(feed.is_stale)
+        server = ReplayServer(trades[gap_end:], port)
+
+        assert _wait_until(lambda: feed.received == gap_start + len(trades) - gap_end and not feed.is_stale())
+
+        for unit in (1, 5):
+            actual = feed.aggregators[MARKET].get_candle_arrays(unit)
+            arrays = expected.get_candle_arrays(unit)
+            for column in arrays:
+                np.testing.assert_allclose(actual[column], arrays[column], err_msg=column)
+    finally:
+        feed.stop()
+        server.stop()
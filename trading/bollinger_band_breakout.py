@@ -1,10 +1,26 @@
+import logging
+import numpy as np
 import pandas as pd
-from ta.volatility import BollingerBands
+from typing import Optional, Callable
+from trading.indicator_cache import get_indicator
+from trading.signal_utils import (SIGNAL_BUY, SIGNAL_SELL, merge_params, shift, has_candle_datetime, frame_indicator,
+                                  frame_candles)
+from utils.log_utils import log_conditions
+
+logger = logging.getLogger(__name__)
+
+# 매매전략 파라미터 기본값
+DEFAULT_PARAMS = {
+    'ema_long': 200,  # 시장 상황 판단 EMA (200EMA 기울기)
+    'bb_window': 20,
+    'bb_dev': 2,
+}
 
 
 def trading_strategy(
         df: pd.DataFrame,
         position: int,
+        params: Optional[dict] = None
 ) -> dict:
     """
     코인 트레이딩 전략 함수 - Bollinger Band Breakout
@@ -12,6 +28,7 @@ def trading_strategy(
     Args:
         df (pd.DataFrame): 가격 데이터프레임
         position (int): 현재 포지션 (0: 매수 가능, 1: 매도 가능)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
 
     Returns:
         str: 트레이딩 액션 ('buy', 'sell', '')
@@ -22,16 +39,20 @@ def trading_strategy(
     - high: 고가
     - low: 저가
     - volume: 거래량
+
+    # 지표는 공용 지표 캐시(indicator_cache)에서 가져오며, 입력 df에 컬럼을 추가하지 않습니다.
     """
 
     # DataFrame 필수 데이터 검증
-    required_columns = ['close', 'date', 'time', 'volume']
-    if not all(col in df.columns for col in required_columns):
-        raise ValueError(f"DataFrame은 {required_columns} 컬럼을 포함해야 합니다.")
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
 
     # 최소 200개 데이터 필요 (MA200 계산을 위해)
     if len(df) < 200:
-        print('데이터가 부족합니다 (최소 200개 필요).')
+        logger.info('데이터가 부족합니다 (최소 200개 필요).')
         return {
             "signal": "",
             "bull_market": "",
@@ -46,47 +67,48 @@ def trading_strategy(
     # df['MA20_slope'] = df['MA20'].diff()  # diff() 함수를 사용하여 기울기 계산
 
     # EMA 계산
-    df['EMA50'] = df['close'].ewm(span=50, adjust=False).mean()
-    df['EMA200'] = df['close'].ewm(span=200, adjust=False).mean()
+    # ema50 = get_indicator(df, 'ema', span=50)
+    ema200 = get_indicator(df, 'ema', span=params['ema_long'])
 
     # 시장 상황 판단 (50EMA와 200EMA 비교)
-    # is_bull_market = df['EMA50'].iloc[-1] > df['EMA200'].iloc[-1]
+    # is_bull_market = ema50.iloc[-1] > ema200.iloc[-1]
 
     # 시장 상황 판단 (200EMA 기울기)
-    df['EMA200_slope'] = df['EMA200'].diff()  # diff() 함수를 사용하여 기울기 계산
+    ema200_slope = ema200.iloc[-1] - ema200.iloc[-2]
 
     # 기울기가 양(+)인 경우 Bull Market
-    is_bull_market = df['EMA200_slope'].iloc[-1] > 0
+    is_bull_market = ema200_slope > 0
 
-    print(f'is_bull_market : {is_bull_market}')
+    log_conditions(logger, is_bull_market=is_bull_market)
 
     # 볼린저밴드 계산
-    bollinger = BollingerBands(df['close'])
-    df['BB_upper'] = bollinger.bollinger_hband()
-    df['BB_mid'] = bollinger.bollinger_mavg()
-    df['BB_lower'] = bollinger.bollinger_lband()
+    bb_upper = get_indicator(df, 'bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_lower = get_indicator(df, 'bb_lower', window=params['bb_window'], window_dev=params['bb_dev'])
 
-    # 최근 20개의 DataFrame 추출
-    recent_df: pd.DataFrame = df.tail(20)
+    candle_open = df['open']
+    candle_close = df['close']
 
     # 이전 캔들이 볼린저밴드 하단을 돌파한 음봉(-)인지 확인
     bb_lower_breakout = (
-            recent_df['open'].iloc[-2] > recent_df['close'].iloc[-2] and
-            recent_df['close'].iloc[-2] < recent_df['BB_lower'].iloc[-2]
+            candle_open.iloc[-2] > candle_close.iloc[-2] and
+            candle_close.iloc[-2] < bb_lower.iloc[-2]
     )
 
-    print(f'position : {position}')
-    print(f'bb_lower_breakout : {bb_lower_breakout}')
+    log_conditions(
+        logger,
+        position=position,
+        bb_lower_breakout=bb_lower_breakout
+    )
 
     # 매수 가능
     if position == 0 and bb_lower_breakout:
         # 현재 캔들이 양봉이면 매수
-        is_recent_positive_candle = recent_df['open'].iloc[-1] < recent_df['close'].iloc[-1]
+        is_recent_positive_candle = candle_open.iloc[-1] < candle_close.iloc[-1]
 
         if is_recent_positive_candle:
             buy_msg = '이전 캔들이 볼린저밴드 하단을 돌파한 음봉이고, 현재 캔들이 양봉'
 
-            print(f'buy_signal! - {buy_msg}')
+            logger.info('buy_signal! - %s', buy_msg)
             return {
                 "signal": "buy",
                 "bull_market": is_bull_market,
@@ -97,16 +119,16 @@ def trading_strategy(
     elif position == 1:
         # 이전 캔들이 볼린저밴드 상단을 돌파한 양봉(+)인지 확인
         bb_upper_breakout = (
-                recent_df['open'].iloc[-2] < recent_df['close'].iloc[-2] and
-                recent_df['close'].iloc[-2] > recent_df['BB_upper'].iloc[-2]
+                candle_open.iloc[-2] < candle_close.iloc[-2] and
+                candle_close.iloc[-2] > bb_upper.iloc[-2]
         )
 
-        print(f'bb_upper_breakout : {bb_upper_breakout}')
+        log_conditions(logger, bb_upper_breakout=bb_upper_breakout)
 
         if bb_upper_breakout:
             sell_msg = '이전 캔들이 볼린저밴드 상단을 돌파한 양봉'
 
-            print(f'buy_signal! - {sell_msg}')
+            logger.info('sell_signal! - %s', sell_msg)
             return {
                 "signal": "sell",
                 "bull_market": is_bull_market,
@@ -118,3 +140,117 @@ def trading_strategy(
         "bull_market": is_bull_market,
         "message": ""
     }
+
+
+def buy_conditions(candles: dict, indicator: Callable, params: dict) -> dict:
+    """
+    캔들별 매수 조건 배열 (build_signal_conditions, 마켓 스캐너에서 사용)
+
+    마지막 축이 시간이므로 1차원(캔들) 배열과 2차원(마켓 x 캔들) 배열 모두 계산할 수 있습니다.
+
+    Args:
+        candles (dict): {'open', 'close', 'volume'}: 캔들 배열
+        indicator (Callable): 지표 배열 함수 indicator(name, **params) (ex. signal_utils.frame_indicator(df))
+        params (dict): 매매전략 파라미터 (merge_params 결과)
+
+    Returns:
+        dict: 'buy_condition'과 매도 조건에 사용하는 지표 배열
+    """
+    candle_open, candle_close = candles['open'], candles['close']
+    bb_upper = indicator('bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_lower = indicator('bb_lower', window=params['bb_window'], window_dev=params['bb_dev'])
+
+    # 이전 캔들이 볼린저밴드 하단을 돌파한 음봉이고, 현재 캔들이 양봉
+    bb_lower_breakout = shift((candle_open > candle_close) & (candle_close < bb_lower), 1, False)
+
+    return {
+        'buy_condition': bb_lower_breakout & (candle_open < candle_close),
+        'bb_upper': bb_upper,
+    }
+
+
+def build_signal_conditions(
+        df: pd.DataFrame,
+        unit: int = 5,
+        params: Optional[dict] = None,
+        indicator: Optional[Callable] = None
+) -> dict:
+    """
+    전체 캔들 구간의 매수/매도 조건 배열 계산 (generate_signals, 워크포워드에서 사용)
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수/매도 조건에 시각을 사용하지 않으므로 다른 전략과 호출 형태를 맞추기 위한 값)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+        indicator (Callable, optional): 지표 배열 함수 (없으면 지표 캐시, 워크포워드에서는 fold별 디스크 캐시)
+
+    Returns:
+        dict: 조건 배열
+    """
+
+    # DataFrame 필수 데이터 검증
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
+
+    candles = frame_candles(df)
+    conditions = buy_conditions(candles, indicator or frame_indicator(df), params)
+    candle_open, candle_close = candles['open'], candles['close']
+
+    return {
+        'buy_condition': conditions['buy_condition'],
+        # 이전 캔들이 볼린저밴드 상단을 돌파한 양봉
+        'sell_condition': shift((candle_open < candle_close) & (candle_close > conditions['bb_upper']), 1, False),
+    }
+
+
+def generate_signals_from_conditions(conditions: dict, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """
+    조건 배열로 {start} ~ {end} 구간의 매수/매도 신호 계산 ({start} 위치에서는 포지션 없음)
+
+    Args:
+        conditions (dict): build_signal_conditions 결과
+        start (int): 시작 위치 (포함)
+        end (int, optional): 종료 위치 (미포함, 기본값: 마지막)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음, 구간 밖은 0)
+    """
+    buy_condition = conditions['buy_condition']
+    sell_condition = conditions['sell_condition']
+
+    n = len(buy_condition)
+    end = n if end is None else min(end, n)
+    signals = np.zeros(n, dtype=np.int8)
+
+    # 최소 200개 데이터 필요 (포지션이 없으면 매수, 있으면 매도 조건만 확인)
+    position = 0
+    for t in range(max(start, 199), end):
+        if position == 0 and buy_condition[t]:
+            signals[t] = SIGNAL_BUY
+            position = 1
+        elif position == 1 and sell_condition[t]:
+            signals[t] = SIGNAL_SELL
+            position = 0
+
+    return signals
+
+
+def generate_signals(df: pd.DataFrame, unit: int = 5, params: Optional[dict] = None) -> np.ndarray:
+    """
+    전체 캔들 구간의 매수/매도 신호를 한번에 계산 (백테스트용)
+
+    캔들마다 trading_strategy(df.iloc[:t + 1], position)를 호출한 결과와 같습니다.
+    (포지션이 없으면 매수, 있으면 매도 조건만 확인하며 매수/매도를 번갈아 진행)
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수/매도 조건에 시각을 사용하지 않으므로 다른 전략과 호출 형태를 맞추기 위한 값)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음)
+    """
+    return generate_signals_from_conditions(build_signal_conditions(df, unit, params))
@@ -0,0 +1,335 @@
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from ta.trend import MACD
+from ta.momentum import RSIIndicator
+from ta.volatility import BollingerBands
+from trading import indicators
+
+"""
+# 지표 캐시
+
+여러 매매전략이 같은 마켓의 캔들로 같은 지표(MA20, RSI, 볼린저밴드 등)를 각각 계산하지 않도록
+(market, unit, 캔들 구간, 마지막 캔들 timestamp) 기준으로 지표를 한번만 계산하고 공유합니다.
+
+- 캐시된 지표는 읽기 전용 배열이며, 요청한 DataFrame의 index를 붙인 Series로 반환합니다. (복사 없음)
+- 매매전략은 입력 DataFrame에 컬럼을 추가하지 않고 이 캐시에서 지표를 가져옵니다.
+- 캔들 구간(마켓) 단위로 LRU 방식으로 오래된 항목을 제거하며, hit/miss 통계를 확인할 수 있습니다.
+
+## 지표 이름과 파라미터
+- sma: source(기본값 'close'), window
+- ema: source(기본값 'close'), span
+- rsi: window(기본값 14)
+- macd, macd_signal, macd_diff: window_slow(26), window_fast(12), window_sign(9)
+- bb_upper, bb_mid, bb_lower: window(20), window_dev(2)
+- datetime: 캔들 시각 (KST, 'datetime' 컬럼이 있으면 그대로 사용하고 없으면 'date', 'time' 컬럼으로 만듦)
+
+## 증분 계산 (실시간 매매)
+- enable_streaming(market, unit)으로 지정한 마켓은 캔들 구간마다 전체를 다시 계산하지 않고
+  IndicatorStream(trading/indicators.py)으로 새로 추가된 캔들만 계산합니다. (진행 중인 캔들은 revise)
+- 처음 요청한 캔들 구간 전체로 시작하므로 그 구간의 값은 일괄 계산과 같고, 이후에는 이어서 계산합니다.
+  (캔들 구간이 밀리면 EMA, RSI, MACD는 잘라낸 구간만 다시 계산한 값과 조금 다를 수 있음)
+- 이미 계산한 캔들 값이 바뀌었거나(캔들 보정, 재연결 후 보충) 구간이 이어지지 않거나 새로운 지표를 요청하면
+  요청한 캔들 구간 전체로 다시 시작합니다.
+- 백테스트와 파라미터 탐색은 지정하지 않으므로 기존과 같이 일괄 계산합니다.
+- 지원 지표: sma, ema(source는 'close', 'volume'), rsi, macd, macd_signal, macd_diff, bb_upper, bb_mid, bb_lower
+"""
+
+
+def _calc_sma(df: pd.DataFrame, source: str = 'close', window: int = 20) -> dict:
+    return {('sma', (('source', source), ('window', window))): df[source].rolling(window=window).mean()}
+
+
+def _calc_ema(df: pd.DataFrame, source: str = 'close', span: int = 20) -> dict:
+    return {('ema', (('source', source), ('span', span))): df[source].ewm(span=span, adjust=False).mean()}
+
+
+def _calc_rsi(df: pd.DataFrame, window: int = 14) -> dict:
+    return {('rsi', (('window', window),)): RSIIndicator(df['close'], window=window).rsi()}
+
+
+# MACD는 3개 지표를 한번에 계산하여 같이 캐싱한다.
+def _calc_macd(df: pd.DataFrame, window_slow: int = 26, window_fast: int = 12, window_sign: int = 9) -> dict:
+    macd = MACD(df['close'], window_slow=window_slow, window_fast=window_fast, window_sign=window_sign)
+    params = (('window_fast', window_fast), ('window_sign', window_sign), ('window_slow', window_slow))
+    return {
+        ('macd', params): macd.macd(),
+        ('macd_signal', params): macd.macd_signal(),
+        ('macd_diff', params): macd.macd_diff(),
+    }
+
+
+# 볼린저밴드도 3개 지표를 한번에 계산하여 같이 캐싱한다.
+def _calc_bollinger(df: pd.DataFrame, window: int = 20, window_dev: int = 2) -> dict:
+    bollinger = BollingerBands(df['close'], window=window, window_dev=window_dev)
+    params = (('window', window), ('window_dev', window_dev))
+    return {
+        ('bb_upper', params): bollinger.bollinger_hband(),
+        ('bb_mid', params): bollinger.bollinger_mavg(),
+        ('bb_lower', params): bollinger.bollinger_lband(),
+    }
+
+
+def _calc_datetime(df: pd.DataFrame) -> dict:
+    # CandleFrame으로 만든 DataFrame은 캔들 시각이 이미 있으므로 문자열을 파싱하지 않는다.
+    if 'datetime' in df.columns:
+        return {('datetime', ()): df['datetime']}
+
+    return {('datetime', ()): pd.to_datetime(df['date'] + ' ' + df['time'])}
+
+
+# 지표 이름: (계산 함수, 기본 파라미터)
+INDICATORS = {
+    'sma': (_calc_sma, {'source': 'close', 'window': 20}),
+    'ema': (_calc_ema, {'source': 'close', 'span': 20}),
+    'rsi': (_calc_rsi, {'window': 14}),
+    'macd': (_calc_macd, {'window_slow': 26, 'window_fast': 12, 'window_sign': 9}),
+    'macd_signal': (_calc_macd, {'window_slow': 26, 'window_fast': 12, 'window_sign': 9}),
+    'macd_diff': (_calc_macd, {'window_slow': 26, 'window_fast': 12, 'window_sign': 9}),
+    'bb_upper': (_calc_bollinger, {'window': 20, 'window_dev': 2}),
+    'bb_mid': (_calc_bollinger, {'window': 20, 'window_dev': 2}),
+    'bb_lower': (_calc_bollinger, {'window': 20, 'window_dev': 2}),
+    'datetime': (_calc_datetime, {}),
+}
+
+
+# 증분 계산 지표 생성 함수 (결과 이름은 캐시 key와 같음)
+def _stream_sma(source: str = 'close', window: int = 20):
+    return indicators.SMA(('sma', (('source', source), ('window', window))), window, source=source)
+
+
+def _stream_ema(source: str = 'close', span: int = 20):
+    return indicators.EMA(('ema', (('source', source), ('span', span))), span, source=source)
+
+
+def _stream_rsi(window: int = 14):
+    return indicators.RSI(('rsi', (('window', window),)), window)
+
+
+def _stream_macd(window_slow: int = 26, window_fast: int = 12, window_sign: int = 9):
+    params = (('window_fast', window_fast), ('window_sign', window_sign), ('window_slow', window_slow))
+    names = (('macd', params), ('macd_signal', params), ('macd_diff', params))
+    return indicators.MACD(names, window_slow=window_slow, window_fast=window_fast, window_sign=window_sign)
+
+
+def _stream_bollinger(window: int = 20, window_dev: int = 2):
+    params = (('window', window), ('window_dev', window_dev))
+    names = (('bb_upper', params), ('bb_mid', params), ('bb_lower', params))
+    return indicators.BollingerBands(names, window=window, window_dev=window_dev)
+
+
+# 지표 이름: 증분 계산 지표 생성 함수
+STREAM_INDICATORS = {
+    'sma': _stream_sma,
+    'ema': _stream_ema,
+    'rsi': _stream_rsi,
+    'macd': _stream_macd,
+    'macd_signal': _stream_macd,
+    'macd_diff': _stream_macd,
+    'bb_upper': _stream_bollinger,
+    'bb_mid': _stream_bollinger,
+    'bb_lower': _stream_bollinger,
+}
+
+_STREAM_SOURCES = ('close', 'volume')
+
+
+# 캔들 구간 식별 (market, unit, 첫 캔들 시각, 마지막 캔들 시각, 마지막 캔들 timestamp, 캔들 개수)
+# 진행 중인 캔들이 갱신되면 timestamp가 바뀌기 때문에 새로 계산된다.
+# 캔들 시각은 'datetime'(CandleFrame) 또는 'candle_date_time_utc'(API 응답 형태) 컬럼을 사용한다.
+def _frame_key(df: pd.DataFrame):
+    time_column = 'datetime' if 'datetime' in df.columns else 'candle_date_time_utc'
+    required_columns = ['market', 'unit', time_column, 'timestamp']
+    if len(df) == 0 or not all(col in df.columns for col in required_columns):
+        return None
+
+    return (
+        df['market'].iloc[-1],
+        int(df['unit'].iloc[-1]),
+        df[time_column].iloc[0],
+        df[time_column].iloc[-1],
+        int(df['timestamp'].iloc[-1]),
+        len(df),
+    )
+
+
+class IndicatorCache:
+    def __init__(self, max_frames: int = 32, stream_capacity: int = 2000):
+        self.max_frames = max_frames
+        self.stream_capacity = stream_capacity
+
+        # key: 캔들 구간, value: {(지표 이름, 파라미터): 읽기 전용 np.ndarray}
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 증분 계산 (market, unit): IndicatorStream, 요청한 지표 {(계산 함수, 파라미터): (지표 이름, 파라미터)}
+        self._streams = {}
+        self._stream_specs = {}
+        self._stream_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stream_rebuilds = 0
+
+    def get(self, df: pd.DataFrame, name: str, **params) -> pd.Series:
+        """
+        지표 가져오기 (없으면 계산 후 캐싱)
+
+        Args:
+            df (pd.DataFrame): 캔들 데이터 (get_min_candle_data 형태)
+            name (str): 지표 이름 (ex. 'sma', 'bb_upper')
+            **params: 지표 파라미터 (ex. window=20)
+
+        Returns:
+            pd.Series: df와 같은 index를 가진 읽기 전용 Series
+        """
+        if name not in INDICATORS:
+            raise ValueError(f'지원하지 않는 지표입니다. ({name})')
+
+        calc_func, default_params = INDICATORS[name]
+        params = dict(default_params, **params)
+        indicator_key = (name, tuple(sorted(params.items())))
+        frame_key = _frame_key(df)
+
+        if (frame_key is not None and frame_key[:2] in self._streams and name in STREAM_INDICATORS
+                and params.get('source', 'close') in _STREAM_SOURCES):
+            values = self._get_streamed(df, frame_key[:2], name, params, (calc_func, indicator_key[1]), indicator_key)
+            return pd.Series(values, index=df.index, name=name, copy=False)
+
+        with self._lock:
+            if frame_key is not None and frame_key in self._frames:
+                self._frames.move_to_end(frame_key)
+                values = self._frames[frame_key].get(indicator_key)
+                if values is not None:
+                    self.hits += 1
+                    return pd.Series(values, index=df.index, name=name, copy=False)
+
+            self.misses += 1
+
+        # 계산은 lock 밖에서 진행 (같은 지표를 동시에 계산하는 경우 결과는 같으므로 나중 값으로 덮어씀)
+        results = {}
+        for key, series in calc_func(df, **params).items():
+            values = series.to_numpy()
+            values.setflags(write=False)
+            results[key] = values
+
+        if frame_key is not None:
+            with self._lock:
+                if frame_key not in self._frames:
+                    self._frames[frame_key] = {}
+                self._frames[frame_key].update(results)
+                self._frames.move_to_end(frame_key)
+
+                while len(self._frames) > self.max_frames:
+                    self._frames.popitem(last=False)
+                    self.evictions += 1
+
+        return pd.Series(results[indicator_key], index=df.index, name=name, copy=False)
+
+    def enable_streaming(self, market: str, unit: int):
+        """
+        마켓의 지표를 증분 계산 (실시간 매매 프로그램에서 시작할 때 호출)
+
+        Args:
+            market (str): 마켓 ID (ex. 'KRW-DOGE')
+            unit (int): 분 단위
+        """
+        with self._stream_lock:
+            self._streams.setdefault((market, int(unit)), None)
+            self._stream_specs.setdefault((market, int(unit)), {})
+
+    def disable_streaming(self, market: str, unit: int):
+        with self._stream_lock:
+            self._streams.pop((market, int(unit)), None)
+            self._stream_specs.pop((market, int(unit)), None)
+
+    def _get_streamed(self, df: pd.DataFrame, stream_key: tuple, name: str, params: dict, spec_key: tuple,
+                      indicator_key: tuple) -> np.ndarray:
+        times = self.get(df, 'datetime').to_numpy().astype(np.int64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        volume = df['volume'].to_numpy(dtype=np.float64)
+
+        with self._stream_lock:
+            stream = self._streams.get(stream_key)
+            specs = self._stream_specs.setdefault(stream_key, {})
+
+            start = None
+            if stream is not None and indicator_key in stream.names:
+                start = stream.update(times, close, volume)
+
+            # 처음 요청했거나 이어지지 않으면 요청한 캔들 구간 전체로 다시 시작
+            if start is None:
+                specs[spec_key] = (name, params)
+                stream = indicators.IndicatorStream(
+                    [STREAM_INDICATORS[spec_name](**spec_params) for spec_name, spec_params in specs.values()],
+                    capacity=max(self.stream_capacity, len(df))
+                )
+                start = stream.update(times, close, volume)
+                self._streams[stream_key] = stream
+                self.stream_rebuilds += 1
+
+            # 진행 중인 캔들은 다음 갱신 때 바뀌므로 복사해서 반환
+            values = stream.get(indicator_key, start, len(df)).copy()
+
+        values.setflags(write=False)
+        return values
+
+    # 캐시된 지표 내보내기 (warm_state 스냅샷, 배열은 읽기 전용이라 복사하지 않음)
+    def export_frames(self) -> OrderedDict:
+        with self._lock:
+            return OrderedDict((key, dict(values)) for key, values in self._frames.items())
+
+    # 캐시된 지표 가져오기 (재시작 시 warm start, 이미 캐시된 캔들 구간은 유지)
+    def import_frames(self, frames: OrderedDict) -> int:
+        imported = 0
+        with self._lock:
+            # 가져온 구간은 기존 구간보다 오래된 것으로 보고 앞쪽에 순서대로 넣는다.
+            for frame_key, values in reversed(list(frames.items())):
+                if frame_key in self._frames:
+                    continue
+
+                for array in values.values():
+                    array.setflags(write=False)
+                self._frames[frame_key] = values
+                self._frames.move_to_end(frame_key, last=False)
+                imported += 1
+
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+                self.evictions += 1
+
+        return imported
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'frames': len(self._frames),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'streams': sum(stream is not None for stream in self._streams.values()),
+                'stream_rebuilds': self.stream_rebuilds,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+        with self._stream_lock:
+            for stream_key in self._streams:
+                self._streams[stream_key] = None
+
+
+# 공용 지표 캐시
+_indicator_cache = IndicatorCache()
+
+
+def get_indicator(df: pd.DataFrame, name: str, **params) -> pd.Series:
+    return _indicator_cache.get(df, name, **params)
+
+
+def get_indicator_cache() -> IndicatorCache:
+    return _indicator_cache
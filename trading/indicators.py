@@ -0,0 +1,639 @@
+import math
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Optional
+from ta.trend import MACD as TaMACD
+from ta.momentum import RSIIndicator
+from ta.volatility import BollingerBands as TaBollingerBands
+
+"""
+# 증분(Incremental) 지표 계산
+
+매매전략에서는 매번 1,000개 전체 데이터로 이동평균, EMA, RSI, MACD, 볼린저밴드를 다시 계산하지만
+실제로 사용하는 값은 마지막 1~2개입니다.
+지표별로 상태를 보관해두고 캔들이 추가(append)되거나 진행 중인 캔들이 변경(revise)될 때 O(1)로 갱신합니다.
+
+- pandas(rolling, ewm)와 ta 라이브러리의 계산 방식(보정 합계, 가중치 계산 순서 등)을 그대로 따르기 때문에
+  같은 데이터를 처음부터 넣으면 기존 결과와 동일한 값이 나옵니다. (verify_against_batch로 확인)
+- revise는 마지막으로 추가하기 전의 상태로 되돌린 뒤 다시 계산합니다.
+- IndicatorStream은 캔들 배열이 갱신될 때 새로 추가된 캔들만 IndicatorEngine에 넣습니다.
+  실시간 매매 프로그램은 지표 캐시(indicator_cache.enable_streaming)를 통해 사용합니다.
+
+## 지표 이름 (매매전략의 컬럼명과 동일)
+- MA20, MA200, Volume_MA20: 단순 이동평균
+- EMA5, EMA10, EMA20, EMA50, EMA200: 지수 이동평균 (adjust=False)
+- RSI: RSI(14)
+- MACD, MACD_signal, MACD_histogram: MACD(12, 26, 9)
+- BB_upper, BB_mid, BB_lower: 볼린저밴드(20, 2)
+"""
+
+NAN = float('nan')
+
+
+# pandas ewm과 동일한 방식으로 alpha 계산 (span, alpha -> center of mass -> alpha)
+def _ewm_alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    if span is not None:
+        com = (span - 1) / 2
+    elif alpha is not None:
+        com = (1 - alpha) / alpha
+    else:
+        raise ValueError('[span, alpha] 중 하나는 필수입니다.')
+
+    return 1. / (1. + float(com))
+
+
+class EWM:
+    """
+    지수 가중 이동평균 (pandas ewm(adjust=False, ignore_na=False).mean()과 동일)
+    """
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None, min_periods: int = 0):
+        self.alpha = _ewm_alpha(span, alpha)
+        self.old_wt_factor = 1. - self.alpha
+        self.new_wt = self.alpha
+        self.min_periods = max(int(min_periods), 1)
+
+        self.weighted = None  # 첫 번째 값이 들어오기 전에는 None
+        self.old_wt = 1.
+        self.nobs = 0
+        self._prev_state = None
+
+    def update(self, value: float) -> float:
+        self._prev_state = (self.weighted, self.old_wt, self.nobs)
+        return self._step(value)
+
+    def revise(self, value: float) -> float:
+        self.weighted, self.old_wt, self.nobs = self._prev_state
+        return self._step(value)
+
+    def _step(self, cur: float) -> float:
+        is_observation = cur == cur
+
+        if self.weighted is None:
+            self.weighted = cur
+            self.nobs = int(is_observation)
+            self.old_wt = 1.
+        else:
+            self.nobs += is_observation
+            weighted = self.weighted
+
+            if weighted == weighted:
+                self.old_wt *= self.old_wt_factor
+                if is_observation:
+                    # 같은 값이 반복되는 경우 부동소수점 오차가 생기지 않도록 계산하지 않음 (pandas와 동일)
+                    if weighted != cur:
+                        weighted = self.old_wt * weighted + self.new_wt * cur
+                        weighted /= (self.old_wt + self.new_wt)
+                    self.old_wt = 1.
+                self.weighted = weighted
+            elif is_observation:
+                self.weighted = cur
+
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class RollingMean:
+    """
+    단순 이동평균 (pandas rolling(window).mean()과 동일, Kahan 보정 합계 사용)
+    """
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+
+        self.values = deque()
+        self.count = 0
+        self.nobs = 0
+        self.sum_x = 0.
+        self.neg_ct = 0
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+        self._prev_state = None
+
+    def _get_state(self) -> tuple:
+        return (self.nobs, self.sum_x, self.neg_ct, self.compensation_add, self.compensation_remove,
+                self.num_consecutive_same_value, self.prev_value)
+
+    def update(self, value: float) -> float:
+        removed = self.values[0] if len(self.values) == self.window else None
+        self._prev_state = (self._get_state(), removed)
+        return self._step(value)
+
+    def revise(self, value: float) -> float:
+        state, removed = self._prev_state
+        (self.nobs, self.sum_x, self.neg_ct, self.compensation_add, self.compensation_remove,
+         self.num_consecutive_same_value, self.prev_value) = state
+        self.values.pop()
+        if removed is not None:
+            self.values.appendleft(removed)
+        self.count -= 1
+        return self._step(value)
+
+    def _add(self, val: float):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1., val) < 0:
+                self.neg_ct += 1
+
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val: float):
+        if val == val:
+            self.nobs -= 1
+            y = - val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1., val) < 0:
+                self.neg_ct -= 1
+
+    def _step(self, value: float) -> float:
+        if self.count == 0:
+            self.prev_value = value
+            self.num_consecutive_same_value = 0
+            self.sum_x = self.compensation_add = self.compensation_remove = 0.
+            self.nobs = 0
+            self.neg_ct = 0
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+
+        self._add(value)
+        self.values.append(value)
+        self.count += 1
+
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.
+            return result
+
+        return NAN
+
+
+class RollingStd:
+    """
+    이동 표준편차 (pandas rolling(window).std(ddof)와 동일, Welford + Kahan 보정 사용)
+    """
+
+    def __init__(self, window: int, min_periods: Optional[int] = None, ddof: int = 1):
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self.ddof = ddof
+
+        self.values = deque()
+        self.count = 0
+        self.nobs = 0.
+        self.mean_x = 0.
+        self.ssqdm_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+        self._prev_state = None
+
+    def _get_state(self) -> tuple:
+        return (self.nobs, self.mean_x, self.ssqdm_x, self.compensation_add, self.compensation_remove,
+                self.num_consecutive_same_value, self.prev_value)
+
+    def update(self, value: float) -> float:
+        removed = self.values[0] if len(self.values) == self.window else None
+        self._prev_state = (self._get_state(), removed)
+        return self._step(value)
+
+    def revise(self, value: float) -> float:
+        state, removed = self._prev_state
+        (self.nobs, self.mean_x, self.ssqdm_x, self.compensation_add, self.compensation_remove,
+         self.num_consecutive_same_value, self.prev_value) = state
+        self.values.pop()
+        if removed is not None:
+            self.values.appendleft(removed)
+        self.count -= 1
+        return self._step(value)
+
+    def _add(self, val: float):
+        if val != val:
+            return
+
+        self.nobs += 1
+
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        delta = t
+        if self.nobs:
+            self.mean_x = self.mean_x + delta / self.nobs
+        else:
+            self.mean_x = 0.
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if val == val:
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean_x - self.compensation_remove
+                y = val - self.compensation_remove
+                t = y - self.mean_x
+                self.compensation_remove = t + self.mean_x - y
+                delta = t
+                self.mean_x = self.mean_x - delta / self.nobs
+                self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            else:
+                self.mean_x = 0.
+                self.ssqdm_x = 0.
+
+    def _step(self, value: float) -> float:
+        if self.count == 0:
+            self.prev_value = value
+            self.num_consecutive_same_value = 0
+            self.mean_x = self.ssqdm_x = self.nobs = self.compensation_add = self.compensation_remove = 0.
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+
+        self._add(value)
+        self.values.append(value)
+        self.count += 1
+
+        if self.nobs >= self.min_periods and self.nobs > self.ddof:
+            if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+                var = 0.
+            else:
+                var = self.ssqdm_x / (self.nobs - self.ddof)
+            return math.sqrt(var) if var >= 0 else 0.
+
+        return NAN
+
+
+# ============================== 지표 ==============================
+# 각 지표는 names(결과 이름 목록)와 update(candle), revise(candle) 함수를 가진다.
+# update/revise는 names 순서대로 결과 값 tuple을 반환한다.
+
+class SMA:
+    def __init__(self, name: str, window: int, source: str = 'close'):
+        self.names = (name,)
+        self.source = source
+        self._mean = RollingMean(window)
+
+    def update(self, candle: dict) -> tuple:
+        return self._mean.update(float(candle[self.source])),
+
+    def revise(self, candle: dict) -> tuple:
+        return self._mean.revise(float(candle[self.source])),
+
+
+class EMA:
+    def __init__(self, name: str, span: int, source: str = 'close'):
+        self.names = (name,)
+        self.source = source
+        self._ewm = EWM(span=span)
+
+    def update(self, candle: dict) -> tuple:
+        return self._ewm.update(float(candle[self.source])),
+
+    def revise(self, candle: dict) -> tuple:
+        return self._ewm.revise(float(candle[self.source])),
+
+
+class RSI:
+    """
+    ta.momentum.RSIIndicator와 동일
+    """
+
+    def __init__(self, name: str = 'RSI', window: int = 14):
+        self.names = (name,)
+        self._up = EWM(alpha=1 / window, min_periods=window)
+        self._down = EWM(alpha=1 / window, min_periods=window)
+        self._last_close = None
+        self._prev_close = None
+
+    def update(self, candle: dict) -> tuple:
+        self._prev_close = self._last_close
+        return self._step(float(candle['close']), False)
+
+    def revise(self, candle: dict) -> tuple:
+        return self._step(float(candle['close']), True)
+
+    def _step(self, close: float, is_revise: bool) -> tuple:
+        diff = NAN if self._prev_close is None else close - self._prev_close
+        self._last_close = close
+
+        up_direction = diff if diff > 0 else 0.0
+        down_direction = -(diff if diff < 0 else 0.0)
+
+        if is_revise:
+            emaup = self._up.revise(up_direction)
+            emadn = self._down.revise(down_direction)
+        else:
+            emaup = self._up.update(up_direction)
+            emadn = self._down.update(down_direction)
+
+        if emadn == 0:
+            return 100.,
+
+        return 100 - (100 / (1 + emaup / emadn)) if emadn == emadn else NAN,
+
+
+class MACD:
+    """
+    ta.trend.MACD와 동일 (macd, macd_signal, macd_diff)
+    """
+
+    def __init__(self, names: tuple = ('MACD', 'MACD_signal', 'MACD_histogram'),
+                 window_slow: int = 26, window_fast: int = 12, window_sign: int = 9):
+        self.names = tuple(names)
+        self._fast = EWM(span=window_fast, min_periods=window_fast)
+        self._slow = EWM(span=window_slow, min_periods=window_slow)
+        self._signal = EWM(span=window_sign, min_periods=window_sign)
+
+    def update(self, candle: dict) -> tuple:
+        close = float(candle['close'])
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        return macd, signal, macd - signal
+
+    def revise(self, candle: dict) -> tuple:
+        close = float(candle['close'])
+        macd = self._fast.revise(close) - self._slow.revise(close)
+        signal = self._signal.revise(macd)
+        return macd, signal, macd - signal
+
+
+class BollingerBands:
+    """
+    ta.volatility.BollingerBands와 동일 (hband, mavg, lband)
+    """
+
+    def __init__(self, names: tuple = ('BB_upper', 'BB_mid', 'BB_lower'), window: int = 20, window_dev: int = 2):
+        self.names = tuple(names)
+        self.window_dev = window_dev
+        self._mavg = RollingMean(window)
+        self._mstd = RollingStd(window, ddof=0)
+
+    def update(self, candle: dict) -> tuple:
+        close = float(candle['close'])
+        return self._bands(self._mavg.update(close), self._mstd.update(close))
+
+    def revise(self, candle: dict) -> tuple:
+        close = float(candle['close'])
+        return self._bands(self._mavg.revise(close), self._mstd.revise(close))
+
+    def _bands(self, mavg: float, mstd: float) -> tuple:
+        return mavg + self.window_dev * mstd, mavg, mavg - self.window_dev * mstd
+
+
+# 매매전략에서 사용하는 지표 목록
+def create_default_indicators() -> list:
+    return [
+        SMA('MA20', 20),
+        SMA('MA200', 200),
+        SMA('Volume_MA20', 20, source='volume'),
+        EMA('EMA5', 5),
+        EMA('EMA10', 10),
+        EMA('EMA20', 20),
+        EMA('EMA50', 50),
+        EMA('EMA200', 200),
+        RSI('RSI', 14),
+        MACD(),
+        BollingerBands(),
+    ]
+
+
+class IndicatorEngine:
+    """
+    여러 지표를 한번에 증분 계산합니다.
+
+    - append: 새로운 캔들 추가
+    - revise: 마지막(진행 중인) 캔들 값 변경
+    - update: 캔들 시각을 보고 append/revise를 자동으로 선택
+    - 지표별로 최근 {history}개의 값을 보관합니다. (ex. get('EMA5', -2)로 이전 캔들의 값 확인)
+    """
+
+    def __init__(self, indicators: Optional[list] = None, history: int = 3):
+        self.indicators = indicators if indicators is not None else create_default_indicators()
+        self.history = {name: deque(maxlen=history) for ind in self.indicators for name in ind.names}
+        self.last_time = None
+        self.count = 0
+
+    def append(self, candle: dict) -> dict:
+        result = {}
+        for indicator in self.indicators:
+            result.update(zip(indicator.names, indicator.update(candle)))
+
+        for name, value in result.items():
+            self.history[name].append(value)
+
+        self.last_time = candle.get('time')
+        self.count += 1
+
+        return result
+
+    def revise(self, candle: dict) -> dict:
+        if self.count == 0:
+            return self.append(candle)
+
+        result = {}
+        for indicator in self.indicators:
+            result.update(zip(indicator.names, indicator.revise(candle)))
+
+        for name, value in result.items():
+            self.history[name][-1] = value
+
+        return result
+
+    def update(self, candle: dict) -> dict:
+        if self.count > 0 and candle.get('time') is not None and candle.get('time') == self.last_time:
+            return self.revise(candle)
+
+        return self.append(candle)
+
+    def get(self, name: str, offset: int = -1) -> float:
+        return self.history[name][offset]
+
+    def latest(self) -> dict:
+        return {name: values[-1] for name, values in self.history.items() if len(values) > 0}
+
+
+class IndicatorStream:
+    """
+    캔들 배열이 갱신될 때마다 새로 추가된 캔들만 IndicatorEngine에 넣어서 지표 배열을 유지합니다. (실시간 매매)
+
+    - 처음에는 입력 캔들 전체를 넣으므로 그 캔들 구간의 지표는 일괄 계산과 같습니다.
+    - 이후에는 마지막(진행 중이던) 캔들은 revise, 새로운 캔들은 append 합니다.
+    - 캔들 구간이 밀려도(오래된 캔들 제거) 처음부터 이어서 계산하기 때문에 지수 이동평균(EMA, RSI, MACD)은
+      잘라낸 구간만 새로 계산한 값과 조금 다를 수 있습니다. (전체 기간을 한번에 계산하는 백테스트 값에 가까움)
+    - 이미 넣은 캔들 값이 바뀌었거나(캔들 보정, 재연결 후 보충) 이어지지 않으면 None을 반환합니다. (다시 만들어야 함)
+    """
+
+    def __init__(self, indicators: list, capacity: int = 2000):
+        """
+        Args:
+            indicators (list): 지표 목록 (SMA, EMA, RSI, MACD, BollingerBands, source는 'close' 또는 'volume')
+            capacity (int): 보관할 최근 캔들 개수 (매매전략에 전달하는 캔들 개수 이상)
+        """
+        self.engine = IndicatorEngine(indicators, history=1)
+        self.names = tuple(self.engine.history)
+        self.capacity = capacity
+
+        # 넣은 캔들(time, close, volume)과 지표 값 (앞에서부터 {_len}개 사용)
+        self._columns = {name: np.empty(capacity * 2) for name in ('close', 'volume') + self.names}
+        self._columns['time'] = np.empty(capacity * 2, dtype=np.int64)
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def update(self, times: np.ndarray, close: np.ndarray, volume: np.ndarray) -> Optional[int]:
+        """
+        캔들 배열 반영 (새로 추가된 캔들만 계산)
+
+        Args:
+            times (np.ndarray): 캔들 시각 (int64, 시간순)
+            close (np.ndarray): 종가
+            volume (np.ndarray): 거래량
+
+        Returns:
+            int: 입력 캔들의 첫 번째 위치 (get(name, start, len(times))로 지표 배열 확인), 이어지지 않으면 None
+        """
+        n, m = len(times), self._len
+        if m == 0:
+            return self._append(times, close, volume, 0)
+
+        stored_times = self._columns['time'][:m]
+        lo = int(np.searchsorted(stored_times, times[0], side='left'))
+        if lo >= m or stored_times[lo] != times[0]:
+            return None
+
+        # 입력이 마지막으로 넣은 캔들 전에 끝나면 모두 같은 값이어야 함
+        stored_cnt = m - lo
+        if n < stored_cnt:
+            return lo if self._equals(lo, n, times, close, volume) else None
+
+        # 마지막 캔들 이전은 이미 넣은 캔들과 같아야 하고, 마지막 캔들은 진행 중이던 캔들이므로 revise
+        if not self._equals(lo, stored_cnt - 1, times, close, volume) or times[stored_cnt - 1] != stored_times[-1]:
+            return None
+
+        self._revise(m - 1, close[stored_cnt - 1], volume[stored_cnt - 1])
+        if n > stored_cnt:
+            return self._append(times, close, volume, stored_cnt)
+
+        return lo
+
+    def get(self, name, start: int, length: int) -> np.ndarray:
+        return self._columns[name][start:start + length]
+
+    def _equals(self, lo: int, cnt: int, times: np.ndarray, close: np.ndarray, volume: np.ndarray) -> bool:
+        columns = self._columns
+        return (np.array_equal(columns['time'][lo:lo + cnt], times[:cnt])
+                and np.array_equal(columns['close'][lo:lo + cnt], close[:cnt], equal_nan=True)
+                and np.array_equal(columns['volume'][lo:lo + cnt], volume[:cnt], equal_nan=True))
+
+    def _revise(self, index: int, close: float, volume: float):
+        result = self.engine.revise({'close': close, 'volume': volume})
+        self._columns['close'][index] = close
+        self._columns['volume'][index] = volume
+        for name, value in result.items():
+            self._columns[name][index] = value
+
+    # times[start:] 추가 후 입력 캔들 첫 번째 위치 반환 (times[:start]는 이미 넣은 캔들)
+    # 공간이 부족하면 최근 {capacity}개(입력 캔들은 모두)만 남기고 새 배열로 옮긴다. (이전에 반환한 배열은 바뀌지 않음)
+    def _append(self, times: np.ndarray, close: np.ndarray, volume: np.ndarray, start: int) -> int:
+        new_cnt = len(times) - start
+        if self._len + new_cnt > len(self._columns['time']):
+            keep = max(min(self._len, self.capacity), start)
+            size = max(self.capacity, keep + new_cnt) * 2
+            for name, values in self._columns.items():
+                moved = np.empty(size, dtype=values.dtype)
+                moved[:keep] = values[self._len - keep:self._len]
+                self._columns[name] = moved
+            self._len = keep
+
+        columns = self._columns
+        for i in range(start, len(times)):
+            index = self._len
+            result = self.engine.append({'time': int(times[i]), 'close': close[i], 'volume': volume[i]})
+            columns['time'][index] = times[i]
+            columns['close'][index] = close[i]
+            columns['volume'][index] = volume[i]
+            for name, value in result.items():
+                columns[name][index] = value
+            self._len += 1
+
+        return self._len - len(times)
+
+
+# ============================== 일괄(batch) 계산 ==============================
+
+# 매매전략과 동일한 방식(pandas, ta)으로 전체 데이터의 지표 계산
+def compute_batch(df: pd.DataFrame) -> pd.DataFrame:
+    close = df['close']
+    result = pd.DataFrame(index=df.index)
+
+    result['MA20'] = close.rolling(window=20).mean()
+    result['MA200'] = close.rolling(window=200).mean()
+    result['Volume_MA20'] = df['volume'].rolling(window=20).mean()
+
+    for span in (5, 10, 20, 50, 200):
+        result[f'EMA{span}'] = close.ewm(span=span, adjust=False).mean()
+
+    result['RSI'] = RSIIndicator(close, window=14).rsi()
+
+    macd = TaMACD(close)
+    result['MACD'] = macd.macd()
+    result['MACD_signal'] = macd.macd_signal()
+    result['MACD_histogram'] = macd.macd_diff()
+
+    bollinger = TaBollingerBands(close)
+    result['BB_upper'] = bollinger.bollinger_hband()
+    result['BB_mid'] = bollinger.bollinger_mavg()
+    result['BB_lower'] = bollinger.bollinger_lband()
+
+    return result
+
+
+# 증분 계산 결과와 일괄 계산 결과 비교
+def verify_against_batch(df: pd.DataFrame) -> dict:
+    """
+    같은 데이터로 증분 계산(IndicatorEngine)과 일괄 계산(compute_batch)을 하고 결과를 비교합니다.
+
+    Returns:
+        dict: {지표 이름: {'exact': 완전히 같은지 여부, 'max_abs_diff': 최대 오차}}
+    """
+    batch = compute_batch(df)
+    engine = IndicatorEngine(history=len(df))
+
+    for candle in df[['close', 'volume']].to_dict('records'):
+        engine.append(candle)
+
+    result = {}
+    for name in batch.columns:
+        incremental = np.array(engine.history[name], dtype=np.float64)
+        expected = batch[name].to_numpy(dtype=np.float64)
+
+        diff = np.abs(incremental - expected)
+        result[name] = {
+            'exact': bool(np.array_equal(incremental, expected, equal_nan=True)),
+            'max_abs_diff': float(np.nanmax(diff)) if np.any(~np.isnan(diff)) else 0.0
+        }
+
+    return result
@@ -0,0 +1,390 @@
+import os, sys, time, logging, threading, argparse
+import numpy as np
+import pandas as pd
+from typing import Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+# python trading/market_scanner.py 로 실행하는 경우를 위해 프로젝트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading import trading_strategy, trading_strategy2, bollinger_band_breakout
+from trading.indicator_cache import INDICATORS
+from trading.signal_utils import merge_params
+from upbit_data.market import get_krw_markets
+from upbit_data.candle import get_min_candles, CANDLE_PAGE_SIZE
+from upbit_data.candle_frame import CandleFrame
+from upbit_data.websocket_feed import TradeFeed
+from utils.candle_scheduler import CandleCloseScheduler
+
+"""
+# 원화(KRW) 마켓 스캐너
+
+모든 원화 마켓(약 200개)에 대해 캔들 마감마다 매매전략의 매수 조건을 확인하고 매수 후보를 순위대로 반환합니다.
+
+- 마켓별 캔들은 (마켓 x 시간) 2차원 배열로 모으고, 지표는 마켓별 DataFrame이 아닌 2차원 배열 단위로 한번에 계산합니다.
+  (pandas rolling/ewm을 컬럼 방향으로 한번만 호출하므로 매매전략 함수의 지표 값과 같음)
+- 매수 조건은 매매전략 모듈의 buy_conditions(DEFAULT_PARAMS)를 그대로 사용합니다. (마지막 축이 시간인 배열 계산)
+  매매전략의 기준 값을 바꾸면 스캐너에도 같이 반영됩니다.
+- 캔들이 {window}개보다 적은 마켓은 앞쪽을 NaN으로 채우며, 200개 미만인 마켓은 제외합니다. (매매전략과 동일)
+- 캔들 마감 스케줄러(CandleCloseScheduler)에서 마감된 캔들 시각을 전달하면 매매 프로그램과 같이 마감된 캔들 기준으로 맞춥니다.
+  - 마감된 캔들이 없는(마감된 구간에 체결이 없는) 마켓은 제외합니다.
+  - 진행 중인 캔들이 아직 없으면 마감된 캔들의 종가로 거래량이 0인 캔들을 추가합니다. (signal_utils.align_to_closed_candle)
+  - 마감된 캔들 시각이 없으면 진행 중인 캔들이 없는(최근 캔들에 체결이 없는) 마켓은 제외합니다.
+
+## 캔들 데이터
+- WebSocket(기본값): 시작할 때 REST API로 마켓별 {window}개를 한번 가져오고, 이후에는 체결 데이터로 캔들을 만들기 때문에
+  캔들 마감 시점에 API를 호출하지 않습니다. (스캔은 수십 ms 이내)
+  연결이 끊겼다가 다시 연결된 후 끊긴 구간을 채우는 동안에는 REST 방식으로 갱신합니다.
+- REST: 스캔마다 마켓별로 새로 생긴 캔들만 가져옵니다. 요청 수 제한(캔들 그룹 초당 10회)을 지키기 때문에
+  마켓 수 / 10초 정도 걸립니다.
+
+## 실행
+- python -m trading.market_scanner --strategy trading_strategy2 --unit 5
+  ({unit}분봉이 마감되면 바로 스캔, WebSocket 모드는 다음 구간의 첫 체결로 마감 감지)
+"""
+
+logger = logging.getLogger(__name__)
+
+MIN_CANDLE_LEN = 200  # 매매전략 최소 캔들 개수
+
+# 캔들 배열 컬럼
+_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+# (마켓 x 시간) 배열을 (시간 x 마켓) DataFrame으로 바꿔서 컬럼(마켓)별로 계산
+def _sma(values: np.ndarray, window: int) -> np.ndarray:
+    return pd.DataFrame(values.T).rolling(window=window).mean().to_numpy().T
+
+
+def _std(values: np.ndarray, window: int) -> np.ndarray:
+    return pd.DataFrame(values.T).rolling(window=window).std(ddof=0).to_numpy().T
+
+
+def _ema(values: np.ndarray, span: int, min_periods: int = 0) -> np.ndarray:
+    return pd.DataFrame(values.T).ewm(span=span, min_periods=min_periods, adjust=False).mean().to_numpy().T
+
+
+# ta.momentum.RSIIndicator와 같은 계산 (앞쪽 NaN 구간은 계산에서 제외)
+def _rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    close_df = pd.DataFrame(close.T)
+    padding = close_df.isna()
+
+    diff = close_df.diff(1)
+    up_direction = diff.where(diff > 0, 0.0).mask(padding)
+    down_direction = -diff.where(diff < 0, 0.0).mask(padding)
+
+    emaup = up_direction.ewm(alpha=1 / window, min_periods=window, adjust=False).mean().to_numpy()
+    emadn = down_direction.ewm(alpha=1 / window, min_periods=window, adjust=False).mean().to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+
+    return rsi.T
+
+
+# ta.trend.MACD의 macd_diff와 같은 계산
+def _macd_diff(close: np.ndarray, window_slow: int = 26, window_fast: int = 12, window_sign: int = 9) -> np.ndarray:
+    macd = _ema(close, window_fast, window_fast) - _ema(close, window_slow, window_slow)
+    return macd - _ema(macd, window_sign, window_sign)
+
+
+# ta.volatility.BollingerBands와 같은 계산 (상단, 중간, 하단)
+def _bollinger(close: np.ndarray, window: int = 20, window_dev: int = 2) -> tuple:
+    mavg = _sma(close, window)
+    mstd = _std(close, window)
+    return mavg + window_dev * mstd, mavg, mavg - window_dev * mstd
+
+
+def _calc_matrix_indicator(candles: dict, name: str, params: dict) -> np.ndarray:
+    if name == 'sma':
+        return _sma(candles[params['source']], params['window'])
+    if name == 'ema':
+        return _ema(candles[params['source']], params['span'])
+    if name == 'rsi':
+        return _rsi(candles['close'], params['window'])
+    if name == 'macd_diff':
+        return _macd_diff(candles['close'], params['window_slow'], params['window_fast'], params['window_sign'])
+    if name in ('bb_upper', 'bb_mid', 'bb_lower'):
+        bb_upper, bb_mid, bb_lower = _bollinger(candles['close'], params['window'], params['window_dev'])
+        return {'bb_upper': bb_upper, 'bb_mid': bb_mid, 'bb_lower': bb_lower}[name]
+
+    raise ValueError(f'마켓 스캐너에서 지원하지 않는 지표입니다. ({name})')
+
+
+def matrix_indicator(candles: dict) -> Callable:
+    """
+    (마켓 x 시간) 캔들 배열의 지표 배열 함수 (매매전략의 buy_conditions에 전달, 스캔 한번 동안 캐싱)
+
+    지표 이름과 기본 파라미터는 지표 캐시(indicator_cache.INDICATORS)와 같습니다.
+    """
+    cache = {}
+
+    def indicator(name: str, **params) -> np.ndarray:
+        if name not in INDICATORS:
+            raise ValueError(f'지원하지 않는 지표입니다. ({name})')
+
+        params = dict(INDICATORS[name][1], **params)
+        key = (name, tuple(sorted(params.items())))
+        if key not in cache:
+            cache[key] = _calc_matrix_indicator(candles, name, params)
+
+        return cache[key]
+
+    return indicator
+
+
+# 매매전략 이름: 매매전략 모듈 (buy_conditions, DEFAULT_PARAMS)
+SCAN_STRATEGIES = {
+    'trading_strategy': trading_strategy,
+    'trading_strategy2': trading_strategy2,
+    'bollinger_band_breakout': bollinger_band_breakout,
+}
+
+
+def scan_buy_candidates(
+        markets: list,
+        candles: dict,
+        strategy_name: str = 'trading_strategy2',
+        params: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    (마켓 x 시간) 캔들 배열로 매수 조건을 확인하여 매수 후보를 반환
+
+    Args:
+        markets (list): 마켓 목록 (배열의 행 순서)
+        candles (dict): {'time', 'open', 'high', 'low', 'close', 'volume'}: (마켓 x 시간) 배열, 시간순 오른쪽 정렬
+        strategy_name (str): 매매전략 이름 (SCAN_STRATEGIES)
+        params (dict, optional): 매매전략 파라미터
+
+    Returns:
+        pd.DataFrame: 매수 후보 (이전 캔들 거래량 / 20MA 거래량 비율 순)
+    """
+    if strategy_name not in SCAN_STRATEGIES:
+        raise ValueError(f'지원하지 않는 매매전략입니다. ({strategy_name})')
+
+    strategy = SCAN_STRATEGIES[strategy_name]
+    params = merge_params(strategy.DEFAULT_PARAMS, params)
+
+    candle_close = candles['close']
+    candle_volume = candles['volume']
+
+    # 캔들이 200개 이상이고 진행 중인 캔들이 있는 마켓만 확인
+    candle_cnt = (~np.isnan(candle_close)).sum(axis=1)
+    last_time = candles['time'][:, -1]
+    is_active = (candle_cnt >= MIN_CANDLE_LEN) & (last_time == last_time.max())
+
+    # 매매전략의 매수 조건 (마지막 캔들 기준)
+    indicator = matrix_indicator(candles)
+    is_buy = strategy.buy_conditions(candles, indicator, params)['buy_condition'][:, -1] & is_active
+
+    volume_ma20 = indicator('sma', source='volume', window=20)[:, -2]
+    rsi = indicator('rsi', window=14)[:, -1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result_df = pd.DataFrame({
+            'market': np.asarray(markets),
+            'close': candle_close[:, -1],
+            'change_rate': candle_close[:, -1] / candle_close[:, -2] - 1,
+            'volume_ratio': candle_volume[:, -2] / volume_ma20,
+            'rsi': rsi,
+            'trade_price': np.nansum(candle_close * candle_volume, axis=1),  # {window}개 캔들 거래 금액 (근사값)
+        })[is_buy]
+
+    return result_df.sort_values(['volume_ratio', 'trade_price'], ascending=False).reset_index(drop=True)
+
+
+class MarketScanner:
+    """
+    원화 마켓 전체의 캔들을 유지하고 캔들 마감마다 매수 후보를 확인합니다.
+    """
+
+    def __init__(
+            self,
+            strategy_name: str = 'trading_strategy2',
+            unit: int = 5,
+            window: int = 400,
+            markets: Optional[list] = None,
+            use_websocket: bool = True,
+            params: Optional[dict] = None,
+            max_workers: int = 10
+    ):
+        if strategy_name not in SCAN_STRATEGIES:
+            raise ValueError(f'지원하지 않는 매매전략입니다. ({strategy_name})')
+        if window < MIN_CANDLE_LEN:
+            raise ValueError(f'window는 {MIN_CANDLE_LEN} 이상이어야 합니다.')
+
+        self.strategy_name = strategy_name
+        self.unit = unit
+        self.window = window
+        self.markets = list(markets) if markets else None
+        self.use_websocket = use_websocket
+        self.params = params
+        self.max_workers = max_workers
+
+        self.feed = None
+        self.last_scan_sec = None  # 마지막 스캔 소요 시간
+
+        # REST 모드의 마켓별 캔들 배열 {market: {'time', 'open', ...}}
+        self._candles = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.markets is None:
+            self.markets = get_krw_markets()
+
+        # 마켓별 초기 캔들 (요청 수 제한은 공용 클라이언트에서 처리)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            seeds = list(executor.map(lambda m: self._fetch(m, self.window), self.markets))
+
+        # 캔들을 가져오지 못한 마켓(신규 상장 등)은 제외
+        self.markets = [market for market, candles in zip(self.markets, seeds) if candles is not None]
+        seeds = [candles for candles in seeds if candles is not None]
+
+        for market, candles in zip(self.markets, seeds):
+            self._candles[market] = self._to_arrays(candles)
+
+        if self.use_websocket:
+            self.feed = TradeFeed(self.markets, units=(self.unit,), max_len=self.window)
+            for market, candles in zip(self.markets, seeds):
+                self.feed.aggregators[market].seed(self.unit, candles)
+            self.feed.start()
+
+        logger.info(f'마켓 스캐너 시작 : {len(self.markets)}개 마켓, {self.unit}분봉, '
+                    f'{"WebSocket" if self.use_websocket else "REST"}')
+
+    def stop(self):
+        if self.feed is not None:
+            self.feed.stop()
+
+    def _fetch(self, market: str, count: int) -> Optional[CandleFrame]:
+        try:
+            return get_min_candles(market, self.unit, count=count)
+        except Exception as e:
+            logger.error(f'[{market}] 캔들 조회 실패 : {e}')
+            return None
+
+    @staticmethod
+    def _to_arrays(candles: CandleFrame) -> dict:
+        return {column: candles[column] for column in ('time',) + _COLUMNS}
+
+    # REST 모드: 마켓별로 새로 생긴 캔들만 가져와서 합치기
+    def _refresh_market(self, market: str):
+        arrays = self._candles[market]
+        now_sec = int(time.time())
+        missing_cnt = (now_sec - int(arrays['time'][-1])) // (self.unit * 60) + 2
+
+        candles = self._fetch(market, min(missing_cnt, CANDLE_PAGE_SIZE))
+        if candles is None:
+            return
+
+        new_arrays = self._to_arrays(candles)
+
+        # 같은 시각의 캔들은 새로 가져온 값으로 변경 (진행 중이던 캔들 갱신)
+        keep = arrays['time'] < new_arrays['time'][0]
+        merged = {column: np.concatenate([arrays[column][keep], new_arrays[column]])[-self.window:]
+                  for column in arrays}
+
+        with self._lock:
+            self._candles[market] = merged
+
+    def refresh(self):
+        # 재연결 후 보정이 끝나지 않았으면 REST API로 갱신
+        if self.use_websocket and not self.feed.is_stale():
+            for market in self.markets:
+                arrays = self.feed.aggregators[market].get_candle_arrays(self.unit)
+                if arrays is not None:
+                    self._candles[market] = {column: arrays[column][-self.window:] for column in ('time',) + _COLUMNS}
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(self._refresh_market, self.markets))
+
+    # 마감된 캔들(closed_time)과 진행 중인 캔들까지 자르기 (signal_utils.align_to_closed_candle과 동일, 마감된 캔들이 없으면 None)
+    def _align_arrays(self, arrays: dict, closed_time: int) -> Optional[dict]:
+        times = arrays['time']
+        closed_idx = int(np.searchsorted(times, closed_time, side='left'))
+        if closed_idx >= len(times) or times[closed_idx] != closed_time:
+            return None
+
+        live_time = closed_time + self.unit * 60
+        if closed_idx + 1 < len(times) and times[closed_idx + 1] == live_time:
+            return {column: values[:closed_idx + 2] for column, values in arrays.items()}
+
+        # 진행 중인 캔들이 아직 없으면 체결이 없는 캔들로 추가
+        closed_price = arrays['close'][closed_idx]
+        live = {'time': live_time, 'open': closed_price, 'high': closed_price, 'low': closed_price,
+                'close': closed_price, 'volume': 0.0}
+
+        return {column: np.append(values[:closed_idx + 1], live[column]) for column, values in arrays.items()}
+
+    def get_candle_matrix(self, closed_time: Optional[int] = None) -> dict:
+        """
+        마켓별 캔들을 (마켓 x 시간) 배열로 합치기 (오른쪽 정렬, 부족한 앞쪽은 NaN)
+
+        Args:
+            closed_time (int, optional): 마감된 캔들의 시작 시각 (UTC epoch seconds, 마감된 캔들이 없는 마켓은 빈 행)
+        """
+        m, w = len(self.markets), self.window
+        matrix = {'time': np.full((m, w), -1, dtype=np.int64)}
+        for column in _COLUMNS:
+            matrix[column] = np.full((m, w), np.nan)
+
+        with self._lock:
+            for i, market in enumerate(self.markets):
+                arrays = self._candles[market]
+                if closed_time is not None:
+                    arrays = self._align_arrays(arrays, closed_time)
+                    if arrays is None:
+                        continue
+
+                length = min(len(arrays['time']), w)
+                for column in matrix:
+                    matrix[column][i, w - length:] = arrays[column][-length:]
+
+        return matrix
+
+    def scan(self, closed_time: Optional[int] = None) -> pd.DataFrame:
+        """
+        매수 후보 확인
+
+        Args:
+            closed_time (int, optional): 마감된 캔들의 시작 시각 (UTC epoch seconds, 캔들 마감 스케줄러에서 전달)
+        """
+        start = time.perf_counter()
+
+        self.refresh()
+        candles = self.get_candle_matrix(closed_time)
+        candidates = scan_buy_candidates(self.markets, candles, self.strategy_name, self.params)
+
+        self.last_scan_sec = time.perf_counter() - start
+        logger.info(f'마켓 스캔 완료 : 후보 {len(candidates)}개, {self.last_scan_sec:.3f}초')
+
+        return candidates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='원화 마켓 매수 후보 스캐너')
+    parser.add_argument('--strategy', default='trading_strategy2', choices=list(SCAN_STRATEGIES.keys()))
+    parser.add_argument('--unit', type=int, default=5)
+    parser.add_argument('--window', type=int, default=400)
+    parser.add_argument('--rest', action='store_true', help='WebSocket 대신 REST API로 캔들 갱신')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    scanner = MarketScanner(args.strategy, args.unit, args.window, use_websocket=not args.rest)
+    scanner.start()
+
+    def print_candidates(closed_time: int):
+        print(scanner.scan(closed_time).head(20).to_string())
+
+    # {unit}분봉 마감 직후 (WebSocket 모드는 다음 구간의 첫 체결로 마감 감지)
+    scheduler = CandleCloseScheduler(unit=args.unit, feed=scanner.feed)
+    scheduler.add_job(print_candidates)
+    scheduler.start()
+
+    try:
+        while True:
+            time.sleep(2)
+    except (KeyboardInterrupt, SystemExit):
+        scheduler.shutdown()
+        scanner.stop()
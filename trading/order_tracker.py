@@ -0,0 +1,177 @@
+import time, logging, threading
+from typing import Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, Future
+from trading.trade import buy_market, sell_market, get_order
+from utils.metrics import get_metrics
+
+"""
+# 주문 체결 확인 (Order Tracker)
+
+주문 후 체결 대기 주문 목록을 5초마다 조회하는 대신, 주문 UUID로 개별 주문을 조회하여 체결 완료를 확인합니다.
+
+- 조회 간격은 짧게 시작해서 점점 늘립니다. (0.1초 -> 0.2초 -> 0.4초 ... 최대 2초)
+  시장가 주문은 대부분 첫 조회에서 체결이 확인되기 때문에 API 호출이 1~2회로 끝납니다.
+- 주문 상태가 done(전체 체결) 또는 cancel(취소, 시장가 매수의 잔여 금액 포함)이면 완료로 판단합니다.
+- 조회는 별도 스레드에서 하고 concurrent.futures.Future를 반환합니다.
+  기다려야 하면 future.result(), 기다리지 않으려면 future.add_done_callback()을 사용합니다.
+- {timeout}초가 지나도 완료되지 않으면 마지막으로 조회한 상태로 체결 결과를 반환합니다. (timed_out: True)
+- add_listener로 체결 결과마다 호출될 함수를 등록할 수 있습니다. (Future 완료 전에 호출, ex. 계좌 캐시 반영)
+
+## 체결 결과 (fill report)
+- uuid, market, side, ord_type, state
+- executed_volume: 체결 수량
+- executed_funds: 체결 금액
+- avg_price: 평균 체결 가격 (체결 금액 / 체결 수량)
+- paid_fee: 수수료
+- trades_count: 체결 수
+- elapsed_sec: 주문 조회 시작부터 완료까지 걸린 시간
+- timed_out: 제한 시간 초과 여부
+"""
+
+logger = logging.getLogger(__name__)
+
+ORDER_FINAL_STATES = ('done', 'cancel')
+
+ORDER_POLL_INITIAL_SEC = 0.1  # 첫 조회 대기 시간
+ORDER_POLL_MAX_SEC = 2.0  # 최대 조회 간격
+ORDER_TIMEOUT_SEC = 30.0  # 체결 확인 제한 시간
+
+
+# 개별 주문 조회 결과로 체결 결과 생성
+def make_fill_report(order: dict, elapsed_sec: float = 0.0, timed_out: bool = False) -> dict:
+    trades = order.get('trades') or []
+    executed_volume = float(order.get('executed_volume') or 0)
+
+    if trades:
+        executed_funds = sum(float(trade['funds']) for trade in trades)
+    else:
+        executed_funds = float(order.get('executed_funds') or 0)
+
+    return {
+        'uuid': order.get('uuid'),
+        'market': order.get('market'),
+        'side': order.get('side'),
+        'ord_type': order.get('ord_type'),
+        'state': order.get('state'),
+        'executed_volume': executed_volume,
+        'executed_funds': executed_funds,
+        'avg_price': executed_funds / executed_volume if executed_volume > 0 else 0.0,
+        'paid_fee': float(order.get('paid_fee') or 0),
+        'trades_count': int(order.get('trades_count') or len(trades)),
+        'elapsed_sec': elapsed_sec,
+        'timed_out': timed_out,
+    }
+
+
+class OrderTracker:
+    def __init__(
+            self,
+            get_order_func: Callable[[str], dict] = get_order,
+            initial_sec: float = ORDER_POLL_INITIAL_SEC,
+            max_sec: float = ORDER_POLL_MAX_SEC,
+            timeout: float = ORDER_TIMEOUT_SEC,
+            max_workers: int = 4
+    ):
+        self.get_order_func = get_order_func
+        self.initial_sec = initial_sec
+        self.max_sec = max_sec
+        self.timeout = timeout
+
+        self._listeners = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='order-tracker')
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        self._listeners.append(callback)
+
+    def track(self, order_uuid: str, timeout: Optional[float] = None) -> Future:
+        """
+        주문 체결 확인 (조회는 별도 스레드에서 진행)
+
+        Args:
+            order_uuid (str): 주문 UUID
+            timeout (float, optional): 제한 시간 (초), 없으면 기본값
+
+        Returns:
+            Future: 체결 결과(dict)
+        """
+        if not order_uuid:
+            raise ValueError(f'[uuid] 파라미터는 필수입니다.')
+
+        return self._executor.submit(self._track, order_uuid, self.timeout if timeout is None else timeout)
+
+    def _track(self, order_uuid: str, timeout: float) -> dict:
+        fill = self._wait_fill(order_uuid, timeout)
+
+        get_metrics().observe('order_fill_seconds', fill['elapsed_sec'], side=fill['side'])
+        if fill['timed_out']:
+            get_metrics().inc('order_fill_timeouts_total', side=fill['side'])
+
+        for callback in self._listeners:
+            try:
+                callback(fill)
+            except Exception as e:
+                logger.error(f'[{order_uuid}] 체결 listener 오류 : {e}')
+
+        return fill
+
+    def _wait_fill(self, order_uuid: str, timeout: float) -> dict:
+        start = time.monotonic()
+        delay = self.initial_sec
+        order = None
+
+        while True:
+            time.sleep(delay)
+
+            try:
+                order = self.get_order_func(order_uuid)
+            except Exception as e:
+                # 조회 실패(네트워크 오류 등)는 제한 시간 안에서 다시 조회
+                logger.error(f'[{order_uuid}] 주문 조회 오류 : {e}')
+
+            elapsed = time.monotonic() - start
+            if order is not None and order.get('state') in ORDER_FINAL_STATES:
+                return make_fill_report(order, elapsed)
+
+            if elapsed >= timeout:
+                logger.error(f'[{order_uuid}] {timeout}초 동안 체결이 완료되지 않았습니다.')
+                return make_fill_report(order or {'uuid': order_uuid}, elapsed, timed_out=True)
+
+            # 제한 시간을 넘지 않도록 마지막 대기 시간은 남은 시간으로 조정
+            delay = min(delay * 2, self.max_sec, timeout - elapsed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+# 공용 주문 체결 확인
+_order_tracker = None
+_order_tracker_lock = threading.Lock()
+
+
+def get_order_tracker() -> OrderTracker:
+    global _order_tracker
+
+    if _order_tracker is None:
+        with _order_tracker_lock:
+            if _order_tracker is None:
+                _order_tracker = OrderTracker()
+
+    return _order_tracker
+
+
+# 주문 응답(DataFrame)의 uuid로 체결 확인 시작
+def _track_order_result(order_result) -> Future:
+    if 'uuid' not in order_result.columns or not order_result['uuid'].notnull()[0]:
+        raise ValueError(f'주문이 정상적으로 처리되지 않았습니다. ({order_result.to_dict("records")})')
+
+    return get_order_tracker().track(order_result['uuid'][0])
+
+
+# 시장가 매수 후 체결 결과 Future 반환 (기다리지 않음)
+def buy_market_async(market: str, price: int) -> Future:
+    return _track_order_result(buy_market(market, price))
+
+
+# 시장가 매도 후 체결 결과 Future 반환 (기다리지 않음)
+def sell_market_async(market: str, volume: str) -> Future:
+    return _track_order_result(sell_market(market, volume))
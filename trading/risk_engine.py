@@ -0,0 +1,202 @@
+import time, logging, threading
+from typing import Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from trading.trade import sell_market
+
+"""
+# 실시간 손절/익절 (리스크 엔진)
+
+매매전략의 손절 조건(매수가 * stop_loss_rate)은 5분봉 마감 때만 확인하기 때문에 급락하면 손절 가격보다 훨씬 아래에서 매도됩니다.
+리스크 엔진은 체결(trade) WebSocket의 체결마다 보유 중인 마켓의 가격을 확인하고, 기준 가격을 넘으면 바로 시장가 매도합니다.
+
+- 손절(stop loss): 체결 가격 <= 매수가 * stop_loss_rate
+- 추적 손절(trailing stop): 체결 가격 <= 감시 시작 이후 최고가 * trailing_rate
+- 익절(take profit): 체결 가격 >= 매수가 * take_profit_rate
+- 조건 확인은 WebSocket 스레드에서 바로 하고, 매도 주문은 별도 스레드에서 실행합니다. (수신 처리가 주문 응답을 기다리지 않음)
+- 같은 포지션은 한번만 매도하며, 매도 후에는 감시 목록에서 제거됩니다.
+- 매도 중(on_exit 완료 전)에는 watch/unwatch가 False를 반환합니다. 매매전략은 unwatch가 True일 때만 매도합니다.
+  as_of(계좌 조회 시각, time.monotonic())를 전달하면 그 이후에 리스크 엔진이 매도한 경우도 False를 반환합니다.
+  (아직 반영되지 않은 계좌 정보로 매도한 포지션을 다시 감시하거나 중복 매도하지 않도록)
+- 매매전략 스케줄러와 별개로 동작하며, TradeFeed의 url을 serve_trade_replay 주소로 지정하면 로컬에서 재생하여 테스트할 수 있습니다.
+"""
+
+logger = logging.getLogger(__name__)
+
+EXIT_STOP_LOSS = 'stop_loss'
+EXIT_TRAILING_STOP = 'trailing_stop'
+EXIT_TAKE_PROFIT = 'take_profit'
+
+
+class RiskEngine:
+    def __init__(
+            self,
+            feed,
+            sell_func: Callable[[str, str], object] = sell_market,
+            on_exit: Optional[Callable[[str, dict], None]] = None
+    ):
+        """
+        Args:
+            feed (TradeFeed): 체결 WebSocket (감시할 마켓을 구독 중이어야 함)
+            sell_func (Callable): 시장가 매도 함수 (market, volume)
+            on_exit (Callable, optional): 매도 후 호출 (market, 매도 정보)
+        """
+        self.feed = feed
+        self.sell_func = sell_func
+        self.on_exit = on_exit
+
+        # 감시 중인 포지션 {market: {'volume', 'buy_price', 'stop_price', 'trailing_rate', 'take_profit_price', 'high'}}
+        self._positions = {}
+        self._exiting = set()  # 매도 중인 마켓 (on_exit 완료 전)
+        self._exited_at = {}  # 마켓별 마지막 매도 시각 (time.monotonic())
+        self._lock = threading.Lock()
+
+        # 매도 주문 스레드 (미리 한개 생성)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='risk-exit')
+
+        feed.add_listener(self._on_trade)
+
+    def watch(
+            self,
+            market: str,
+            volume: str,
+            buy_price: float,
+            stop_loss_rate: Optional[float] = None,
+            trailing_rate: Optional[float] = None,
+            take_profit_rate: Optional[float] = None,
+            as_of: Optional[float] = None
+    ) -> bool:
+        """
+        보유 포지션 감시 시작 (이미 감시 중이면 수량/기준만 변경하고 최고가는 유지)
+
+        Args:
+            market (str): 마켓 ID
+            volume (str): 보유 수량 (매도 주문 수량)
+            buy_price (float): 매수 평균가
+            stop_loss_rate (float, optional): 손절 비율 (ex. 0.9931)
+            trailing_rate (float, optional): 추적 손절 비율 (ex. 0.99 - 최고가 대비 1% 하락 시 매도)
+            take_profit_rate (float, optional): 익절 비율 (ex. 1.02)
+            as_of (float, optional): 계좌 조회 시각 (time.monotonic(), 이후에 매도했으면 감시하지 않음)
+
+        Returns:
+            bool: 감시 여부 (매도 중이거나 as_of 이후에 매도했으면 False)
+        """
+        if market not in self.feed.aggregators:
+            raise ValueError(f'구독 중이 아닌 마켓입니다. ({market})')
+        if not volume or float(volume) <= 0 or buy_price <= 0:
+            raise ValueError('[volume, buy_price] 값이 올바르지 않습니다.')
+
+        with self._lock:
+            if self._is_exited(market, as_of):
+                logger.info(f'[{market}] 리스크 엔진이 매도한 포지션이므로 감시하지 않습니다.')
+                return False
+
+            prev = self._positions.get(market)
+            self._positions[market] = {
+                'volume': volume,
+                'buy_price': buy_price,
+                'stop_price': buy_price * stop_loss_rate if stop_loss_rate else None,
+                'trailing_rate': trailing_rate,
+                'take_profit_price': buy_price * take_profit_rate if take_profit_rate else None,
+                'high': prev['high'] if prev else buy_price,
+            }
+
+            position = dict(self._positions[market])
+
+        logger.info(f'[{market}] 리스크 감시 시작 : {position}')
+        return True
+
+    def unwatch(self, market: str, as_of: Optional[float] = None) -> bool:
+        """
+        감시 해제 (매매전략에서 매도하기 전에 호출)
+
+        Args:
+            market (str): 마켓 ID
+            as_of (float, optional): 계좌 조회 시각 (time.monotonic())
+
+        Returns:
+            bool: 포지션을 넘겨받았는지 여부 (리스크 엔진이 매도 중이거나 as_of 이후에 매도했으면 False)
+        """
+        with self._lock:
+            if self._is_exited(market, as_of):
+                return False
+
+            self._positions.pop(market, None)
+            return True
+
+    # 매도 중이거나 as_of 이후에 매도했는지 확인 (lock 안에서 호출)
+    def _is_exited(self, market: str, as_of: Optional[float]) -> bool:
+        if market in self._exiting:
+            return True
+
+        exited_at = self._exited_at.get(market)
+        return as_of is not None and exited_at is not None and exited_at >= as_of
+
+    def is_watching(self, market: str) -> bool:
+        with self._lock:
+            return market in self._positions
+
+    def get_position(self, market: str) -> Optional[dict]:
+        with self._lock:
+            position = self._positions.get(market)
+            return dict(position) if position else None
+
+    def shutdown(self):
+        with self._lock:
+            self._positions.clear()
+        self._executor.shutdown(wait=True)
+
+    def _on_trade(self, market: str, trade: dict):
+        price = float(trade['trade_price'])
+
+        with self._lock:
+            position = self._positions.get(market)
+            if position is None:
+                return
+
+            position['high'] = max(position['high'], price)
+
+            reason = None
+            if position['stop_price'] is not None and price <= position['stop_price']:
+                reason = EXIT_STOP_LOSS
+            elif position['trailing_rate'] is not None and price <= position['high'] * position['trailing_rate']:
+                reason = EXIT_TRAILING_STOP
+            elif position['take_profit_price'] is not None and price >= position['take_profit_price']:
+                reason = EXIT_TAKE_PROFIT
+
+            if reason is None:
+                return
+
+            # 한번만 매도하도록 감시 목록에서 먼저 제거
+            del self._positions[market]
+            self._exiting.add(market)
+            self._exited_at[market] = time.monotonic()
+
+        self._executor.submit(self._exit, market, position, reason, price, time.perf_counter())
+
+    def _exit(self, market: str, position: dict, reason: str, price: float, triggered_at: float):
+        exit_info = {
+            'reason': reason,
+            'trigger_price': price,
+            'buy_price': position['buy_price'],
+            'high': position['high'],
+            'volume': position['volume'],
+            'result': None,
+            'error': None,
+        }
+
+        try:
+            exit_info['result'] = self.sell_func(market, position['volume'])
+            logger.info(f'[{market}] 리스크 엔진 매도 ({reason}) : 체결 가격 {price}, 매수가 {position["buy_price"]}, '
+                        f'감지 후 주문 완료까지 {(time.perf_counter() - triggered_at) * 1000:.1f}ms')
+        except Exception as e:
+            exit_info['error'] = str(e)
+            logger.error(f'[{market}] 리스크 엔진 매도 실패 ({reason}) : {e}')
+
+        try:
+            if self.on_exit is not None:
+                self.on_exit(market, exit_info)
+        except Exception as e:
+            logger.error(f'[{market}] 리스크 엔진 on_exit 오류 : {e}')
+        finally:
+            with self._lock:
+                self._exiting.discard(market)
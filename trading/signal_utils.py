@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional
+from trading.indicator_cache import get_indicator
+from upbit_data.candle_frame import KST_OFFSET_SEC
+
+"""
+# 매매 신호 공통 함수
+
+매매전략별 generate_signals(전체 구간 벡터 계산)에서 사용하는 함수와
+기존 매매전략 함수를 캔들마다 호출하는 방식(bar-by-bar)으로 신호를 만드는 기준 함수입니다.
+
+## 신호 배열 (np.int8)
+- 1: 매수, -1: 매도, 0: 없음
+
+## 포지션 처리 (main.py와 동일)
+- 포지션이 없으면 매수 조건, 있으면 매도 조건만 확인합니다.
+- 전 금액으로 매수하고 매도 시에도 한번에 전체를 매도합니다.
+- 매수시간(buy_time)은 매수한 캔들의 이전 캔들 시각(매수 캔들 시각 - {unit}분), 매수가격(buy_price)은 매수한 캔들의 종가입니다.
+
+## 캔들 마감 시점의 매매전략 입력 (align_to_closed_candle)
+- 매매전략은 마지막 행을 현재(진행 중인) 캔들, 그 이전 행을 마감된 캔들로 판단합니다. (iloc[-1], iloc[-2])
+- 캔들 마감 직후에는 진행 중인 캔들이 아직 없을 수 있으므로(다음 구간의 첫 체결 전) 마감된 캔들 기준으로 행을 맞춥니다.
+  - 마감된 캔들 이후의 캔들은 제외합니다.
+  - 진행 중인 캔들이 없으면 마감된 캔들의 종가로 시가/고가/저가/종가를 채우고 거래량이 0인 캔들을 추가합니다.
+  - 마감된 캔들이 없으면(조회한 데이터에 아직 반영되지 않음) ValueError가 발생합니다.
+"""
+
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+
+
+# 매매전략 파라미터 (기본값 + 변경할 값)
+def merge_params(default_params: dict, params: Optional[dict] = None) -> dict:
+    if not params:
+        return default_params
+
+    unknown = [key for key in params if key not in default_params]
+    if unknown:
+        raise ValueError(f'지원하지 않는 파라미터입니다. ({unknown})')
+
+    return dict(default_params, **params)
+
+
+# {k}개 이전 값 (앞쪽은 fill_value로 채움, 마지막 축이 시간이므로 (마켓 x 시간) 배열도 사용 가능)
+def shift(values: np.ndarray, k: int, fill_value=np.nan) -> np.ndarray:
+    result = np.empty_like(values)
+    result[..., :k] = fill_value
+    result[..., k:] = values[..., :values.shape[-1] - k]
+    return result
+
+
+# 최근 {window}개 중에서 한번이라도 True인지 확인 (현재 위치 포함, 마지막 축이 시간)
+def rolling_any(mask: np.ndarray, window: int) -> np.ndarray:
+    n = mask.shape[-1]
+    cnt = np.concatenate((np.zeros(mask.shape[:-1] + (1,), dtype=np.int64), np.cumsum(mask, axis=-1, dtype=np.int64)),
+                         axis=-1)
+    lo = np.maximum(np.arange(n) + 1 - window, 0)
+    return cnt[..., 1:] - cnt[..., lo] > 0
+
+
+# DataFrame의 지표 배열 함수 (매매전략의 buy_conditions에 전달, 지표 캐시 사용)
+def frame_indicator(df: pd.DataFrame) -> Callable:
+    return lambda name, **params: get_indicator(df, name, **params).to_numpy()
+
+
+# DataFrame의 캔들 배열 (매매전략의 buy_conditions에 전달)
+def frame_candles(df: pd.DataFrame) -> dict:
+    return {column: df[column].to_numpy(dtype=float) for column in ('open', 'close', 'volume')}
+
+
+# 캔들 시각 컬럼 확인 ('datetime' 또는 'date', 'time')
+def has_candle_datetime(df: pd.DataFrame) -> bool:
+    return 'datetime' in df.columns or ('date' in df.columns and 'time' in df.columns)
+
+
+# 캔들 시각 (KST, epoch nanoseconds)
+def candle_datetime_ns(df: pd.DataFrame) -> np.ndarray:
+    return get_indicator(df, 'datetime').to_numpy().astype(np.int64)
+
+
+def align_to_closed_candle(df: pd.DataFrame, closed_time: int, unit: int, include_live: bool = True) -> pd.DataFrame:
+    """
+    마감된 캔들(closed_time) 기준으로 매매전략 입력 맞추기
+
+    Args:
+        df (pd.DataFrame): 캔들 데이터 (시간순)
+        closed_time (int): 마감된 캔들의 시작 시각 (UTC epoch seconds, 캔들 마감 스케줄러에서 전달)
+        unit (int): 분 단위
+        include_live (bool): 진행 중인 캔들 포함 여부 (False이면 마감된 캔들이 마지막 행)
+
+    Returns:
+        pd.DataFrame: 마감된 캔들(include_live이면 진행 중인 캔들)까지의 캔들 데이터
+    """
+    datetime_ns = candle_datetime_ns(df)
+    closed_ns = (closed_time + KST_OFFSET_SEC) * 10 ** 9
+    unit_ns = unit * 60 * 10 ** 9
+
+    closed_idx = int(np.searchsorted(datetime_ns, closed_ns, side='left'))
+    if closed_idx >= len(df) or datetime_ns[closed_idx] != closed_ns:
+        raise ValueError(f'마감된 캔들이 없습니다. ({pd.Timestamp(closed_ns)})')
+
+    if not include_live:
+        return df.iloc[:closed_idx + 1]
+
+    if closed_idx + 1 < len(df) and datetime_ns[closed_idx + 1] == closed_ns + unit_ns:
+        return df.iloc[:closed_idx + 2]
+
+    # 진행 중인 캔들이 아직 없으면 체결이 없는 캔들로 추가
+    live = df.iloc[[closed_idx]].copy()
+    closed_price = live['close'].iloc[0]
+    for column in ('open', 'high', 'low', 'close'):
+        if column in live.columns:
+            live[column] = closed_price
+    for column in ('volume', 'candle_acc_trade_price'):
+        if column in live.columns:
+            live[column] = 0
+
+    live_datetime = pd.Timestamp(closed_ns + unit_ns)
+    if 'datetime' in live.columns:
+        live['datetime'] = live_datetime
+    if 'date' in live.columns and 'time' in live.columns:
+        live['date'] = live_datetime.strftime('%Y-%m-%d')
+        live['time'] = live_datetime.strftime('%H:%M:%S')
+    if 'candle_date_time_kst' in live.columns:
+        live['candle_date_time_kst'] = live_datetime.strftime('%Y-%m-%dT%H:%M:%S')
+    if 'candle_date_time_utc' in live.columns:
+        live['candle_date_time_utc'] = pd.Timestamp(closed_ns + unit_ns - KST_OFFSET_SEC * 10 ** 9).strftime('%Y-%m-%dT%H:%M:%S')
+
+    return pd.concat([df.iloc[:closed_idx + 1], live], ignore_index=True)
+
+
+# 매수시간 문자열 (매수 캔들 시각 - {unit}분)
+def buy_time_str(datetime_ns: int, unit: int) -> str:
+    return pd.Timestamp(datetime_ns - unit * 60 * 10 ** 9).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate_signals_bar_by_bar(
+        strategy_func: Callable,
+        df: pd.DataFrame,
+        unit: int = 5,
+        use_buy_info: bool = True
+) -> np.ndarray:
+    """
+    매매전략 함수를 캔들마다 호출하여 신호를 만듭니다. (벡터 계산 결과 검증용, O(n²))
+
+    Args:
+        strategy_func (Callable): trading_strategy(df, position, [buy_time, buy_price])
+        df (pd.DataFrame): 캔들 데이터
+        unit (int): 분 단위
+        use_buy_info (bool): 매도 판단 시 buy_time, buy_price 전달 여부
+
+    Returns:
+        np.ndarray: 캔들별 신호
+    """
+    signals = np.zeros(len(df), dtype=np.int8)
+    datetime_ns = candle_datetime_ns(df)
+
+    position = 0
+    buy_time = None
+    buy_price = None
+
+    for t in range(len(df)):
+        df_until_t = df.iloc[:t + 1]
+
+        if position == 0:
+            if strategy_func(df_until_t, 0)['signal'] == 'buy':
+                signals[t] = SIGNAL_BUY
+                position = 1
+                buy_time = buy_time_str(int(datetime_ns[t]), unit)
+                buy_price = float(df['close'].iloc[t])
+        else:
+            if use_buy_info:
+                result = strategy_func(df_until_t, 1, buy_time, buy_price)
+            else:
+                result = strategy_func(df_until_t, 1)
+
+            if result['signal'] == 'sell':
+                signals[t] = SIGNAL_SELL
+                position = 0
+                buy_time = None
+                buy_price = None
+
+    return signals
+
+
+# 벡터 계산 결과와 bar-by-bar 결과 비교
+def verify_signals(generate_func: Callable, strategy_func: Callable, df: pd.DataFrame, unit: int = 5,
+                   use_buy_info: bool = True) -> dict:
+    vectorized = generate_func(df, unit=unit)
+    bar_by_bar = generate_signals_bar_by_bar(strategy_func, df, unit=unit, use_buy_info=use_buy_info)
+    mismatch = np.flatnonzero(vectorized != bar_by_bar)
+
+    return {
+        'match': len(mismatch) == 0,
+        'mismatch_index': mismatch.tolist(),
+        'buy_cnt': int((bar_by_bar == SIGNAL_BUY).sum()),
+        'sell_cnt': int((bar_by_bar == SIGNAL_SELL).sum()),
+    }
@@ -1,14 +1,11 @@
-import requests, jwt, uuid, hashlib, os
 import pandas as pd
-from urllib.parse import urlencode, unquote
-from dotenv import load_dotenv
+from account.account_cache import get_account_cache
+from utils.upbit_client import get_upbit_client
 
-load_dotenv()
-
-# Authorization
-# Key: access_key, secret_key
-access_key = os.getenv('ACCESS_KEY', '')
-secret_key = os.getenv('SECRET_KEY', '')
+# 주문 API 경로
+order_path = '/v1/orders'
+open_order_path = '/v1/orders/open'
+single_order_path = '/v1/order'
 
 """
 # 주문하기
@@ -51,33 +48,15 @@ def buy_market(market: str, price: int) -> pd.DataFrame:
     if not market or not price:
         raise ValueError(f'[market, price] 파라미터는 필수입니다.')
 
-    buy_market_url = 'https://api.upbit.com/v1/orders'
     buy_market_params = {
         "market": market,
         "side": "bid",
         "ord_type": "price",  # 시장가 주문
         "price": price,
     }
-    bm_query_string = unquote(urlencode(buy_market_params, doseq=True)).encode("utf-8")
-    bm_hash = hashlib.sha512()
-    bm_hash.update(bm_query_string)
-    bm_query_hash = bm_hash.hexdigest()
-
-    bm_payload = {
-        "access_key": access_key,
-        "nonce": str(uuid.uuid4()),
-        "query_hash": bm_query_hash,
-        "query_hash_alg": "SHA512"
-    }
-
-    bm_jwt_token = jwt.encode(bm_payload, secret_key)
-    bm_authorization = 'Bearer {}'.format(bm_jwt_token)
-    bm_headers = {
-        "Authorization": bm_authorization
-    }
 
-    buy_market_order_data = pd.DataFrame.from_dict(
-        requests.post(buy_market_url, json=buy_market_params, headers=bm_headers).json(), orient='index').T
+    # 인증(JWT, query_hash)은 공용 클라이언트에서 처리
+    buy_market_order_data = _post_order(buy_market_params)
 
     return buy_market_order_data
 
@@ -86,37 +65,34 @@ def sell_market(market: str, volume: str) -> pd.DataFrame:
     if not market or not volume:
         raise ValueError(f'[market, volume] 파라미터는 필수입니다.')
 
-    sell_market_url = 'https://api.upbit.com/v1/orders'
     sell_market_params = {
         "market": market,
         "side": "ask",
         "ord_type": "market",  # 시장가 주문
         "volume": volume,
     }
-    sm_query_string = unquote(urlencode(sell_market_params, doseq=True)).encode("utf-8")
-    sm_hash = hashlib.sha512()
-    sm_hash.update(sm_query_string)
-    sm_query_hash = sm_hash.hexdigest()
-
-    sm_payload = {
-        "access_key": access_key,
-        "nonce": str(uuid.uuid4()),
-        "query_hash": sm_query_hash,
-        "query_hash_alg": "SHA512"
-    }
-
-    sm_jwt_token = jwt.encode(sm_payload, secret_key)
-    sm_authorization = 'Bearer {}'.format(sm_jwt_token)
-    bm_headers = {
-        "Authorization": sm_authorization
-    }
 
-    sell_market_order_data = pd.DataFrame.from_dict(
-        requests.post(sell_market_url, json=sell_market_params, headers=bm_headers).json(), orient='index').T
+    # 인증(JWT, query_hash)은 공용 클라이언트에서 처리
+    sell_market_order_data = _post_order(sell_market_params)
 
     return sell_market_order_data
 
 
+# 주문 요청 (체결 결과가 반영될 때까지 계좌 캐시가 조회 결과를 사용하지 않도록 진행 중인 주문으로 등록)
+def _post_order(order_params: dict) -> pd.DataFrame:
+    order_uuid = None
+    get_account_cache().begin_order()
+    try:
+        order_data = pd.DataFrame.from_dict(
+            get_upbit_client().post(order_path, body=order_params).json(), orient='index').T
+        if 'uuid' in order_data.columns and order_data['uuid'].notnull()[0]:
+            order_uuid = order_data['uuid'][0]
+    finally:
+        get_account_cache().end_order(order_uuid)
+
+    return order_data
+
+
 """
 # 체결 대기 주문 (Open Order) 조회
 URL: https://docs.upbit.com/reference/%EB%8C%80%EA%B8%B0-%EC%A3%BC%EB%AC%B8-%EC%A1%B0%ED%9A%8C
@@ -161,32 +137,47 @@ def get_open_order(market: str, state: str) -> pd.DataFrame:
     if not state:
         state = 'wait'
 
-    open_order_url = 'https://api.upbit.com/v1/orders/open'
     open_order_params = {
         "market": market,
         "state": state
     }
-    oo_query_string = unquote(urlencode(open_order_params, doseq=True)).encode("utf-8")
-    oo_hash = hashlib.sha512()
-    oo_hash.update(oo_query_string)
-    oo_query_hash = oo_hash.hexdigest()
-
-    oo_payload = {
-        "access_key": access_key,
-        "nonce": str(uuid.uuid4()),
-        "query_hash": oo_query_hash,
-        "query_hash_alg": "SHA512"
-    }
 
-    oo_jwt_token = jwt.encode(oo_payload, secret_key)
-    oo_authorization = 'Bearer {}'.format(oo_jwt_token)
-    oo_headers = {
-        "Authorization": oo_authorization
-    }
-
-    open_order_data = pd.DataFrame(requests.get(open_order_url, json=open_order_params, headers=oo_headers).json())
+    # GET 요청이므로 파라미터는 query string으로 전달 (query_hash와 동일한 값)
+    open_order_data = pd.DataFrame(
+        get_upbit_client().get(open_order_path, params=open_order_params, auth=True).json())
 
     return open_order_data
 
+
 # oo_result = get_open_order('KRW-DOGE', 'wait')
 # print(oo_result)
+
+"""
+# 개별 주문 조회
+URL: https://docs.upbit.com/reference/%EA%B0%9C%EB%B3%84-%EC%A3%BC%EB%AC%B8-%EC%A1%B0%ED%9A%8C
+
+[GET] https://api.upbit.com/v1/order
+
+## Request
+- uuid: 주문 UUID
+- identifier: 조회용 사용자 지정값 (uuid 혹은 identifier 둘 중 하나는 필수)
+
+## Response
+- 주문하기 Response 항목과 동일
+- state: 주문 상태 (wait - 체결 대기, watch - 예약주문 대기, done - 전체 체결 완료, cancel - 주문 취소)
+- executed_funds: 현재까지 체결된 금액
+- trades: 체결 목록 [{market, uuid, price, volume, funds, side, created_at}, ...]
+"""
+
+
+def get_order(order_uuid: str) -> dict:
+    if not order_uuid:
+        raise ValueError(f'[uuid] 파라미터는 필수입니다.')
+
+    response = get_upbit_client().get(single_order_path, params={"uuid": order_uuid}, auth=True)
+    order_data = response.json()
+
+    if not response.ok:
+        raise ValueError(f'주문 조회 실패 : {order_data}')
+
+    return order_data
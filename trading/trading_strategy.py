@@ -1,16 +1,35 @@
 # import math
+import logging
+import numpy as np
 import pandas as pd
-from typing import Optional
-from ta.trend import MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
+from typing import Optional, Callable
+from trading.indicator_cache import get_indicator
+from trading.signal_utils import (SIGNAL_BUY, SIGNAL_SELL, merge_params, shift, rolling_any, candle_datetime_ns,
+                                  has_candle_datetime, frame_indicator, frame_candles)
+from utils.log_utils import log_conditions
+
+logger = logging.getLogger(__name__)
+
+# 매매전략 파라미터 기본값
+DEFAULT_PARAMS = {
+    'ma_short': 20,  # 시장 상황 판단 및 매수 기준 이동평균 (20MA)
+    'ma_long': 200,  # 시장 상황 판단 이동평균 (200MA)
+    'rsi_window': 14,
+    'rsi_buy': 30,  # RSI 매수 기준 (30 미만)
+    'lookback': 20,  # RSI 확인 구간 (최근 20개)
+    'bb_window': 20,
+    'bb_dev': 2,
+    'volume_ma': 20,  # 거래량 이동평균 (20MA)
+    'stop_loss_rate': 0.9931,  # 손절매 기준 (0.69% 손실)
+}
 
 
 def trading_strategy(
         df: pd.DataFrame,
         position: int,
         buy_time: Optional[str] = None,
-        buy_price: Optional[float] = None
+        buy_price: Optional[float] = None,
+        params: Optional[dict] = None
 ) -> dict:
     """
     코인 트레이딩 전략 함수 - 시장 상황(상승장/하락장)에 따른 차별화된 전략 적용
@@ -20,6 +39,7 @@ def trading_strategy(
         position (int): 현재 포지션 (0: 매수 가능, 1: 매도 가능)
         buy_time (str, optional): 매수 시간
         buy_price (float, optional): 매수 가격
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
 
     Returns:
         str: 트레이딩 액션 ('buy', 'sell', '')
@@ -49,53 +69,54 @@ def trading_strategy(
     - high: 고가
     - low: 저가
     - volume: 거래량
+
+    # 지표는 공용 지표 캐시(indicator_cache)에서 가져오며, 입력 df에 컬럼을 추가하지 않습니다.
     """
 
     # DataFrame 필수 데이터 검증
-    required_columns = ['close', 'date', 'time', 'volume']
-    if not all(col in df.columns for col in required_columns):
-        raise ValueError(f"DataFrame은 {required_columns} 컬럼을 포함해야 합니다.")
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
 
     # 최소 200개 데이터 필요 (MA200 계산을 위해)
     if len(df) < 200:
-        print('데이터가 부족합니다 (최소 200개 필요).')
+        logger.info('데이터가 부족합니다 (최소 200개 필요).')
         return {
             "signal": "",
             "message": ""
         }
 
     # 이동평균선 계산
-    df['MA20'] = df['close'].rolling(window=20).mean()
-    # df['MA50'] = df['close'].rolling(window=50).mean()
-    df['MA200'] = df['close'].rolling(window=200).mean()
+    ma20 = get_indicator(df, 'sma', window=params['ma_short'])
+    # ma50 = get_indicator(df, 'sma', window=50)
+    ma200 = get_indicator(df, 'sma', window=params['ma_long'])
 
-    # 20MA 기울기 계산
-    df['MA20_slope'] = df['MA20'].diff()  # diff() 함수를 사용하여 기울기 계산
+    # # 20MA 기울기 계산
+    # ma20_slope = ma20.diff()  # diff() 함수를 사용하여 기울기 계산
 
     # # 골든 크로스 / 데드 크로스 확인
     # golden_cross = (df['MA50'].iloc[-2] < df['MA200'].iloc[-2]) and (df['MA50'].iloc[-1] > df['MA200'].iloc[-1])
     # dead_cross = (df['MA50'].iloc[-2] > df['MA200'].iloc[-2]) and (df['MA50'].iloc[-1] < df['MA200'].iloc[-1])
 
     # 시장 상황 판단 (20MA와 200MA 비교)
-    is_bull_market = df['MA20'].iloc[-1] > df['MA200'].iloc[-1]
+    is_bull_market = ma20.iloc[-1] > ma200.iloc[-1]
 
-    print(f'is_bull_market : {is_bull_market}')
+    log_conditions(logger, is_bull_market=is_bull_market)
 
     # RSI 계산
-    rsi_indicator = RSIIndicator(df['close'], window=14)
-    df['RSI'] = rsi_indicator.rsi()
+    rsi = get_indicator(df, 'rsi', window=params['rsi_window'])
 
     # MACD 계산
-    macd = MACD(df['close'])
-    df['MACD'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
-    df['MACD_histogram'] = macd.macd_diff()
+    # macd = get_indicator(df, 'macd')
+    # macd_signal = get_indicator(df, 'macd_signal')
+    macd_histogram = get_indicator(df, 'macd_diff')
 
     # 볼린저밴드 계산
-    bollinger = BollingerBands(df['close'])
-    df['BB_upper'] = bollinger.bollinger_hband()
-    df['BB_mid'] = bollinger.bollinger_mavg()
-    df['BB_lower'] = bollinger.bollinger_lband()
+    bb_upper = get_indicator(df, 'bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_mid = get_indicator(df, 'bb_mid', window=params['bb_window'], window_dev=params['bb_dev'])
+    # bb_lower = get_indicator(df, 'bb_lower')
 
     # 매수 가능
     if position == 0:
@@ -103,10 +124,10 @@ def trading_strategy(
         buy_msg = ''
 
         # 20일 거래량 이동평균 계산 추가
-        df['Volume_MA20'] = df['volume'].rolling(window=20).mean()
+        volume_ma20 = get_indicator(df, 'sma', source='volume', window=params['volume_ma'])
 
-        # 최근 20개의 DataFrame 추출
-        recent_df: pd.DataFrame = df.tail(20)
+        # 최근 20개의 데이터 추출
+        recent_rsi: pd.Series = rsi.tail(params['lookback'])
 
         if not is_bull_market:
             # recent_df_10: pd.DataFrame = df.tail(10)
@@ -117,17 +138,20 @@ def trading_strategy(
             # if not ma20_slope_positive:
 
             # 추가 매수 조건: RSI 30 미만 이후 MACD 히스토그램 양전환
-            rsi_under_30 = (recent_df['RSI'] < 30).any()
+            rsi_under_30 = (recent_rsi < params['rsi_buy']).any()
 
             # MACD 히스토그램 양전환 확인
             macd_turned_positive = (
-                    recent_df['MACD_histogram'].iloc[-1] > recent_df['MACD_histogram'].iloc[-2] and
-                    (recent_df['MACD_histogram'].iloc[-1] > 0 > recent_df['MACD_histogram'].iloc[-2] or
-                     recent_df['MACD_histogram'].iloc[-1] > 0 > recent_df['MACD_histogram'].iloc[-3])
+                    macd_histogram.iloc[-1] > macd_histogram.iloc[-2] and
+                    (macd_histogram.iloc[-1] > 0 > macd_histogram.iloc[-2] or
+                     macd_histogram.iloc[-1] > 0 > macd_histogram.iloc[-3])
             )
 
-            print(f'rsi_under_30 : {rsi_under_30}')
-            print(f'macd_turned_positive : {macd_turned_positive}')
+            log_conditions(
+                logger,
+                rsi_under_30=rsi_under_30,
+                macd_turned_positive=macd_turned_positive
+            )
 
             if rsi_under_30 and macd_turned_positive:
                 buy_condition = True
@@ -141,7 +165,7 @@ def trading_strategy(
         else:
             # 시작(open)값이 20MA 아래이고, 종료(close) 값이 20MA를 돌파
             is_20ma_up = (
-                    recent_df['open'].iloc[-1] < recent_df['MA20'].iloc[-1] < recent_df['close'].iloc[-1]
+                    df['open'].iloc[-1] < ma20.iloc[-1] < df['close'].iloc[-1]
             )
 
             if is_20ma_up:
@@ -161,12 +185,12 @@ def trading_strategy(
         if not buy_condition:
             # 다음 조건인 경우에도 매수하도록 설정
             # 거래량이 20일 이동평균 초과
-            is_20ma_volume_up = recent_df['volume'].iloc[-1] > recent_df['Volume_MA20'].iloc[-1]
+            is_20ma_volume_up = df['volume'].iloc[-1] > volume_ma20.iloc[-1]
 
             # 시작(open)값이 볼린저밴드 중간 아래이고, 종료(close) 값이 볼린저밴드 상단을 돌파
             is_giant_bb_up = (
-                    recent_df['open'].iloc[-1] <= recent_df['BB_mid'].iloc[-1] and
-                    recent_df['close'].iloc[-1] >= recent_df['BB_upper'].iloc[-1]
+                    df['open'].iloc[-1] <= bb_mid.iloc[-1] and
+                    df['close'].iloc[-1] >= bb_upper.iloc[-1]
             )
 
             if is_20ma_volume_up and is_giant_bb_up:
@@ -203,7 +227,7 @@ def trading_strategy(
         #     buy_condition = has_double_bottom and macd_turned_positive
 
         if buy_condition:
-            print(f'buy_signal! - {buy_msg}')
+            logger.info('buy_signal! - %s', buy_msg)
             return {
                 "signal": "buy",
                 "message": f"매수 조건에 부합 - {buy_msg}"
@@ -213,7 +237,7 @@ def trading_strategy(
     elif position == 1:
         # 필수 입력값 검증
         if not buy_time or not buy_price:
-            print('매수 시간 또는 가격 정보가 없습니다.')
+            logger.warning('매수 시간 또는 가격 정보가 없습니다.')
             return {
                 "signal": "",
                 "message": ""
@@ -221,8 +245,8 @@ def trading_strategy(
 
         # 손절매 조건 (0.69% 손실)
         current_price = df['close'].iloc[-1]
-        if current_price < buy_price * 0.9931:
-            print('sell_signal - 손절매!!')
+        if current_price < buy_price * params['stop_loss_rate']:
+            logger.info('sell_signal - 손절매!!')
             return {
                 "signal": "sell",
                 "message": "손절매!!"
@@ -232,23 +256,26 @@ def trading_strategy(
         # df['Volume_MA20'] = df['volume'].rolling(window=20).mean()
 
         # 'datetime' 데이터 만들기
-        df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'])
+        candle_datetime = get_indicator(df, 'datetime')
         buy_datetime = pd.to_datetime(buy_time)
 
-        after_buy_df = df[df['datetime'] > buy_datetime]
+        after_buy_mask = (candle_datetime > buy_datetime).to_numpy()
+        after_buy_close = df['close'].to_numpy()[after_buy_mask]
+        after_buy_bb_upper = bb_upper.to_numpy()[after_buy_mask]
+        after_buy_bb_mid = bb_mid.to_numpy()[after_buy_mask]
 
-        print(f'len(after_buy_df) : {len(after_buy_df)}')
+        log_conditions(logger, after_buy_cnt=len(after_buy_close))
 
         # 최소 2개의 캔들이 있어야 인덱싱 가능
-        if len(after_buy_df) >= 2:
+        if len(after_buy_close) >= 2:
             if is_bull_market:
                 # 매수 후 볼린저밴드 상단 돌파 여부 확인
-                has_breached_upper_band = (after_buy_df['close'] > after_buy_df['BB_upper']).any()
+                has_breached_upper_band = (after_buy_close > after_buy_bb_upper).any()
 
                 # 한번이라도 볼린저밴드 상단을 돌파한 경우, 중심선 아래로 하락 시 매도
                 if has_breached_upper_band:
-                    if after_buy_df['close'].iloc[-1] < after_buy_df['BB_mid'].iloc[-1]:
-                        print('sell_signal - 볼린저밴드 상단 돌파 후 중심선 아래로 하락')
+                    if after_buy_close[-1] < after_buy_bb_mid[-1]:
+                        logger.info('sell_signal - 볼린저밴드 상단 돌파 후 중심선 아래로 하락')
                         return {
                             "signal": "sell",
                             "message": "볼린저밴드 상단 돌파 후 중심선 아래로 하락"
@@ -275,15 +302,15 @@ def trading_strategy(
 
             else:
                 # 이전 캔들이 볼린저밴드 상단을 돌파한 경우 매도
-                if after_buy_df['close'].iloc[-2] > after_buy_df['BB_upper'].iloc[-2]:
-                    print('sell_signal - 이전 캔들이 볼린저밴드 상단 돌파')
+                if after_buy_close[-2] > after_buy_bb_upper[-2]:
+                    logger.info('sell_signal - 이전 캔들이 볼린저밴드 상단 돌파')
                     return {
                         "signal": "sell",
                         "message": "이전 캔들이 볼린저밴드 상단 돌파"
                     }
 
         else:
-            print('매수 이후 데이터 부족')
+            logger.debug('매수 이후 데이터 부족')
             return {
                 "signal": "",
                 "message": "매수 이후 데이터 부족"
@@ -302,7 +329,7 @@ def trading_strategy(
             #     # 이전 캔들의 종가가 볼린저밴드 상단을 돌파 and 거래량이 20일 이동평균을 초과
             #     if (prev_candle['close'] >= prev_candle['BB_upper'] and
             #             prev_candle['volume'] > prev_candle['Volume_MA20']):
-            #         print('sell_signal - [하락장] 이전 캔들이 볼린저밴드 상단 돌파 및 거래량 증가')
+            #         logger.info('sell_signal - [하락장] 이전 캔들이 볼린저밴드 상단 돌파 및 거래량 증가')
             #         return {
             #             "signal": "sell",
             #             "message": "[하락장] 이전 캔들이 볼린저밴드 상단 돌파 및 거래량 증가"
@@ -312,3 +339,179 @@ def trading_strategy(
         "signal": "",
         "message": ""
     }
+
+
+def buy_conditions(candles: dict, indicator: Callable, params: dict) -> dict:
+    """
+    캔들별 매수 조건 배열 (build_signal_conditions, 마켓 스캐너에서 사용)
+
+    마지막 축이 시간이므로 1차원(캔들) 배열과 2차원(마켓 x 캔들) 배열 모두 계산할 수 있습니다.
+
+    Args:
+        candles (dict): {'open', 'close', 'volume'}: 캔들 배열
+        indicator (Callable): 지표 배열 함수 indicator(name, **params) (ex. signal_utils.frame_indicator(df))
+        params (dict): 매매전략 파라미터 (merge_params 결과)
+
+    Returns:
+        dict: 'buy_condition'과 매도 조건에 사용하는 지표 배열
+    """
+    candle_open, candle_close, candle_volume = candles['open'], candles['close'], candles['volume']
+
+    ma20 = indicator('sma', window=params['ma_short'])
+    ma200 = indicator('sma', window=params['ma_long'])
+    rsi = indicator('rsi', window=params['rsi_window'])
+    macd_histogram = indicator('macd_diff')
+    bb_upper = indicator('bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_mid = indicator('bb_mid', window=params['bb_window'], window_dev=params['bb_dev'])
+    volume_ma20 = indicator('sma', source='volume', window=params['volume_ma'])
+
+    is_bull_market = ma20 > ma200
+
+    # [하락장] RSI 30 미만 이후 MACD 히스토그램 양전환
+    rsi_under_30 = rolling_any(rsi < params['rsi_buy'], params['lookback'])
+    macd_prev1 = shift(macd_histogram, 1)
+    macd_prev2 = shift(macd_histogram, 2)
+    macd_turned_positive = (macd_histogram > macd_prev1) & (macd_histogram > 0) & ((macd_prev1 < 0) | (macd_prev2 < 0))
+
+    # [상승장] 시작(open)값이 20MA 아래이고, 종료(close) 값이 20MA를 돌파
+    is_20ma_up = (candle_open < ma20) & (ma20 < candle_close)
+
+    # 거래량이 20MA를 초과하고, 볼린저밴드 중간 아래에서 상단까지 돌파한 장대 양봉
+    is_giant_bb_up = (candle_volume > volume_ma20) & (candle_open <= bb_mid) & (candle_close >= bb_upper)
+
+    return {
+        'buy_condition': np.where(is_bull_market, is_20ma_up, rsi_under_30 & macd_turned_positive) | is_giant_bb_up,
+        'is_bull_market': is_bull_market,
+        'bb_upper': bb_upper,
+        'bb_mid': bb_mid,
+    }
+
+
+def build_signal_conditions(
+        df: pd.DataFrame,
+        unit: int = 5,
+        params: Optional[dict] = None,
+        indicator: Optional[Callable] = None
+) -> dict:
+    """
+    전체 캔들 구간의 지표와 매수/매도 조건 배열 계산 (generate_signals, 워크포워드에서 사용)
+
+    지표는 이전 캔들만 사용하기 때문에(causal) 전체 구간으로 한번 계산한 값을 구간별로 잘라서 사용해도 같습니다.
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수시간 = 매수 캔들 시각 - {unit}분)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+        indicator (Callable, optional): 지표 배열 함수 (없으면 지표 캐시, 워크포워드에서는 fold별 디스크 캐시)
+
+    Returns:
+        dict: 조건 배열
+    """
+
+    # DataFrame 필수 데이터 검증
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
+
+    candles = frame_candles(df)
+    conditions = buy_conditions(candles, indicator or frame_indicator(df), params)
+    candle_close = candles['close']
+
+    over_upper = candle_close > conditions['bb_upper']
+
+    return {
+        'buy_condition': conditions['buy_condition'],
+        'is_bull_market': conditions['is_bull_market'],
+        'candle_close': candle_close,
+        'candle_datetime': candle_datetime_ns(df),
+        'over_upper_cnt': np.concatenate(([0], np.cumsum(over_upper, dtype=np.int64))),
+        'prev_over_upper': shift(over_upper, 1, False),
+        'below_mid': candle_close < conditions['bb_mid'],
+        'unit_ns': unit * 60 * 10 ** 9,
+        'stop_loss_rate': params['stop_loss_rate'],
+    }
+
+
+def generate_signals_from_conditions(conditions: dict, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """
+    조건 배열로 {start} ~ {end} 구간의 매수/매도 신호 계산 ({start} 위치에서는 포지션 없음)
+
+    포지션에 따라 달라지는 매도 조건(손절매, 매수 이후 구간)만 캔들 순서대로 확인합니다.
+
+    Args:
+        conditions (dict): build_signal_conditions 결과
+        start (int): 시작 위치 (포함)
+        end (int, optional): 종료 위치 (미포함, 기본값: 마지막)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음, 구간 밖은 0)
+    """
+    buy_condition = conditions['buy_condition']
+    is_bull_market = conditions['is_bull_market']
+    candle_close = conditions['candle_close']
+    candle_datetime = conditions['candle_datetime']
+    over_upper_cnt = conditions['over_upper_cnt']
+    prev_over_upper = conditions['prev_over_upper']
+    below_mid = conditions['below_mid']
+    unit_ns = conditions['unit_ns']
+    stop_loss_rate = conditions['stop_loss_rate']
+
+    n = len(candle_close)
+    end = n if end is None else min(end, n)
+    signals = np.zeros(n, dtype=np.int8)
+
+    position = 0
+    buy_price = 0.0
+    after_buy_start = 0
+
+    # 최소 200개 데이터 필요 (MA200 계산을 위해)
+    for t in range(max(start, 199), end):
+        if position == 0:
+            if buy_condition[t]:
+                signals[t] = SIGNAL_BUY
+                position = 1
+                buy_price = candle_close[t]
+
+                # 매수시간 이후(초과)의 첫 캔들 위치
+                after_buy_start = int(np.searchsorted(candle_datetime, candle_datetime[t] - unit_ns, side='right'))
+            continue
+
+        sell = False
+
+        # 손절매 조건 (0.69% 손실)
+        if candle_close[t] < buy_price * stop_loss_rate:
+            sell = True
+        elif t - after_buy_start + 1 >= 2:
+            if is_bull_market[t]:
+                # 매수 이후 볼린저밴드 상단을 돌파한 적이 있고, 중심선 아래로 하락
+                sell = over_upper_cnt[t + 1] - over_upper_cnt[after_buy_start] > 0 and below_mid[t]
+            else:
+                # 이전 캔들이 볼린저밴드 상단을 돌파
+                sell = prev_over_upper[t]
+
+        if sell:
+            signals[t] = SIGNAL_SELL
+            position = 0
+
+    return signals
+
+
+def generate_signals(df: pd.DataFrame, unit: int = 5, params: Optional[dict] = None) -> np.ndarray:
+    """
+    전체 캔들 구간의 매수/매도 신호를 한번에 계산 (백테스트용)
+
+    캔들마다 trading_strategy(df.iloc[:t + 1], ...)를 호출한 결과와 같습니다.
+    지표와 매수 조건은 NumPy 배열로 한번에 계산하고, 포지션에 따라 달라지는 매도 조건(손절매, 매수 이후 구간)만
+    캔들 순서대로 확인합니다.
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수시간 = 매수 캔들 시각 - {unit}분)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음)
+    """
+    return generate_signals_from_conditions(build_signal_conditions(df, unit, params))
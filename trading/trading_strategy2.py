@@ -1,16 +1,36 @@
+import logging
 import pandas as pd
 import numpy as np
-from typing import Optional
-from ta.trend import MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
+from typing import Optional, Callable
+from trading.indicator_cache import get_indicator
+from trading.signal_utils import (SIGNAL_BUY, SIGNAL_SELL, merge_params, shift, rolling_any, candle_datetime_ns,
+                                  has_candle_datetime, frame_indicator, frame_candles)
+from utils.log_utils import log_conditions
+
+logger = logging.getLogger(__name__)
+
+# 매매전략 파라미터 기본값
+DEFAULT_PARAMS = {
+    'ma_long': 200,  # 기울기 확인 이동평균 (200MA)
+    'ema_short': 5,  # 5EMA
+    'ema_mid': 10,  # 10EMA
+    'ema_long': 20,  # 20EMA
+    'rsi_window': 14,
+    'rsi_buy': 30,  # RSI 매수 기준 (30 미만)
+    'lookback': 20,  # 볼린저밴드 하단, RSI 확인 구간 (최근 20개)
+    'bb_window': 20,
+    'bb_dev': 2,
+    'volume_ma': 20,  # 거래량 이동평균 (20MA)
+    'stop_loss_rate': 0.993058,  # 손절매 기준 (0.6942% 손실)
+}
 
 
 def trading_strategy(
         df: pd.DataFrame,
         position: int,
         buy_time: Optional[str] = None,
-        buy_price: Optional[float] = None
+        buy_price: Optional[float] = None,
+        params: Optional[dict] = None
 ) -> dict:
     """
     코인 트레이딩 전략 함수 - 시장 상황(상승장/하락장)에 따른 차별화된 전략 적용
@@ -20,6 +40,7 @@ def trading_strategy(
         position (int): 현재 포지션 (0: 매수 가능, 1: 매도 가능)
         buy_time (str, optional): 매수 시간
         buy_price (float, optional): 매수 가격
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
 
     Returns:
         str: 트레이딩 액션 ('buy', 'sell', '')
@@ -36,69 +57,64 @@ def trading_strategy(
     - high: 고가
     - low: 저가
     - volume: 거래량
+
+    # 지표는 공용 지표 캐시(indicator_cache)에서 가져오며, 입력 df에 컬럼을 추가하지 않습니다.
     """
 
     # DataFrame 필수 데이터 검증
-    required_columns = ['close', 'date', 'time', 'volume']
-    if not all(col in df.columns for col in required_columns):
-        raise ValueError(f"DataFrame은 {required_columns} 컬럼을 포함해야 합니다.")
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
 
     # 최소 200개 데이터 필요
     if len(df) < 200:
-        print('데이터가 부족합니다 (최소 200개 필요).')
+        logger.info('데이터가 부족합니다 (최소 200개 필요).')
         return {
             "signal": "",
             "message": ""
         }
 
     # 이동평균선 계산
-    df['MA20'] = df['close'].rolling(window=20).mean()
-    df['MA200'] = df['close'].rolling(window=200).mean()
+    ma20 = get_indicator(df, 'sma', window=20)
+    ma200 = get_indicator(df, 'sma', window=params['ma_long'])
 
     # # 시장 상황 판단 (20MA와 200MA 비교)
-    # is_bull_market = df['MA20'].iloc[-2] > df['MA200'].iloc[-2]
+    # is_bull_market = ma20.iloc[-2] > ma200.iloc[-2]
 
     # EMA 계산
-    df['EMA5'] = df['close'].ewm(span=5, adjust=False).mean()
-    df['EMA10'] = df['close'].ewm(span=10, adjust=False).mean()
-    df['EMA20'] = df['close'].ewm(span=20, adjust=False).mean()
+    ema5 = get_indicator(df, 'ema', span=params['ema_short'])
+    ema10 = get_indicator(df, 'ema', span=params['ema_mid'])
+    ema20 = get_indicator(df, 'ema', span=params['ema_long'])
 
-    # 200MA 기울기 계산
-    df['MA200_slope'] = df['MA200'].diff()  # diff() 함수를 사용하여 기울기 계산
-
-    is_positive_200ma_slope = df['MA200_slope'].iloc[-2] > 0
+    # 200MA 기울기 계산 (이전 캔들 기준)
+    is_positive_200ma_slope = ma200.iloc[-2] - ma200.iloc[-3] > 0
 
     # RSI 계산
-    rsi_indicator = RSIIndicator(df['close'], window=14)
-    df['RSI'] = rsi_indicator.rsi()
-
-    # MACD 계산
-    macd = MACD(df['close'])
-    df['MACD'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
-    df['MACD_histogram'] = macd.macd_diff()
+    rsi = get_indicator(df, 'rsi', window=params['rsi_window'])
 
     # 볼린저밴드 계산
-    bollinger = BollingerBands(df['close'])
-    df['BB_upper'] = bollinger.bollinger_hband()
-    df['BB_mid'] = bollinger.bollinger_mavg()
-    df['BB_lower'] = bollinger.bollinger_lband()
+    bb_upper = get_indicator(df, 'bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_lower = get_indicator(df, 'bb_lower', window=params['bb_window'], window_dev=params['bb_dev'])
 
-    # 볼린저밴드 영역 계산
-    df['BB_range'] = df['BB_upper'] - df['BB_lower']
+    # 볼린저밴드 영역 계산 (이전 캔들 기준)
+    bb_range = bb_upper.iloc[-2] - bb_lower.iloc[-2]
 
-    # 양봉 캔들의 크기가 볼린저밴드 영역의 절반을 넘는지 확인
-    df['candle_size'] = df['close'] - df['open']
-    df['is_big_bull'] = (df['candle_size'] > df['BB_range'] / 2) & (df['close'] > df['open'])
+    # 양봉 캔들의 크기가 볼린저밴드 영역의 절반을 넘는지 확인 (이전 캔들 기준)
+    candle_size = df['close'].iloc[-2] - df['open'].iloc[-2]
+    is_big_bull = (candle_size > bb_range / 2) & (df['close'].iloc[-2] > df['open'].iloc[-2])
 
     # 20일 거래량 이동평균 계산
-    df['Volume_MA20'] = df['volume'].rolling(window=20).mean()
+    volume_ma20 = get_indicator(df, 'sma', source='volume', window=params['volume_ma'])
 
-    # 최근 20개의 DataFrame 추출
-    recent_df: pd.DataFrame = df.tail(20)
+    # 최근 20개의 데이터 추출
+    recent_close: pd.Series = df['close'].tail(params['lookback'])
+    recent_bb_lower: pd.Series = bb_lower.tail(params['lookback'])
+    recent_rsi: pd.Series = rsi.tail(params['lookback'])
 
     # 20MA 기울기 계산
-    diffs = recent_df['MA20'].diff()
+    diffs = ma20.tail(20).diff()
 
     # 기울기가 음(-)인 경우와 양(+)인 경우 개수 세기
     negative_cnt = np.sum(np.where(diffs < 0, 1, 0))
@@ -107,16 +123,18 @@ def trading_strategy(
     is_positive_20ma_slope = positive_cnt > negative_cnt
 
     # 결과 출력
-    print('[20MA, 200MA 기울기 확인]')
-    print(f'음(-)인 기울기 개수 : {negative_cnt}')
-    print(f'양(+)인 기울기 개수 : {positive_cnt}')
-    print(f'is_positive_20ma_slope : {is_positive_20ma_slope}')
-    print(f'is_positive_200ma_slope : {is_positive_200ma_slope}')
-
-    # EMA 기울기 계산
-    df['EMA5_slope'] = df['EMA5'].diff()
-    df['EMA10_slope'] = df['EMA10'].diff()
-    df['EMA20_slope'] = df['EMA20'].diff()
+    log_conditions(
+        logger,
+        ma20_negative_slope_cnt=negative_cnt,
+        ma20_positive_slope_cnt=positive_cnt,
+        is_positive_20ma_slope=is_positive_20ma_slope,
+        is_positive_200ma_slope=is_positive_200ma_slope
+    )
+
+    # EMA 기울기 계산 (이전 캔들 기준)
+    ema5_slope = ema5.iloc[-2] - ema5.iloc[-3]
+    ema10_slope = ema10.iloc[-2] - ema10.iloc[-3]
+    ema20_slope = ema20.iloc[-2] - ema20.iloc[-3]
 
     # 매수 가능
     if position == 0:
@@ -130,27 +148,28 @@ def trading_strategy(
         #         df['MACD_histogram'].iloc[-2] > -0.05
         # )
 
-        print('[EMA 값 확인]')
-        print(f"5EMA : {df['EMA5'].iloc[-2]}")
-        print(f"10EMA : {df['EMA10'].iloc[-2]}")
-        print(f"20EMA : {df['EMA20'].iloc[-2]}")
+        # EMA 값 확인
+        log_conditions(logger, ema5=ema5.iloc[-2], ema10=ema10.iloc[-2], ema20=ema20.iloc[-2])
 
         # 최근 20개의 캔들(종가 기준) 중에서 볼린저밴드 하단 아래로 내려갔는지 확인
-        recent_candle_below_bb = (recent_df['close'][:-1] < recent_df['BB_lower'][:-1]).any()
+        recent_candle_below_bb = (recent_close[:-1] < recent_bb_lower[:-1]).any()
 
         # EMA 기울기가 양(+)으로 모두 바뀌었는지 확인
         is_positive_all_ema_slope = (
-                df['EMA5_slope'].iloc[-2] > 0 and
-                df['EMA10_slope'].iloc[-2] > 0 and
-                df['EMA20_slope'].iloc[-2] > 0
+                ema5_slope > 0 and
+                ema10_slope > 0 and
+                ema20_slope > 0
         )
 
         # RSI 30 미만 확인
-        rsi_under_30 = (recent_df['RSI'] < 30).any()
+        rsi_under_30 = (recent_rsi < params['rsi_buy']).any()
 
-        print(f'recent_candle_below_bb : {recent_candle_below_bb}')
-        print(f'is_positive_all_ema_slope : {is_positive_all_ema_slope}')
-        print(f'rsi_under_30 : {rsi_under_30}')
+        log_conditions(
+            logger,
+            recent_candle_below_bb=recent_candle_below_bb,
+            is_positive_all_ema_slope=is_positive_all_ema_slope,
+            rsi_under_30=rsi_under_30
+        )
 
         if recent_candle_below_bb and is_positive_all_ema_slope:
             if is_positive_200ma_slope:
@@ -163,20 +182,23 @@ def trading_strategy(
 
         if not buy_condition:
             # 최근 캔들이 큰 양봉인지 확인
-            is_big_bull_candle = recent_df['is_big_bull'].iloc[-2]
+            is_big_bull_candle = is_big_bull
 
             # 거래량이 20일 거래량 이동평균을 넘어서는지 확인
-            is_over_20ma_vol = recent_df['volume'].iloc[-2] > recent_df['Volume_MA20'].iloc[-2]
+            is_over_20ma_vol = df['volume'].iloc[-2] > volume_ma20.iloc[-2]
 
-            print(f'is_big_bull_candle : {is_big_bull_candle}')
-            print(f'is_over_20ma_vol : {is_over_20ma_vol}')
+            log_conditions(
+                logger,
+                is_big_bull_candle=is_big_bull_candle,
+                is_over_20ma_vol=is_over_20ma_vol
+            )
 
             if is_big_bull_candle and is_over_20ma_vol:
                 buy_condition = True
                 buy_msg = '볼린저밴드 반을 넘는 거대한 양봉이고 거래량도 20일 평균을 넘어섬'
 
         if buy_condition:
-            print(f'buy_signal! - {buy_msg}')
+            logger.info('buy_signal! - %s', buy_msg)
             return {
                 "signal": "buy",
                 "message": f"매수 조건에 부합 - {buy_msg}"
@@ -186,22 +208,22 @@ def trading_strategy(
     elif position == 1:
         # 필수 입력값 검증
         if not buy_time or not buy_price:
-            print('매수 시간 또는 가격 정보가 없습니다.')
+            logger.warning('매수 시간 또는 가격 정보가 없습니다.')
             return {
                 "signal": "",
                 "message": ""
             }
 
         # 'datetime' 데이터 만들기
-        df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'])
+        candle_datetime = get_indicator(df, 'datetime')
         buy_datetime = pd.to_datetime(buy_time)
 
-        # 매수시점 이후의 캔들만 가져오기
-        after_buy_df = df[df['datetime'] >= buy_datetime]
+        # 매수시점 이후의 캔들 개수
+        after_buy_cnt = int((candle_datetime >= buy_datetime).sum())
 
-        print(f'len(after_buy_df) : {len(after_buy_df)}')
+        log_conditions(logger, after_buy_cnt=after_buy_cnt)
 
-        if len(after_buy_df) >= 2:
+        if after_buy_cnt >= 2:
             # # STOPLOSS
             # # STOPLOSS는 매수 시점 바로 이전의 최종 3개의 캔들의 시작(open)에서 최솟값
             # last3_df: pd.Series = df['open'].tail(4).iloc[:-1]
@@ -212,7 +234,7 @@ def trading_strategy(
             # print(f'current_price : {current_price}')
             #
             # if current_price < stop_loss_price:
-            #     print('sell_signal - STOPLOSS')
+            #     logger.info('sell_signal - STOPLOSS')
             #     return {
             #         "signal": "sell",
             #         "message": "STOPLOSS"
@@ -220,11 +242,11 @@ def trading_strategy(
 
             current_price = df['close'].iloc[-2]
 
-            print(f'current_price : {current_price}')
+            log_conditions(logger, current_price=current_price)
 
             # 손절매 조건 (0.6942% 손실)
-            if current_price < buy_price * 0.993058:
-                print('sell_signal - 손절매!!')
+            if current_price < buy_price * params['stop_loss_rate']:
+                logger.info('sell_signal - 손절매!!')
                 return {
                     "signal": "sell",
                     "message": "손절매(0.6942% 손실)!!"
@@ -232,22 +254,22 @@ def trading_strategy(
 
             # 이전 캔들의 EMA가 정배열(5, 10, 20이 순서대로)인지 확인
             is_bef_ema_ordered = (
-                    df['EMA5'].iloc[-3] > df['EMA10'].iloc[-3] > df['EMA20'].iloc[-3]
+                    ema5.iloc[-3] > ema10.iloc[-3] > ema20.iloc[-3]
             )
 
-            print(f'is_bef_ema_ordered : {is_bef_ema_ordered}')
+            log_conditions(logger, is_bef_ema_ordered=is_bef_ema_ordered)
 
             # 5EMA가 10EMA에 하향 교차
-            if (len(after_buy_df) >= 3 and
+            if (after_buy_cnt >= 3 and
                     is_bef_ema_ordered and
-                    df['EMA5'].iloc[-2] < df['EMA10'].iloc[-2]):
-                print('sell_signal - 5EMA가 10EMA에 하향 교차')
+                    ema5.iloc[-2] < ema10.iloc[-2]):
+                logger.info('sell_signal - 5EMA가 10EMA에 하향 교차')
                 return {
                     "signal": "sell",
                     "message": "5EMA가 10EMA에 하향 교차"
                 }
         else:
-            print('매수 이후 데이터 부족')
+            logger.debug('매수 이후 데이터 부족')
             return {
                 "signal": "",
                 "message": "매수 이후 데이터 부족"
@@ -257,3 +279,173 @@ def trading_strategy(
         "signal": "",
         "message": ""
     }
+
+
+def buy_conditions(candles: dict, indicator: Callable, params: dict) -> dict:
+    """
+    캔들별 매수 조건 배열 (build_signal_conditions, 마켓 스캐너에서 사용)
+
+    마지막 축이 시간이므로 1차원(캔들) 배열과 2차원(마켓 x 캔들) 배열 모두 계산할 수 있습니다.
+
+    Args:
+        candles (dict): {'open', 'close', 'volume'}: 캔들 배열
+        indicator (Callable): 지표 배열 함수 indicator(name, **params) (ex. signal_utils.frame_indicator(df))
+        params (dict): 매매전략 파라미터 (merge_params 결과)
+
+    Returns:
+        dict: 'buy_condition'과 매도 조건에 사용하는 지표 배열
+    """
+    candle_open, candle_close, candle_volume = candles['open'], candles['close'], candles['volume']
+
+    ma200 = indicator('sma', window=params['ma_long'])
+    ema5 = indicator('ema', span=params['ema_short'])
+    ema10 = indicator('ema', span=params['ema_mid'])
+    ema20 = indicator('ema', span=params['ema_long'])
+    rsi = indicator('rsi', window=params['rsi_window'])
+    bb_upper = indicator('bb_upper', window=params['bb_window'], window_dev=params['bb_dev'])
+    bb_lower = indicator('bb_lower', window=params['bb_window'], window_dev=params['bb_dev'])
+    volume_ma20 = indicator('sma', source='volume', window=params['volume_ma'])
+
+    # 이전 캔들 기준 값 (t 위치에 t-1 값)
+    is_positive_200ma_slope = shift(ma200 - shift(ma200, 1), 1) > 0
+    is_positive_all_ema_slope = (
+            (shift(ema5 - shift(ema5, 1), 1) > 0) &
+            (shift(ema10 - shift(ema10, 1), 1) > 0) &
+            (shift(ema20 - shift(ema20, 1), 1) > 0)
+    )
+
+    # 최근 20개의 캔들 중 현재 캔들을 제외한 19개에서 볼린저밴드 하단 아래로 내려갔는지 확인
+    recent_candle_below_bb = shift(rolling_any(candle_close < bb_lower, params['lookback'] - 1), 1, False)
+    rsi_under_30 = rolling_any(rsi < params['rsi_buy'], params['lookback'])
+
+    # 이전 캔들이 볼린저밴드 반을 넘는 거대한 양봉이고 거래량도 20일 평균을 넘어섬
+    candle_size = candle_close - candle_open
+    is_big_bull = (candle_size > (bb_upper - bb_lower) / 2) & (candle_close > candle_open)
+    is_over_20ma_vol = candle_volume > volume_ma20
+    big_bull_with_volume = shift(is_big_bull & is_over_20ma_vol, 1, False)
+
+    return {
+        'buy_condition': (
+                (recent_candle_below_bb & is_positive_all_ema_slope & (is_positive_200ma_slope | rsi_under_30)) |
+                big_bull_with_volume
+        ),
+        'ema5': ema5,
+        'ema10': ema10,
+        'ema20': ema20,
+    }
+
+
+def build_signal_conditions(
+        df: pd.DataFrame,
+        unit: int = 5,
+        params: Optional[dict] = None,
+        indicator: Optional[Callable] = None
+) -> dict:
+    """
+    전체 캔들 구간의 지표와 매수/매도 조건 배열 계산 (generate_signals, 워크포워드에서 사용)
+
+    지표는 이전 캔들만 사용하기 때문에(causal) 전체 구간으로 한번 계산한 값을 구간별로 잘라서 사용해도 같습니다.
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수시간 = 매수 캔들 시각 - {unit}분)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+        indicator (Callable, optional): 지표 배열 함수 (없으면 지표 캐시, 워크포워드에서는 fold별 디스크 캐시)
+
+    Returns:
+        dict: 조건 배열
+    """
+
+    # DataFrame 필수 데이터 검증
+    required_columns = ['close', 'volume']
+    if not all(col in df.columns for col in required_columns) or not has_candle_datetime(df):
+        raise ValueError(f"DataFrame은 {required_columns} 컬럼과 캔들 시각('datetime' 또는 'date', 'time') 컬럼을 포함해야 합니다.")
+
+    params = merge_params(DEFAULT_PARAMS, params)
+
+    candles = frame_candles(df)
+    conditions = buy_conditions(candles, indicator or frame_indicator(df), params)
+    ema5, ema10, ema20 = conditions['ema5'], conditions['ema10'], conditions['ema20']
+
+    return {
+        'buy_condition': conditions['buy_condition'],
+        'candle_close': candles['close'],
+        'candle_datetime': candle_datetime_ns(df),
+        'prev_close': shift(candles['close'], 1),
+        # 5EMA가 10EMA에 하향 교차 (2개 전 캔들 정배열, 이전 캔들 5EMA < 10EMA)
+        'ema_cross_down': shift((ema5 > ema10) & (ema10 > ema20), 2, False) & shift(ema5 < ema10, 1, False),
+        'unit_ns': unit * 60 * 10 ** 9,
+        'stop_loss_rate': params['stop_loss_rate'],
+    }
+
+
+def generate_signals_from_conditions(conditions: dict, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """
+    조건 배열로 {start} ~ {end} 구간의 매수/매도 신호 계산 ({start} 위치에서는 포지션 없음)
+
+    매도 조건(매수 이후 캔들 개수, 손절매)만 캔들 순서대로 확인합니다.
+
+    Args:
+        conditions (dict): build_signal_conditions 결과
+        start (int): 시작 위치 (포함)
+        end (int, optional): 종료 위치 (미포함, 기본값: 마지막)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음, 구간 밖은 0)
+    """
+    buy_condition = conditions['buy_condition']
+    candle_close = conditions['candle_close']
+    candle_datetime = conditions['candle_datetime']
+    prev_close = conditions['prev_close']
+    ema_cross_down = conditions['ema_cross_down']
+    unit_ns = conditions['unit_ns']
+    stop_loss_rate = conditions['stop_loss_rate']
+
+    n = len(candle_close)
+    end = n if end is None else min(end, n)
+    signals = np.zeros(n, dtype=np.int8)
+
+    position = 0
+    buy_price = 0.0
+    after_buy_start = 0
+
+    # 최소 200개 데이터 필요
+    for t in range(max(start, 199), end):
+        if position == 0:
+            if buy_condition[t]:
+                signals[t] = SIGNAL_BUY
+                position = 1
+                buy_price = candle_close[t]
+
+                # 매수시간 이후(이상)의 첫 캔들 위치
+                after_buy_start = int(np.searchsorted(candle_datetime, candle_datetime[t] - unit_ns, side='left'))
+            continue
+
+        after_buy_cnt = t - after_buy_start + 1
+        if after_buy_cnt < 2:
+            continue
+
+        # 손절매 조건 (0.6942% 손실), 5EMA가 10EMA에 하향 교차
+        if prev_close[t] < buy_price * stop_loss_rate or (after_buy_cnt >= 3 and ema_cross_down[t]):
+            signals[t] = SIGNAL_SELL
+            position = 0
+
+    return signals
+
+
+def generate_signals(df: pd.DataFrame, unit: int = 5, params: Optional[dict] = None) -> np.ndarray:
+    """
+    전체 캔들 구간의 매수/매도 신호를 한번에 계산 (백테스트용)
+
+    캔들마다 trading_strategy(df.iloc[:t + 1], ...)를 호출한 결과와 같습니다.
+    매수 조건은 NumPy 배열로 한번에 계산하고, 매도 조건(매수 이후 캔들 개수, 손절매)만 캔들 순서대로 확인합니다.
+
+    Args:
+        df (pd.DataFrame): 가격 데이터프레임
+        unit (int): 분 단위 (매수시간 = 매수 캔들 시각 - {unit}분)
+        params (dict, optional): 매매전략 파라미터 (없으면 DEFAULT_PARAMS)
+
+    Returns:
+        np.ndarray: 캔들별 신호 (1: 매수, -1: 매도, 0: 없음)
+    """
+    return generate_signals_from_conditions(build_signal_conditions(df, unit, params))
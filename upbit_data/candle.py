@@ -1,7 +1,12 @@
-import requests
+import math
+import threading
 import pandas as pd
-
-headers = {"Accept": "application/json"}
+from typing import Optional
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from utils.upbit_client import get_upbit_client
+from upbit_data.candle_frame import CandleFrame
+from upbit_data.candle_store import load_candle_arrays, append_closed_candles
 
 """
 # 캔들 정보 조회 [분(Minutes) 기준]
@@ -33,62 +38,208 @@ URL: https://docs.upbit.com/reference/%EB%B6%84minute-%EC%BA%94%EB%93%A4-1
 """
 
 
-# 분 기준 캔들정보 가져오기
-def get_min_candle_data(market: str, minute: int):
-    candle_min_url = f'https://api.upbit.com/v1/candles/minutes/{minute}'
+CANDLE_PAGE_SIZE = 200  # 한번 호출 시 가져올 수 있는 최대 캔들 개수
+
+# 캔들 캐시
+# key: (market, minute), value: 시간순으로 정렬된 캔들 (CandleFrame)
+_candle_cache = {}
+_candle_cache_lock = threading.Lock()
+
+# (market, minute)별 갱신 lock (API 호출은 같은 key끼리만 기다림)
+_candle_key_locks = {}
+
+
+def _get_candle_key_lock(key: tuple) -> threading.Lock:
+    with _candle_cache_lock:
+        return _candle_key_locks.setdefault(key, threading.Lock())
+
+
+# 캔들정보 한 페이지(최대 200개)를 가져와서 컬럼별 배열(CandleFrame)로 변환 (캔들 시각은 여기서 한번만 파싱)
+def _get_candle_page(market: str, minute: int, to: Optional[str] = None, count: int = CANDLE_PAGE_SIZE) -> CandleFrame:
+    candle_min_path = f'/v1/candles/minutes/{minute}'
+
+    candle_min_params = {
+        "market": market,
+        "count": count
+    }
+    if to:
+        candle_min_params['to'] = to
+
+    return CandleFrame.from_api(market, minute, get_upbit_client().get(candle_min_path, params=candle_min_params).json())
+
+
+# 분 기준 캔들정보 가져오기 (CandleFrame)
+def get_min_candles(market: str, minute: int, count: int = 1000, concurrent: bool = False) -> CandleFrame:
+    # 여러 페이지를 동시에 요청하는 경우
+    if concurrent:
+        return _get_min_candles_concurrent(market, minute, count)
 
     # 모든 캔들정보를 여기에 담는다.
-    candle_all_data = None
+    pages = []
     last_time = None
 
-    # 5번 호출하여 1,000개의 데이터를 만든다.
+    # 기본값은 5번 호출하여 1,000개의 데이터를 만든다.
     # 한번 호출 시, {minute}분 간격으로 200개씩 데이터를 가져온다.
     # 이 데이터는 {minute} X 200
-    for i in range(5):
-        if i == 0:
-            candle_min_params = {
-                "market": market,
-                "count": 200
-            }
-        else:
-            candle_min_params = {
-                "market": market,
-                "to": last_time,
-                "count": 200
-            }
-        candle_min_data = pd.DataFrame(
-            requests.get(candle_min_url, params=candle_min_params, headers=headers).json())
-
-        if candle_min_data.empty or len(candle_min_data) == 0:
-            raise ValueError('캔들정보가 비어 있습니다.')
-
-        candle_min_data['date'] = candle_min_data.candle_date_time_kst.str.split('T').str[0]
-        candle_min_data['time'] = candle_min_data.candle_date_time_kst.str.split('T').str[1]
-        # candle_min_data.drop(['candle_date_time_utc', 'candle_date_time_kst', 'timestamp'], axis=1, inplace=True)
-
-        # 라이브러리에서 활용할 수 있도록 컬럼 값 형태 변경
-        candle_min_data['open'] = candle_min_data['opening_price']  # 시가
-        candle_min_data['close'] = candle_min_data['trade_price']  # 종가
-        candle_min_data['high'] = candle_min_data['high_price']  # 고가
-        candle_min_data['low'] = candle_min_data['low_price']  # 저가
-        candle_min_data['volume'] = candle_min_data['candle_acc_trade_volume']  # 거래량
-
-        # 헷갈리지 않도록 변경 전 컬럼 값은 삭제
-        candle_min_data.drop(['opening_price', 'trade_price', 'high_price', 'low_price', 'candle_acc_trade_volume'],
-                             axis=1,
-                             inplace=True)
-
-        # last_time 설정
-        # 순회하면서 다음 번 호출 시 파라미터의 'to'에 해당 값이 세팅됩니다.
-        last_time = candle_min_data['candle_date_time_utc'].iloc[-1]
+    page_cnt = math.ceil(count / CANDLE_PAGE_SIZE)
+    for i in range(page_cnt):
+        page_size = min(CANDLE_PAGE_SIZE, count - i * CANDLE_PAGE_SIZE)
+        candle_page = _get_candle_page(market, minute, to=last_time, count=page_size)
 
-        if candle_all_data is None:
-            candle_all_data = candle_min_data
+        # last_time 설정 (가장 오래된 캔들 시각)
+        # 순회하면서 다음 번 호출 시 파라미터의 'to'에 해당 값이 세팅됩니다.
+        last_time = datetime.fromtimestamp(int(candle_page['time'][0]), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+        pages.append(candle_page)
+
+    # 시간순으로 정렬하고 중복된 캔들 제거
+    return CandleFrame.concat(pages[::-1])
+
+
+# 분 기준 캔들정보 가져오기 (매매전략에서 사용하는 DataFrame, CandleFrame.to_dataframe 참고)
+def get_min_candle_data(market: str, minute: int, count: int = 1000, concurrent: bool = False) -> pd.DataFrame:
+    return get_min_candles(market, minute, count, concurrent).to_dataframe()
+
+
+# 페이지별 'to' 파라미터 미리 계산
+def _get_page_cursors(minute: int, count: int) -> list:
+    """
+    분 단위 캔들은 시작 시각이 {minute}분 간격으로 고정되어 있기 때문에,
+    이전 응답을 기다리지 않고 현재 시각만으로 페이지별 'to'(마지막 캔들 시각, 미포함)를 계산할 수 있습니다.
+
+    - 첫 페이지는 'to' 없이 요청합니다. (가장 최근 캔들)
+    - 첫 페이지는 서버 시각, 나머지는 로컬 PC 시각 기준이므로 시간 차이로 캔들이 빠지지 않도록
+      두 번째 페이지를 첫 페이지와 1개 겹치게 요청합니다. (겹치는 만큼 페이지를 하나 더 요청할 수 있음)
+    """
+    unit_sec = minute * 60
+    now_sec = int(datetime.now(timezone.utc).timestamp())
+    curr_candle_sec = now_sec - now_sec % unit_sec  # 현재 진행 중인 캔들의 시작 시각
+
+    cursors = [None]
+    for i in range(1, math.ceil((count + 1) / CANDLE_PAGE_SIZE)):
+        to_sec = curr_candle_sec - (i * CANDLE_PAGE_SIZE - 2) * unit_sec
+        cursors.append(datetime.fromtimestamp(to_sec, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'))
+
+    return cursors
+
+
+# 분 기준 캔들정보 가져오기 (여러 페이지 동시 요청)
+def _get_min_candles_concurrent(market: str, minute: int, count: int, max_workers: int = 10) -> CandleFrame:
+    """
+    미리 계산한 'to' 파라미터로 모든 페이지를 스레드 풀에서 동시에 요청한 뒤 합칩니다.
+    페이지를 순서대로 호출하지 않기 때문에 응답 대기 시간이 1번의 호출 시간 수준으로 줄어듭니다.
+
+    - 거래가 없었던 구간은 캔들이 생성되지 않으므로 {count}개보다 적게 반환될 수 있습니다.
+    - 업비트 시세 조회 API는 초당 10회로 제한되어 있어 동시 요청 수는 최대 {max_workers}개로 제한합니다.
+    """
+    cursors = _get_page_cursors(minute, count)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cursors))) as executor:
+        pages = list(executor.map(lambda to: _get_candle_page(market, minute, to=to), cursors))
+
+    # 페이지 경계에서 겹치는 캔들 제거 후 시간순으로 정렬 (겹치는 캔들은 최신 페이지 값 사용)
+    return CandleFrame.concat(pages[::-1], max_len=count)
+
+
+# 분 기준 캔들정보 가져오기 (캐시 사용, CandleFrame)
+def get_cached_min_candles(market: str, minute: int, max_len: int = 1000, use_store: bool = True) -> CandleFrame:
+    """
+    (market, minute) 별로 최근 {max_len}개의 캔들을 메모리에 보관하고,
+    호출 시에는 마지막으로 캐싱된 캔들 이후의 데이터만 가져와서 갱신합니다.
+
+    - 최초 호출(또는 캐시가 너무 오래된 경우)에는 get_min_candles로 전체 페이지를 동시에 요청하여 가져옵니다.
+    - 이후에는 1번만 호출하여 새로 생긴 캔들을 추가하고, 아직 진행 중인(마지막) 캔들은 최신 값으로 덮어씁니다.
+    - 캐시의 배열은 읽기 전용이고 갱신할 때마다 새로 만들기 때문에 복사하지 않고 반환합니다.
+    - API 호출은 (market, minute)별 lock 안에서 하므로 다른 마켓/분 단위의 조회는 기다리지 않습니다.
+    - use_store가 True이면 마감된 캔들을 로컬 저장소(candle_store)에 추가하고,
+      재시작 시에는 저장소의 데이터로 캐시를 먼저 채운 뒤 빠진 캔들만 가져옵니다.
+
+    Args:
+        market (str): 마켓 ID (ex. 'KRW-DOGE')
+        minute (int): 분 단위
+        max_len (int): 캐시에 보관할 최대 캔들 개수
+        use_store (bool): 로컬 캔들 저장소 사용 여부
+
+    Returns:
+        CandleFrame: 시간순으로 정렬된 캔들
+    """
+    key = (market, minute)
+
+    # API 호출 중에는 같은 (market, minute)만 기다리고, 캐시는 새로 만든 CandleFrame으로 교체한다.
+    with _get_candle_key_lock(key):
+        with _candle_cache_lock:
+            cached_candles = _candle_cache.get(key)
+
+        # 재시작한 경우 로컬 저장소의 데이터로 캐시를 채운다.
+        # 저장소에는 마감된 캔들만 있으므로 진행 중인 캔들 1개는 빠져있다.
+        if cached_candles is None and use_store:
+            stored_arrays = load_candle_arrays(market, minute, count=max_len)
+            if stored_arrays is not None and len(stored_arrays['time']) >= max_len - 1:
+                cached_candles = CandleFrame(market, minute, stored_arrays)
+
+        # 마지막으로 캐싱된 캔들 이후에 몇 개의 캔들이 생겼는지 계산
+        # 로컬 PC와 서버의 시간 차이를 고려하여 1개를 더 가져온다.
+        missing_cnt = None
+        if cached_candles is not None and len(cached_candles) > 0:
+            elapsed_sec = datetime.now(timezone.utc).timestamp() - int(cached_candles['time'][-1])
+            missing_cnt = max(int(elapsed_sec // (minute * 60)), 0) + 2
+
+        if missing_cnt is None or missing_cnt > CANDLE_PAGE_SIZE:
+            # 캐시가 없거나 한번 호출로 채울 수 없는 경우 전체 데이터를 다시 가져온다.
+            candles = get_min_candles(market, minute, count=max_len, concurrent=True)
         else:
-            candle_all_data = pd.concat([candle_all_data, candle_min_data], ignore_index=True)
+            candle_new = _get_candle_page(market, minute, count=missing_cnt)
+
+            # 새로 가져온 캔들 중 가장 오래된 캔들 이후의 캐시는 새로운 값으로 대체한다.
+            candles = CandleFrame.concat([cached_candles.slice_time(end=int(candle_new['time'][0])), candle_new],
+                                         max_len=max_len)
+
+        with _candle_cache_lock:
+            _candle_cache[key] = candles
+
+        if use_store:
+            append_closed_candles(market, minute, candles)
+
+        return candles
+
+
+# 분 기준 캔들정보 가져오기 (캐시 사용, 매매전략에서 사용하는 DataFrame)
+def get_cached_min_candle_data(market: str, minute: int, max_len: int = 1000, use_store: bool = True) -> pd.DataFrame:
+    """
+    get_cached_min_candles의 결과를 DataFrame으로 반환합니다. (CandleFrame.to_dataframe, 숫자 컬럼은 복사 없음)
+
+    Returns:
+        pd.DataFrame: 시간순으로 정렬된 캔들 데이터 (읽기 전용)
+    """
+    return get_cached_min_candles(market, minute, max_len, use_store).to_dataframe()
+
+
+# 캔들 캐시 내보내기 (warm_state 스냅샷)
+# 캐시의 CandleFrame은 갱신할 때마다 새로 만들기 때문에 복사하지 않는다.
+def export_candle_cache() -> dict:
+    with _candle_cache_lock:
+        return dict(_candle_cache)
+
+
+# 캔들 캐시 가져오기 (재시작 시 warm start, 이미 캐시된 (market, minute)는 유지)
+def import_candle_cache(cache: dict) -> int:
+    with _candle_cache_lock:
+        imported = 0
+        for key, candle_data in cache.items():
+            if key not in _candle_cache:
+                _candle_cache[key] = candle_data
+                imported += 1
+
+        return imported
+
 
-    # 데이터가 역순(최신순)이기 때문에 시간순으로 순서를 변경해야 한다.
-    candle_all_data.sort_values(by='candle_date_time_kst', inplace=True)
-    candle_all_data.drop_duplicates(subset=['candle_date_time_kst'], keep='last')  # 중복된 데이터 제거
+# 캔들 캐시 초기화
+def clear_candle_cache(market: Optional[str] = None, minute: Optional[int] = None):
+    with _candle_cache_lock:
+        if market is None and minute is None:
+            _candle_cache.clear()
+            return
 
-    return candle_all_data
+        for key in list(_candle_cache.keys()):
+            if (market is None or key[0] == market) and (minute is None or key[1] == minute):
+                del _candle_cache[key]
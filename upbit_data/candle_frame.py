@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+"""
+# 캔들 컨테이너 (CandleFrame)
+
+REST API 응답(JSON)을 DataFrame으로 그대로 만들면 마켓명, UTC/KST 시각 문자열, date/time 문자열 등
+문자열 컬럼이 캔들마다 들어가서 1,000개 기준 메모리의 대부분을 차지하고, 매매전략에서는 매번
+'date' + 'time' 문자열을 다시 파싱하여 캔들 시각을 만듭니다.
+
+CandleFrame은 캔들을 컬럼별 연속된 numpy 배열로 보관하고, 캔들 시각은 받을 때 한번만 파싱하여 int64(epoch seconds)로 저장합니다.
+
+- 컬럼: candle_store와 동일 (time, timestamp, open, high, low, close, volume, acc_trade_price)
+- 배열은 읽기 전용이며 시간순으로 정렬되어 있고 같은 시각의 캔들은 하나만 있습니다.
+- to_dataframe(): 매매전략/지표 캐시에서 사용하는 DataFrame (숫자 컬럼은 복사 없이 배열을 그대로 사용)
+  - market, unit: 마켓 ID, 분 단위 (지표 캐시의 캔들 구간 식별)
+  - datetime: 캔들 기준 시각 (KST, datetime64) - 'date', 'time' 문자열 컬럼 대신 사용
+  - timestamp, candle_acc_trade_price, open, close, high, low, volume: 기존 컬럼과 동일
+"""
+
+KST_OFFSET_SEC = 9 * 60 * 60  # UTC + 9시간
+
+# 컬럼명: dtype
+CANDLE_COLUMNS = {
+    'time': np.int64,
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+    'acc_trade_price': np.float64,
+}
+
+# API 응답 필드 -> 컬럼 (time 제외)
+_API_FIELDS = {
+    'timestamp': 'timestamp',
+    'open': 'opening_price',
+    'high': 'high_price',
+    'low': 'low_price',
+    'close': 'trade_price',
+    'volume': 'candle_acc_trade_volume',
+    'acc_trade_price': 'candle_acc_trade_price',
+}
+
+
+class CandleFrame:
+    __slots__ = ('market', 'unit', 'arrays')
+
+    def __init__(self, market: str, unit: int, arrays: dict):
+        """
+        Args:
+            market (str): 마켓 ID (ex. 'KRW-DOGE')
+            unit (int): 분 단위
+            arrays (dict): {컬럼명: np.ndarray} (시간순 정렬, candle_store 컬럼)
+        """
+        self.market = market
+        self.unit = unit
+        self.arrays = {}
+
+        # 원본 배열(memmap, shared memory 등)은 그대로 두고 읽기 전용 view로 보관
+        for column, dtype in CANDLE_COLUMNS.items():
+            values = np.ascontiguousarray(arrays[column], dtype=dtype).view()
+            values.setflags(write=False)
+            self.arrays[column] = values
+
+    @classmethod
+    def from_api(cls, market: str, unit: int, rows: list) -> 'CandleFrame':
+        """
+        캔들 API 응답(최신순)으로 만들기 (캔들 시각 문자열은 여기서 한번만 파싱)
+
+        Args:
+            market (str): 마켓 ID
+            unit (int): 분 단위
+            rows (list): [{'candle_date_time_utc': ..., 'opening_price': ..., ...}, ...]
+        """
+        # API 오류 응답 (ex. {'error': {'name': 'too_many_requests', 'message': ...}})
+        if isinstance(rows, dict):
+            error = rows.get('error') or {}
+            message = error.get('message', error) if isinstance(error, dict) else error
+            raise ValueError(f'캔들정보 조회 오류 : {message or rows}')
+
+        if not isinstance(rows, list):
+            raise ValueError(f'캔들정보 응답 형식이 올바르지 않습니다. ({type(rows).__name__})')
+
+        if not rows:
+            raise ValueError('캔들정보가 비어 있습니다.')
+
+        times = np.array([row['candle_date_time_utc'] for row in rows], dtype='datetime64[s]').astype(np.int64)
+        values = np.array([[row[field] for field in _API_FIELDS.values()] for row in rows], dtype=np.float64)
+
+        order = np.argsort(times, kind='stable')
+        arrays = {'time': times[order]}
+        for i, column in enumerate(_API_FIELDS):
+            arrays[column] = values[order, i]
+
+        return cls(market, unit, arrays)
+
+    @classmethod
+    def concat(cls, frames: list, max_len: Optional[int] = None) -> 'CandleFrame':
+        """
+        여러 CandleFrame 합치기 (같은 시각의 캔들은 뒤에 있는 frame의 값 사용, 시간순 정렬)
+
+        Args:
+            frames (list): [CandleFrame, ...] (같은 마켓, 분 단위)
+            max_len (int, optional): 최근 {max_len}개만 남기기
+        """
+        arrays = {column: np.concatenate([frame.arrays[column] for frame in frames]) for column in CANDLE_COLUMNS}
+
+        # 뒤에서부터 처음 나온 시각의 위치 (np.unique는 시각순으로 정렬된 결과를 반환)
+        times = arrays['time']
+        _, reversed_index = np.unique(times[::-1], return_index=True)
+        index = len(times) - 1 - reversed_index
+        if max_len is not None:
+            index = index[-max_len:]
+
+        return cls(frames[0].market, frames[0].unit, {column: values[index] for column, values in arrays.items()})
+
+    def __len__(self) -> int:
+        return len(self.arrays['time'])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.arrays[column]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def slice_time(self, start: Optional[int] = None, end: Optional[int] = None) -> 'CandleFrame':
+        """
+        시각 구간의 캔들 (UTC epoch seconds, start 포함, end 미포함, 복사 없음)
+        """
+        times = self.arrays['time']
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+
+        return CandleFrame(self.market, self.unit, {column: values[lo:hi] for column, values in self.arrays.items()})
+
+    def tail(self, n: int) -> 'CandleFrame':
+        return CandleFrame(self.market, self.unit, {column: values[-n:] for column, values in self.arrays.items()})
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        매매전략에서 사용하는 DataFrame (숫자 컬럼은 배열을 복사하지 않고 그대로 사용, 읽기 전용)
+        """
+        arrays = self.arrays
+        candle_datetime = ((arrays['time'] + KST_OFFSET_SEC) * 1_000_000_000).astype('datetime64[ns]')
+
+        # 마켓 ID는 캔들마다 문자열을 두지 않도록 category 1개로 표현
+        market = pd.Categorical.from_codes(np.zeros(len(self), dtype=np.int8), categories=[self.market])
+
+        return pd.DataFrame({
+            'market': market,
+            'unit': self.unit,
+            'datetime': candle_datetime,
+            'timestamp': arrays['timestamp'],
+            'candle_acc_trade_price': arrays['acc_trade_price'],
+            'open': arrays['open'],
+            'close': arrays['close'],
+            'high': arrays['high'],
+            'low': arrays['low'],
+            'volume': arrays['volume'],
+        }, copy=False)
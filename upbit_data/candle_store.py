@@ -0,0 +1,196 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional
+from datetime import datetime, timezone
+from upbit_data.candle_frame import CandleFrame
+
+"""
+# 캔들 저장소 (로컬 디스크)
+
+마감된 캔들을 (market, unit) 별로 컬럼 단위의 고정 길이 바이너리 파일에 추가(append)합니다.
+읽을 때는 numpy memmap을 사용하기 때문에 파일 전체를 읽지 않고 필요한 구간만 복사 없이 접근합니다.
+재시작하거나 백테스트를 할 때 몇 달치 1분/5분봉 데이터를 API 호출 없이 바로 불러올 수 있습니다.
+
+## 디렉토리 구조
+- {CANDLE_STORE_DIR}/{market}_{unit}m/{column}.{dtype}
+  (ex. data/candles/KRW-DOGE_5m/close.f8)
+
+## 컬럼
+- time: 캔들 기준 시각 (UTC, epoch seconds)
+- timestamp: 해당 캔들에서 마지막 틱이 저장된 시각 (epoch milliseconds)
+- open, high, low, close: 시가, 고가, 저가, 종가
+- volume: 누적 거래량
+- acc_trade_price: 누적 거래 금액
+"""
+
+CANDLE_STORE_DIR = os.getenv(
+    'CANDLE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'candles'))
+
+# 컬럼명: (파일 확장자, dtype)
+STORE_COLUMNS = {
+    'time': ('i8', np.int64),
+    'timestamp': ('i8', np.int64),
+    'open': ('f8', np.float64),
+    'high': ('f8', np.float64),
+    'low': ('f8', np.float64),
+    'close': ('f8', np.float64),
+    'volume': ('f8', np.float64),
+    'acc_trade_price': ('f8', np.float64),
+}
+
+# 마지막으로 저장된 캔들 시각 (파일을 매번 읽지 않도록 메모리에 보관)
+_last_stored_time = {}
+_store_lock = threading.Lock()
+
+
+def _store_path(market: str, minute: int) -> str:
+    return os.path.join(CANDLE_STORE_DIR, f'{market}_{minute}m')
+
+
+def _column_path(market: str, minute: int, column: str) -> str:
+    ext, _ = STORE_COLUMNS[column]
+    return os.path.join(_store_path(market, minute), f'{column}.{ext}')
+
+
+# 저장된 캔들 개수 확인
+# 추가(append) 도중 프로세스가 종료되면 컬럼별 길이가 다를 수 있으므로 가장 짧은 길이를 기준으로 한다.
+def _stored_len(market: str, minute: int) -> int:
+    lengths = []
+    for column, (_, dtype) in STORE_COLUMNS.items():
+        path = _column_path(market, minute, column)
+        if not os.path.exists(path):
+            return 0
+        lengths.append(os.path.getsize(path) // np.dtype(dtype).itemsize)
+
+    return min(lengths)
+
+
+# 컬럼별 길이를 맞춘다. (중간에 끊긴 append 복구)
+def _repair(market: str, minute: int) -> int:
+    length = _stored_len(market, minute)
+    for column, (_, dtype) in STORE_COLUMNS.items():
+        path = _column_path(market, minute, column)
+        if os.path.exists(path) and os.path.getsize(path) != length * np.dtype(dtype).itemsize:
+            os.truncate(path, length * np.dtype(dtype).itemsize)
+
+    return length
+
+
+def _get_last_stored_time(market: str, minute: int) -> Optional[int]:
+    key = (market, minute)
+    if key not in _last_stored_time:
+        length = _repair(market, minute)
+        if length == 0:
+            _last_stored_time[key] = None
+        else:
+            times = np.memmap(_column_path(market, minute, 'time'), dtype=np.int64, mode='r', shape=(length,))
+            _last_stored_time[key] = int(times[-1])
+
+    return _last_stored_time[key]
+
+
+# 마감된 캔들 저장
+def append_closed_candles(market: str, minute: int, candles: CandleFrame) -> int:
+    """
+    캔들(CandleFrame, 시간순 정렬)에서 마감된 캔들만 골라 저장소에 추가합니다.
+    이미 저장된 캔들(마지막 저장 시각 이전)은 건너뜁니다.
+
+    Args:
+        market (str): 마켓 ID (ex. 'KRW-DOGE')
+        minute (int): 분 단위
+        candles (CandleFrame): 캔들 데이터
+
+    Returns:
+        int: 새로 저장된 캔들 개수
+    """
+    if candles is None or len(candles) == 0:
+        return 0
+
+    times = candles['time']
+
+    # 캔들 시작 시각 + 분 단위가 현재 시각보다 이전이면 마감된 캔들
+    now_sec = int(datetime.now(timezone.utc).timestamp())
+    closed_mask = times + minute * 60 <= now_sec
+
+    with _store_lock:
+        last_time = _get_last_stored_time(market, minute)
+        if last_time is not None:
+            closed_mask &= times > last_time
+
+        if not closed_mask.any():
+            return 0
+
+        columns = {column: candles[column][closed_mask] for column in STORE_COLUMNS}
+
+        os.makedirs(_store_path(market, minute), exist_ok=True)
+        for column, (_, dtype) in STORE_COLUMNS.items():
+            with open(_column_path(market, minute, column), 'ab') as f:
+                columns[column].astype(dtype, copy=False).tofile(f)
+
+        _last_stored_time[(market, minute)] = int(columns['time'][-1])
+
+        return len(columns['time'])
+
+
+# 저장된 캔들을 memmap으로 가져오기
+def load_candle_arrays(
+        market: str,
+        minute: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        count: Optional[int] = None
+) -> Optional[dict]:
+    """
+    저장된 캔들을 컬럼별 numpy memmap(읽기 전용)으로 반환합니다.
+    반환된 배열은 파일을 그대로 참조하기 때문에 복사 비용이 없습니다.
+
+    Args:
+        market (str): 마켓 ID
+        minute (int): 분 단위
+        start (int, optional): 시작 시각 (UTC epoch seconds, 포함)
+        end (int, optional): 종료 시각 (UTC epoch seconds, 미포함)
+        count (int, optional): 마지막 {count}개만 가져오기
+
+    Returns:
+        dict: {컬럼명: np.ndarray}, 저장된 데이터가 없으면 None
+    """
+    with _store_lock:
+        length = _repair(market, minute)
+
+    if length == 0:
+        return None
+
+    arrays = {
+        column: np.memmap(_column_path(market, minute, column), dtype=dtype, mode='r', shape=(length,))
+        for column, (_, dtype) in STORE_COLUMNS.items()
+    }
+
+    lo = 0 if start is None else int(np.searchsorted(arrays['time'], start, side='left'))
+    hi = length if end is None else int(np.searchsorted(arrays['time'], end, side='left'))
+    if count is not None:
+        lo = max(lo, hi - count)
+
+    return {column: arr[lo:hi] for column, arr in arrays.items()}
+
+
+# 저장된 캔들을 get_min_candle_data와 같은 형태의 DataFrame으로 가져오기
+def load_candle_data(
+        market: str,
+        minute: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        count: Optional[int] = None
+) -> Optional[pd.DataFrame]:
+    arrays = load_candle_arrays(market, minute, start=start, end=end, count=count)
+    if arrays is None or len(arrays['time']) == 0:
+        return None
+
+    return build_candle_frame(market, minute, arrays)
+
+
+# 컬럼별 배열을 get_min_candle_data와 같은 형태의 DataFrame으로 변환 (CandleFrame.to_dataframe)
+def build_candle_frame(market: str, minute: int, arrays: dict) -> pd.DataFrame:
+    return CandleFrame(market, minute, arrays).to_dataframe()
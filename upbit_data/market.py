@@ -0,0 +1,36 @@
+import pandas as pd
+from utils.upbit_client import get_upbit_client
+
+"""
+# 마켓 코드 조회
+URL: https://docs.upbit.com/reference/%EB%A7%88%EC%BC%93-%EC%BD%94%EB%93%9C-%EC%A1%B0%ED%9A%8C
+
+[GET] https://api.upbit.com/v1/market/all
+
+## Request
+- isDetails: 유의종목 필드과 같은 상세 정보 노출 여부 (기본값: false)
+
+## Response
+- market: 업비트에서 제공중인 시장 정보 (ex. 'KRW-BTC')
+- korean_name: 거래 대상 디지털 자산 한글명
+- english_name: 거래 대상 디지털 자산 영문명
+- market_event: 시장 경보 정보 (isDetails=true 인 경우)
+"""
+
+market_all_path = '/v1/market/all'
+
+
+def get_market_all(is_details: bool = False) -> pd.DataFrame:
+    market_all = pd.DataFrame(
+        get_upbit_client().get(market_all_path, params={'isDetails': 'true' if is_details else 'false'}).json())
+
+    if market_all.empty or 'market' not in market_all.columns:
+        raise ValueError('마켓 정보가 비어 있습니다.')
+
+    return market_all
+
+
+# 원화(KRW) 마켓 목록 (ex. ['KRW-BTC', 'KRW-ETH', ...])
+def get_krw_markets() -> list:
+    market_all = get_market_all()
+    return market_all.loc[market_all['market'].str.startswith('KRW-'), 'market'].tolist()
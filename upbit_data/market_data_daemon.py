@@ -0,0 +1,340 @@
+import os, sys, time, signal, logging, argparse, threading
+import numpy as np
+import pandas as pd
+from typing import Optional
+from multiprocessing import shared_memory, resource_tracker
+
+# python upbit_data/market_data_daemon.py 로 실행하는 경우를 위해 프로젝트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upbit_data.candle import get_cached_min_candles
+from upbit_data.candle_store import STORE_COLUMNS, build_candle_frame
+from upbit_data.websocket_feed import TradeFeed
+
+"""
+# 시세 데이터 데몬 (shared memory)
+
+캔들 조회(REST 또는 WebSocket)는 데몬 프로세스 하나만 하고, 최근 캔들을 (market, unit)별 shared memory
+링 버퍼에 게시(publish)합니다. 매매 프로세스(main.py, main_bb_breakout.py 등)는 shared memory에 연결(attach)하여
+직접 읽기 때문에 API를 호출하지 않습니다. 매매 프로세스를 추가해도 API 요청 수는 늘어나지 않습니다.
+
+## shared memory 구조 (이름: {MARKET_DATA_SHM_PREFIX}_{market}_{unit}m)
+- header (int64 x 8): 시퀀스 번호, 누적 캔들 수, 용량, 마지막 게시 시각(ms), 게시 주기(ms), 데몬 PID
+- 컬럼별 배열 (용량 x 8 bytes): candle_store의 컬럼과 동일 (time, timestamp, open, high, low, close, volume, acc_trade_price)
+- 누적 i번째 캔들은 {i % 용량} 위치에 저장되며, 마지막 캔들은 진행 중인 캔들입니다.
+- WebSocket 연결이 끊겼다가 다시 연결되면 끊긴 구간을 REST API로 채울 때까지(TradeFeed.is_stale) 게시하지 않습니다.
+
+## 시퀀스 번호 (seqlock)
+- 데몬은 쓰기 전후로 시퀀스 번호를 1씩 증가시킵니다. (쓰는 중에는 홀수)
+- 읽는 쪽은 복사 전후의 시퀀스 번호가 같고 짝수일 때만 결과를 사용하고, 아니면 다시 읽습니다. (잠금 없음)
+
+## 실행
+- python -m upbit_data.market_data_daemon --markets KRW-DOGE --units 5
+- python -m upbit_data.market_data_daemon --markets KRW-DOGE --units 5 --source rest --interval 5
+
+## 환경변수 (.env)
+- MARKET_DATA_SHM_PREFIX: shared memory 이름 앞부분 (기본값: upbit)
+"""
+
+MARKET_DATA_SHM_PREFIX = os.getenv('MARKET_DATA_SHM_PREFIX', 'upbit')
+
+logger = logging.getLogger(__name__)
+
+# header 인덱스
+_SEQ, _COUNT, _CAPACITY, _UPDATED_MS, _INTERVAL_MS, _PID = range(6)
+_HEADER_LEN = 8
+_ITEM_SIZE = 8  # 컬럼 dtype 크기 (int64, float64)
+
+_READ_RETRY = 100  # 쓰는 중일 때 다시 읽는 횟수
+
+# 이 프로세스에서 만든 shared memory 이름 (데몬과 reader가 같은 프로세스인 경우)
+_created_names = set()
+
+
+def shm_name(market: str, unit: int) -> str:
+    return f'{MARKET_DATA_SHM_PREFIX}_{market}_{unit}m'
+
+
+def _shm_size(capacity: int) -> int:
+    return (_HEADER_LEN + capacity * len(STORE_COLUMNS)) * _ITEM_SIZE
+
+
+# shared memory 버퍼를 header, 컬럼별 배열로 나누기 (복사 없음)
+def _map_buffer(buf, capacity: int) -> tuple:
+    header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=buf)
+    columns = {}
+    offset = _HEADER_LEN * _ITEM_SIZE
+    for column, (_, dtype) in STORE_COLUMNS.items():
+        columns[column] = np.ndarray((capacity,), dtype=dtype, buffer=buf, offset=offset)
+        offset += capacity * _ITEM_SIZE
+
+    return header, columns
+
+
+class CandleRingWriter:
+    """
+    (market, unit) 캔들 링 버퍼 쓰기 (데몬 전용, 채널당 하나의 writer)
+    """
+
+    def __init__(self, market: str, unit: int, capacity: int = 1000, interval_sec: float = 1.0):
+        self.market = market
+        self.unit = unit
+        self.capacity = capacity
+        self.name = shm_name(market, unit)
+
+        # 이전에 비정상 종료된 데몬의 shared memory가 남아 있으면 지우고 새로 만든다.
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=_shm_size(capacity))
+        except FileExistsError:
+            old_shm = shared_memory.SharedMemory(name=self.name)
+            old_shm.close()
+            old_shm.unlink()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=_shm_size(capacity))
+
+        _created_names.add(self.name)
+
+        self._header, self._columns = _map_buffer(self._shm.buf, capacity)
+        self._header[:] = 0
+        self._header[_CAPACITY] = capacity
+        self._header[_INTERVAL_MS] = int(interval_sec * 1000)
+        self._header[_PID] = os.getpid()
+
+    def publish(self, arrays: dict) -> int:
+        """
+        캔들 배열(시간순)을 링 버퍼에 반영합니다.
+        마지막으로 게시한 캔들(진행 중인 캔들)부터 이후 캔들만 씁니다.
+
+        Args:
+            arrays (dict): {컬럼명: np.ndarray} (candle_store 컬럼)
+
+        Returns:
+            int: 새로 추가된 캔들 개수
+        """
+        header = self._header
+        times = arrays['time']
+        count = int(header[_COUNT])
+
+        # 마지막 게시 캔들 이후만 쓰기 (같은 시각의 캔들은 덮어쓰기)
+        start = 0
+        last_time = None
+        if count > 0:
+            last_time = self._columns['time'][(count - 1) % self.capacity]
+            start = int(np.searchsorted(times, last_time, side='left'))
+        start = max(start, len(times) - self.capacity)
+
+        new_len = len(times) - start
+        first = count - 1 if new_len > 0 and last_time is not None and times[start] == last_time else count
+        positions = np.arange(first, first + new_len) % self.capacity
+
+        header[_SEQ] += 1  # 쓰기 시작 (홀수)
+        for column in STORE_COLUMNS:
+            self._columns[column][positions] = arrays[column][start:]
+        header[_COUNT] = first + new_len
+        header[_UPDATED_MS] = int(time.time() * 1000)
+        header[_SEQ] += 1  # 쓰기 완료 (짝수)
+
+        return first + new_len - count
+
+    def close(self):
+        self._header = self._columns = None
+        self._shm.close()
+        self._shm.unlink()
+        _created_names.discard(self.name)
+
+
+class CandleRingReader:
+    """
+    (market, unit) 캔들 링 버퍼 읽기 (매매 프로세스)
+    """
+
+    def __init__(self, market: str, unit: int):
+        self.market = market
+        self.unit = unit
+        self._shm = shared_memory.SharedMemory(name=shm_name(market, unit))
+
+        # 연결만 한 프로세스가 종료될 때 shared memory가 삭제되지 않도록 resource_tracker 등록 해제
+        # (생성/삭제는 데몬이 담당)
+        if self._shm.name not in _created_names:
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+
+        capacity = int(np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=self._shm.buf)[_CAPACITY])
+        self._header, self._columns = _map_buffer(self._shm.buf, capacity)
+        self.capacity = capacity
+
+    # 데몬이 게시 주기의 3배(+1초) 넘게 갱신하지 않았으면 사용하지 않는다.
+    def is_fresh(self) -> bool:
+        updated_ms = int(self._header[_UPDATED_MS])
+        interval_ms = int(self._header[_INTERVAL_MS])
+        return updated_ms > 0 and time.time() * 1000 - updated_ms <= interval_ms * 3 + 1000
+
+    def read_arrays(self, count: Optional[int] = None, include_current: bool = True) -> Optional[dict]:
+        """
+        최근 캔들을 컬럼별 배열(복사본)로 가져오기
+
+        Args:
+            count (int, optional): 마지막 {count}개만 가져오기
+            include_current (bool): 진행 중인 캔들 포함 여부
+
+        Returns:
+            dict: {컬럼명: np.ndarray}, 게시된 캔들이 없으면 None
+        """
+        header = self._header
+        for _ in range(_READ_RETRY):
+            seq = int(header[_SEQ])
+            if seq % 2 == 1:
+                time.sleep(0)
+                continue
+
+            total = int(header[_COUNT])
+            end = total if include_current else total - 1
+            length = min(end, self.capacity, end if count is None else count)
+            positions = np.arange(end - length, end) % self.capacity
+            arrays = {column: values[positions] for column, values in self._columns.items()}
+
+            if int(header[_SEQ]) == seq:
+                return arrays if length > 0 else None
+
+        raise ValueError(f'[{self.market}] 캔들 링 버퍼를 읽지 못했습니다. (쓰기 중)')
+
+    def get_candle_data(self, count: Optional[int] = None, include_current: bool = True) -> Optional[pd.DataFrame]:
+        arrays = self.read_arrays(count, include_current)
+        if arrays is None:
+            return None
+
+        return build_candle_frame(self.market, self.unit, arrays)
+
+    def close(self):
+        self._header = self._columns = None
+        self._shm.close()
+
+
+# 프로세스별 reader (최초 호출 시 연결)
+_readers = {}
+
+
+def get_shared_candle_data(market: str, unit: int, count: Optional[int] = None) -> Optional[pd.DataFrame]:
+    """
+    시세 데이터 데몬이 게시한 캔들을 get_min_candle_data와 같은 형태로 가져오기
+
+    Returns:
+        pd.DataFrame: 캔들 데이터, 데몬이 실행 중이 아니거나 갱신이 멈췄으면 None (REST API로 직접 조회)
+    """
+    key = (market, unit)
+    reader = _readers.get(key)
+
+    # 데몬이 다시 시작되면 새로 만든 shared memory에 다시 연결한다.
+    if reader is not None and not reader.is_fresh():
+        _readers.pop(key).close()
+        reader = None
+
+    if reader is None:
+        try:
+            reader = _readers[key] = CandleRingReader(market, unit)
+        except FileNotFoundError:
+            return None
+
+    if not reader.is_fresh():
+        return None
+
+    return reader.get_candle_data(count)
+
+
+class MarketDataDaemon:
+    """
+    캔들 조회 후 shared memory에 게시
+
+    - websocket: 시작할 때 REST API로 캔들을 한번 가져오고, 이후에는 체결 데이터로 만든 캔들을 {interval_sec}마다 게시
+    - rest: {interval_sec}마다 get_cached_min_candles(새로 생긴 캔들만 조회)로 가져와서 게시
+    """
+
+    def __init__(
+            self,
+            markets: list,
+            units: tuple = (5,),
+            capacity: int = 1000,
+            source: str = 'websocket',
+            interval_sec: Optional[float] = None
+    ):
+        if source not in ('websocket', 'rest'):
+            raise ValueError(f'지원하지 않는 source 입니다. ({source})')
+
+        self.markets = list(markets)
+        self.units = tuple(units)
+        self.capacity = capacity
+        self.source = source
+        self.interval_sec = interval_sec if interval_sec is not None else (1.0 if source == 'websocket' else 5.0)
+
+        self.feed = None
+        self.writers = {}
+        self._stop_event = threading.Event()
+
+    def start(self):
+        for market in self.markets:
+            for unit in self.units:
+                self.writers[(market, unit)] = CandleRingWriter(market, unit, self.capacity, self.interval_sec)
+
+        if self.source == 'websocket':
+            self.feed = TradeFeed(self.markets, units=self.units, max_len=self.capacity)
+            for market in self.markets:
+                for unit in self.units:
+                    self.feed.aggregators[market].seed(
+                        unit, get_cached_min_candles(market, unit, max_len=self.capacity))
+            self.feed.start()
+
+        logger.info(f'시세 데이터 데몬 시작 : {self.markets}, {self.units}분봉, {self.source}')
+
+    def publish_once(self):
+        for (market, unit), writer in self.writers.items():
+            try:
+                if self.source == 'websocket':
+                    # 재연결 후 보정이 끝날 때까지 게시하지 않는다. (reader는 갱신이 멈춘 것으로 보고 REST API로 조회)
+                    if self.feed.is_stale():
+                        continue
+                    arrays = self.feed.aggregators[market].get_candle_arrays(unit)
+                else:
+                    arrays = get_cached_min_candles(market, unit, max_len=self.capacity).arrays
+
+                if arrays is not None:
+                    writer.publish(arrays)
+            except Exception as e:
+                logger.error(f'[{market}] {unit}분봉 게시 실패 : {e}')
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop_event.is_set():
+                started = time.monotonic()
+                self.publish_once()
+                self._stop_event.wait(max(0.0, self.interval_sec - (time.monotonic() - started)))
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        if self.feed is not None:
+            self.feed.stop()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='시세 데이터 데몬 (shared memory)')
+    parser.add_argument('--markets', nargs='+', default=['KRW-DOGE'])
+    parser.add_argument('--units', nargs='+', type=int, default=[5])
+    parser.add_argument('--capacity', type=int, default=1000)
+    parser.add_argument('--source', default='websocket', choices=['websocket', 'rest'])
+    parser.add_argument('--interval', type=float, default=None, help='게시 주기 (초)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    daemon = MarketDataDaemon(args.markets, tuple(args.units), args.capacity, args.source, args.interval)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,466 @@
+import os, json, uuid, time, asyncio, logging, threading
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Optional, Callable
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from upbit_data.candle import get_min_candles
+from upbit_data.candle_frame import CandleFrame
+from upbit_data.candle_store import build_candle_frame
+
+"""
+# 실시간 체결(Trade) 구독 및 캔들 생성
+URL: https://docs.upbit.com/reference/websocket-trade
+
+[WebSocket] wss://api.upbit.com/websocket/v1
+
+## Request
+- [{"ticket": "고유 식별자"}, {"type": "trade", "codes": ["KRW-DOGE"]}, {"format": "DEFAULT"}]
+
+## Response (type: trade)
+- code: 마켓 코드 (ex. 'KRW-DOGE')
+- trade_price: 체결 가격
+- trade_volume: 체결량
+- ask_bid: 매수/매도 구분 (ASK: 매도, BID: 매수)
+- trade_timestamp: 체결 타임스탬프 (milliseconds)
+- sequential_id: 체결 번호 (Unique)
+
+REST API를 주기적으로 호출하지 않고, 체결 데이터로 1/3/5/15분봉 캔들을 직접 만듭니다.
+만들어진 캔들은 get_min_candle_data와 같은 컬럼 형태로 가져올 수 있습니다.
+
+## 재연결 후 보정 (backfill)
+- 연결이 끊긴 동안의 체결은 받을 수 없으므로 캔들이 비거나 잘못된 값이 됩니다.
+- 연결이 끊기면 stale 상태가 되고(is_stale), 다시 연결되면 끊긴 구간의 캔들을 REST API(get_min_candles)로 가져와 채웁니다.
+- 보정하는 동안 수신한 체결은 그대로 반영하면서 따로 보관했다가, REST 캔들에 포함되지 않은 체결만 다시 반영합니다.
+- 모든 마켓의 보정이 끝나야 stale 상태가 해제됩니다. (실패하면 다음 재연결 때 다시 시도)
+
+## 환경변수 (.env)
+- UPBIT_WS_URL: WebSocket 주소 (기본값: wss://api.upbit.com/websocket/v1)
+"""
+
+UPBIT_WS_URL = os.getenv('UPBIT_WS_URL', 'wss://api.upbit.com/websocket/v1')
+
+logger = logging.getLogger(__name__)
+
+# 캔들 배열 인덱스
+# [시작 시각(UTC epoch seconds), 시가, 고가, 저가, 종가, 거래량, 거래금액, 마지막 체결 시각(ms)]
+_TIME, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _ACC_PRICE, _LAST_TS = range(8)
+
+BACKFILL_RETRY = 3  # 재연결 후 보정 실패 시 다시 시도하는 횟수
+
+
+# CandleFrame을 캔들 배열(행 목록)로 변환
+def _candle_rows(candles: CandleFrame) -> np.ndarray:
+    return np.column_stack([
+        candles['time'],
+        candles['open'],
+        candles['high'],
+        candles['low'],
+        candles['close'],
+        candles['volume'],
+        candles['acc_trade_price'],
+        candles['timestamp'],
+    ]).astype(np.float64)
+
+
+class CandleAggregator:
+    """
+    체결 데이터로 분 단위 캔들을 만듭니다.
+
+    - 캔들 시작 시각은 UTC 기준으로 {unit}분 단위로 맞춥니다. (업비트 캔들과 동일)
+    - 새로운 구간의 체결이 들어오면 진행 중이던 캔들을 마감하고 새 캔들을 시작합니다.
+    - 진행 중인 캔들보다 이전 시각의 체결(순서가 바뀐 체결)은 무시합니다.
+    - 재연결 후에는 begin_backfill -> backfill(단위별) -> end_backfill 순서로 끊긴 구간을 채웁니다.
+    """
+
+    def __init__(self, market: str, units: tuple = (1, 3, 5, 15), max_len: int = 1000):
+        self.market = market
+        self.units = tuple(units)
+        self.dropped = 0  # 무시한 체결 수
+
+        # 단위별 마감된 캔들, 진행 중인 캔들
+        self._closed = {unit: deque(maxlen=max_len) for unit in self.units}
+        self._current = {unit: None for unit in self.units}
+        self._pending = None  # 보정 중에 수신한 체결 [(가격, 체결량, 체결 시각), ...] (보정 중이 아니면 None)
+        self._lock = threading.Lock()
+
+    # REST API로 가져온 캔들로 초기값 설정 (CandleFrame, 시간순 정렬)
+    def seed(self, unit: int, candles: CandleFrame):
+        rows = _candle_rows(candles)
+
+        with self._lock:
+            self._closed[unit].clear()
+            for row in rows[:-1]:
+                self._closed[unit].append(list(row))
+
+            # 마지막 캔들은 진행 중인 캔들로 간주
+            self._current[unit] = list(rows[-1]) if len(rows) > 0 else None
+
+    def on_trade(self, price: float, volume: float, trade_timestamp: int) -> list:
+        """
+        체결 데이터 반영
+
+        Args:
+            price (float): 체결 가격
+            volume (float): 체결량
+            trade_timestamp (int): 체결 시각 (epoch milliseconds)
+
+        Returns:
+            list: 이번 체결로 마감된 캔들 [(unit, 캔들 배열), ...]
+        """
+        closed_candles = []
+
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((price, volume, trade_timestamp))
+
+            for unit in self.units:
+                self._apply(unit, price, volume, trade_timestamp, closed_candles)
+
+        return closed_candles
+
+    # 단위별 체결 반영 (잠금 상태에서 호출)
+    def _apply(self, unit: int, price: float, volume: float, trade_timestamp: int, closed_candles: list):
+        trade_sec = trade_timestamp // 1000
+        candle_time = trade_sec - trade_sec % (unit * 60)
+        current = self._current[unit]
+
+        if current is not None and candle_time < current[_TIME]:
+            self.dropped += 1
+            return
+
+        if current is None or candle_time > current[_TIME]:
+            if current is not None:
+                self._closed[unit].append(current)
+                closed_candles.append((unit, list(current)))
+
+            self._current[unit] = [candle_time, price, price, price, price, volume, price * volume, trade_timestamp]
+            return
+
+        current[_HIGH] = max(current[_HIGH], price)
+        current[_LOW] = min(current[_LOW], price)
+        current[_CLOSE] = price
+        current[_VOLUME] += volume
+        current[_ACC_PRICE] += price * volume
+        current[_LAST_TS] = trade_timestamp
+
+    # 보정 시작 (이후 수신한 체결을 보관), 단위별 진행 중인 캔들 시각(보정 시작 시각) 반환
+    def begin_backfill(self) -> dict:
+        with self._lock:
+            self._pending = []
+            return {unit: int(current[_TIME]) for unit, current in self._current.items() if current is not None}
+
+    def backfill(self, unit: int, candles: CandleFrame):
+        """
+        연결이 끊긴 구간을 REST API로 가져온 캔들로 채우기
+
+        - REST 캔들의 첫 시각부터 이후 캔들(마감된 캔들, 진행 중인 캔들)은 REST 캔들로 바꿉니다.
+        - begin_backfill 이후 수신한 체결 중 REST 캔들의 마지막 체결 시각 이후의 체결만 다시 반영합니다.
+
+        Args:
+            unit (int): 분 단위
+            candles (CandleFrame): 끊긴 구간을 포함하는 최근 캔들 (시간순 정렬)
+        """
+        rows = _candle_rows(candles)
+        if len(rows) == 0:
+            return
+
+        with self._lock:
+            closed = self._closed[unit]
+            while len(closed) > 0 and closed[-1][_TIME] >= rows[0][_TIME]:
+                closed.pop()
+            for row in rows[:-1]:
+                closed.append(list(row))
+            self._current[unit] = list(rows[-1])
+
+            last_ts = rows[-1][_LAST_TS]
+            for price, volume, trade_timestamp in self._pending or ():
+                if trade_timestamp > last_ts:
+                    self._apply(unit, price, volume, trade_timestamp, [])
+
+    # 보정 종료 (보관한 체결 삭제)
+    def end_backfill(self):
+        with self._lock:
+            self._pending = None
+
+    # 진행 중인 캔들
+    def get_current_candle(self, unit: int) -> Optional[dict]:
+        with self._lock:
+            current = self._current[unit]
+            if current is None:
+                return None
+
+            return {
+                'time': int(current[_TIME]),
+                'open': current[_OPEN],
+                'high': current[_HIGH],
+                'low': current[_LOW],
+                'close': current[_CLOSE],
+                'volume': current[_VOLUME],
+                'acc_trade_price': current[_ACC_PRICE],
+                'timestamp': int(current[_LAST_TS]),
+            }
+
+    # 마감된 캔들 + 진행 중인 캔들을 컬럼별 배열로 반환 (candle_store의 컬럼과 동일)
+    def get_candle_arrays(self, unit: int, include_current: bool = True) -> Optional[dict]:
+        with self._lock:
+            rows = list(self._closed[unit])
+            if include_current and self._current[unit] is not None:
+                rows.append(list(self._current[unit]))
+
+        if len(rows) == 0:
+            return None
+
+        candles = np.array(rows, dtype=np.float64)
+        return {
+            'time': candles[:, _TIME].astype(np.int64),
+            'timestamp': candles[:, _LAST_TS].astype(np.int64),
+            'open': candles[:, _OPEN],
+            'high': candles[:, _HIGH],
+            'low': candles[:, _LOW],
+            'close': candles[:, _CLOSE],
+            'volume': candles[:, _VOLUME],
+            'acc_trade_price': candles[:, _ACC_PRICE],
+        }
+
+    # 마감된 캔들 + 진행 중인 캔들을 get_min_candle_data와 같은 형태로 반환
+    def get_candle_data(self, unit: int, include_current: bool = True) -> Optional[pd.DataFrame]:
+        arrays = self.get_candle_arrays(unit, include_current)
+        if arrays is None:
+            return None
+
+        return build_candle_frame(self.market, unit, arrays)
+
+
+class TradeFeed:
+    """
+    업비트 체결(trade) WebSocket 구독
+
+    - 별도 스레드에서 asyncio 이벤트 루프를 실행하며, 연결이 끊기면 다시 연결합니다.
+    - 연결이 끊긴 구간은 다시 연결한 후 REST API 캔들로 채우며, 끝날 때까지 is_stale()이 True입니다.
+    - 마켓별 CandleAggregator에 체결을 반영합니다.
+    - add_listener로 체결마다 호출될 함수를 등록할 수 있습니다. (callback(market, trade))
+    - record_path를 지정하면 수신한 체결을 JSON Lines 파일로 저장합니다. (serve_trade_replay로 재생 가능)
+    """
+
+    def __init__(
+            self,
+            markets: list,
+            url: str = UPBIT_WS_URL,
+            units: tuple = (1, 3, 5, 15),
+            max_len: int = 1000,
+            record_path: Optional[str] = None
+    ):
+        self.markets = list(markets)
+        self.url = url
+        self.record_path = record_path
+        self.max_len = max_len
+        self.aggregators = {market: CandleAggregator(market, units, max_len) for market in self.markets}
+
+        self.last_trade_at = None  # 마지막 체결 수신 시각 (time.time())
+        self.received = 0  # 수신한 체결 수
+
+        self._listeners = []
+        self._thread = None
+        self._loop = None
+        self._stop_event = None
+        self._connected = threading.Event()
+        self._stale = threading.Event()
+        self._backfill_future = None
+
+    def add_listener(self, callback: Callable[[str, dict], None]):
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(target=self._run_loop, name='trade-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # 연결될 때까지 대기
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    # 연결이 끊긴 구간을 아직 채우지 못했는지 확인 (True이면 캔들을 사용하지 않고 REST API로 조회)
+    def is_stale(self) -> bool:
+        return self._stale.is_set()
+
+    def get_candle_data(self, market: str, unit: int, include_current: bool = True) -> Optional[pd.DataFrame]:
+        return self.aggregators[market].get_candle_data(unit, include_current)
+
+    def get_current_candle(self, market: str, unit: int) -> Optional[dict]:
+        return self.aggregators[market].get_current_candle(unit)
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._stop_event = asyncio.Event()
+
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        retry_sec = 1
+
+        while not self._stop_event.is_set():
+            try:
+                # 이전 보정이 끝난 후 다시 보정 (보관한 체결이 섞이지 않도록)
+                if self._backfill_future is not None:
+                    await asyncio.wait({self._backfill_future})
+
+                async with connect(self.url) as websocket:
+                    await websocket.send(json.dumps([
+                        {"ticket": str(uuid.uuid4())},
+                        {"type": "trade", "codes": self.markets},
+                        {"format": "DEFAULT"}
+                    ]))
+                    self._connected.set()
+                    retry_sec = 1
+
+                    # 재연결: 체결을 계속 받으면서 끊긴 구간을 별도 스레드에서 채운다.
+                    if self._stale.is_set():
+                        since = {market: aggregator.begin_backfill() for market, aggregator in self.aggregators.items()}
+                        self._backfill_future = self._loop.run_in_executor(None, self._backfill, since)
+
+                    stop_task = asyncio.ensure_future(self._stop_event.wait())
+                    try:
+                        while not self._stop_event.is_set():
+                            recv_task = asyncio.ensure_future(websocket.recv())
+                            done, _ = await asyncio.wait({recv_task, stop_task},
+                                                         return_when=asyncio.FIRST_COMPLETED)
+                            if recv_task not in done:
+                                recv_task.cancel()
+                                break
+
+                            self._on_message(recv_task.result())
+                    finally:
+                        stop_task.cancel()
+
+            except Exception as e:
+                logger.error(f'WebSocket 연결 오류 : {e}')
+
+            self._connected.clear()
+
+            if not self._stop_event.is_set():
+                self._stale.set()
+
+                # 다시 연결하기 전에 대기 (최대 30초)
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=retry_sec)
+                except asyncio.TimeoutError:
+                    pass
+                retry_sec = min(retry_sec * 2, 30)
+
+    def _backfill(self, since: dict):
+        """
+        연결이 끊긴 구간을 REST API 캔들로 채우기 (이벤트 루프 밖의 스레드에서 실행)
+
+        - 연결이 끊기기 전 진행 중이던 캔들 시각부터 현재까지의 캔들 수(+2)만큼 가져옵니다. (최대 max_len)
+        - 실패한 마켓은 BACKFILL_RETRY번까지 다시 시도하고, 그래도 실패하면 stale 상태를 유지합니다.
+
+        Args:
+            since (dict): {market: {unit: 연결이 끊기기 전 진행 중이던 캔들 시각}} (begin_backfill 반환값)
+        """
+        remaining = list(self.markets)
+        try:
+            for retry in range(BACKFILL_RETRY):
+                failed = []
+                for market in remaining:
+                    aggregator = self.aggregators[market]
+                    try:
+                        for unit, candle_time in since[market].items():
+                            missing_cnt = (int(time.time()) - candle_time) // (unit * 60) + 2
+                            aggregator.backfill(unit, get_min_candles(market, unit, count=min(missing_cnt, self.max_len)))
+                    except Exception as e:
+                        logger.error(f'[{market}] 재연결 후 캔들 보정 실패 : {e}')
+                        failed.append(market)
+
+                remaining = failed
+                if len(remaining) == 0 or self._stop_event.is_set():
+                    break
+                time.sleep(2 ** retry)
+        finally:
+            for aggregator in self.aggregators.values():
+                aggregator.end_backfill()
+
+        if len(remaining) == 0:
+            self._stale.clear()
+            logger.info('재연결 후 캔들 보정 완료')
+        else:
+            logger.error(f'재연결 후 캔들 보정 실패 (stale 유지) : {remaining}')
+
+    def _on_message(self, message):
+        trade = json.loads(message)
+        if trade.get('type') != 'trade' or trade.get('code') not in self.aggregators:
+            return
+
+        self.received += 1
+        self.last_trade_at = time.time()
+
+        self.aggregators[trade['code']].on_trade(
+            float(trade['trade_price']), float(trade['trade_volume']), int(trade['trade_timestamp']))
+
+        if self.record_path:
+            with open(self.record_path, 'a') as f:
+                f.write(json.dumps(trade) + '\n')
+
+        for callback in self._listeners:
+            try:
+                callback(trade['code'], trade)
+            except Exception as e:
+                logger.error(f'체결 listener 오류 : {e}')
+
+
+# 저장된 체결 데이터 가져오기 (JSON Lines)
+def load_recorded_trades(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def serve_trade_replay(trades: list, host: str = '127.0.0.1', port: int = 8765, speed: float = 0.0):
+    """
+    저장된 체결 데이터를 재생하는 로컬 WebSocket 서버 (업비트 WebSocket 대용, 테스트용)
+
+    - 구독 요청의 codes에 해당하는 체결만 순서대로 전송합니다.
+    - speed가 0이면 대기 없이 전송하고, 1이면 실제 체결 간격대로 전송합니다. (2이면 2배속)
+
+    Args:
+        trades (list): 체결 데이터 목록 (업비트 trade 응답 형태)
+        host (str): 호스트
+        port (int): 포트
+        speed (float): 재생 속도
+    """
+
+    async def handler(websocket):
+        request = json.loads(await websocket.recv())
+        codes = set()
+        for item in request:
+            if item.get('type') == 'trade':
+                codes.update(item.get('codes', []))
+
+        prev_ts = None
+        for trade in trades:
+            if trade.get('code') not in codes:
+                continue
+
+            if speed > 0 and prev_ts is not None:
+                await asyncio.sleep(max(trade['trade_timestamp'] - prev_ts, 0) / 1000 / speed)
+            prev_ts = trade['trade_timestamp']
+
+            # 업비트와 동일하게 bytes로 전송
+            await websocket.send(json.dumps(trade).encode('utf-8'))
+
+        await websocket.wait_closed()
+
+    async with serve(handler, host, port) as server:
+        await server.serve_forever()
@@ -0,0 +1,155 @@
+import time, logging, threading
+import pandas as pd
+from typing import Optional, Callable
+from trading.signal_utils import align_to_closed_candle
+from utils.exchange_clock import ExchangeClock, get_exchange_clock
+
+"""
+# 캔들 마감 스케줄러
+
+매분 정해진 초(cron)에 실행하고 시간을 확인해서 대부분을 건너뛰는 대신, {unit}분 캔들이 마감되면 바로 한번만 실행합니다.
+
+- 거래소 시각(exchange_clock) 기준으로 캔들 마감 시각 + {grace_sec}초에 실행합니다. (로컬 PC 시각이 틀어져도 보정)
+- TradeFeed를 전달하면 다음 구간의 첫 체결이 들어오는 즉시 실행합니다. (마감 시각보다 먼저 확인되는 경우)
+- 같은 캔들에 대해서는 한번만 실행하며, 작업 함수에는 마감된 캔들의 시작 시각(UTC epoch seconds)을 전달합니다.
+- 작업이 길어져서 여러 캔들이 지나가면 마지막으로 마감된 캔들만 실행합니다.
+- 마감 직후에는 REST/캐시/shared memory에 마감된 캔들이 아직 없을 수 있으므로,
+  작업에서는 get_closed_candle_data로 마감된 캔들 기준의 매매전략 입력을 가져옵니다. (없으면 잠시 후 다시 조회)
+"""
+
+logger = logging.getLogger(__name__)
+
+CLOSED_CANDLE_RETRIES = 4  # 마감된 캔들이 없을 때 조회 횟수
+CLOSED_CANDLE_RETRY_SEC = 0.5  # 다시 조회할 때 대기 시간
+
+
+def get_closed_candle_data(
+        fetch_func: Callable[[], pd.DataFrame],
+        closed_time: int,
+        unit: int,
+        include_live: bool = True,
+        retries: int = CLOSED_CANDLE_RETRIES,
+        retry_sec: float = CLOSED_CANDLE_RETRY_SEC
+) -> pd.DataFrame:
+    """
+    마감된 캔들(closed_time) 기준의 매매전략 입력 (signal_utils.align_to_closed_candle 참고)
+
+    Args:
+        fetch_func (Callable): 캔들 데이터 조회 함수 (호출할 때마다 새로 조회)
+        closed_time (int): 마감된 캔들의 시작 시각 (UTC epoch seconds)
+        unit (int): 분 단위
+        include_live (bool): 진행 중인 캔들 포함 여부 (False이면 마감된 캔들이 마지막 행)
+        retries (int): 마감된 캔들이 없을 때 조회 횟수
+        retry_sec (float): 다시 조회할 때 대기 시간
+
+    Returns:
+        pd.DataFrame: 마감된 캔들(include_live이면 진행 중인 캔들)까지의 캔들 데이터
+    """
+    for attempt in range(retries):
+        try:
+            return align_to_closed_candle(fetch_func(), closed_time, unit, include_live)
+        except ValueError as e:
+            if attempt == retries - 1:
+                raise
+            logger.debug(f'마감된 캔들 다시 조회 ({attempt + 1}/{retries}) : {e}')
+            time.sleep(retry_sec)
+
+
+class CandleCloseScheduler:
+    def __init__(
+            self,
+            unit: int = 5,
+            clock: Optional[ExchangeClock] = None,
+            feed=None,
+            grace_sec: float = 0.5
+    ):
+        """
+        Args:
+            unit (int): 분 단위
+            clock (ExchangeClock, optional): 거래소 시각 (기본값: 공용 시각)
+            feed (TradeFeed, optional): 체결 WebSocket (체결로 캔들 마감 감지, 거래소 시각 보정)
+            grace_sec (float): 마감 시각 이후 대기 시간 (마감 직전 체결이 반영될 시간)
+        """
+        self.unit_sec = unit * 60
+        self.clock = clock or get_exchange_clock()
+        self.feed = feed
+        self.grace_sec = grace_sec
+
+        self._jobs = []
+        self._last_fired = None  # 마지막으로 실행한 마감 캔들 시작 시각
+        self._feed_closed = None  # 체결로 확인한 마감 캔들 시작 시각
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if feed is not None:
+            feed.add_listener(self._on_trade)
+
+    # 작업 추가 (func(closed_time): closed_time은 마감된 캔들의 시작 시각)
+    def add_job(self, func: Callable[[int], None]):
+        self._jobs.append(func)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='candle-scheduler', daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # 현재 시각 기준으로 마지막으로 마감된 캔들의 시작 시각
+    def last_closed_time(self, now: Optional[float] = None) -> int:
+        now = self.clock.now() if now is None else now
+        return (int(now // self.unit_sec) - 1) * self.unit_sec
+
+    def _on_trade(self, market: str, trade: dict):
+        trade_timestamp = int(trade['trade_timestamp'])
+        self.clock.observe_trade(trade_timestamp, time.time())
+
+        closed_time = (trade_timestamp // 1000 // self.unit_sec - 1) * self.unit_sec
+        if self._feed_closed is None or closed_time > self._feed_closed:
+            self._feed_closed = closed_time
+            self._wake.set()
+
+    def _run(self):
+        # 시작 시점에 이미 마감된 캔들은 실행하지 않는다.
+        self._last_fired = self.last_closed_time()
+
+        while not self._stop_event.is_set():
+            # 진행 중인 캔들의 마감 시각 + grace 까지 대기 (체결로 먼저 마감이 확인되면 바로 깨어남)
+            next_close = self._last_fired + 2 * self.unit_sec
+            self._wake.wait(max(0.0, next_close + self.grace_sec - self.clock.now()))
+            self._wake.clear()
+
+            if self._stop_event.is_set():
+                break
+
+            closed_time = self.last_closed_time(self.clock.now() - self.grace_sec)
+            if self._feed_closed is not None:
+                closed_time = max(closed_time, self._feed_closed)
+
+            if closed_time <= self._last_fired:
+                continue
+
+            skipped = (closed_time - self._last_fired) // self.unit_sec - 1
+            if skipped > 0:
+                logger.warning(f'캔들 {skipped}개를 건너뛰었습니다. (이전 작업 지연)')
+
+            self._last_fired = closed_time
+            self._fire(closed_time)
+
+    def _fire(self, closed_time: int):
+        delay = self.clock.now() - (closed_time + self.unit_sec)
+        logger.debug(f'캔들 마감 : {closed_time}, 마감 후 {delay:.3f}초')
+
+        for func in self._jobs:
+            try:
+                func(closed_time)
+            except Exception as e:
+                logger.error(f'캔들 마감 작업 오류 : {e}')
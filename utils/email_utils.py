@@ -1,22 +1,62 @@
-import smtplib, ssl, os
+import smtplib, ssl, os, time, queue, logging, threading
+from typing import Optional
 from datetime import datetime
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
+from utils.metrics import get_metrics
 
 load_dotenv()
 
-SMTP_SSL_PORT = 465
-SMTP_SERVER = 'smtp.gmail.com'
+"""
+# 메일 알림
+
+매매 중에 메일을 보내면 SMTP 연결/로그인(수 초)이 끝날 때까지 주문 처리가 멈추기 때문에
+send_email은 메일을 큐에 넣기만 하고, 백그라운드 스레드(EmailNotifier)에서 전송합니다.
+
+- 큐가 가득 차면 새 메일은 버리고 에러 로그를 남깁니다. (주문 처리가 메일 때문에 기다리지 않음)
+- SMTP 연결은 한번 로그인한 후 재사용하고, {idle_sec}초 동안 보낼 메일이 없으면 끊습니다.
+- 짧은 시간({batch_sec}초)에 여러 메일이 쌓이면 한 통으로 묶어서(digest) 보냅니다.
+- 전송에 실패하면 연결을 다시 만들고 1초, 2초, 4초 ... 간격으로 {max_retry}번까지 다시 보냅니다.
+- 제목의 시각은 메일을 보낸 시각이 아니라 send_email을 호출한 시각입니다.
+- 로컬 SMTP 서버(ex. aiosmtpd)로 테스트할 때는 EMAIL_SMTP_SSL=false, EMAIL_SMTP_PORT를 설정합니다. (비밀번호가 없으면 로그인 생략)
+
+## 환경변수 (.env)
+- SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL: 송/수신자 정보
+- EMAIL_SMTP_SERVER: SMTP 서버, 기본값 smtp.gmail.com
+- EMAIL_SMTP_PORT: SMTP 포트, 기본값 465
+- EMAIL_SMTP_SSL: SSL 사용 여부, 기본값 true
+- EMAIL_QUEUE_SIZE: 대기 메일 최대 개수, 기본값 100
+- EMAIL_BATCH_SEC: 메일을 묶어서 보낼 대기 시간(초), 기본값 2
+- EMAIL_MAX_RETRY: 전송 실패 시 재시도 횟수, 기본값 5
+"""
+
+SMTP_SSL_PORT = int(os.getenv('EMAIL_SMTP_PORT', '465'))
+SMTP_SERVER = os.getenv('EMAIL_SMTP_SERVER', 'smtp.gmail.com')
+SMTP_USE_SSL = os.getenv('EMAIL_SMTP_SSL', 'true').lower() != 'false'
 
 SENDER_EMAIL = os.getenv('SENDER_EMAIL', '')
 SENDER_PASSWORD = os.getenv('SENDER_PASSWORD', '')
 RECEIVER_EMAIL = os.getenv('RECEIVER_EMAIL', '')
 
+EMAIL_QUEUE_SIZE = int(os.getenv('EMAIL_QUEUE_SIZE', '100'))
+EMAIL_BATCH_SEC = float(os.getenv('EMAIL_BATCH_SEC', '2'))
+EMAIL_MAX_RETRY = int(os.getenv('EMAIL_MAX_RETRY', '5'))
+EMAIL_MAX_BATCH = 20  # 한 통으로 묶을 최대 메일 수
+EMAIL_IDLE_SEC = 60.0  # 보낼 메일이 없을 때 연결 유지 시간
 
-def send_email(title: str, send_msg: str):
+logger = logging.getLogger(__name__)
+
+
+# 메일 제목 (호출 시각 포함)
+def _make_title(title: str, created_at: datetime) -> str:
+    return title + ' (' + created_at.strftime('%Y-%m-%d %H시 %M분') + ')'
+
+
+# 바로 전송 (SMTP 연결 후 로그인, 전송, 종료)
+def send_email_now(title: str, send_msg: str):
     # 메일 내용 작성
     msg = MIMEText(send_msg)
-    msg['Subject'] = title + ' (' + datetime.now().strftime('%Y-%m-%d %H시 %M분') + ')'
+    msg['Subject'] = _make_title(title, datetime.now())
 
     context = ssl.create_default_context()
 
@@ -24,4 +64,218 @@ def send_email(title: str, send_msg: str):
         server.login(SENDER_EMAIL, SENDER_PASSWORD)
         server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
 
+
+class EmailNotifier:
+    def __init__(
+            self,
+            host: str = SMTP_SERVER,
+            port: int = SMTP_SSL_PORT,
+            use_ssl: bool = SMTP_USE_SSL,
+            sender: str = SENDER_EMAIL,
+            password: str = SENDER_PASSWORD,
+            receiver: str = RECEIVER_EMAIL,
+            queue_size: int = EMAIL_QUEUE_SIZE,
+            batch_sec: float = EMAIL_BATCH_SEC,
+            max_retry: int = EMAIL_MAX_RETRY,
+            max_batch: int = EMAIL_MAX_BATCH,
+            idle_sec: float = EMAIL_IDLE_SEC
+    ):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.sender = sender
+        self.password = password
+        self.receiver = receiver
+        self.batch_sec = batch_sec
+        self.max_retry = max_retry
+        self.max_batch = max_batch
+        self.idle_sec = idle_sec
+
+        # (제목, 내용, 호출 시각), None이면 종료
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._server = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        self.sent = 0  # 전송한 메일 수 (묶은 메일은 1통)
+        self.dropped = 0  # 큐가 가득 차거나 재시도 후에도 실패하여 버린 알림 수
+
+    def send(self, title: str, send_msg: str) -> bool:
+        """
+        메일을 큐에 추가 (전송은 백그라운드 스레드에서 진행)
+
+        Returns:
+            bool: 큐에 추가 여부 (큐가 가득 찬 경우 False)
+        """
+        self.start()
+
+        try:
+            self._queue.put_nowait((title, send_msg, datetime.now()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            get_metrics().inc('email_dropped_total')
+            logger.error(f'메일 큐가 가득 차서 알림을 버립니다. ({title})')
+            return False
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='email-notifier', daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        큐에 있는 메일을 모두 보낼 때까지 대기
+
+        Returns:
+            bool: 제한 시간 안에 모두 보냈는지 여부
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+        return True
+
+    # 남은 메일을 보내고 종료
+    def stop(self, timeout: float = 30.0):
+        if self._thread is None or not self._thread.is_alive():
+            return
+
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.error('메일 큐가 가득 차서 종료 요청을 추가하지 못했습니다.')
+            return
+
+        self._thread.join(timeout)
+
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=30)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=30)
+
+        if self.password:
+            server.login(self.sender, self.password)
+
+        return server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_sec)
+            except queue.Empty:
+                # 보낼 메일이 없으면 연결 종료 (다음 메일을 보낼 때 다시 연결)
+                self._disconnect()
+                continue
+
+            # 잠시 기다리면서 같이 보낼 메일을 모은다.
+            items = [item]
+            deadline = time.monotonic() + self.batch_sec
+            while item is not None and len(items) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                items.append(item)
+
+            stop = items[-1] is None
+            messages = [message for message in items if message is not None]
+
+            # 예상하지 못한 오류(메일 작성 등)는 해당 메일만 버리고 계속 진행 (flush가 끝나도록 task_done은 항상 호출)
+            try:
+                if messages:
+                    self._send_with_retry(self._make_message(messages), len(messages))
+            except Exception as e:
+                self.dropped += len(messages)
+                get_metrics().inc('email_dropped_total', len(messages))
+                logger.error(f'메일 전송 중 예상치 못한 오류가 발생하여 알림을 버립니다. ({len(messages)}건) : {e}')
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if stop:
+                self._disconnect()
+                return
+
+    # 메일이 여러 개면 한 통으로 묶는다. (digest)
+    @staticmethod
+    def _make_message(messages: list) -> MIMEText:
+        if len(messages) == 1:
+            title, send_msg, created_at = messages[0]
+            msg = MIMEText(send_msg)
+            msg['Subject'] = _make_title(title, created_at)
+            return msg
+
+        sections = [f'[{created_at.strftime("%H:%M:%S")}] {title}\n{send_msg}' for title, send_msg, created_at in messages]
+        msg = MIMEText(f'\n\n{"-" * 40}\n\n'.join(sections))
+        msg['Subject'] = _make_title(f'{messages[0][0]} 외 {len(messages) - 1}건', messages[0][2])
+        return msg
+
+    def _send_with_retry(self, msg: MIMEText, count: int):
+        delay = 1.0
+        for retry in range(self.max_retry + 1):
+            try:
+                if self._server is None:
+                    self._server = self._connect()
+
+                with get_metrics().span('email_send_seconds'):
+                    self._server.sendmail(self.sender, self.receiver, msg.as_string())
+                self.sent += 1
+                get_metrics().inc('email_sent_total')
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                logger.error(f'메일 전송 오류 ({retry + 1}/{self.max_retry + 1}) : {e}')
+
+                # 끊긴 연결일 수 있으므로 다음 시도에서 새로 연결
+                self._disconnect()
+
+                if retry < self.max_retry:
+                    time.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+
+        self.dropped += count
+        get_metrics().inc('email_dropped_total', count)
+        logger.error(f'메일을 보내지 못했습니다. ({msg["Subject"]})')
+
+
+# 공용 메일 알림
+_email_notifier = None
+_email_notifier_lock = threading.Lock()
+
+
+def get_email_notifier() -> EmailNotifier:
+    global _email_notifier
+
+    if _email_notifier is None:
+        with _email_notifier_lock:
+            if _email_notifier is None:
+                _email_notifier = EmailNotifier()
+
+    return _email_notifier
+
+
+# 메일 전송 (큐에 넣고 바로 반환, 전송은 백그라운드에서 진행)
+def send_email(title: str, send_msg: str):
+    get_email_notifier().send(title, send_msg)
+
 # send_email('TEST', '메일 전송 테스트입니다.')
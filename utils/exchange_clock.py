@@ -0,0 +1,83 @@
+import time, threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+"""
+# 거래소 시각 추정
+
+로컬 PC 시각과 업비트 서버 시각의 차이(offset = 거래소 시각 - 로컬 시각)를 추정합니다.
+캔들 구간은 거래소 시각 기준이기 때문에 로컬 시각이 틀어져 있으면 캔들 마감 시점을 잘못 판단합니다.
+
+- REST 응답의 Date 헤더 (초 단위): 요청 전/후 로컬 시각으로 offset의 하한/상한을 구합니다.
+- WebSocket 체결 시각 (밀리초): 체결 시각 - 수신 시각은 offset의 하한입니다. (네트워크 지연만큼 작게 측정됨)
+- 체결 샘플이 있으면 하한 중 최댓값(지연이 가장 작았던 체결)을, 없으면 하한 중 최댓값과 상한 중 최솟값의 중간을 사용합니다.
+"""
+
+_MAX_SAMPLES = 100  # 최근 샘플 개수
+
+
+class ExchangeClock:
+    def __init__(self, max_samples: int = _MAX_SAMPLES):
+        self._lower = deque(maxlen=max_samples)
+        self._upper = deque(maxlen=max_samples)
+        self._trade_cnt = 0  # 하한 샘플 중 체결 샘플 개수
+        self._lock = threading.Lock()
+
+    # REST 응답 Date 헤더 반영 (sent_at, received_at: 요청 전/응답 후 로컬 시각 time.time())
+    def observe_http_date(self, date_header: Optional[str], sent_at: float, received_at: float):
+        if not date_header:
+            return
+
+        try:
+            server_sec = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+
+        # 서버 시각은 [Date, Date + 1) 구간이고, 로컬 시각은 [sent_at, received_at] 구간
+        self._add(server_sec - received_at, server_sec + 1 - sent_at)
+
+    # 체결 데이터 반영 (trade_timestamp: 체결 시각 ms, received_at: 수신 로컬 시각 time.time())
+    def observe_trade(self, trade_timestamp: int, received_at: float):
+        self._add(trade_timestamp / 1000 - received_at, None, is_trade=True)
+
+    def _add(self, lower: float, upper: Optional[float], is_trade: bool = False):
+        with self._lock:
+            # 로컬 시각이 변경(NTP 동기화 등)되어 구간이 맞지 않으면 이전 샘플은 버린다.
+            if upper is not None and self._lower and max(self._lower) > upper:
+                self._lower.clear()
+                self._trade_cnt = 0
+            if self._upper and lower > min(self._upper):
+                self._upper.clear()
+
+            self._lower.append(lower)
+            if is_trade:
+                self._trade_cnt = min(self._trade_cnt + 1, len(self._lower))
+            if upper is not None:
+                self._upper.append(upper)
+
+    # 거래소 시각 - 로컬 시각 (초), 샘플이 없으면 0
+    def offset(self) -> float:
+        with self._lock:
+            lower = max(self._lower) if self._lower else None
+            upper = min(self._upper) if self._upper else None
+
+        if lower is not None and upper is not None:
+            return lower if self._trade_cnt > 0 else (lower + upper) / 2
+        if lower is not None:
+            return lower
+        if upper is not None:
+            return upper
+        return 0.0
+
+    # 현재 거래소 시각 (epoch seconds)
+    def now(self) -> float:
+        return time.time() + self.offset()
+
+
+# 공용 시각 (업비트 클라이언트 응답으로 갱신)
+_exchange_clock = ExchangeClock()
+
+
+def get_exchange_clock() -> ExchangeClock:
+    return _exchange_clock
@@ -0,0 +1,267 @@
+import os, json, time, queue, atexit, logging, threading
+import logging.config
+import logging.handlers
+from contextlib import contextmanager
+from utils.metrics import get_metrics
+
+"""
+# 로그 (비동기 처리, 매매 판단 기록)
+
+logging.conf의 핸들러(콘솔, 파일)를 그대로 사용하되, 매매 스레드에서는 로그를 큐에 넣기만 하고
+메시지 포맷과 콘솔/파일 출력은 별도 스레드(QueueListener)에서 처리합니다.
+
+- 로그 메시지는 '%s' 형식의 인자로 전달하면 포맷도 별도 스레드에서 합니다. (f-string은 호출할 때 포맷)
+  같은 프로세스 안의 큐이므로 LogRecord를 그대로 넘기며, 인자는 이후에 변경되지 않는 값(숫자, 문자열 등)이어야 합니다.
+- 큐가 가득 차면 로그를 버리고 개수만 기록합니다. (log_dropped_total, 매매 스레드가 기다리지 않음)
+- LOG_LEVEL을 INFO로 설정하면 DEBUG 로그는 LogRecord도 만들지 않습니다. (운영 환경 권장)
+- 매매 판단 기록(decision trace): 매매전략 한번 실행의 조건 값, 결과, 소요시간을 JSON 한 줄로 저장합니다.
+  - 매매전략에서는 print 대신 log_conditions(logger, 조건=값, ...)으로 조건 값을 DEBUG 로그로 남기고 기록에 추가합니다.
+  - 실행마다 해당 스레드의 로그 개수(log_records)와 로그 처리 시간(log_us)을 같이 기록합니다.
+    (metrics: log_emit_seconds, log_records_total)
+
+## 파일
+- {DECISION_TRACE_PATH}: 매매 판단 기록 (JSON lines, 매일 자정 새로 생성, 60일 보관)
+  ex. {"ts": "2026-10-17 12:05:00", "strategy": "trading_strategy2", "closed_time": 1792209600,
+       "conditions": {"is_positive_20ma_slope": true, ...}, "signal": "", "elapsed_ms": 3.1, "log_records": 14, "log_us": 21.5}
+
+## 환경변수 (.env)
+- LOG_LEVEL: root 로거 레벨 (없으면 logging.conf 설정)
+- LOG_QUEUE_SIZE: 로그 큐 최대 크기, 기본값 10000
+- DECISION_TRACE_PATH: 매매 판단 기록 파일, 기본값 logs/decision_trace.jsonl (빈 값이면 저장하지 않음)
+"""
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', '')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+DECISION_TRACE_PATH = os.getenv(
+    'DECISION_TRACE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'decision_trace.jsonl'))
+
+# 스레드별 진행 중인 매매 판단 기록
+_local = threading.local()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    로그를 큐에 넣기만 하는 핸들러 (큐가 가득 차면 버림)
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+        # 스레드별 로그 개수, 처리 시간(ns)
+        self._stats = threading.local()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 메시지 포맷은 QueueListener 스레드의 핸들러에서 (lazy)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            get_metrics().inc('log_dropped_total')
+
+    def emit(self, record: logging.LogRecord):
+        start = time.perf_counter_ns()
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+        stats = self._stats
+        stats.records = getattr(stats, 'records', 0) + 1
+        stats.ns = getattr(stats, 'ns', 0) + time.perf_counter_ns() - start
+
+    def thread_stats(self) -> tuple:
+        """
+        현재 스레드에서 처리한 로그 (개수, 누적 처리 시간 ns)
+        """
+        return getattr(self._stats, 'records', 0), getattr(self._stats, 'ns', 0)
+
+
+def _start_listener(handlers: list, queue_size: int) -> tuple:
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    return queue_handler, listener
+
+
+# 로그 설정 (setup_logging에서 세팅)
+_queue_handler = None
+_listener = None
+_logging_lock = threading.Lock()
+
+
+def setup_logging(config_path: str = 'logging.conf', level: str = LOG_LEVEL,
+                  queue_size: int = LOG_QUEUE_SIZE) -> NonBlockingQueueHandler:
+    """
+    logging.conf를 읽고 root 로거의 핸들러를 큐 + 별도 스레드로 변경
+
+    Args:
+        config_path (str): 로그 설정 파일
+        level (str): root 로거 레벨 (빈 값이면 설정 파일의 레벨)
+        queue_size (int): 로그 큐 최대 크기
+
+    Returns:
+        NonBlockingQueueHandler: root 로거에 추가된 큐 핸들러
+    """
+    global _queue_handler, _listener
+
+    with _logging_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        # 설정 전에 import된 모듈의 로거도 사용할 수 있도록 disable_existing_loggers=False
+        logging.config.fileConfig(config_path, disable_existing_loggers=False)
+
+        root = logging.getLogger()
+        if level:
+            root.setLevel(level.upper())
+
+        handlers = root.handlers[:]
+        for handler in handlers:
+            root.removeHandler(handler)
+
+        _queue_handler, _listener = _start_listener(handlers, queue_size)
+        root.addHandler(_queue_handler)
+
+    # 종료할 때 큐에 남은 로그 출력
+    atexit.register(shutdown_logging)
+
+    return _queue_handler
+
+
+def shutdown_logging():
+    """
+    큐에 남은 로그를 모두 출력하고 로그 스레드 종료 (매매 판단 기록 포함)
+    """
+    global _queue_handler, _listener
+
+    if _decision_trace is not None:
+        _decision_trace.close()
+
+    with _logging_lock:
+        if _listener is None:
+            return
+
+        _listener.stop()
+        for handler in _listener.handlers:
+            logging.getLogger().addHandler(handler)
+        logging.getLogger().removeHandler(_queue_handler)
+
+        _queue_handler, _listener = None, None
+
+
+# 현재 스레드의 로그 (개수, 처리 시간 ns), setup_logging 전이면 (0, 0)
+def _log_stats() -> tuple:
+    handler = _queue_handler
+    return handler.thread_stats() if handler is not None else (0, 0)
+
+
+def _json_default(value):
+    # numpy 값(np.bool_, np.float64 등)은 파이썬 값으로
+    if hasattr(value, 'item'):
+        return value.item()
+
+    return str(value)
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.trace, ensure_ascii=False, default=_json_default)
+
+
+class DecisionTrace:
+    def __init__(self, path: str = DECISION_TRACE_PATH, queue_size: int = LOG_QUEUE_SIZE):
+        self.path = path
+
+        self._logger = logging.getLogger('decision_trace')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._queue_handler = None
+        self._listener = None
+
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                path, when='midnight', backupCount=60, encoding='utf-8', delay=True)
+            file_handler.suffix = '%Y-%m-%d'
+            file_handler.setFormatter(_JsonLinesFormatter())
+
+            self._queue_handler, self._listener = _start_listener([file_handler], queue_size)
+            self._logger.addHandler(self._queue_handler)
+
+    @contextmanager
+    def evaluate(self, **fields):
+        """
+        매매전략 한번 실행 기록 (with 블록 안에서 log_conditions로 추가한 조건 값 포함)
+
+        with get_decision_trace().evaluate(strategy='trading_strategy2', closed_time=closed_time) as trace:
+            result = trading_strategy(...)
+            trace.update(signal=result['signal'], message=result['message'])
+        """
+        trace = {'ts': time.strftime('%Y-%m-%d %H:%M:%S'), **fields, 'conditions': {}}
+        records, ns = _log_stats()
+        start = time.perf_counter()
+
+        _local.trace = trace
+        try:
+            yield trace
+        except Exception as e:
+            trace['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            _local.trace = None
+
+            log_records, log_ns = _log_stats()
+            log_records -= records
+            log_ns -= ns
+
+            trace['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            trace['log_records'] = log_records
+            trace['log_us'] = round(log_ns / 1000, 1)
+
+            metrics = get_metrics()
+            metrics.observe('log_emit_seconds', log_ns / 1e9)
+            metrics.inc('log_records_total', log_records)
+
+            if self._queue_handler is not None:
+                self._logger.info('', extra={'trace': trace})
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+# 공용 매매 판단 기록
+_decision_trace = None
+_decision_trace_lock = threading.Lock()
+
+
+def get_decision_trace() -> DecisionTrace:
+    global _decision_trace
+
+    if _decision_trace is None:
+        with _decision_trace_lock:
+            if _decision_trace is None:
+                _decision_trace = DecisionTrace()
+
+    return _decision_trace
+
+
+def log_conditions(logger: logging.Logger, **conditions):
+    """
+    매매전략 조건 값 기록 (DEBUG 로그 '이름 : 값', 진행 중인 매매 판단 기록에 추가)
+    DEBUG 로그가 꺼져 있고 매매 판단 기록 중이 아니면(ex. 백테스트) 아무것도 하지 않습니다.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace['conditions'].update(conditions)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for name, value in conditions.items():
+            logger.debug('%s : %s', name, value)
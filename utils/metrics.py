@@ -0,0 +1,268 @@
+import os, time, logging, threading
+import numpy as np
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+"""
+# 성능 지표 (Metrics)
+
+auto_trading 한번 실행에서 계좌 조회, 캔들 조회, 매매전략(지표 계산), 주문, 체결 확인, 메일 전송에
+각각 얼마나 걸리는지 기록하고, 캔들 마감부터 주문 응답까지의 지연시간(SLO)을 확인하기 위한 지표입니다.
+
+- 시간(histogram): span(name, **labels)으로 구간을 감싸거나 observe(name, seconds)로 기록합니다.
+  최근 {window}개의 값으로 p50/p95/p99를 계산하고, 전체 개수/합계는 누적합니다.
+- 횟수(counter): inc(name, **labels)로 API 호출, 에러, 매매 신호 등을 누적합니다.
+- 출력
+  - Prometheus text 형식 HTTP 엔드포인트: start_metrics_server() -> http://127.0.0.1:{METRICS_PORT}/metrics
+    (시간은 summary 타입으로 quantile 0.5/0.95/0.99, _sum, _count 제공)
+  - 주기적인 로그 한 줄: start_metrics_reporter() -> {METRICS_LOG_SEC}초마다 INFO 로그
+
+## 주요 지표
+- trading_stage_seconds{stage}: auto_trading 단계별 시간 (account, candles, strategy, order, fill, email, total)
+- candle_close_to_decision_seconds: 캔들 마감(거래소 시각)부터 매매전략 판단까지
+- candle_close_to_order_ack_seconds{side}: 캔들 마감(거래소 시각)부터 주문 응답까지
+- api_request_seconds{endpoint}, api_requests_total{endpoint}, api_errors_total{endpoint}: 업비트 API
+- order_fill_seconds{side}, order_fill_timeouts_total{side}: 주문 체결 확인
+- trading_signals_total{strategy, signal}: 매매 신호 (buy, sell, none)
+- trading_errors_total{type}: auto_trading 실행 중 발생한 오류
+- email_send_seconds, email_sent_total, email_dropped_total: 메일 전송 (백그라운드)
+
+## 환경변수 (.env)
+- METRICS_PORT: 엔드포인트 포트, 기본값 9108 (0이면 사용하지 않음)
+- METRICS_LOG_SEC: 로그 출력 주기(초), 기본값 300 (0이면 사용하지 않음)
+"""
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+METRICS_LOG_SEC = float(os.getenv('METRICS_LOG_SEC', '300'))
+METRICS_WINDOW = 1024  # 백분위 계산에 사용할 최근 값 개수
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger(__name__)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels_key: tuple, extra: Optional[tuple] = None) -> str:
+    items = list(labels_key) + list(extra or ())
+    if not items:
+        return ''
+
+    values = ','.join(f'{key}="{value}"' for key, value in items)
+    return '{' + values + '}'
+
+
+class Histogram:
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def quantiles(self) -> dict:
+        if not self._recent:
+            return {q: 0.0 for q in QUANTILES}
+
+        values = np.quantile(np.fromiter(self._recent, dtype=np.float64), QUANTILES)
+        return dict(zip(QUANTILES, values.tolist()))
+
+
+class MetricsRegistry:
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+
+        # {name: {labels_key: Histogram}}, {name: {labels_key: float}}
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        구간 시간 기록 (with metrics.span('trading_stage_seconds', stage='account'): ...)
+        예외가 발생해도 기록합니다.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """
+        현재 지표 값
+
+        Returns:
+            dict: {'histograms': {name: {labels: {count, sum, max, p50, p95, p99}}}, 'counters': {name: {labels: value}}}
+        """
+        with self._lock:
+            histograms = {
+                name: {
+                    key: dict(count=histogram.count, sum=histogram.total, max=histogram.max,
+                              **{f'p{int(q * 100)}': value for q, value in histogram.quantiles().items()})
+                    for key, histogram in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        return {'histograms': histograms, 'counters': counters}
+
+    # Prometheus text 형식
+    def render_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+
+        for name, series in sorted(snapshot['histograms'].items()):
+            lines.append(f'# TYPE {name} summary')
+            for key, values in series.items():
+                for q in QUANTILES:
+                    lines.append(f'{name}{_format_labels(key, (("quantile", q),))} {values[f"p{int(q * 100)}"]:.6f}')
+                lines.append(f'{name}_sum{_format_labels(key)} {values["sum"]:.6f}')
+                lines.append(f'{name}_count{_format_labels(key)} {values["count"]}')
+
+        for name, series in sorted(snapshot['counters'].items()):
+            lines.append(f'# TYPE {name} counter')
+            for key, value in series.items():
+                lines.append(f'{name}{_format_labels(key)} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+    # 로그 한 줄 (시간은 ms, p50/p95/p99)
+    def format_log_line(self) -> str:
+        snapshot = self.snapshot()
+        items = []
+
+        for name, series in sorted(snapshot['histograms'].items()):
+            for key, values in series.items():
+                label = ','.join(value for _, value in key)
+                items.append(f'{name}[{label}] n={values["count"]} '
+                             f'p50={values["p50"] * 1000:.1f} p95={values["p95"] * 1000:.1f} '
+                             f'p99={values["p99"] * 1000:.1f}ms')
+
+        for name, series in sorted(snapshot['counters'].items()):
+            for key, value in series.items():
+                label = ','.join(value for _, value in key)
+                items.append(f'{name}[{label}]={value:g}')
+
+        return ' | '.join(items)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# 공용 지표
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+def span(name: str, **labels):
+    return _metrics.span(name, **labels)
+
+
+def observe(name: str, seconds: float, **labels):
+    _metrics.observe(name, seconds, **labels)
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    _metrics.inc(name, value, **labels)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        data = self.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = '127.0.0.1',
+                         registry: Optional[MetricsRegistry] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Prometheus text 엔드포인트 시작 (/metrics, 별도 스레드)
+
+    Returns:
+        ThreadingHTTPServer, optional: 서버 (port가 0이면 None, 종료 시 shutdown() 호출)
+    """
+    if not port:
+        return None
+
+    handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'registry': registry or _metrics})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        # 같은 포트를 다른 매매 프로그램이 사용 중인 경우 등 (매매는 계속 진행)
+        logger.error(f'metrics 엔드포인트를 시작하지 못했습니다. (port {port}) : {e}')
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+
+    logger.info(f'metrics 엔드포인트 : http://{host}:{port}/metrics')
+
+    return server
+
+
+def start_metrics_reporter(interval_sec: float = METRICS_LOG_SEC,
+                           registry: Optional[MetricsRegistry] = None) -> Optional[threading.Event]:
+    """
+    {interval_sec}초마다 지표를 로그 한 줄로 출력 (별도 스레드)
+
+    Returns:
+        threading.Event, optional: 종료 이벤트 (set() 호출 시 종료, interval_sec가 0이면 None)
+    """
+    if not interval_sec:
+        return None
+
+    registry = registry or _metrics
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval_sec):
+            line = registry.format_log_line()
+            if line:
+                logger.info(f'metrics : {line}')
+
+    threading.Thread(target=run, name='metrics-reporter', daemon=True).start()
+
+    return stop_event
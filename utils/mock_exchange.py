@@ -0,0 +1,944 @@
+import os, json, math, time, uuid, random, signal, asyncio, hashlib, logging, argparse, threading
+import jwt
+import numpy as np
+from collections import deque
+from typing import Optional
+from datetime import datetime, timezone, timedelta
+from urllib.parse import urlsplit, parse_qs, urlencode, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from upbit_data.websocket_feed import CandleAggregator, load_recorded_trades
+from utils.rate_limiter import get_api_group, DEFAULT_GROUP_LIMITS
+
+"""
+# 로컬 모의 거래소 (업비트 대용)
+
+실제 키와 api.upbit.com 없이 매매 프로그램 전체를 실행하고, 노트북에서 틱 지연시간과 처리량을 측정하기 위한 로컬 서버입니다.
+기존 모듈은 주소만 바꾸면 그대로 사용할 수 있습니다. (UPBIT_BASE_URL, UPBIT_WS_URL)
+
+## REST API (업비트와 같은 경로/응답 형태)
+- [GET] /v1/market/all: 마켓 목록
+- [GET] /v1/candles/minutes/{unit}: 분 캔들 (market, to, count - 최대 200개, 최신순)
+- [GET] /v1/accounts: 계좌 잔고
+- [POST] /v1/orders: 주문 (시장가 매수 price, 시장가 매도 market, 지정가 limit)
+- [GET] /v1/orders/open: 체결 대기 주문 (market, state)
+- [GET] /v1/order: 개별 주문 조회 (uuid, 체결 목록 포함)
+
+## WebSocket
+- 업비트와 같은 구독 요청([{"ticket"}, {"type": "trade", "codes"}, {"format"}])에 체결 데이터를 bytes로 전송합니다.
+- 체결 데이터에 생성 시각(mock_created_at, time.time())을 추가하여 받는 쪽에서 지연시간을 계산할 수 있습니다.
+
+## 인증 (JWT)
+- 업비트와 같은 방식으로 확인합니다. (access_key, nonce 재사용, query_hash - query string 또는 body의 SHA512)
+
+## 시세 데이터
+- 합성(synthetic): 마켓별 시작 가격에서 랜덤 워크로 체결을 만들고, 시작할 때 과거 {history}개의 캔들을 미리 만듭니다.
+- 녹화(recorded): TradeFeed(record_path)로 저장한 체결을 과거 데이터로 사용합니다. (마지막 체결이 현재 시각이 되도록 이동)
+  이후에는 마지막 체결 가격부터 랜덤 워크로 이어갑니다.
+
+## 체결
+- 시장가 주문은 {fill_delay_sec}초 후 그 시점의 가격으로 전체 체결합니다. (수수료 {fee_rate})
+- 지정가 주문은 체결 가격이 주문 가격을 넘으면 주문 가격으로 체결합니다.
+
+## 장애 주입
+- latency_ms, jitter_ms: 응답(REST, WebSocket 전송)마다 지연 (latency_ms + 0~jitter_ms)
+- error_rate: 요청 수 제한과 별개로 429 응답을 보낼 확률
+- 요청 수 제한: 그룹별 초당 요청 수(rate_limiter와 동일)를 넘으면 429, 'Remaining-Req' 헤더 포함
+- outage_interval_sec, outage_sec: {outage_interval_sec}초마다 {outage_sec}초 동안 장애 (REST 503, WebSocket 연결 종료)
+  start_outage(seconds)로 직접 장애를 만들 수도 있습니다.
+
+## 실행
+- python -m utils.mock_exchange --markets KRW-DOGE --latency-ms 20 --jitter-ms 10
+- 매매 프로그램은 .env에 UPBIT_BASE_URL=http://127.0.0.1:8000, UPBIT_WS_URL=ws://127.0.0.1:8765,
+  ACCESS_KEY/SECRET_KEY를 모의 거래소 키(기본값 mock-access-key/mock-secret-key)로 설정하고 실행합니다.
+- python -m utils.mock_exchange --bench 10: 모의 거래소를 띄워서 틱 지연시간/처리량, REST 응답 시간, 주문 체결 확인 시간 측정
+"""
+
+MOCK_ACCESS_KEY = os.getenv('MOCK_ACCESS_KEY', 'mock-access-key')
+MOCK_SECRET_KEY = os.getenv('MOCK_SECRET_KEY', 'mock-secret-key')
+
+DEFAULT_START_PRICES = {'KRW-DOGE': 200.0, 'KRW-BTC': 100000000.0, 'KRW-ETH': 4000000.0, 'KRW-XRP': 3000.0}
+DEFAULT_START_PRICE = 1000.0
+
+KST_OFFSET = timedelta(hours=9)
+
+logger = logging.getLogger(__name__)
+
+
+# 원화 마켓 호가 단위로 가격 맞추기
+def _round_tick(price: float) -> float:
+    if price >= 2000000:
+        tick = 1000
+    elif price >= 1000000:
+        tick = 500
+    elif price >= 500000:
+        tick = 100
+    elif price >= 100000:
+        tick = 50
+    elif price >= 10000:
+        tick = 10
+    elif price >= 1000:
+        tick = 1
+    elif price >= 100:
+        tick = 0.1
+    elif price >= 10:
+        tick = 0.01
+    else:
+        tick = 0.001
+
+    return round(round(price / tick) * tick, 4)
+
+
+# 숫자 -> 업비트 응답 형태의 문자열
+def _num_str(value: float) -> str:
+    return format(round(value, 8), 'f').rstrip('0').rstrip('.') or '0'
+
+
+def _error(status: int, name: str, message: str) -> tuple:
+    return status, {'error': {'name': name, 'message': message}}
+
+
+class MockExchange:
+    def __init__(
+            self,
+            markets: tuple = ('KRW-DOGE',),
+            units: tuple = (1, 3, 5, 15),
+            history: int = 1200,
+            host: str = '127.0.0.1',
+            http_port: int = 8000,
+            ws_port: int = 8765,
+            access_key: str = MOCK_ACCESS_KEY,
+            secret_key: str = MOCK_SECRET_KEY,
+            krw_balance: float = 1000000.0,
+            fee_rate: float = 0.0005,
+            start_prices: Optional[dict] = None,
+            volatility: float = 0.0003,
+            trades_per_sec: float = 5.0,
+            history_trade_sec: float = 10.0,
+            recorded_trades: Optional[list] = None,
+            fill_delay_sec: float = 0.05,
+            latency_ms: float = 0.0,
+            jitter_ms: float = 0.0,
+            error_rate: float = 0.0,
+            rate_limit: bool = True,
+            outage_interval_sec: float = 0.0,
+            outage_sec: float = 0.0,
+            seed: Optional[int] = None
+    ):
+        """
+        Args:
+            markets (tuple): 마켓 목록
+            units (tuple): 캔들 분 단위
+            history (int): 시작할 때 만들어 둘 단위별 과거 캔들 개수
+            host, http_port, ws_port: 서버 주소 (포트가 0이면 빈 포트 사용)
+            access_key, secret_key: 인증 키
+            krw_balance (float): 시작 원화 잔고
+            fee_rate (float): 거래 수수료
+            start_prices (dict, optional): 마켓별 시작 가격
+            volatility (float): 초당 가격 변동성 (로그 수익률 표준편차)
+            trades_per_sec (float): 마켓별 초당 체결 수
+            history_trade_sec (float): 과거 캔들을 만들 때의 체결 간격(초)
+            recorded_trades (list, optional): 녹화된 체결 데이터 (load_recorded_trades)
+            fill_delay_sec (float): 시장가 주문 체결까지 걸리는 시간
+            latency_ms, jitter_ms, error_rate, rate_limit, outage_interval_sec, outage_sec: 장애 주입
+            seed (int, optional): 난수 시드
+        """
+        self.markets = list(markets)
+        self.units = tuple(units)
+        self.history = history
+        self.host = host
+        self.http_port = http_port
+        self.ws_port = ws_port
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.fee_rate = fee_rate
+        self.volatility = volatility
+        self.trades_per_sec = trades_per_sec
+        self.fill_delay_sec = fill_delay_sec
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.outage_interval_sec = outage_interval_sec
+        self.outage_sec = outage_sec
+
+        self._random = random.Random(seed)
+        self._np_random = np.random.default_rng(seed)
+
+        self._aggregators = {market: CandleAggregator(market, self.units, max_len=history) for market in self.markets}
+        self._prices = {}
+        self._sequential_id = 0
+
+        # 계좌 {currency: {'balance', 'locked', 'avg_buy_price'}}
+        self._accounts = {'KRW': {'balance': krw_balance, 'locked': 0.0, 'avg_buy_price': 0.0}}
+        self._orders = {}  # {uuid: 주문}
+        self._open_limit_orders = []  # 체결 대기 지정가 주문 uuid
+        self._lock = threading.RLock()
+
+        # 인증 (최근 사용한 nonce)
+        self._used_nonces = set()
+        self._nonce_order = deque()
+
+        # 요청 수 제한 {group: [초(int), 요청 수]}
+        self._rate_windows = {}
+        self._rate_lock = threading.Lock()
+
+        # 장애
+        self._started_at = time.monotonic()
+        self._outage_until = 0.0
+
+        # 통계
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'ticks': 0, 'ws_sent': 0, 'ws_dropped': 0}
+
+        # 서버
+        self._http_server = None
+        self._http_thread = None
+        self._ws_loop = None
+        self._ws_thread = None
+        self._ws_stop = None
+        self._ws_ready = threading.Event()
+        self._ws_clients = set()  # (구독 마켓, asyncio.Queue)
+        self._ws_outage_notified = False
+        self._tick_thread = None
+        self._stop_event = threading.Event()
+
+        start_prices = dict(DEFAULT_START_PRICES, **(start_prices or {}))
+        if recorded_trades:
+            self._load_recorded(recorded_trades)
+        for market in self.markets:
+            if market not in self._prices:
+                self._make_history(market, start_prices.get(market, DEFAULT_START_PRICE), history_trade_sec)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.http_port}'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://{self.host}:{self.ws_port}'
+
+    # ============================== 시세 데이터 ==============================
+
+    # 랜덤 워크로 과거 체결을 만들어서 캔들 생성 (가장 큰 단위 기준 {history}개)
+    def _make_history(self, market: str, start_price: float, trade_sec: float):
+        span_sec = self.history * max(self.units) * 60
+        count = int(span_sec / trade_sec)
+        now_ms = int(time.time() * 1000)
+
+        timestamps = now_ms - span_sec * 1000 + (np.arange(count) * trade_sec * 1000).astype(np.int64)
+        returns = self._np_random.normal(0.0, self.volatility * math.sqrt(trade_sec), count)
+        prices = start_price * np.exp(np.cumsum(returns))
+        volumes = self._np_random.exponential(1000000.0 / start_price, count)
+
+        aggregator = self._aggregators[market]
+        price = start_price
+        for ts, raw_price, volume in zip(timestamps.tolist(), prices.tolist(), volumes.tolist()):
+            price = _round_tick(raw_price)
+            aggregator.on_trade(price, volume, ts)
+
+        self._prices[market] = price
+
+    # 녹화된 체결을 현재 시각으로 이동하여 캔들 생성
+    def _load_recorded(self, trades: list):
+        if not trades:
+            return
+
+        offset_ms = int(time.time() * 1000) - max(trade['trade_timestamp'] for trade in trades)
+        for trade in sorted(trades, key=lambda item: item['trade_timestamp']):
+            market = trade.get('code')
+            if market not in self._aggregators:
+                continue
+
+            price = float(trade['trade_price'])
+            self._aggregators[market].on_trade(price, float(trade['trade_volume']), trade['trade_timestamp'] + offset_ms)
+            self._prices[market] = price
+
+    def _tick(self, market: str) -> Optional[bytes]:
+        created_at = time.time()
+        trade_timestamp = int(created_at * 1000)
+
+        with self._lock:
+            step = self.volatility * math.sqrt(1.0 / self.trades_per_sec)
+            price = _round_tick(self._prices[market] * math.exp(self._random.gauss(0.0, step)))
+            volume = round(self._random.expovariate(self.trades_per_sec * price / 1000000.0), 8)
+            ask_bid = 'BID' if price >= self._prices[market] else 'ASK'
+
+            self._prices[market] = price
+            self._sequential_id += 1
+            self._aggregators[market].on_trade(price, volume, trade_timestamp)
+            self._match_limit_orders(market, price)
+            self.stats['ticks'] += 1
+
+            utc = datetime.fromtimestamp(created_at, timezone.utc)
+            return json.dumps({
+                'type': 'trade',
+                'code': market,
+                'timestamp': trade_timestamp,
+                'trade_date': utc.strftime('%Y-%m-%d'),
+                'trade_time': utc.strftime('%H:%M:%S'),
+                'trade_timestamp': trade_timestamp,
+                'trade_price': price,
+                'trade_volume': volume,
+                'ask_bid': ask_bid,
+                'sequential_id': self._sequential_id,
+                'stream_type': 'REALTIME',
+                'mock_created_at': created_at,
+            }).encode('utf-8')
+
+    def _run_ticks(self):
+        interval = 1.0 / (self.trades_per_sec * len(self.markets))
+        next_at = time.monotonic()
+        index = 0
+
+        while not self._stop_event.is_set():
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+
+            market = self.markets[index % len(self.markets)]
+            index += 1
+
+            try:
+                payload = self._tick(market)
+                self._broadcast(market, payload)
+            except Exception as e:
+                logger.error(f'[{market}] 모의 체결 오류 : {e}')
+
+    def get_price(self, market: str) -> float:
+        with self._lock:
+            return self._prices[market]
+
+    # ============================== 장애 ==============================
+
+    def start_outage(self, seconds: float):
+        self._outage_until = time.monotonic() + seconds
+        logger.info(f'모의 거래소 장애 시작 ({seconds}초)')
+
+    def in_outage(self) -> bool:
+        now = time.monotonic()
+        if now < self._outage_until:
+            return True
+
+        if self.outage_interval_sec > 0 and self.outage_sec > 0:
+            return (now - self._started_at) % self.outage_interval_sec >= self.outage_interval_sec - self.outage_sec
+
+        return False
+
+    def _delay_sec(self) -> float:
+        return (self.latency_ms + self._random.uniform(0.0, self.jitter_ms)) / 1000
+
+    # 그룹별 초당 요청 수 확인 (남은 요청 수, 초과 시 -1)
+    def _consume_rate(self, group: str) -> int:
+        limit = DEFAULT_GROUP_LIMITS.get(group, DEFAULT_GROUP_LIMITS['default'])
+        second = int(time.time())
+
+        with self._rate_lock:
+            window = self._rate_windows.setdefault(group, [second, 0])
+            if window[0] != second:
+                window[0], window[1] = second, 0
+
+            if window[1] >= limit:
+                return -1
+
+            window[1] += 1
+            return limit - window[1]
+
+    # ============================== REST API ==============================
+
+    def handle_request(self, method: str, path: str, query: str, raw_body: bytes, authorization: Optional[str]) -> tuple:
+        """
+        REST 요청 처리
+
+        Returns:
+            tuple: (status, 응답 JSON, 추가 헤더 dict)
+        """
+        delay = self._delay_sec()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.stats['requests'] += 1
+        headers = {}
+
+        if self.in_outage():
+            self.stats['errors'] += 1
+            return 503, {'error': {'name': 'service_unavailable', 'message': '모의 거래소 장애'}}, headers
+
+        group = get_api_group(method, path)
+        remaining = self._consume_rate(group) if self.rate_limit else DEFAULT_GROUP_LIMITS.get(group, 30)
+        headers['Remaining-Req'] = f'group={group}; min=1800; sec={max(remaining, 0)}'
+
+        if remaining < 0 or (self.error_rate > 0 and self._random.random() < self.error_rate):
+            self.stats['throttled'] += 1
+            return 429, {'error': {'name': 'too_many_requests', 'message': 'Too many API requests.'}}, headers
+
+        try:
+            params = {key: values if key.endswith('[]') else values[-1]
+                      for key, values in parse_qs(query, keep_blank_values=True).items()}
+            body = json.loads(raw_body) if raw_body else None
+
+            status, payload = self._route(method, path, query, params, body, authorization)
+        except Exception as e:
+            logger.exception(f'모의 거래소 요청 처리 오류 : {method} {path}')
+            status, payload = _error(500, 'server_error', str(e))
+
+        if status >= 400:
+            self.stats['errors'] += 1
+
+        return status, payload, headers
+
+    def _route(self, method: str, path: str, query: str, params: dict, body: Optional[dict],
+               authorization: Optional[str]) -> tuple:
+        if method == 'GET' and path == '/v1/market/all':
+            return 200, [{'market': market, 'korean_name': market.split('-', 1)[1],
+                          'english_name': market.split('-', 1)[1]} for market in self.markets]
+
+        if method == 'GET' and path.startswith('/v1/candles/minutes/'):
+            return self._get_candles(path.rsplit('/', 1)[1], params)
+
+        routes = {
+            ('GET', '/v1/accounts'): lambda: self._get_accounts(),
+            ('POST', '/v1/orders'): lambda: self._create_order(body or {}),
+            ('GET', '/v1/orders/open'): lambda: self._get_open_orders(params),
+            ('GET', '/v1/order'): lambda: self._get_order(params),
+        }
+        route = routes.get((method, path))
+        if route is None:
+            return _error(404, 'not_found', f'{method} {path}')
+
+        auth_error = self._verify_auth(authorization, unquote(query) if method == 'GET' else body)
+        if auth_error is not None:
+            return auth_error
+
+        return route()
+
+    def _verify_auth(self, authorization: Optional[str], params) -> Optional[tuple]:
+        if not authorization or not authorization.startswith('Bearer '):
+            return _error(401, 'jwt_verification', '인증 헤더가 없습니다.')
+
+        try:
+            payload = jwt.decode(authorization[len('Bearer '):], self.secret_key, algorithms=['HS256', 'HS512'])
+        except jwt.PyJWTError as e:
+            return _error(401, 'jwt_verification', f'JWT 검증 실패 : {e}')
+
+        if payload.get('access_key') != self.access_key:
+            return _error(401, 'invalid_access_key', '잘못된 access key입니다.')
+
+        nonce = payload.get('nonce')
+        with self._lock:
+            if not nonce or nonce in self._used_nonces:
+                return _error(401, 'nonce_used', '이미 사용한 nonce입니다.')
+            self._used_nonces.add(nonce)
+            self._nonce_order.append(nonce)
+            if len(self._nonce_order) > 100000:
+                self._used_nonces.discard(self._nonce_order.popleft())
+
+        # GET은 query string, POST는 body로 query_hash 계산 (업비트와 동일)
+        if isinstance(params, dict):
+            query_string = unquote(urlencode(params, doseq=True)) if params else ''
+        else:
+            query_string = params or ''
+
+        if query_string:
+            expected = hashlib.sha512(query_string.encode('utf-8')).hexdigest()
+            if payload.get('query_hash') != expected:
+                return _error(401, 'invalid_query_payload', 'query_hash가 일치하지 않습니다.')
+
+        return None
+
+    def _get_candles(self, unit: str, params: dict) -> tuple:
+        if not unit.isdigit() or int(unit) not in self.units:
+            return _error(400, 'invalid_parameter_error', f'지원하지 않는 분 단위입니다. ({unit})')
+
+        market = params.get('market')
+        if market not in self._aggregators:
+            return _error(404, 'not_found_market', f'Code not found ({market})')
+
+        count = int(params.get('count') or 1)
+        if not 1 <= count <= 200:
+            return _error(400, 'invalid_parameter_error', 'count는 1~200 사이여야 합니다.')
+
+        unit = int(unit)
+        arrays = self._aggregators[market].get_candle_arrays(unit)
+        if arrays is None:
+            return 200, []
+
+        end = len(arrays['time'])
+        if params.get('to'):
+            to = datetime.fromisoformat(params['to'].replace(' ', 'T'))
+            if to.tzinfo is None:
+                to = to.replace(tzinfo=timezone.utc)
+            # 'to' 시각 이전의 캔들만 (업비트와 동일하게 'to'는 포함하지 않음)
+            end = int(np.searchsorted(arrays['time'], int(to.timestamp()), side='left'))
+
+        candles = []
+        for i in range(end - 1, max(end - count, 0) - 1, -1):
+            utc = datetime.fromtimestamp(int(arrays['time'][i]), timezone.utc)
+            candles.append({
+                'market': market,
+                'candle_date_time_utc': utc.strftime('%Y-%m-%dT%H:%M:%S'),
+                'candle_date_time_kst': (utc + KST_OFFSET).strftime('%Y-%m-%dT%H:%M:%S'),
+                'opening_price': float(arrays['open'][i]),
+                'high_price': float(arrays['high'][i]),
+                'low_price': float(arrays['low'][i]),
+                'trade_price': float(arrays['close'][i]),
+                'timestamp': int(arrays['timestamp'][i]),
+                'candle_acc_trade_price': float(arrays['acc_trade_price'][i]),
+                'candle_acc_trade_volume': float(arrays['volume'][i]),
+                'unit': unit,
+            })
+
+        return 200, candles
+
+    def _get_accounts(self) -> tuple:
+        with self._lock:
+            return 200, [
+                {
+                    'currency': currency,
+                    'balance': _num_str(item['balance']),
+                    'locked': _num_str(item['locked']),
+                    'avg_buy_price': _num_str(item['avg_buy_price']),
+                    'avg_buy_price_modified': False,
+                    'unit_currency': 'KRW',
+                }
+                for currency, item in self._accounts.items()
+            ]
+
+    def _account(self, currency: str) -> dict:
+        return self._accounts.setdefault(currency, {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+
+    def _create_order(self, body: dict) -> tuple:
+        market = body.get('market')
+        side = body.get('side')
+        ord_type = body.get('ord_type')
+
+        if market not in self._aggregators:
+            return _error(400, 'market_does_not_exist', f'마켓이 존재하지 않습니다. ({market})')
+        if side not in ('bid', 'ask'):
+            return _error(400, 'invalid_side', f'잘못된 주문 종류입니다. ({side})')
+
+        try:
+            price = float(body['price']) if body.get('price') is not None else None
+            volume = float(body['volume']) if body.get('volume') is not None else None
+        except ValueError:
+            return _error(400, 'invalid_parameter_error', '[price, volume] 값이 올바르지 않습니다.')
+
+        if ord_type == 'price' and (side != 'bid' or not price):
+            return _error(400, 'invalid_price_bid', '시장가 매수는 price가 필요합니다.')
+        if ord_type == 'market' and (side != 'ask' or not volume):
+            return _error(400, 'invalid_volume_ask', '시장가 매도는 volume이 필요합니다.')
+        if ord_type == 'limit' and (not price or not volume):
+            return _error(400, 'invalid_parameter_error', '지정가 주문은 price, volume이 필요합니다.')
+        if ord_type not in ('price', 'market', 'limit'):
+            return _error(400, 'invalid_ord_type', f'지원하지 않는 주문 방식입니다. ({ord_type})')
+
+        currency = market.split('-', 1)[1]
+
+        with self._lock:
+            # 매수는 주문 금액 + 수수료, 매도는 수량을 묶어둔다.
+            if side == 'bid':
+                funds = price if ord_type == 'price' else price * volume
+                locked = funds * (1 + self.fee_rate)
+                account = self._account('KRW')
+                if account['balance'] < locked:
+                    return _error(400, 'insufficient_funds_bid', '주문가능한 금액(KRW)이 부족합니다.')
+            else:
+                account = self._accounts.get(currency)
+                # 잔고를 문자열로 바꾸면서 생긴 반올림 오차는 허용
+                if account is None or account['balance'] < volume - 1e-8:
+                    return _error(400, 'insufficient_funds_ask', f'주문가능한 금액({currency})이 부족합니다.')
+                locked = min(volume, account['balance'])
+
+            account['balance'] -= locked
+            account['locked'] += locked
+
+            order = {
+                'uuid': str(uuid.uuid4()),
+                'side': side,
+                'ord_type': ord_type,
+                'price': price,
+                'state': 'wait',
+                'market': market,
+                'created_at': datetime.now(timezone(KST_OFFSET)).isoformat(timespec='seconds'),
+                'volume': volume,
+                'remaining_volume': volume,
+                'reserved_fee': (locked - locked / (1 + self.fee_rate)) if side == 'bid' else 0.0,
+                'remaining_fee': 0.0,
+                'paid_fee': 0.0,
+                'locked': locked,
+                'executed_volume': 0.0,
+                'executed_funds': 0.0,
+                'trades': [],
+            }
+            self._orders[order['uuid']] = order
+
+            if ord_type == 'limit':
+                self._open_limit_orders.append(order['uuid'])
+            else:
+                timer = threading.Timer(self.fill_delay_sec, self._fill_market_order, args=(order['uuid'],))
+                timer.daemon = True
+                timer.start()
+
+            return 201, self._order_response(order, include_trades=False)
+
+    def _fill_market_order(self, order_uuid: str):
+        with self._lock:
+            order = self._orders[order_uuid]
+            self._fill(order, self._prices[order['market']])
+
+    # 지정가 주문 체결 확인 (체결 가격이 주문 가격을 넘으면 주문 가격으로 체결)
+    def _match_limit_orders(self, market: str, price: float):
+        for order_uuid in list(self._open_limit_orders):
+            order = self._orders[order_uuid]
+            if order['market'] != market:
+                continue
+
+            if (order['side'] == 'bid' and price <= order['price']) or (order['side'] == 'ask' and price >= order['price']):
+                self._open_limit_orders.remove(order_uuid)
+                self._fill(order, order['price'])
+
+    # 주문 전체 체결 (lock 안에서 호출)
+    def _fill(self, order: dict, price: float):
+        if order['ord_type'] == 'price':
+            funds = order['price']
+            volume = round(funds / price, 8)
+        else:
+            volume = order['volume']
+            funds = price * volume
+        fee = funds * self.fee_rate
+
+        currency = order['market'].split('-', 1)[1]
+        krw = self._account('KRW')
+
+        if order['side'] == 'bid':
+            coin = self._account(currency)
+            total = coin['balance'] + coin['locked']
+            coin['avg_buy_price'] = (total * coin['avg_buy_price'] + funds) / (total + volume)
+            coin['balance'] += volume
+
+            # 묶어둔 금액 중 남은 금액은 돌려준다.
+            krw['locked'] -= order['locked']
+            krw['balance'] += order['locked'] - funds - fee
+        else:
+            coin = self._accounts[currency]
+            coin['locked'] -= order['locked']
+            krw['balance'] += funds - fee
+
+            if coin['balance'] <= 0 and coin['locked'] <= 0:
+                del self._accounts[currency]
+
+        order.update({
+            'state': 'done',
+            'remaining_volume': 0.0,
+            'paid_fee': fee,
+            'locked': 0.0,
+            'executed_volume': volume,
+            'executed_funds': funds,
+        })
+        order['trades'].append({
+            'market': order['market'],
+            'uuid': str(uuid.uuid4()),
+            'price': _num_str(price),
+            'volume': _num_str(volume),
+            'funds': _num_str(funds),
+            'side': order['side'],
+            'created_at': datetime.now(timezone(KST_OFFSET)).isoformat(timespec='seconds'),
+        })
+
+    def _order_response(self, order: dict, include_trades: bool = True) -> dict:
+        response = {
+            key: _num_str(value) if isinstance(value, float) else value
+            for key, value in order.items() if key != 'trades'
+        }
+        response['trades_count'] = len(order['trades'])
+        if include_trades:
+            response['trades'] = list(order['trades'])
+
+        return response
+
+    def _get_open_orders(self, params: dict) -> tuple:
+        states = params.get('states[]') or [params.get('state') or 'wait']
+
+        with self._lock:
+            return 200, [
+                self._order_response(order, include_trades=False)
+                for order in reversed(list(self._orders.values()))
+                if order['state'] in states and (not params.get('market') or order['market'] == params['market'])
+            ]
+
+    def _get_order(self, params: dict) -> tuple:
+        with self._lock:
+            order = self._orders.get(params.get('uuid'))
+            if order is None:
+                return _error(404, 'order_not_found', '주문을 찾지 못했습니다.')
+
+            return 200, self._order_response(order)
+
+    # ============================== WebSocket ==============================
+
+    def _broadcast(self, market: str, payload: bytes):
+        if self.in_outage():
+            # 장애가 시작되면 연결을 모두 끊는다.
+            if not self._ws_outage_notified:
+                self._ws_outage_notified = True
+                for _, queue in list(self._ws_clients):
+                    self._ws_loop.call_soon_threadsafe(queue.put_nowait, None)
+            return
+
+        self._ws_outage_notified = False
+        for codes, queue in list(self._ws_clients):
+            if market in codes:
+                self._ws_loop.call_soon_threadsafe(self._enqueue, queue, payload)
+
+    # 받는 쪽이 느려서 쌓인 메시지가 많으면 버린다.
+    def _enqueue(self, queue: asyncio.Queue, payload: bytes):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.stats['ws_dropped'] += 1
+
+    async def _ws_handler(self, websocket):
+        if self.in_outage():
+            await websocket.close(1013, 'outage')
+            return
+
+        request = json.loads(await websocket.recv())
+        codes = set()
+        for item in request:
+            if item.get('type') == 'trade':
+                codes.update(item.get('codes', []))
+
+        client = (frozenset(codes), asyncio.Queue(maxsize=10000))
+        self._ws_clients.add(client)
+        try:
+            while True:
+                payload = await client[1].get()
+                if payload is None:
+                    await websocket.close(1013, 'outage')
+                    break
+
+                delay = self._delay_sec()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                await websocket.send(payload)
+                self.stats['ws_sent'] += 1
+        except ConnectionClosed:
+            pass
+        finally:
+            self._ws_clients.discard(client)
+
+    def _run_ws(self):
+        self._ws_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._ws_loop)
+        self._ws_stop = asyncio.Event()
+
+        async def run():
+            async with serve(self._ws_handler, self.host, self.ws_port) as server:
+                self.ws_port = server.sockets[0].getsockname()[1]
+                self._ws_ready.set()
+                await self._ws_stop.wait()
+
+        try:
+            self._ws_loop.run_until_complete(run())
+        finally:
+            self._ws_ready.set()
+            self._ws_loop.close()
+
+    # ============================== 실행 ==============================
+
+    def start(self):
+        handler = type('MockRequestHandler', (_MockRequestHandler,), {'exchange': self})
+        self._http_server = ThreadingHTTPServer((self.host, self.http_port), handler)
+        self._http_server.daemon_threads = True
+        self.http_port = self._http_server.server_address[1]
+        self._http_thread = threading.Thread(target=self._http_server.serve_forever, name='mock-http', daemon=True)
+        self._http_thread.start()
+
+        self._ws_thread = threading.Thread(target=self._run_ws, name='mock-ws', daemon=True)
+        self._ws_thread.start()
+        self._ws_ready.wait(5)
+
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self._tick_thread = threading.Thread(target=self._run_ticks, name='mock-ticks', daemon=True)
+        self._tick_thread.start()
+
+        logger.info(f'모의 거래소 시작 : {self.base_url}, {self.ws_url}, 마켓 {self.markets}')
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._tick_thread is not None:
+            self._tick_thread.join(timeout)
+
+        if self._ws_loop is not None and self._ws_stop is not None and not self._ws_loop.is_closed():
+            self._ws_loop.call_soon_threadsafe(self._ws_stop.set)
+        if self._ws_thread is not None:
+            self._ws_thread.join(timeout)
+
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive (UpbitClient 연결 재사용)
+    disable_nagle_algorithm = True  # 헤더와 body를 따로 보내면서 생기는 지연(delayed ACK) 방지
+    exchange = None
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length > 0 else b''
+
+        status, payload, headers = self.exchange.handle_request(
+            method, url.path, url.query, raw_body, self.headers.get('Authorization'))
+
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} {format % args}')
+
+
+# ============================== 성능 측정 ==============================
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+
+    array = np.array(values) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(array, 50)), 3),
+        'p90_ms': round(float(np.percentile(array, 90)), 3),
+        'p99_ms': round(float(np.percentile(array, 99)), 3),
+        'max_ms': round(float(array.max()), 3),
+    }
+
+
+def run_benchmark(exchange: MockExchange, duration_sec: float = 10.0, orders: int = 5) -> dict:
+    """
+    모의 거래소로 틱 지연시간/처리량, REST 응답 시간, 주문 체결 확인 시간 측정
+
+    - tick: 모의 체결 생성부터 TradeFeed listener 호출까지 걸린 시간
+    - rest: UpbitClient로 캔들(200개), 계좌 조회
+    - order: 시장가 매수/매도 후 OrderTracker로 체결 확인까지 걸린 시간
+    """
+    from utils.upbit_client import UpbitClient
+    from upbit_data.websocket_feed import TradeFeed
+    from trading.order_tracker import OrderTracker
+
+    tick_latencies = []
+    feed = TradeFeed(exchange.markets, url=exchange.ws_url, units=(1,))
+    feed.add_listener(lambda market, trade: tick_latencies.append(time.time() - trade['mock_created_at']))
+    feed.start()
+    feed.wait_connected(5)
+    feed_start = time.perf_counter()
+
+    client = UpbitClient(base_url=exchange.base_url, access_key=exchange.access_key, secret_key=exchange.secret_key)
+    market = exchange.markets[0]
+
+    # REST: 측정 시간 동안 캔들/계좌 조회 반복 (클라이언트의 요청 수 제한 적용)
+    rest_start = time.perf_counter()
+    while time.perf_counter() - rest_start < duration_sec:
+        client.get(f'/v1/candles/minutes/{exchange.units[0]}', params={'market': market, 'count': 200})
+        client.get('/v1/accounts', auth=True)
+
+    # 주문: 시장가 매수 -> 체결 확인 -> 시장가 매도 -> 체결 확인
+    def get_order_func(order_uuid: str) -> dict:
+        return client.get('/v1/order', params={'uuid': order_uuid}, auth=True).json()
+
+    tracker = OrderTracker(get_order_func, initial_sec=0.01)
+    order_latencies = []
+    for _ in range(orders):
+        start = time.perf_counter()
+        bid = client.post('/v1/orders', body={'market': market, 'side': 'bid', 'ord_type': 'price',
+                                              'price': 10000}).json()
+        bid_fill = tracker.track(bid['uuid']).result()
+        ask = client.post('/v1/orders', body={'market': market, 'side': 'ask', 'ord_type': 'market',
+                                              'volume': _num_str(bid_fill['executed_volume'])}).json()
+        tracker.track(ask['uuid']).result()
+        order_latencies.append((time.perf_counter() - start) / 2)
+
+    feed.stop()
+    tracker.shutdown()
+    feed_elapsed = time.perf_counter() - feed_start
+
+    return {
+        'tick': dict(_percentiles(tick_latencies), per_sec=round(len(tick_latencies) / feed_elapsed, 1)),
+        'rest': client.get_latency_stats(),
+        'order': _percentiles(order_latencies),
+        'exchange': dict(exchange.stats),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='로컬 모의 거래소 (업비트 대용)')
+    parser.add_argument('--markets', nargs='+', default=['KRW-DOGE'])
+    parser.add_argument('--units', nargs='+', type=int, default=[1, 3, 5, 15])
+    parser.add_argument('--history', type=int, default=1200)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--http-port', type=int, default=8000)
+    parser.add_argument('--ws-port', type=int, default=8765)
+    parser.add_argument('--krw', type=float, default=1000000.0, help='시작 원화 잔고')
+    parser.add_argument('--trades-per-sec', type=float, default=5.0, help='마켓별 초당 체결 수')
+    parser.add_argument('--recorded', default=None, help='녹화된 체결 데이터 (JSON Lines)')
+    parser.add_argument('--fill-delay', type=float, default=0.05, help='시장가 주문 체결 시간 (초)')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='429 응답 확률')
+    parser.add_argument('--no-rate-limit', action='store_true', help='그룹별 요청 수 제한 사용 안함')
+    parser.add_argument('--outage-every', type=float, default=0.0, help='장애 주기 (초)')
+    parser.add_argument('--outage-sec', type=float, default=0.0, help='장애 시간 (초)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--bench', type=float, default=None, help='성능 측정 시간 (초)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    mock_exchange = MockExchange(
+        markets=tuple(args.markets),
+        units=tuple(args.units),
+        history=args.history,
+        host=args.host,
+        http_port=0 if args.bench else args.http_port,
+        ws_port=0 if args.bench else args.ws_port,
+        krw_balance=args.krw,
+        trades_per_sec=args.trades_per_sec,
+        recorded_trades=load_recorded_trades(args.recorded) if args.recorded else None,
+        fill_delay_sec=args.fill_delay,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=not args.no_rate_limit,
+        outage_interval_sec=args.outage_every,
+        outage_sec=args.outage_sec,
+        seed=args.seed,
+    )
+    mock_exchange.start()
+
+    if args.bench:
+        print(json.dumps(run_benchmark(mock_exchange, args.bench), indent=2, ensure_ascii=False))
+        mock_exchange.stop()
+    else:
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        try:
+            stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+        mock_exchange.stop()
@@ -0,0 +1,257 @@
+import os, sys, time, random, signal, logging, cProfile, threading, functools
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Callable
+
+"""
+# 스케줄러 작업 프로파일링
+
+운영 중에 auto_trading이 느려졌을 때 재시작하지 않고 원인을 찾기 위해, 요청이 있으면 다음 {runs}번의 실행을 프로파일링합니다.
+
+- 요청 방법
+  - 시그널: SIGUSR1 -> 샘플링, SIGUSR2 -> cProfile (윈도우는 시그널이 없으므로 플래그 파일 사용)
+  - 플래그 파일: {PROFILE_DIR}/profile.flag 파일 생성 (내용: '[sample|cprofile] [실행 횟수]', 비어 있으면 'sample 3')
+    다음 실행 전에 읽고 삭제합니다.
+- 방식
+  - sample: 별도 스레드에서 {interval_ms}ms마다 작업 스레드의 호출 스택을 기록합니다. (오버헤드 낮음)
+    flamegraph 도구(flamegraph.pl, speedscope 등)에서 읽을 수 있는 collapsed stack 형식(.folded)으로 저장합니다.
+  - cprofile: cProfile로 모든 함수 호출을 기록하고 pstats 파일(.prof)로 저장합니다. (snakeviz 등으로 확인)
+- 상시 샘플링: {sample_rate}(ex. 0.01) 확률로 실행을 샘플링하여 하나의 파일(profile_sampled.folded)에 누적합니다.
+  나머지 실행은 확률 확인만 하므로 오버헤드가 거의 없습니다.
+
+## 파일
+- {PROFILE_DIR}/profile_{시각(ms)}_{작업 이름}.folded 또는 .prof
+- {PROFILE_DIR}/profile_sampled.folded (상시 샘플링 누적)
+
+## 환경변수 (.env)
+- PROFILE_DIR: 결과 저장 디렉토리, 기본값 logs
+- PROFILE_RUNS: 요청 한번에 프로파일링할 실행 횟수, 기본값 3
+- PROFILE_SAMPLE_RATE: 상시 샘플링 확률, 기본값 0 (사용 안함)
+- PROFILE_INTERVAL_MS: 샘플링 간격(ms), 기본값 5
+"""
+
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs'))
+PROFILE_RUNS = int(os.getenv('PROFILE_RUNS', '3'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+
+MODE_SAMPLE = 'sample'
+MODE_CPROFILE = 'cprofile'
+
+logger = logging.getLogger(__name__)
+
+
+# 프레임 -> collapsed stack 문자열 (root;...;leaf)
+def _collapse_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname은 Python 3.11부터 지원
+        names.append(f'{os.path.basename(code.co_filename)}:{getattr(code, "co_qualname", code.co_name)}')
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    지정한 스레드의 호출 스택을 주기적으로 기록 (collapsed stack)
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval_sec = interval_ms / 1000
+        self.stacks = Counter()  # {collapsed stack: 샘플 수}
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        return self.stacks
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_sec):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse_stack(frame)] += 1
+
+
+def write_collapsed(path: str, stacks: Counter):
+    with open(path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+
+def read_collapsed(path: str) -> Counter:
+    stacks = Counter()
+    if not os.path.exists(path):
+        return stacks
+
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+
+    return stacks
+
+
+class JobProfiler:
+    def __init__(
+            self,
+            output_dir: str = PROFILE_DIR,
+            runs: int = PROFILE_RUNS,
+            sample_rate: float = PROFILE_SAMPLE_RATE,
+            interval_ms: float = PROFILE_INTERVAL_MS
+    ):
+        self.output_dir = output_dir
+        self.flag_path = os.path.join(output_dir, 'profile.flag')
+        self.sampled_path = os.path.join(output_dir, 'profile_sampled.folded')
+        self.runs = runs
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+
+        # 요청된 프로파일링 (방식, 남은 실행 횟수)
+        self._mode = MODE_SAMPLE
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def request(self, mode: str = MODE_SAMPLE, runs: Optional[int] = None):
+        """
+        다음 {runs}번의 실행 프로파일링 요청
+
+        Args:
+            mode (str): 'sample' 또는 'cprofile'
+            runs (int, optional): 실행 횟수 (없으면 기본값)
+        """
+        if mode not in (MODE_SAMPLE, MODE_CPROFILE):
+            raise ValueError(f'지원하지 않는 프로파일링 방식입니다. ({mode})')
+
+        with self._lock:
+            self._mode = mode
+            self._pending = runs or self.runs
+
+        logger.info(f'프로파일링 요청 : {mode}, 다음 {runs or self.runs}번 실행')
+
+    def install_signal_handlers(self):
+        """
+        SIGUSR1(샘플링), SIGUSR2(cProfile) 시그널로 프로파일링 요청 (메인 스레드에서 호출, 윈도우는 지원하지 않음)
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+
+        signal.signal(signal.SIGUSR1, lambda *_: self.request(MODE_SAMPLE))
+        signal.signal(signal.SIGUSR2, lambda *_: self.request(MODE_CPROFILE))
+
+    # 플래그 파일이 있으면 읽고 삭제
+    def _check_flag(self):
+        if not os.path.exists(self.flag_path):
+            return
+
+        try:
+            with open(self.flag_path) as f:
+                args = f.read().split()
+            os.remove(self.flag_path)
+
+            mode = args[0] if args else MODE_SAMPLE
+            runs = int(args[1]) if len(args) > 1 else None
+            self.request(mode, runs)
+        except (OSError, ValueError) as e:
+            logger.error(f'프로파일링 플래그 파일 오류 : {e}')
+
+    # 이번 실행의 프로파일링 방식 (None이면 프로파일링하지 않음)
+    def _next_mode(self) -> tuple:
+        self._check_flag()
+
+        with self._lock:
+            if self._pending > 0:
+                self._pending -= 1
+                return self._mode, False
+
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return MODE_SAMPLE, True
+
+        return None, False
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        작업 함수에 프로파일링 적용 (ex. scheduler.add_job(profiler.wrap(auto_trading)))
+        """
+        job_name = getattr(func, '__name__', 'job')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            mode, is_sampled = self._next_mode()
+            if mode is None:
+                return func(*args, **kwargs)
+
+            if mode == MODE_CPROFILE:
+                return self._run_cprofile(job_name, func, args, kwargs)
+
+            return self._run_sample(job_name, func, args, kwargs, is_sampled)
+
+        return wrapper
+
+    def _make_path(self, job_name: str, ext: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        return os.path.join(self.output_dir, f'profile_{timestamp}_{job_name}.{ext}')
+
+    def _run_cprofile(self, job_name: str, func: Callable, args: tuple, kwargs: dict):
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            path = self._make_path(job_name, 'prof')
+            profile.dump_stats(path)
+            logger.info(f'[{job_name}] cProfile 저장 : {path} ({(time.perf_counter() - start) * 1000:.1f}ms)')
+
+    def _run_sample(self, job_name: str, func: Callable, args: tuple, kwargs: dict, is_sampled: bool):
+        sampler = StackSampler(threading.get_ident(), self.interval_ms)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stacks = sampler.stop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            try:
+                if is_sampled:
+                    # 상시 샘플링은 하나의 파일에 누적
+                    os.makedirs(self.output_dir, exist_ok=True)
+                    write_collapsed(self.sampled_path, read_collapsed(self.sampled_path) + stacks)
+                    logger.debug(f'[{job_name}] 샘플링 누적 : {sum(stacks.values())}개 ({elapsed_ms:.1f}ms)')
+                else:
+                    path = self._make_path(job_name, 'folded')
+                    write_collapsed(path, stacks)
+                    logger.info(f'[{job_name}] 샘플링 저장 : {path}, {sum(stacks.values())}개 ({elapsed_ms:.1f}ms)')
+            except OSError as e:
+                logger.error(f'[{job_name}] 프로파일링 결과 저장 오류 : {e}')
+
+
+# 공용 프로파일러
+_job_profiler = None
+_job_profiler_lock = threading.Lock()
+
+
+def get_job_profiler() -> JobProfiler:
+    global _job_profiler
+
+    if _job_profiler is None:
+        with _job_profiler_lock:
+            if _job_profiler is None:
+                _job_profiler = JobProfiler()
+
+    return _job_profiler
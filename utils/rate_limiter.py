@@ -0,0 +1,212 @@
+import time, threading
+from typing import Optional
+from utils.exchange_clock import get_exchange_clock
+
+"""
+# 업비트 API 요청 수 제한 (Rate Limit)
+URL: https://docs.upbit.com/reference/rate-limits
+
+- 업비트는 API 그룹별로 초당 요청 수를 제한하며, 응답 헤더 'Remaining-Req'로 남은 요청 수를 알려줍니다.
+  (ex. 'group=default; min=1800; sec=29')
+- 그룹별 토큰 버킷으로 요청 속도를 조절하고, 'Remaining-Req' 값을 보고 허용량을 보정합니다.
+  - 같은 API 키를 사용하는 다른 프로세스의 요청도 서버의 남은 요청 수에 포함되므로, 남은 요청 수가 토큰보다 적으면
+    토큰을 줄이고 서버의 초 단위 구간(거래소 시각 기준)이 끝날 때까지 충전하지 않습니다.
+- 요청 수를 초과할 것 같으면 에러를 내지 않고 토큰이 생길 때까지 대기합니다.
+- 같은 그룹에서 대기 중인 요청이 여러 개인 경우 주문 관련(우선순위 높음) 요청을 먼저 처리합니다. (get_api_priority)
+  - default 그룹은 계좌 조회, 대기 주문 조회와 개별 주문 조회/취소가 같이 사용하므로 체결 확인과 취소가 먼저 처리됩니다.
+  - 주문 생성은 별도 그룹(order)이며 모두 우선순위가 높습니다.
+
+## 그룹별 기본 허용량 (초당)
+- 시세 조회(quotation): market, candle, trade, ticker, orderbook - 10회
+- 거래소(exchange): default - 30회, order(주문 생성) - 8회
+"""
+
+PRIORITY_HIGH = 0  # 주문 생성, 개별 주문 조회/취소
+PRIORITY_NORMAL = 1  # 시세/계좌 조회
+
+DEFAULT_GROUP_LIMITS = {
+    'market': 10,
+    'candle': 10,
+    'trade': 10,
+    'ticker': 10,
+    'orderbook': 10,
+    'default': 30,
+    'order': 8,
+}
+
+
+# 'Remaining-Req' 헤더 파싱
+# 'group=default; min=1800; sec=29' -> ('default', 29)
+def parse_remaining_req(header: Optional[str]) -> Optional[tuple]:
+    if not header:
+        return None
+
+    values = {}
+    for item in header.split(';'):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            values[key.strip()] = value.strip()
+
+    if 'group' not in values or 'sec' not in values:
+        return None
+
+    try:
+        return values['group'], int(values['sec'])
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    def __init__(self, capacity: int):
+        self.capacity = capacity  # 초당 허용량 (1초 동안 채워지는 토큰 수)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+        self.high_waiting = 0  # 대기 중인 우선순위 높은 요청 수
+        self.hold_until = 0.0  # 서버 기준 남은 요청 수를 적용하는 구간의 끝 (time.monotonic(), 이때까지 충전하지 않음)
+        self.cond = threading.Condition()
+
+        # 통계
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_sec = 0.0
+        self.too_many_requests = 0
+
+    # 경과 시간만큼 토큰 충전 (cond 안에서 호출, 서버 기준으로 줄인 구간은 충전하지 않음)
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - max(self.updated_at, self.hold_until)
+        if elapsed > 0:
+            self.tokens = min(float(self.capacity), self.tokens + elapsed * self.capacity)
+        self.updated_at = now
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> bool:
+        start = time.monotonic()
+        is_throttled = False
+
+        with self.cond:
+            if priority == PRIORITY_HIGH:
+                self.high_waiting += 1
+
+            try:
+                while True:
+                    self._refill()
+
+                    # 우선순위 높은 요청이 대기 중이면 일반 요청은 양보한다.
+                    if self.tokens >= 1 and (priority == PRIORITY_HIGH or self.high_waiting == 0):
+                        self.tokens -= 1
+                        self.acquired += 1
+                        break
+
+                    is_throttled = True
+                    wait = max((1 - self.tokens) / self.capacity, self.hold_until - self.updated_at, 0.001)
+                    if timeout is not None:
+                        remaining = timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+
+                    self.cond.wait(wait)
+            finally:
+                if priority == PRIORITY_HIGH:
+                    self.high_waiting -= 1
+                    self.cond.notify_all()
+
+                if is_throttled:
+                    self.throttled += 1
+                    self.wait_sec += time.monotonic() - start
+
+        return True
+
+    # 서버가 알려준 남은 요청 수로 보정
+    def observe_remaining(self, remaining: int):
+        with self.cond:
+            self._refill()
+
+            # 남은 요청 수 + 방금 사용한 1회보다 허용량이 작게 잡혀있으면 늘린다.
+            if remaining + 1 > self.capacity:
+                self.capacity = remaining + 1
+
+            # 다른 프로세스에서도 같은 키로 호출할 수 있으므로 서버 기준 남은 요청 수를 넘지 않도록 하고,
+            # 서버의 현재 1초 구간이 끝날 때까지는 충전하지 않는다. (바로 충전하면 줄인 값이 유지되지 않음)
+            if remaining < self.tokens:
+                self.tokens = float(remaining)
+                self.hold_until = self.updated_at + (1.0 - get_exchange_clock().now() % 1.0)
+
+    # 429(Too Many Requests) 응답을 받은 경우 토큰을 비운다.
+    def penalize(self):
+        with self.cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+            self.too_many_requests += 1
+
+    def get_stats(self) -> dict:
+        with self.cond:
+            return {
+                'capacity': self.capacity,
+                'tokens': self.tokens,
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'wait_sec': self.wait_sec,
+                'too_many_requests': self.too_many_requests,
+            }
+
+
+class RateLimiter:
+    def __init__(self, group_limits: Optional[dict] = None):
+        self._group_limits = dict(DEFAULT_GROUP_LIMITS, **(group_limits or {}))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, group: str) -> TokenBucket:
+        with self._lock:
+            if group not in self._buckets:
+                self._buckets[group] = TokenBucket(self._group_limits.get(group, self._group_limits['default']))
+            return self._buckets[group]
+
+    def acquire(self, group: str, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> bool:
+        return self._get_bucket(group).acquire(priority, timeout)
+
+    def update_from_header(self, header: Optional[str]):
+        remaining_req = parse_remaining_req(header)
+        if remaining_req is not None:
+            group, remaining = remaining_req
+            self._get_bucket(group).observe_remaining(remaining)
+
+    def penalize(self, group: str):
+        self._get_bucket(group).penalize()
+
+    # 그룹별 통계 (throttled: 대기한 요청 수, wait_sec: 총 대기 시간)
+    def get_stats(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+
+        return {group: bucket.get_stats() for group, bucket in buckets.items()}
+
+
+# API 경로로 그룹 확인
+def get_api_group(method: str, path: str) -> str:
+    if path.startswith('/v1/candles'):
+        return 'candle'
+    if path.startswith('/v1/market'):
+        return 'market'
+    if path.startswith('/v1/ticker'):
+        return 'ticker'
+    if path.startswith('/v1/trades'):
+        return 'trade'
+    if path.startswith('/v1/orderbook'):
+        return 'orderbook'
+    if method == 'POST' and path == '/v1/orders':
+        return 'order'
+
+    return 'default'
+
+
+# API 경로로 우선순위 확인 (주문 생성, 개별 주문 조회/취소는 같은 그룹의 조회 요청보다 먼저 처리)
+def get_api_priority(method: str, path: str) -> int:
+    if method == 'POST' and path == '/v1/orders':
+        return PRIORITY_HIGH
+    if path == '/v1/order':
+        return PRIORITY_HIGH
+
+    return PRIORITY_NORMAL
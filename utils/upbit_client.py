@@ -0,0 +1,195 @@
+import os, time, uuid, hashlib, threading
+import jwt
+import requests
+from typing import Optional
+from urllib.parse import urlencode, unquote
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.rate_limiter import RateLimiter, get_api_group, get_api_priority
+from utils.exchange_clock import get_exchange_clock
+from utils.metrics import get_metrics
+
+load_dotenv()
+
+"""
+# 업비트 API 공용 클라이언트
+
+- requests.Session을 공유하여 TLS 연결을 재사용(keep-alive)합니다. (매 호출마다 핸드셰이크를 하지 않음)
+- 인증이 필요한 API는 JWT(query_hash 포함) 서명을 한 곳에서 처리합니다.
+- 엔드포인트별 호출 횟수, 에러 횟수, 응답 시간(latency)을 기록합니다. (metrics에도 기록)
+- API 그룹별 요청 수 제한(rate_limiter)을 적용하고, 429 응답은 대기 후 다시 요청합니다.
+- 응답의 Date 헤더로 거래소 시각(exchange_clock)을 추정합니다.
+
+## 환경변수 (.env)
+- UPBIT_BASE_URL: API 주소 (기본값: https://api.upbit.com)
+- UPBIT_CONNECT_TIMEOUT: 연결 타임아웃(초), 기본값 3.05
+- UPBIT_READ_TIMEOUT: 응답 타임아웃(초), 기본값 10
+"""
+
+UPBIT_BASE_URL = os.getenv('UPBIT_BASE_URL', 'https://api.upbit.com')
+UPBIT_CONNECT_TIMEOUT = float(os.getenv('UPBIT_CONNECT_TIMEOUT', '3.05'))
+UPBIT_READ_TIMEOUT = float(os.getenv('UPBIT_READ_TIMEOUT', '10'))
+UPBIT_MAX_RETRY = 3  # 429(Too Many Requests) 응답 시 재시도 횟수
+
+
+class UpbitClient:
+    def __init__(
+            self,
+            base_url: str = UPBIT_BASE_URL,
+            access_key: Optional[str] = None,
+            secret_key: Optional[str] = None,
+            timeout: tuple = (UPBIT_CONNECT_TIMEOUT, UPBIT_READ_TIMEOUT),
+            pool_maxsize: int = 10,
+            rate_limiter: Optional[RateLimiter] = None
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.access_key = access_key if access_key is not None else os.getenv('ACCESS_KEY', '')
+        self.secret_key = secret_key if secret_key is not None else os.getenv('SECRET_KEY', '')
+        self.timeout = timeout
+
+        # 연결 풀 설정 (캔들 페이지 동시 요청을 고려하여 최대 {pool_maxsize}개의 연결 유지)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+        # API 그룹별 요청 수 제한
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+        # 엔드포인트별 latency 통계
+        # key: 'GET /v1/accounts', value: {count, error, total_sec, max_sec}
+        self._latency_stats = {}
+        self._latency_lock = threading.Lock()
+
+    # 인증 헤더 생성
+    # 파라미터가 있는 경우 query string의 SHA512 해시를 payload에 포함한다.
+    def make_auth_headers(self, params: Optional[dict] = None) -> dict:
+        payload = {
+            "access_key": self.access_key,
+            "nonce": str(uuid.uuid4()),
+        }
+
+        if params:
+            query_string = unquote(urlencode(params, doseq=True)).encode("utf-8")
+            payload['query_hash'] = hashlib.sha512(query_string).hexdigest()
+            payload['query_hash_alg'] = 'SHA512'
+
+        jwt_token = jwt.encode(payload, self.secret_key)
+        return {
+            "Authorization": 'Bearer {}'.format(jwt_token)
+        }
+
+    def request(
+            self,
+            method: str,
+            path: str,
+            params: Optional[dict] = None,
+            body: Optional[dict] = None,
+            auth: bool = False,
+            timeout: Optional[tuple] = None,
+            priority: Optional[int] = None
+    ) -> requests.Response:
+        """
+        업비트 API 호출
+
+        Args:
+            method (str): HTTP 메소드 (GET, POST, DELETE)
+            path (str): API 경로 (ex. '/v1/accounts')
+            params (dict, optional): query string 파라미터
+            body (dict, optional): JSON body 파라미터
+            auth (bool): 인증(JWT) 헤더 포함 여부
+            timeout (tuple, optional): (연결, 응답) 타임아웃. 없으면 기본값 사용
+            priority (int, optional): 요청 수 제한 대기 시 우선순위. 없으면 주문 생성, 개별 주문 조회/취소만 PRIORITY_HIGH
+
+        Returns:
+            requests.Response: 응답
+        """
+        url = self.base_url + path
+        endpoint = f'{method} {path}'
+
+        group = get_api_group(method, path)
+        if priority is None:
+            priority = get_api_priority(method, path)
+
+        for retry in range(UPBIT_MAX_RETRY + 1):
+            # 요청 수 제한에 걸리면 토큰이 생길 때까지 대기
+            self.rate_limiter.acquire(group, priority)
+
+            # nonce는 매번 달라야 하므로 재시도할 때마다 새로 만든다.
+            headers = self.make_auth_headers(body if body is not None else params) if auth else None
+
+            sent_at = time.time()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, json=body, headers=headers,
+                                                timeout=timeout or self.timeout)
+            except requests.RequestException:
+                self._record_latency(endpoint, time.perf_counter() - start, True)
+                raise
+
+            self._record_latency(endpoint, time.perf_counter() - start, not response.ok)
+            self.rate_limiter.update_from_header(response.headers.get('Remaining-Req'))
+            get_exchange_clock().observe_http_date(response.headers.get('Date'), sent_at, time.time())
+
+            if response.status_code != 429 or retry == UPBIT_MAX_RETRY:
+                return response
+
+            # 429(Too Many Requests)인 경우 토큰을 비우고 잠시 대기 후 재시도
+            self.rate_limiter.penalize(group)
+            time.sleep(0.1 * (2 ** retry))
+
+        return response
+
+    def get(self, path: str, params: Optional[dict] = None, auth: bool = False, **kwargs) -> requests.Response:
+        return self.request('GET', path, params=params, auth=auth, **kwargs)
+
+    def post(self, path: str, body: Optional[dict] = None, auth: bool = True, **kwargs) -> requests.Response:
+        return self.request('POST', path, body=body, auth=auth, **kwargs)
+
+    def _record_latency(self, endpoint: str, elapsed_sec: float, is_error: bool):
+        with self._latency_lock:
+            stats = self._latency_stats.setdefault(endpoint, {
+                'count': 0,
+                'error': 0,
+                'total_sec': 0.0,
+                'max_sec': 0.0
+            })
+            stats['count'] += 1
+            stats['error'] += 1 if is_error else 0
+            stats['total_sec'] += elapsed_sec
+            stats['max_sec'] = max(stats['max_sec'], elapsed_sec)
+
+        metrics = get_metrics()
+        metrics.observe('api_request_seconds', elapsed_sec, endpoint=endpoint)
+        metrics.inc('api_requests_total', endpoint=endpoint)
+        if is_error:
+            metrics.inc('api_errors_total', endpoint=endpoint)
+
+    # 엔드포인트별 latency 통계 (평균 포함)
+    def get_latency_stats(self) -> dict:
+        with self._latency_lock:
+            return {
+                endpoint: dict(stats, avg_sec=stats['total_sec'] / stats['count'] if stats['count'] else 0.0)
+                for endpoint, stats in self._latency_stats.items()
+            }
+
+    def reset_latency_stats(self):
+        with self._latency_lock:
+            self._latency_stats.clear()
+
+
+# 공용 클라이언트
+_upbit_client = None
+_upbit_client_lock = threading.Lock()
+
+
+def get_upbit_client() -> UpbitClient:
+    global _upbit_client
+
+    if _upbit_client is None:
+        with _upbit_client_lock:
+            if _upbit_client is None:
+                _upbit_client = UpbitClient()
+
+    return _upbit_client
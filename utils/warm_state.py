@@ -0,0 +1,138 @@
+import os, time, pickle, logging, threading
+from typing import Optional
+from upbit_data.candle import export_candle_cache, import_candle_cache
+from trading.indicator_cache import get_indicator_cache
+
+"""
+# 캔들/지표 캐시 스냅샷 (warm start)
+
+재시작하면 메모리의 캔들 캐시와 지표 캐시가 비어있어서 첫 실행 때 캔들 전체(1,000개, 5페이지)를 다시 조회하고 지표를 다시 계산합니다.
+주기적으로 두 캐시를 파일 하나로 저장해두고, 시작할 때 불러와서 마지막 캔들 이후의 데이터만 가져오도록 합니다.
+
+- 캔들 캐시: (market, minute) 별 CandleFrame (진행 중인 캔들 포함, upbit_data/candle.py)
+- 지표 캐시: 캔들 구간별로 계산된 지표 배열 (trading/indicator_cache.py)
+- 저장은 임시 파일에 쓰고 fsync 후 교체(os.replace)하기 때문에 저장 도중 종료되어도 이전 스냅샷이 남습니다.
+- 저장한 지 {max_age_sec}초가 지난 스냅샷은 사용하지 않습니다. (어차피 캔들을 전부 다시 가져와야 함)
+- 이 프로그램이 직접 저장한 파일만 읽어야 합니다. (pickle)
+
+## 환경변수 (.env)
+- WARM_STATE_PATH: 스냅샷 파일 경로, 기본값 data/state/warm_state.pkl
+- WARM_STATE_INTERVAL_SEC: 저장 주기(초), 기본값 60
+- WARM_STATE_MAX_AGE_SEC: 스냅샷 최대 사용 시간(초), 기본값 3600
+"""
+
+WARM_STATE_PATH = os.getenv(
+    'WARM_STATE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'state', 'warm_state.pkl'))
+WARM_STATE_INTERVAL_SEC = float(os.getenv('WARM_STATE_INTERVAL_SEC', '60'))
+WARM_STATE_MAX_AGE_SEC = float(os.getenv('WARM_STATE_MAX_AGE_SEC', '3600'))
+
+WARM_STATE_VERSION = 2  # 2: 캔들 캐시를 CandleFrame으로 저장
+
+logger = logging.getLogger(__name__)
+
+
+def save_warm_state(path: str = WARM_STATE_PATH) -> dict:
+    """
+    캔들/지표 캐시를 파일로 저장
+
+    Returns:
+        dict: 저장 결과 (candles: 캔들 캐시 개수, indicator_frames: 지표 캐시 구간 개수, elapsed_ms)
+    """
+    start = time.perf_counter()
+
+    state = {
+        'version': WARM_STATE_VERSION,
+        'saved_at': time.time(),
+        'candles': export_candle_cache(),
+        'indicator_frames': get_indicator_cache().export_frames(),
+    }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return {
+        'candles': len(state['candles']),
+        'indicator_frames': len(state['indicator_frames']),
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+def load_warm_state(path: str = WARM_STATE_PATH, max_age_sec: float = WARM_STATE_MAX_AGE_SEC) -> Optional[dict]:
+    """
+    저장된 캔들/지표 캐시 불러오기
+
+    Returns:
+        dict, optional: 불러온 결과 (candles, indicator_frames, age_sec, elapsed_ms), 사용할 스냅샷이 없으면 None
+    """
+    start = time.perf_counter()
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError) as e:
+        logger.warning(f'캐시 스냅샷을 읽을 수 없습니다. ({path}) : {e}')
+        return None
+
+    if state.get('version') != WARM_STATE_VERSION:
+        return None
+
+    age_sec = time.time() - state['saved_at']
+    if age_sec > max_age_sec:
+        logger.info(f'캐시 스냅샷이 오래되어 사용하지 않습니다. ({age_sec:.0f}초 전)')
+        return None
+
+    result = {
+        'candles': import_candle_cache(state['candles']),
+        'indicator_frames': get_indicator_cache().import_frames(state['indicator_frames']),
+        'age_sec': age_sec,
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
+
+    logger.info(f'캐시 스냅샷 복원 : {result}')
+
+    return result
+
+
+class WarmStateSnapshotter:
+    def __init__(self, path: str = WARM_STATE_PATH, interval_sec: float = WARM_STATE_INTERVAL_SEC):
+        self.path = path
+        self.interval_sec = interval_sec
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='warm-state', daemon=True)
+        self._thread.start()
+
+    # 종료하면서 한번 더 저장
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        self._save()
+
+    def _save(self):
+        try:
+            result = save_warm_state(self.path)
+            logger.debug(f'캐시 스냅샷 저장 : {result}')
+        except Exception as e:
+            logger.error(f'캐시 스냅샷 저장 오류 : {e}')
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_sec):
+            self._save()